@@ -0,0 +1,273 @@
+"""
+Near-duplicate business detection for Lux Sales Dashboard
+
+get_or_create_business only links a record to an existing business when
+nombre and direccion match exactly (ignoring case), so "Taller El Rayo" and
+"Taller el Rayo SAC", or "Av." and "Avenida", become two businesses and split
+their visits, opportunities and sales. This module:
+
+- normalizes names and addresses (accents, case, punctuation, legal suffixes
+  like SAC/EIRL, street abbreviations) into a match key
+- splits the key into pg_trgm-style trigrams; engines keep an inverted index
+  gram -> businesses (SQLite business_ngrams, NgramIndex in memory, a pg_trgm
+  GiST index in Supabase) to find candidates without reading every business.
+  House numbers are indexed too ("#120"), so an address with a number is
+  only compared with the businesses at that number
+- scores candidates on name and address; house numbers must agree, so
+  "Av. Colonial 120" and "Av. Colonial 210" are never duplicates
+
+The forms warn about near-duplicates before creating a business
+(find_similar_businesses). The batch job below groups the duplicates already
+stored and merges each group into its oldest business:
+
+    python app/business_match.py [--engine sqlite] [--threshold 0.85] [--apply]
+
+Without --apply it only prints the groups it would merge.
+"""
+
+import argparse
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+# Score above which the forms warn before creating a business
+WARN_THRESHOLD = 0.65
+# Score above which the batch job merges two businesses
+MERGE_THRESHOLD = 0.85
+NAME_WEIGHT = 0.6
+ADDRESS_WEIGHT = 0.4
+
+# Candidates are the businesses sharing the most of the query's rarest half of
+# trigrams: anything sharing over half of them is found, and the rarest lists
+# (house numbers, unusual words) are the short ones, so lookups stay cheap
+MIN_RARE_GRAMS = 8
+MAX_CANDIDATES = 100
+
+_NUMBER = re.compile(r"\d+")
+LEGAL_SUFFIXES = {"sac", "saa", "sa", "srl", "eirl", "sc", "scrl"}
+NAME_STOPWORDS = {"el", "la", "los", "las", "de", "del", "y"}
+# Address words -> canonical abbreviation; number markers are dropped
+ADDRESS_WORDS = {
+    "avenida": "av", "avda": "av", "ave": "av",
+    "jiron": "jr", "jiro": "jr",
+    "calle": "ca", "cl": "ca", "cll": "ca",
+    "pasaje": "pje", "psje": "pje", "pj": "pje",
+    "urbanizacion": "urb", "manzana": "mz", "lote": "lt",
+    "prolongacion": "prol", "carretera": "carr", "ctra": "carr",
+    "nro": "", "no": "", "numero": "", "n": "",
+}
+
+
+def _fold(text: Optional[str]) -> str:
+    """Lowercase, drop accents, punctuation to spaces"""
+    text = unicodedata.normalize("NFKD", text or "").lower()
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return re.sub(r"[^\w]+", " ", text).replace("_", " ")
+
+
+def _join_initials(words: List[str]) -> List[str]:
+    """'s a c' (from S.A.C.) -> 'sac'"""
+    joined, run = [], []
+    for word in words + [""]:
+        if len(word) == 1 and word.isalpha():
+            run.append(word)
+            continue
+        if run:
+            joined.append("".join(run) if len(run) > 1 else run[0])
+            run = []
+        if word:
+            joined.append(word)
+    return joined
+
+
+@lru_cache(maxsize=65536)
+def normalize_name(nombre: Optional[str]) -> str:
+    words = _join_initials(_fold(nombre).split())
+    while len(words) > 1 and words[-1] in LEGAL_SUFFIXES:
+        words.pop()
+    return " ".join(w for w in words if w not in NAME_STOPWORDS) or " ".join(words)
+
+
+@lru_cache(maxsize=65536)
+def normalize_address(direccion: Optional[str]) -> str:
+    words = (ADDRESS_WORDS.get(w, w) for w in _fold(direccion).split())
+    return " ".join(w for w in words if w)
+
+
+def match_key(nombre: Optional[str], direccion: Optional[str]) -> str:
+    """Normalized text the n-gram index is built from"""
+    return f"{normalize_name(nombre)} {normalize_address(direccion)}".strip()
+
+
+@lru_cache(maxsize=65536)
+def trigrams(text: str) -> FrozenSet[str]:
+    """pg_trgm-style trigrams: each word padded with two spaces before and one after"""
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+
+@lru_cache(maxsize=65536)
+def _numbers(text: str) -> FrozenSet[str]:
+    return frozenset(_NUMBER.findall(text))
+
+
+def number_grams(direccion: Optional[str]) -> FrozenSet[str]:
+    """Index entries for the house numbers of an address ("#120")"""
+    return frozenset(f"#{n}" for n in _numbers(normalize_address(direccion)))
+
+
+def index_grams(nombre: Optional[str], direccion: Optional[str]) -> FrozenSet[str]:
+    """What a business is indexed under: match-key trigrams and house numbers"""
+    return trigrams(match_key(nombre, direccion)) | number_grams(direccion)
+
+
+def similarity(a: str, b: str, containment: bool = False) -> float:
+    """
+    Trigram similarity of two normalized texts, 0 when their numbers differ.
+    With containment, a text that is part of the other (an address without
+    its district) counts as a full match.
+    """
+    if _numbers(a) != _numbers(b):
+        return 0.0
+    ga, gb = trigrams(a), trigrams(b)
+    if not ga or not gb:
+        return 1.0 if a == b else 0.0
+    return len(ga & gb) / (min(len(ga), len(gb)) if containment else len(ga | gb))
+
+
+def rare_gram_count(grams: int) -> int:
+    """How many of a query's trigrams (the rarest) are looked up"""
+    return max(MIN_RARE_GRAMS, (grams + 1) // 2)
+
+
+def business_score(nombre: str, direccion: str, other_nombre: str, other_direccion: str) -> float:
+    """How likely two businesses are the same one (0-1)"""
+    name = similarity(normalize_name(nombre), normalize_name(other_nombre))
+    address = similarity(normalize_address(direccion), normalize_address(other_direccion), containment=True)
+    return NAME_WEIGHT * name + ADDRESS_WEIGHT * address
+
+
+def rank_candidates(nombre: str, direccion: str, candidates: Iterable[Dict[str, Any]],
+                    threshold: float = WARN_THRESHOLD, limit: int = 5) -> List[Dict[str, Any]]:
+    """Score candidate rows (id, nombre, direccion, ...) and keep the best above threshold"""
+    scored = []
+    for row in candidates:
+        score = business_score(nombre, direccion, row["nombre"], row["direccion"])
+        if score >= threshold:
+            scored.append({**row, "score": round(score, 3)})
+    scored.sort(key=lambda r: (-r["score"], r["id"]))
+    return scored[:limit]
+
+
+class NgramIndex:
+    """In-memory inverted index match-key trigram -> business ids"""
+
+    def __init__(self):
+        self._postings: Dict[str, Set[int]] = defaultdict(set)
+        self._grams: Dict[int, FrozenSet[str]] = {}
+
+    def add(self, business_id: int, nombre: str, direccion: str) -> None:
+        self.remove(business_id)
+        grams = index_grams(nombre, direccion)
+        self._grams[business_id] = grams
+        for gram in grams:
+            self._postings[gram].add(business_id)
+
+    def remove(self, business_id: int) -> None:
+        for gram in self._grams.pop(business_id, ()):
+            self._postings[gram].discard(business_id)
+
+    def candidates(self, nombre: str, direccion: str, limit: int = MAX_CANDIDATES) -> List[int]:
+        """
+        Businesses sharing the most of the query's rarest trigrams. When the
+        address has house numbers only businesses with the same ones are
+        counted: without them a score can't pass NAME_WEIGHT.
+        """
+        block = None
+        numbers = number_grams(direccion)
+        if numbers:
+            block = set.intersection(*(self._postings.get(g, set()) for g in numbers))
+            if not block:
+                return []
+        grams = sorted((g for g in trigrams(match_key(nombre, direccion)) if self._postings.get(g)),
+                       key=lambda g: len(self._postings[g]))
+        shared: Counter = Counter()
+        for gram in grams[:rare_gram_count(len(grams))]:
+            shared.update(self._postings[gram] if block is None else self._postings[gram] & block)
+        return [business_id for business_id, _ in shared.most_common(limit)]
+
+
+def duplicate_groups(businesses: List[Dict[str, Any]],
+                     threshold: float = MERGE_THRESHOLD) -> List[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+    """
+    Group stored businesses into (keeper, duplicates), the keeper being the
+    oldest (lowest id). A business joins a group only if it matches that
+    group's keeper, so chains of loose matches never merge.
+
+    Above NAME_WEIGHT a match needs the same house numbers, so businesses are
+    first split by the numbers in their address and only compared within
+    each block.
+    """
+    blocks: Dict[Any, List[Dict[str, Any]]] = defaultdict(list)
+    for b in businesses:
+        blocks[_numbers(normalize_address(b["direccion"])) if threshold > NAME_WEIGHT else None].append(b)
+
+    groups = []
+    for block in blocks.values():
+        if len(block) < 2:
+            continue
+        index = NgramIndex()
+        by_id = {b["id"]: b for b in block}
+        for b in block:
+            index.add(b["id"], b["nombre"], b["direccion"])
+
+        grouped: Set[int] = set()
+        for keeper in sorted(block, key=lambda b: b["id"]):
+            if keeper["id"] in grouped:
+                continue
+            candidates = [by_id[i] for i in index.candidates(keeper["nombre"], keeper["direccion"])
+                          if i > keeper["id"] and i not in grouped]
+            duplicates = rank_candidates(keeper["nombre"], keeper["direccion"], candidates,
+                                         threshold, limit=len(candidates))
+            if duplicates:
+                grouped.update(d["id"] for d in duplicates)
+                groups.append((keeper, duplicates))
+    groups.sort(key=lambda g: g[0]["id"])
+    return groups
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--engine", help="Storage engine (default: the configured one)")
+    parser.add_argument("--threshold", type=float, default=MERGE_THRESHOLD)
+    parser.add_argument("--apply", action="store_true", help="Merge the groups (default: only list them)")
+    args = parser.parse_args()
+
+    from repository import get_repository
+
+    db = get_repository(args.engine)
+    db.init_database()
+    businesses = db.get_businesses()
+    groups = duplicate_groups(businesses, args.threshold)
+    print(f"🔎 {len(businesses)} negocios, {len(groups)} grupo(s) de duplicados "
+          f"({sum(len(d) for _, d in groups)} a fusionar)")
+    for keeper, duplicates in groups:
+        print(f"\n✅ #{keeper['id']} {keeper['nombre']} — {keeper['direccion']}")
+        for d in duplicates:
+            print(f"   ↳ #{d['id']} {d['nombre']} — {d['direccion']} ({d['score']:.2f})")
+
+    if not args.apply:
+        if groups:
+            print("\nSin cambios (use --apply para fusionar)")
+        return
+    moved = sum(db.merge_businesses(keeper["id"], [d["id"] for d in duplicates]) for keeper, duplicates in groups)
+    print(f"\n💾 {len(groups)} grupo(s) fusionados, {moved} registro(s) reasignados")
+
+
+if __name__ == "__main__":
+    main()
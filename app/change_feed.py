@@ -0,0 +1,294 @@
+"""
+Change feed for Lux Sales Dashboard
+
+Keeps an in-process copy of businesses, visitas, oportunidades and ventas that
+is loaded once and then updated row by row from a change feed, so other reps'
+new records show up without re-running every query:
+
+- Supabase: realtime ``postgres_changes`` subscription (async client on a
+  background thread). The tables must be in the ``supabase_realtime``
+  publication, see migrations/supabase/0015_realtime.sql.
+- SQLite (local stand-in): triggers write to ``change_log`` (see
+  database.init_database) and a background thread tails it by id, deleting
+  the entries it has read once they are LOG_RETENTION seconds old.
+
+Pages read from the store through DataContext; the store's ``version`` tells the
+UI when something changed.
+"""
+
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from datetime import date
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+TABLES = ["businesses", "visitas", "oportunidades", "ventas"]
+
+# Date column used for period reads, newest first like the getters
+PERIOD_COLUMNS = {
+    "visitas": "fecha",
+    "oportunidades": "fecha_contacto",
+    "ventas": "fecha_cierre",
+}
+
+# change_log entries a feed has read are kept this long (seconds) for other
+# processes tailing the same database, then deleted
+LOG_RETENTION = 3600.0
+# Seconds between prunes (the first one runs at startup)
+PRUNE_INTERVAL = 300.0
+
+_store: Optional["LiveStore"] = None
+
+
+class LiveStore:
+    """Thread-safe copy of the sales tables, updated by deltas"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._rows: Dict[str, Dict[int, Dict[str, Any]]] = {t: {} for t in TABLES}
+        self._pending: List[tuple] = []
+        self.loaded = False
+        self.version = 0
+
+    def load(self, snapshot: Dict[str, List[Dict[str, Any]]]) -> None:
+        """Replace the contents with a full snapshot, then apply events received meanwhile"""
+        with self._lock:
+            self._rows = {t: {r['id']: r for r in snapshot.get(t, [])} for t in TABLES}
+            self.loaded = True
+            pending, self._pending = self._pending, []
+            for args in pending:
+                self._apply(*args)
+            self.version += 1
+
+    def apply(self, table: str, op: str, record: Optional[Dict[str, Any]],
+              old_record: Optional[Dict[str, Any]] = None) -> None:
+        """Apply one INSERT/UPDATE/DELETE coming from a feed"""
+        if table not in self._rows:
+            return
+        with self._lock:
+            if not self.loaded:
+                # Buffer until the snapshot is in
+                self._pending.append((table, op, record, old_record))
+                return
+            if self._apply(table, op, record, old_record):
+                self.version += 1
+
+    def _apply(self, table, op, record, old_record) -> bool:
+        rows = self._rows[table]
+        if op == "DELETE":
+            row_id = (old_record or record or {}).get('id')
+            return rows.pop(row_id, None) is not None
+        current = rows.get(record['id'])
+        # Ignore events older than what we already have (snapshot raced the feed)
+        if current and str(record.get('updated_at') or '') < str(current.get('updated_at') or ''):
+            return False
+        rows[record['id']] = record
+        return True
+
+    def _flatten(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """Add business fields like the getters' join does"""
+        flat = dict(row)
+        business = self._rows["businesses"].get(row.get('business_id'))
+        if business:
+            flat['nombre'] = business['nombre']
+            flat['tipo_negocio'] = business['tipo_negocio']
+            flat['direccion'] = business['direccion']
+        return flat
+
+    def period_rows(self, table: str, start_date: date, end_date: date) -> List[Dict[str, Any]]:
+        """Rows of a table within the date range, newest first"""
+        column = PERIOD_COLUMNS[table]
+        lo, hi = start_date.isoformat(), end_date.isoformat()
+        with self._lock:
+            rows = [self._flatten(r) for r in self._rows[table].values()
+                    if lo <= str(r[column])[:10] <= hi]
+        rows.sort(key=lambda r: str(r[column]), reverse=True)
+        return rows
+
+    def oportunidades_activas(self) -> List[Dict[str, Any]]:
+        """Active opportunities, newest contact first"""
+        with self._lock:
+            rows = [self._flatten(r) for r in self._rows["oportunidades"].values()
+                    if r.get('estado') == 'Activa']
+        rows.sort(key=lambda r: str(r['fecha_contacto']), reverse=True)
+        return rows
+
+
+def live_store() -> Optional[LiveStore]:
+    """The running store, or None if no change feed was started"""
+    return _store if _store is not None and _store.loaded else None
+
+
+# --- Supabase realtime ---
+
+def _load_supabase_snapshot(client) -> Dict[str, List[Dict[str, Any]]]:
+    """Full read of each table, paginated past PostgREST's row limit"""
+    page = 1000
+    snapshot = {}
+    for table in TABLES:
+        rows, offset = [], 0
+        while True:
+            batch = client.table(table).select("*").order("id").range(offset, offset + page - 1).execute().data
+            rows.extend(batch)
+            if len(batch) < page:
+                break
+            offset += page
+        snapshot[table] = rows
+    return snapshot
+
+
+class SupabaseChangeFeed:
+    """Realtime subscription on a background thread with its own event loop"""
+
+    def __init__(self, url: str, key: str, store: LiveStore, sync_client_factory: Callable[[], Any]):
+        self.url = url
+        self.key = key
+        self.store = store
+        self._sync_client_factory = sync_client_factory
+        self._thread = threading.Thread(target=self._run, name="lux-realtime", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def _on_change(self, payload: Dict[str, Any]) -> None:
+        data = payload.get('data', payload)
+        op = str(data.get('type', '')).upper().rsplit('.', 1)[-1]
+        self.store.apply(data.get('table'), op, data.get('record') or None, data.get('old_record'))
+
+    def _run(self) -> None:
+        try:
+            asyncio.run(self._listen())
+        except Exception as e:
+            logger.warning(f"Realtime feed stopped: {e}")
+
+    async def _listen(self) -> None:
+        from supabase import acreate_client
+
+        client = await acreate_client(self.url, self.key)
+        channel = client.channel("lux-changes")
+        for table in TABLES:
+            channel.on_postgres_changes("*", schema="public", table=table, callback=self._on_change)
+        await channel.subscribe()
+
+        # Subscribed first, so nothing committed after the snapshot is missed
+        snapshot = await asyncio.to_thread(_load_supabase_snapshot, self._sync_client_factory())
+        self.store.load(snapshot)
+        logger.info("Realtime feed subscribed")
+
+        listen = getattr(client.realtime, "listen", None)
+        if listen is not None:
+            await listen()
+        else:
+            await asyncio.Event().wait()
+
+
+# --- SQLite change log ---
+
+class SQLiteChangeFeed:
+    """Tails the trigger-maintained change_log table of a SQLite database"""
+
+    def __init__(self, db_path: Path, store: LiveStore, interval: float = 1.0):
+        self.db_path = db_path
+        self.store = store
+        self.interval = interval
+        self.last_id = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="lux-changelog", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def load_snapshot(self) -> None:
+        conn = self._connect()
+        try:
+            # Remember where the log is before reading, later entries are deltas
+            self.last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM change_log").fetchone()[0]
+            snapshot = {t: [dict(r) for r in conn.execute(f"SELECT * FROM {t}")] for t in TABLES}
+        finally:
+            conn.close()
+        self.store.load(snapshot)
+
+    def poll(self) -> int:
+        """Apply log entries newer than the last seen id; returns how many were read"""
+        conn = self._connect()
+        try:
+            entries = conn.execute(
+                "SELECT id, table_name, row_id FROM change_log WHERE id > ? ORDER BY id",
+                (self.last_id,)
+            ).fetchall()
+            if not entries:
+                return 0
+            changed: Dict[str, set] = {}
+            for entry in entries:
+                changed.setdefault(entry['table_name'], set()).add(entry['row_id'])
+
+            # Current state of each touched row; missing rows were deleted
+            for table, ids in changed.items():
+                placeholders = ",".join("?" * len(ids))
+                current = {r['id']: dict(r) for r in
+                           conn.execute(f"SELECT * FROM {table} WHERE id IN ({placeholders})", tuple(ids))}
+                for row_id in ids:
+                    if row_id in current:
+                        self.store.apply(table, "UPDATE", current[row_id])
+                    else:
+                        self.store.apply(table, "DELETE", None, {'id': row_id})
+            self.last_id = entries[-1]['id']
+            return len(entries)
+        finally:
+            conn.close()
+
+    def prune(self) -> int:
+        """Delete read log entries older than LOG_RETENTION; returns how many"""
+        conn = self._connect()
+        try:
+            deleted = conn.execute(
+                "DELETE FROM change_log WHERE id <= ? AND changed_at < datetime('now', ?)",
+                (self.last_id, f"-{LOG_RETENTION:.0f} seconds")
+            ).rowcount
+            conn.commit()
+            return deleted
+        finally:
+            conn.close()
+
+    def _run(self) -> None:
+        last_prune = None
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+                if last_prune is None or time.monotonic() - last_prune > PRUNE_INTERVAL:
+                    self.prune()
+                    last_prune = time.monotonic()
+            except Exception as e:
+                logger.warning(f"Change log poll failed: {e}")
+
+
+def start_supabase_feed(url: str, key: str, sync_client_factory: Callable[[], Any]) -> LiveStore:
+    """Start the realtime feed and return its store (filled once subscribed)"""
+    global _store
+    _store = LiveStore()
+    SupabaseChangeFeed(url, key, _store, sync_client_factory).start()
+    return _store
+
+
+def start_sqlite_feed(db_path: Path, interval: float = 1.0) -> LiveStore:
+    """Load the SQLite tables and start tailing their change log"""
+    global _store
+    store = LiveStore()
+    feed = SQLiteChangeFeed(db_path, store, interval)
+    feed.load_snapshot()
+    feed.start()
+    _store = store
+    return store
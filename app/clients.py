@@ -0,0 +1,44 @@
+"""
+Client factories for external services, usable from any thread or process
+
+One Supabase client per process, built from config.py settings. The
+Streamlit app, the background replica/queue/feed threads and CLI jobs all
+get their client from here.
+"""
+
+import logging
+import threading
+from typing import Any, Optional
+
+import config
+
+logger = logging.getLogger(__name__)
+
+_supabase: Optional[Any] = None
+_lock = threading.Lock()
+
+
+def supabase_credentials() -> tuple:
+    """(url, key) from [supabase] in the settings; ConfigError if missing"""
+    return config.require("supabase", "url"), config.require("supabase", "key")
+
+
+def get_supabase_client():
+    """The process-wide Supabase client, created on first use"""
+    global _supabase
+    if _supabase is None:
+        with _lock:
+            if _supabase is None:
+                # Imported here so the Supabase/httpx stack only loads on the first query
+                from supabase import create_client
+
+                url, key = supabase_credentials()
+                _supabase = create_client(url, key)
+                logger.info(f"Supabase client created for {url}")
+    return _supabase
+
+
+def set_supabase_client(client) -> None:
+    """Use a prebuilt client (e.g. fake_supabase.FakeSupabase) instead of connecting"""
+    global _supabase
+    _supabase = client
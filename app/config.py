@@ -0,0 +1,131 @@
+"""
+Configuration for Lux Sales Dashboard, independent of Streamlit
+
+Settings are read from the same secrets.toml the Streamlit app uses
+(.streamlit/secrets.toml, or the file named by LUX_SECRETS_FILE), so
+background threads, worker processes and CLI jobs see the same configuration
+as the UI without importing Streamlit.
+
+Environment variables override the file. ``LUX_<SECTION>_<KEY>`` sets
+``[section] key``; SUPABASE_URL and SUPABASE_KEY are also accepted:
+
+    LUX_SUPABASE_URL=https://xyz.supabase.co  LUX_REPLICA_ENABLED=true
+
+When the file is missing and the process is a Streamlit app (Streamlit Cloud
+stores secrets outside the repo), st.secrets is used instead.
+"""
+
+import os
+import sys
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+
+SECRETS_PATH = Path(__file__).parent.parent / ".streamlit" / "secrets.toml"
+
+# Sections whose names contain underscores, so LUX_GREEN_API_TOKEN maps to
+# [green_api] token rather than [green] api_token
+SECTIONS = ["supabase", "database", "realtime", "replica", "write_queue", "green_api"]
+
+# Conventional names accepted besides LUX_<SECTION>_<KEY>
+ENV_ALIASES = {
+    "SUPABASE_URL": ("supabase", "url"),
+    "SUPABASE_KEY": ("supabase", "key"),
+}
+
+
+class ConfigError(Exception):
+    """A required setting is missing or invalid"""
+
+
+def _parse_env(value: str) -> Any:
+    """Turn 'true'/'false'/numbers from the environment into TOML-like values"""
+    lowered = value.strip().lower()
+    if lowered in ("true", "false"):
+        return lowered == "true"
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except ValueError:
+            pass
+    return value
+
+
+def _read_file() -> Dict[str, Any]:
+    path = Path(os.environ.get("LUX_SECRETS_FILE", SECRETS_PATH))
+    if path.exists() and tomllib is not None:
+        with open(path, "rb") as f:
+            return tomllib.load(f)
+    return {}
+
+
+def _read_streamlit_secrets() -> Dict[str, Any]:
+    """st.secrets, only if this process already runs Streamlit (never imports it)"""
+    st = sys.modules.get("streamlit")
+    if st is None:
+        return {}
+    try:
+        return {k: dict(v) if hasattr(v, "items") else v for k, v in st.secrets.items()}
+    except Exception:
+        return {}
+
+
+@lru_cache(maxsize=1)
+def settings() -> Dict[str, Any]:
+    """All settings, file (or st.secrets) first, then environment overrides"""
+    data = _read_file() or _read_streamlit_secrets()
+    data = {k: dict(v) if isinstance(v, dict) else v for k, v in data.items()}
+
+    known = sorted(set(SECTIONS) | set(data), key=len, reverse=True)
+    for name, value in os.environ.items():
+        if name in ENV_ALIASES:
+            section, key = ENV_ALIASES[name]
+        elif name.startswith("LUX_") and name.count("_") >= 2 and name != "LUX_SECRETS_FILE":
+            rest = name[4:].lower()
+            section = next((s for s in known if rest.startswith(s + "_")), rest.split("_", 1)[0])
+            key = rest[len(section) + 1:]
+        else:
+            continue
+        data.setdefault(section, {})
+        if isinstance(data[section], dict):
+            data[section][key] = _parse_env(value)
+    return data
+
+
+def section(name: str) -> Dict[str, Any]:
+    """One [section] of the settings (empty if absent)"""
+    value = settings().get(name, {})
+    return value if isinstance(value, dict) else {}
+
+
+def get(section_name: str, key: str, default: Any = None) -> Any:
+    return section(section_name).get(key, default)
+
+
+def enabled(section_name: str) -> bool:
+    """``[section] enabled = true``"""
+    return bool(get(section_name, "enabled", False))
+
+
+def require(section_name: str, key: str) -> Any:
+    """A setting that must be present, or ConfigError naming where to set it"""
+    value = get(section_name, key)
+    if value in (None, ""):
+        raise ConfigError(
+            f"Missing [{section_name}] {key} in secrets.toml "
+            f"(or LUX_{section_name.upper()}_{key.upper()} in the environment)"
+        )
+    return value
+
+
+def reload() -> None:
+    """Forget cached settings (after editing the file or the environment)"""
+    settings.cache_clear()
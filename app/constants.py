@@ -0,0 +1,24 @@
+"""
+Shared constants for Lux Sales Dashboard pages
+"""
+
+TIPOS_NEGOCIO = ["Taller Automotriz", "Detailing", "Maestranza", "Factoría", "Comercializadora", "Salón de Belleza", "Otro"]
+PRODUCTOS = ["JP01Y (Poliurea Alto Tránsito)", "JP02R (Poliurea Impermeabilización)", 
+             "JS02Y (Poliaspártico)", "JS02Y + Flakes Decorativos", 
+             "1002A/B (Poliuretano Brillante)", "1003A/B (Poliuretano Mate)"]
+SOURCES = ["Digital Advertising", "F2F Contact", "Known Client", "Referral"]
+ASSIGNED_TO = ["Sebastian", "Ingemar", "Emmanuel", "Adolfo"]
+
+# Automatic assignment of new opportunities (weighted random pick)
+SALES_REPS = ["Emmanuel", "Sebastian", "Ingemar", "Adolfo"]
+SALES_WEIGHTS = [0.40, 0.30, 0.20, 0.10]
+
+# Page options
+PAGES = ["🏠 Inicio", "📝 Registrar Visita", "🎯 Registrar Oportunidad", 
+         "💰 Registrar Venta", "📋 Ver Registros", "📊 KPIs y Reportes", "🔎 Buscar"]
+
+# KPIs page snapshots (snapshots.py); here so the storage engines need not import it.
+# Bumped when the snapshot keys change: stored snapshots of another format are recomputed
+SNAPSHOT_FORMAT = 3
+# Snapshots kept in the table (older ones are deleted on save)
+SNAPSHOTS_KEPT = 48
@@ -5,26 +5,22 @@ Date: 13 January 2026
 """
 
 import streamlit as st
-import pandas as pd
-from datetime import datetime, date, timedelta
+import time
+from datetime import date
 from pathlib import Path
 import sys
 
 # Add app directory to path
 sys.path.append(str(Path(__file__).parent))
 
-from database_supabase import (
-    init_database, create_visita, update_visita, delete_visita, 
-    create_oportunidad, update_oportunidad, delete_oportunidad, mark_opportunity_lost,
-    create_venta, update_venta, get_visitas_by_period, get_oportunidades_activas,
-    get_ventas_by_period, generate_venta_id, get_week_number,
-    SALES_REPS, ASSIGNED_TO
-)
-from excel_reader import (
-    read_gastos_excel, get_gastos_by_period, get_gastos_by_week,
-    get_gastos_by_venta_id, get_costos_summary, IS_CLOUD,
-    read_gastos_from_uploaded_file
-)
+import config
+import instrumentation
+from repository import get_repository, engine_name
+from constants import PAGES
+from data_context import new_data_context
+from change_feed import live_store
+from write_queue import write_queue
+from views import render_page
 
 # Page config
 st.set_page_config(
@@ -34,16 +30,137 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Initialize database
-init_database()
+# Time every data-layer call (see instrumentation.py); collect this run's calls
+_run_started = time.perf_counter()
+instrumentation.install()
+instrumentation.begin_run()
+
+
+@st.cache_resource
+def _init_database_once() -> bool:
+    """Run schema setup once per process instead of on every rerun"""
+    get_repository().init_database()
+    return True
+
+
+def _check_connection() -> None:
+    """Stop with a readable message if the Supabase client can't be created"""
+    if engine_name() != "supabase":
+        return
+    from database_supabase import init_connection
+    try:
+        init_connection()
+    except Exception as e:
+        st.error(f"❌ Error connecting to Supabase: {e}")
+        st.stop()
+
+
+@st.cache_resource
+def _start_change_feed_once() -> bool:
+    """Start the realtime change feed if enabled in secrets ([realtime] enabled = true)"""
+    try:
+        if not config.enabled("realtime"):
+            return False
+        if engine_name() == "sqlite":
+            from change_feed import start_sqlite_feed
+            from database import DB_PATH
+            start_sqlite_feed(DB_PATH)
+            return True
+        if engine_name() != "supabase":
+            return False
+        from change_feed import start_supabase_feed
+        from clients import supabase_credentials
+        from database_supabase import init_connection
+        start_supabase_feed(*supabase_credentials(), init_connection)
+        return True
+    except Exception as e:
+        print(f"Realtime feed not started: {e}")
+        return False
+
+
+@st.cache_resource
+def _start_replica_once() -> bool:
+    """Serve reads from the local SQLite replica if enabled ([replica] enabled = true)"""
+    try:
+        cfg = config.section("replica")
+        if not cfg.get("enabled", False) or engine_name() != "supabase":
+            return False
+        from replica import start_replica
+        from database_supabase import init_connection
+        start_replica(init_connection(), max_staleness=float(cfg.get("max_staleness", 30)))
+        return True
+    except Exception as e:
+        print(f"Replica not started: {e}")
+        return False
+
+
+@st.cache_resource
+def _start_write_queue_once() -> bool:
+    """Queue creates/updates locally and replay them in the background ([write_queue] enabled = true)"""
+    try:
+        if not config.enabled("write_queue") or engine_name() != "supabase":
+            return False
+        from write_queue import start_write_queue
+        from database_supabase import init_connection
+        start_write_queue(init_connection)
+        return True
+    except Exception as e:
+        print(f"Write queue not started: {e}")
+        return False
+
+
+@st.cache_resource
+def _start_followups_once() -> bool:
+    """Send WhatsApp reminders when next actions come due ([followups] enabled = true)"""
+    try:
+        if not config.enabled("followups"):
+            return False
+        from followups import REMINDER_HOUR, TIMEZONE, start_followups
+        cfg = config.section("followups")
+        start_followups(get_repository(), int(cfg.get("hour", REMINDER_HOUR)), cfg.get("timezone", TIMEZONE))
+        return True
+    except Exception as e:
+        print(f"Follow-up scheduler not started: {e}")
+        return False
+
+
+@st.cache_resource
+def _start_snapshots_once() -> bool:
+    """Precompute the KPIs page in the background ([snapshots] enabled = true)"""
+    try:
+        if not config.enabled("snapshots"):
+            return False
+        from snapshots import CHECK_EVERY, REFRESH_INTERVAL, start_snapshot_worker
+        cfg = config.section("snapshots")
+        start_snapshot_worker(get_repository(), float(cfg.get("interval", REFRESH_INTERVAL)),
+                              float(cfg.get("check_every", CHECK_EVERY)))
+        return True
+    except Exception as e:
+        print(f"KPI snapshot worker not started: {e}")
+        return False
 
-# Constants
-TIPOS_NEGOCIO = ["Taller Automotriz", "Detailing", "Maestranza", "Factoría", "Comercializadora", "Salón de Belleza", "Otro"]
-PRODUCTOS = ["JP01Y (Poliurea Alto Tránsito)", "JP02R (Poliurea Impermeabilización)", 
-             "JS02Y (Poliaspártico)", "JS02Y + Flakes Decorativos", 
-             "1002A/B (Poliuretano Brillante)", "1003A/B (Poliuretano Mate)"]
-SOURCES = ["Digital Advertising", "F2F Contact", "Known Client", "Referral"]
-ASSIGNED_TO = ["Sebastian", "Ingemar", "Emmanuel", "Adolfo"]
+
+# Initialize database
+_check_connection()
+_init_database_once()
+_start_replica_once()
+_start_write_queue_once()
+_start_change_feed_once()
+_start_followups_once()
+_start_snapshots_once()
+
+# Pages that reflect other reps' changes as they arrive
+LIVE_PAGES = ["🏠 Inicio", "📋 Ver Registros", "📊 KPIs y Reportes"]
+
+
+@st.fragment(run_every="5s")
+def _watch_live_updates() -> None:
+    """Rerun from memory when the change feed applied new rows (no queries involved)"""
+    store = live_store()
+    if store is None or st.session_state.get('page') not in LIVE_PAGES:
+        return
+    if store.version != st.session_state.get('_live_version'):
+        st.rerun()
 
 # Sidebar navigation
 st.sidebar.title("📊 Lux Dashboard")
@@ -53,10 +170,6 @@ st.sidebar.markdown("---")
 if 'page' not in st.session_state:
     st.session_state['page'] = "🏠 Inicio"
 
-# Page options
-PAGES = ["🏠 Inicio", "📝 Registrar Visita", "🎯 Registrar Oportunidad", 
-         "💰 Registrar Venta", "📋 Ver Registros", "📊 KPIs y Reportes"]
-
 # Sidebar radio controlled by session state
 current_index = PAGES.index(st.session_state['page']) if st.session_state['page'] in PAGES else 0
 
@@ -72,950 +185,30 @@ if page != st.session_state['page']:
     st.rerun()
 
 st.sidebar.markdown("---")
-st.sidebar.info(f"📅 Hoy: {date.today().strftime('%d-%b-%Y')}\n\n🗓️ Semana: {get_week_number(date.today())}")
-
-
-# ============= PAGE: INICIO =============
-if st.session_state['page'] == "🏠 Inicio":
-    st.title("🏠 Bienvenido al Dashboard Lux")
-    st.markdown("### Sistema de Control de Ventas B2B - Pisos Industriales")
-    
-    col1, col2, col3 = st.columns(3)
-    
-    # Quick stats for this week
-    today = date.today()
-    week_start = today - timedelta(days=today.weekday())
-    month_start = date(today.year, today.month, 1)
-    
-    visitas = get_visitas_by_period(week_start, today)
-    visitas_mes = get_visitas_by_period(month_start, today)
-    oportunidades = get_oportunidades_activas()
-    ventas_semana = get_ventas_by_period(week_start, today)
-    
-    # Custom CSS for the nav buttons
-    st.markdown("""
-    <style>
-    div[data-testid="stButton"] > button {
-        border-radius: 12px;
-        padding: 0.55rem 0rem;
-        font-size: 0.95rem;
-        font-weight: 600;
-        transition: opacity 0.2s;
-    }
-    div[data-testid="stButton"] > button:hover { opacity: 0.85; }
-    div.nav-btn-visitas > div[data-testid="stButton"] > button {
-        background: linear-gradient(135deg, #1a73e8, #0d47a1);
-        color: white; border: none;
-    }
-    div.nav-btn-opps > div[data-testid="stButton"] > button {
-        background: linear-gradient(135deg, #e65100, #bf360c);
-        color: white; border: none;
-    }
-    div.nav-btn-ventas > div[data-testid="stButton"] > button {
-        background: linear-gradient(135deg, #2e7d32, #1b5e20);
-        color: white; border: none;
-    }
-    </style>
-    """, unsafe_allow_html=True)
-
-    # Metrics row
-    with col1:
-        st.metric("✅ Visitas esta Semana", len(visitas), delta=f"{len(visitas_mes)} en el mes")
-    with col2:
-        st.metric("🎯 Oportunidades Activas", len(oportunidades))
-    with col3:
-        st.metric("💰 Ventas esta Semana", len(ventas_semana))
-
-    # Buttons row — separate columns so they are always perfectly aligned
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        st.markdown('<div class="nav-btn-visitas">', unsafe_allow_html=True)
-        if st.button("📝 Ver Visitas →", key="home_ver_visitas", use_container_width=True):
-            st.session_state['ver_registros_tab'] = 0
-            st.session_state['page'] = "📋 Ver Registros"
-            st.rerun()
-        st.markdown('</div>', unsafe_allow_html=True)
-    with col2:
-        st.markdown('<div class="nav-btn-opps">', unsafe_allow_html=True)
-        if st.button("🎯 Ver Oportunidades →", key="home_ver_opps", use_container_width=True):
-            st.session_state['ver_registros_tab'] = 1
-            st.session_state['page'] = "📋 Ver Registros"
-            st.rerun()
-        st.markdown('</div>', unsafe_allow_html=True)
-    with col3:
-        st.markdown('<div class="nav-btn-ventas">', unsafe_allow_html=True)
-        if st.button("💰 Ver Ventas →", key="home_ver_ventas", use_container_width=True):
-            st.session_state['ver_registros_tab'] = 2
-            st.session_state['page'] = "📋 Ver Registros"
-            st.rerun()
-        st.markdown('</div>', unsafe_allow_html=True)
-    
-    st.markdown("---")
-    st.markdown("### 📌 Acciones Rápidas")
-    
-    col1, col2, col3 = st.columns(3)
-    
-    with col1:
-        if st.button("➕ Nueva Visita", use_container_width=True):
-            st.session_state['page'] = "📝 Registrar Visita"
-            st.rerun()
-    
-    with col2:
-        if st.button("🎯 Nueva Oportunidad", use_container_width=True):
-            st.session_state['page'] = "🎯 Registrar Oportunidad"
-            st.rerun()
-    
-    with col3:
-        if st.button("💰 Nueva Venta", use_container_width=True):
-            st.session_state['page'] = "💰 Registrar Venta"
-            st.rerun()
-
-
-
-# ============= PAGE: REGISTRAR VISITA =============
-elif st.session_state['page'] == "📝 Registrar Visita":
-    # Check if editing an existing visit
-    editing_visita = st.session_state.get('visita_to_edit', None)
-    st.title("📝 " + ("Editar Visita" if editing_visita else "Registrar Nueva Visita"))
-
-    with st.form("form_visita"):
-        st.markdown("### Datos del Negocio")
-
-        col1, col2 = st.columns(2)
-
-        with col1:
-            nombre = st.text_input("Nombre del Negocio *", value=editing_visita['nombre'] if editing_visita else "", placeholder="Ej: Taller El Rayo")
-            tipo_negocio = st.selectbox("Tipo de Negocio *", TIPOS_NEGOCIO, index=TIPOS_NEGOCIO.index(editing_visita['tipo_negocio']) if editing_visita else 0)
-
-        with col2:
-            fecha = st.date_input("Fecha de Visita *", value=editing_visita['fecha'] if editing_visita else date.today())
-            semana = get_week_number(fecha)
-            st.text_input("Semana", value=semana, disabled=True)
-
-        direccion = st.text_area("Dirección *", value=editing_visita['direccion'] if editing_visita else "", placeholder="Ej: Av. Arriola 234, Urb. Industrial, La Victoria", height=100)
-
-        notas = st.text_area("Notas / Observaciones", value=editing_visita['notas'] if editing_visita and editing_visita['notas'] else "", placeholder="Ej: Hablé con el dueño, mostró interés en JS02Y, tiene 150m²", height=100)
-
-        submitted = st.form_submit_button("💾 Guardar Visita", use_container_width=True)
-
-        if submitted:
-            if nombre and tipo_negocio and direccion:
-                try:
-                    if editing_visita:
-                        update_visita(editing_visita['id'], nombre, tipo_negocio, direccion, fecha, semana, notas)
-                        st.success(f"✅ Visita actualizada exitosamente! ID: {editing_visita['id']}")
-                        del st.session_state['visita_to_edit']
-                        st.rerun()
-                    else:
-                        visita_id = create_visita(nombre, tipo_negocio, direccion, fecha, semana, notas)
-                        st.success(f"✅ Visita registrada exitosamente! ID: {visita_id}")
-                    st.balloons()
-                except Exception as e:
-                    st.error(f"❌ Error al guardar: {str(e)}")
-            else:
-                st.error("⚠️ Por favor complete todos los campos obligatorios (*)")
-
-    # Show recent visits
-    st.markdown("---")
-    
-    # Filter controls for the list
-    col_filter1, col_filter2 = st.columns([2, 1])
-    with col_filter1:
-        st.markdown(f"### 📋 Visitas Recientes")
-    with col_filter2:
-        # Week number display in corner as requested
-        current_week_num = get_week_number(date.today())
-        st.markdown(f"#### 🗓️ Semana Actual: {current_week_num}")
-
-    # Date selector for the list
-    col_d1, col_d2 = st.columns(2)
-    with col_d1:
-        filter_option = st.selectbox(
-            "Filtrar lista por:", 
-            ["Esta Semana (Lun-Dom)", "Últimos 15 días", "Seleccionar Rango"],
-            index=1 # Default to last 15 days so we see recent entries even if they were last week
-        )
-    
-    today = date.today()
-    if filter_option == "Esta Semana (Lun-Dom)":
-        start_date = today - timedelta(days=today.weekday())
-        end_date = today + timedelta(days=6 - today.weekday())
-    elif filter_option == "Últimos 15 días":
-        start_date = today - timedelta(days=15)
-        end_date = today
-    else: # Select Range
-        with col_d2:
-            date_range = st.date_input(
-                "Selecciona rango",
-                value=(today - timedelta(days=7), today),
-                key="visit_date_range"
-            )
-            if isinstance(date_range, tuple) and len(date_range) == 2:
-                start_date, end_date = date_range
-            else:
-                start_date = today - timedelta(days=7)
-                end_date = today
-
-    visitas = get_visitas_by_period(start_date, end_date)
-
-    if visitas:
-        st.info(f"Mostrando {len(visitas)} visitas del {start_date} al {end_date}")
-        for visita in visitas:
-            with st.expander(f"📅 {visita['fecha']} | {visita['nombre']} ({visita['tipo_negocio']})"):
-                st.write(f"**Dirección:** {visita['direccion']}")
-                st.write(f"**Semana:** {visita['semana']}")
-                if visita['notas']:
-                    st.write(f"**Notas:** {visita['notas']}")
-
-                col1, col2, col3 = st.columns(3)
-                with col1:
-                    if st.button("✏️ Editar Visita", key=f"edit_{visita['id']}"):
-                        st.session_state['visita_to_edit'] = visita
-                        st.session_state['page'] = "📝 Registrar Visita"
-                        st.rerun()
-                with col2:
-                    if st.button("🎯 Convertir a Oportunidad", key=f"conv_{visita['id']}"):
-                        st.session_state['visita_to_convert'] = visita
-                        st.session_state['page'] = "🎯 Registrar Oportunidad"
-                        st.rerun()
-                with col3:
-                    if st.button("🗑️ Eliminar Visita", key=f"del_{visita['id']}"):
-                        st.session_state['visita_to_delete'] = visita['id']
-                        st.session_state['show_delete_confirm'] = True
-                        st.rerun()
-    else:
-        st.info("No hay visitas registradas en este período.")
-
-    # Delete confirmation dialog
-    if st.session_state.get('show_delete_confirm', False):
-        visita_id = st.session_state.get('visita_to_delete')
-        if visita_id:
-            st.warning("¿Está seguro que desea eliminar esta visita? Esta acción no se puede deshacer.")
-            col1, col2 = st.columns(2)
-            with col1:
-                # Use a specific key for the confirm button that doesn't conflict
-                if st.button("✅ Confirmar Eliminación", key="confirm_delete_btn"):
-                    try:
-                        delete_visita(visita_id)
-                        st.success("Visita eliminada exitosamente.")
-                        # Clear state
-                        del st.session_state['visita_to_delete']
-                        del st.session_state['show_delete_confirm']
-                        st.rerun()
-                    except Exception as e:
-                        st.error(f"Error al eliminar: {e}")
-            with col2:
-                if st.button("❌ Cancelar", key="cancel_delete_btn"):
-                    del st.session_state['visita_to_delete']
-                    del st.session_state['show_delete_confirm']
-                    st.rerun()
-
-
-# ============= PAGE: REGISTRAR OPORTUNIDAD =============
-elif st.session_state['page'] == "🎯 Registrar Oportunidad":
-    st.title("🎯 Gestión de Oportunidades")
-    
-    # Check if converting from visit
-    visita_convert = st.session_state.get('visita_to_convert', None)
-    # Check if editing existing opportunity
-    opp_to_edit = st.session_state.get('opp_to_edit', None)
-    
-    if opp_to_edit:
-        st.info(f"✏️ Editando oportunidad: {opp_to_edit['nombre']}")
-        if st.button("❌ Cancelar Edición"):
-            del st.session_state['opp_to_edit']
-            st.rerun()
-
-    title_text = "Editar Oportunidad" if opp_to_edit else "Registrar Nueva Oportunidad"
-    
-    with st.form("form_oportunidad"):
-        st.markdown(f"### {title_text}")
-        
-        col1, col2 = st.columns(2)
-        
-        # Defaults
-        def_nombre = opp_to_edit['nombre'] if opp_to_edit else (visita_convert['nombre'] if visita_convert else "")
-        def_tipo_idx = TIPOS_NEGOCIO.index(opp_to_edit['tipo_negocio']) if opp_to_edit else (TIPOS_NEGOCIO.index(visita_convert['tipo_negocio']) if visita_convert else 0)
-        
-        # Handle source default properly
-        def_source_idx = 0
-        if opp_to_edit and opp_to_edit.get('source') in SOURCES:
-            def_source_idx = SOURCES.index(opp_to_edit['source'])
-            
-        def_fecha = datetime.strptime(opp_to_edit['fecha_contacto'], '%Y-%m-%d').date() if opp_to_edit and isinstance(opp_to_edit['fecha_contacto'], str) else (opp_to_edit['fecha_contacto'] if opp_to_edit else date.today())
-        
-        with col1:
-            nombre = st.text_input("Nombre del Negocio *", 
-                                   value=def_nombre,
-                                   placeholder="Ej: Taller Los Andes")
-            tipo_negocio = st.selectbox("Tipo de Negocio *", TIPOS_NEGOCIO,
-                                       index=def_tipo_idx)
-            source = st.selectbox("Fuente de Oportunidad *", SOURCES,
-                                 index=def_source_idx)
-        
-        with col2:
-            fecha_contacto = st.date_input("Fecha de Contacto *", value=def_fecha)
-            semana = get_week_number(fecha_contacto)
-            st.text_input("Semana", value=semana, disabled=True)
-            
-        def_direccion = opp_to_edit['direccion'] if opp_to_edit else (visita_convert['direccion'] if visita_convert else "")
-        direccion = st.text_area("Dirección *", 
-                                 value=def_direccion,
-                                 placeholder="Ej: Av. Argentina 890, Callao", height=80)
-        
-        # --- Contact Info ---
-        col_c1, col_c2, col_c3, col_c4 = st.columns(4)
-        def_contacto = opp_to_edit.get('nombre_contacto', "") if opp_to_edit else ""
-        def_cargo = opp_to_edit.get('cargo_contacto', "") if opp_to_edit else ""
-        def_celular = opp_to_edit.get('celular_contacto', "") if opp_to_edit else ""
-        def_email = opp_to_edit.get('email_contacto', "") if opp_to_edit else ""
-        
-        with col_c1:
-            nombre_contacto = st.text_input("Nombre de Contacto", value=def_contacto, placeholder="Ej: Juan Pérez")
-        with col_c2:
-            cargo_contacto = st.text_input("Cargo", value=def_cargo, placeholder="Ej: Jefe de Mantenimiento")
-        with col_c3:
-            celular_contacto = st.text_input("Nro Celular", value=def_celular, placeholder="Ej: 999 888 777")
-        with col_c4:
-            email_contacto = st.text_input("Email", value=def_email, placeholder="Ej: juan@empresa.com")
-        # --------------------
-        
-        st.markdown("### Detalles de la Oportunidad")
-        
-        col1, col2 = st.columns(2)
-        
-        def_m2 = opp_to_edit['m2_estimado'] if opp_to_edit else 100
-        
-        # Product default
-        def_prod_idx = 0
-        if opp_to_edit and opp_to_edit.get('producto_interes') in PRODUCTOS:
-            def_prod_idx = PRODUCTOS.index(opp_to_edit['producto_interes']) + 1 # +1 because of [""]
-        elif opp_to_edit and opp_to_edit.get('producto_interes'):
-             # If product exists but not in current list, handle it or just default 0
-             pass 
-        
-        with col1:
-            m2_estimado = st.number_input("m² Estimado", min_value=0, value=def_m2 or 0, step=10)
-            
-            # Handle product selection carefully
-            prod_options = [""] + PRODUCTOS
-            # Recalculate index based on full list
-            curr_prod = opp_to_edit['producto_interes'] if opp_to_edit else ""
-            try:
-                prod_idx = prod_options.index(curr_prod)
-            except ValueError:
-                prod_idx = 0
-                
-            producto_interes = st.selectbox("Producto de Interés", prod_options, index=prod_idx)
-        
-        with col2:
-            def_accion = opp_to_edit['siguiente_accion'] if opp_to_edit else ""
-            siguiente_accion = st.text_area("Siguiente Acción", 
-                                           value=def_accion or "",
-                                           placeholder="Ej: Visita técnica programada para 20-Ene",
-                                           height=100)
-            
-            # --- Auto-Assignment Display / Edit ---
-            if opp_to_edit:
-                curr_assigned = opp_to_edit.get('asignado_a')
-                # If current assigned is not in list (e.g. None), default to first or handle it
-                try:
-                    assigned_idx = ASSIGNED_TO.index(curr_assigned)
-                except ValueError:
-                    assigned_idx = 0
-                
-                # Allow manual reassignment
-                asignado_a = st.selectbox("Asignado a", ASSIGNED_TO, index=assigned_idx)
-            else:
-                # For new opportunities, assignment happens automatically on creation
-                # We do NOT let the user pick here to ensure the probabilities are respected
-                st.info("ℹ️ La oportunidad será asignada automáticamente a un vendedor al guardar.")
-                asignado_a = None
-            # --------------------------------------
-        
-        btn_label = "💾 Actualizar Oportunidad" if opp_to_edit else "💾 Guardar Oportunidad"
-        submitted = st.form_submit_button(btn_label, use_container_width=True)
-        
-        if submitted:
-            if nombre and tipo_negocio and direccion and source:
-                try:
-                    m2_val = m2_estimado if m2_estimado > 0 else None
-                    prod_val = producto_interes if producto_interes else None
-                    accion_val = siguiente_accion if siguiente_accion else None
-                    
-                    if opp_to_edit:
-                        # Update
-                        update_oportunidad(
-                            opp_to_edit['id'], nombre, tipo_negocio, direccion,
-                            fecha_contacto, semana, m2_val, prod_val, accion_val, source,
-                            nombre_contacto, cargo_contacto, celular_contacto,
-                            email_contacto=email_contacto,
-                            asignado_a=asignado_a
-                        )
-                        st.success(f"✅ Oportunidad actualizada exitosamente!")
-                        del st.session_state['opp_to_edit']
-                        st.balloons()
-                        st.rerun()
-                    else:
-                        # Create
-                        visita_id = visita_convert['id'] if visita_convert else None
-                        opp_id = create_oportunidad(
-                            nombre, tipo_negocio, direccion, fecha_contacto, semana,
-                            m2_val, prod_val, accion_val,
-                            visita_id, source,
-                            nombre_contacto, cargo_contacto, celular_contacto,
-                            email_contacto=email_contacto
-                        )
-                        st.success(f"✅ Oportunidad registrada exitosamente! ID: {opp_id}")
-                        st.balloons()
-                        
-                        # Clear conversion state
-                        if 'visita_to_convert' in st.session_state:
-                            del st.session_state['visita_to_convert']
-                        
-                except Exception as e:
-                    st.error(f"❌ Error al guardar: {str(e)}")
-            else:
-                st.error("⚠️ Por favor complete todos los campos obligatorios (*)")
-    
-    # Show active opportunities
-    st.markdown("---")
-    st.markdown("### 📋 Oportunidades Activas")
-    
-    # Handle deletion state
-    if 'opp_to_delete' in st.session_state:
-        st.warning(f"¿Está seguro que desea eliminar la oportunidad de '{st.session_state['opp_to_delete']['nombre']}'? Esta acción no se puede deshacer.")
-        col1, col2 = st.columns(2)
-        with col1:
-            if st.button("✅ Confirmar Eliminación", key="confirm_del_opp"):
-                delete_oportunidad(st.session_state['opp_to_delete']['id'])
-                st.success("Oportunidad eliminada.")
-                del st.session_state['opp_to_delete']
-                st.rerun()
-        with col2:
-            if st.button("❌ Cancelar", key="cancel_del_opp"):
-                del st.session_state['opp_to_delete']
-                st.rerun()
-
-    # Handle lost opportunity state
-    if 'opp_to_lose' in st.session_state:
-        st.info(f"Marcando como PERDIDA la oportunidad de '{st.session_state['opp_to_lose']['nombre']}'")
-        with st.form("form_lost_opp"):
-            motivo = st.text_area("Motivo de la pérdida *", 
-                                 placeholder="Ej: Precio muy alto, competencia ganó, proyecto cancelado...")
-            
-            c1, c2 = st.columns(2)
-            with c1:
-                confirm_lost = st.form_submit_button("📉 Confirmar Pérdida", use_container_width=True)
-            with c2:
-                cancel_lost = st.form_submit_button("❌ Cancelar", use_container_width=True)
-            
-            if confirm_lost:
-                if motivo:
-                    mark_opportunity_lost(st.session_state['opp_to_lose']['id'], motivo)
-                    st.success("Oportunidad marcada como perdida.")
-                    del st.session_state['opp_to_lose']
-                    st.rerun()
-                else:
-                    st.error("⚠️ Debe ingresar un motivo.")
-            
-            if cancel_lost:
-                del st.session_state['opp_to_lose']
-                st.rerun()
-
-    oportunidades = get_oportunidades_activas()
-    
-    if oportunidades:
-        for opp in oportunidades[:20]:  # Show first 20
-            with st.expander(f"🎯 {opp['nombre']} ({opp['tipo_negocio']}) - {opp['m2_estimado']}m²"):
-                st.write(f"**Dirección:** {opp['direccion']}")
-                
-                # Show contact info if available
-                if opp.get('nombre_contacto') or opp.get('celular_contacto') or opp.get('cargo_contacto') or opp.get('email_contacto'):
-                    contact_parts = []
-                    if opp.get('nombre_contacto'): contact_parts.append(opp['nombre_contacto'])
-                    if opp.get('cargo_contacto'): contact_parts.append(f"({opp['cargo_contacto']})")
-                    if opp.get('celular_contacto'): contact_parts.append(f"📞 {opp['celular_contacto']}")
-                    if opp.get('email_contacto'): contact_parts.append(f"📧 {opp['email_contacto']}")
-                    
-                    st.write(f"**Contacto:** {' '.join(contact_parts)}")
-
-                st.write(f"**Fuente:** {opp.get('source', 'N/A')}")
-                st.write(f"**Asignado a:** {opp.get('asignado_a', 'Pendiente')}")
-                st.write(f"**Fecha Contacto:** {opp['fecha_contacto']} ({opp['semana']})")
-                if opp['producto_interes']:
-                    st.write(f"**Producto:** {opp['producto_interes']}")
-                if opp['siguiente_accion']:
-                    st.write(f"**Siguiente Acción:** {opp['siguiente_accion']}")
-                
-                col1, col2, col3, col4 = st.columns(4)
-                with col1:
-                    if st.button("💰 Convertir", key=f"convventa_{opp['id']}"):
-                        st.session_state['opp_to_convert'] = opp
-                        st.session_state['page'] = "💰 Registrar Venta"
-                        st.rerun()
-                with col2:
-                    if st.button("✏️ Editar", key=f"edit_{opp['id']}"):
-                        st.session_state['opp_to_edit'] = opp
-                        st.rerun()
-                with col3:
-                    if st.button("📉 Perdida", key=f"lost_{opp['id']}"):
-                        st.session_state['opp_to_lose'] = opp
-                        st.rerun()
-                with col4:
-                    if st.button("🗑️ Eliminar", key=f"del_{opp['id']}"):
-                        st.session_state['opp_to_delete'] = opp
-                        st.rerun()
+st.sidebar.info(f"📅 Hoy: {date.today().strftime('%d-%b-%Y')}\n\n🗓️ Semana: {get_repository().get_week_number(date.today())}")
+
+# Offline queue status (sync lag of writes not yet in Supabase)
+if write_queue() is not None:
+    _pending = write_queue().pending_count()
+    if _pending:
+        st.sidebar.warning(f"⏳ {_pending} cambio(s) pendientes de sincronizar (hace {write_queue().sync_lag():.0f}s)")
     else:
-        st.info("No hay oportunidades activas.")
+        st.sidebar.caption("✅ Todo sincronizado")
 
 
-# ============= PAGE: REGISTRAR VENTA =============
-elif st.session_state['page'] == "💰 Registrar Venta":
-    # Check edit / convert states
-    venta_to_edit = st.session_state.get('venta_to_edit', None)
-    opp_convert = st.session_state.get('opp_to_convert', None)
+# Fresh per-run query memo shared by the page and its fragments
+new_data_context()
+if live_store() is not None:
+    st.session_state['_live_version'] = live_store().version
+    with st.sidebar:
+        _watch_live_updates()
 
-    if venta_to_edit:
-        st.title("✏️ Editar Venta")
-        st.info(f"Editando: {venta_to_edit['venta_id']} — {venta_to_edit['nombre']}")
-        if st.button("❌ Cancelar edición"):
-            del st.session_state['venta_to_edit']
-            st.rerun()
-    else:
-        st.title("💰 Registrar Nueva Venta")
-
-    # --- helpers to pre-fill ---
-    def _vdate(key, fallback):
-        val = venta_to_edit.get(key) if venta_to_edit else None
-        if val is None:
-            return fallback
-        if isinstance(val, str):
-            from datetime import datetime as _dt
-            return _dt.strptime(val, '%Y-%m-%d').date()
-        return val
-
-    with st.form("form_venta"):
-        st.markdown("### Datos de la Venta")
-
-        col1, col2 = st.columns(2)
-
-        with col1:
-            venta_id_val = venta_to_edit['venta_id'] if venta_to_edit else generate_venta_id()
-            st.text_input("ID de Venta", value=venta_id_val, disabled=True)
-            nombre = st.text_input("Nombre del Negocio *",
-                value=venta_to_edit['nombre'] if venta_to_edit else (opp_convert['nombre'] if opp_convert else ""),
-                placeholder="Ej: Taller El Rayo")
-            tipo_negocio = st.selectbox("Tipo de Negocio *", TIPOS_NEGOCIO,
-                index=TIPOS_NEGOCIO.index(venta_to_edit['tipo_negocio']) if venta_to_edit and venta_to_edit.get('tipo_negocio') in TIPOS_NEGOCIO
-                      else (TIPOS_NEGOCIO.index(opp_convert['tipo_negocio']) if opp_convert else 0))
-
-        with col2:
-            fecha_cierre = st.date_input("Fecha de Cierre *",
-                value=_vdate('fecha_cierre', date.today()))
-            semana = get_week_number(fecha_cierre)
-            st.text_input("Semana", value=semana, disabled=True)
-
-        direccion = st.text_area("Dirección *",
-            value=venta_to_edit['direccion'] if venta_to_edit else (opp_convert['direccion'] if opp_convert else ""),
-            placeholder="Ej: Av. Arriola 234, La Victoria", height=80)
-
-        st.markdown("### Detalles del Proyecto")
-
-        col1, col2, col3 = st.columns(3)
-
-        with col1:
-            _m2_default = venta_to_edit['m2_real'] if venta_to_edit else (opp_convert['m2_estimado'] if opp_convert and opp_convert.get('m2_estimado') else 100)
-            m2_real = st.number_input("m² Real *", min_value=1, value=int(_m2_default), step=10)
-
-        with col2:
-            _prod_default = venta_to_edit.get('producto') if venta_to_edit else (opp_convert.get('producto_interes') if opp_convert else None)
-            _prod_idx = PRODUCTOS.index(_prod_default) if _prod_default and _prod_default in PRODUCTOS else 0
-            producto = st.selectbox("Producto *", PRODUCTOS, index=_prod_idx)
-
-        with col3:
-            _monto_default = float(venta_to_edit['monto_soles']) if venta_to_edit else 10000.0
-            monto_soles = st.number_input("Monto S/. *", min_value=0.0, value=_monto_default, step=500.0)
-
-        fecha_instalacion = st.date_input("Fecha de Instalación",
-            value=_vdate('fecha_instalacion', date.today() + timedelta(days=7)))
-
-        btn_label = "💾 Actualizar Venta" if venta_to_edit else "💰 Registrar Venta"
-        submitted = st.form_submit_button(btn_label, use_container_width=True)
-
-        if submitted:
-            if nombre and tipo_negocio and direccion and m2_real > 0 and monto_soles > 0:
-                try:
-                    if venta_to_edit:
-                        update_venta(
-                            venta_to_edit['id'], nombre, tipo_negocio, direccion,
-                            fecha_cierre, semana, m2_real, producto, monto_soles,
-                            fecha_instalacion
-                        )
-                        st.success(f"✅ Venta actualizada: {venta_to_edit['venta_id']}")
-                        del st.session_state['venta_to_edit']
-                        st.rerun()
-                    else:
-                        opp_id = opp_convert['id'] if opp_convert else None
-                        create_venta(
-                            venta_id_val, nombre, tipo_negocio, direccion,
-                            fecha_cierre, semana, m2_real, producto, monto_soles,
-                            fecha_instalacion, opp_id
-                        )
-                        st.success(f"✅ Venta registrada exitosamente! {venta_id_val}")
-                        st.balloons()
-                        st.info(f"""
-                        **Resumen de la Venta:**
-                        - Cliente: {nombre}
-                        - m²: {m2_real}
-                        - Monto: S/. {monto_soles:,.2f}
-                        - Instalación: {fecha_instalacion}
-                        """)
-                        if 'opp_to_convert' in st.session_state:
-                            del st.session_state['opp_to_convert']
-                except Exception as e:
-                    st.error(f"❌ Error al guardar: {str(e)}")
-            else:
-                st.error("⚠️ Por favor complete todos los campos obligatorios (*)")
-
-    # Show recent sales with edit button
-    st.markdown("---")
-    st.markdown("### 📋 Ventas Recientes (Este Mes)")
-
-    today = date.today()
-    month_start = date(today.year, today.month, 1)
-    ventas = get_ventas_by_period(month_start, today)
-
-    if ventas:
-        for venta in ventas:
-            with st.expander(f"💰 {venta['venta_id']} | {venta['nombre']} - S/. {venta['monto_soles']:,.2f}"):
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.write(f"**Tipo:** {venta['tipo_negocio']}")
-                    st.write(f"**m²:** {venta['m2_real']}")
-                    st.write(f"**Producto:** {venta['producto']}")
-                with col2:
-                    st.write(f"**Fecha Cierre:** {venta['fecha_cierre']}")
-                    st.write(f"**Instalación:** {venta['fecha_instalacion']}")
-                    st.write(f"**Dirección:** {venta['direccion']}")
-                if st.button("✏️ Editar Venta", key=f"edit_venta_{venta['id']}"):
-                    st.session_state['venta_to_edit'] = venta
-                    st.rerun()
-    else:
-        st.info("No hay ventas registradas este mes.")
-
-
-# ============= PAGE: VER REGISTROS =============
-elif st.session_state['page'] == "📋 Ver Registros":
-    st.title("📋 Historial de Registros")
-    
-    # Pre-select tab if navigated from home page
-    _tab_goto = st.session_state.pop('ver_registros_tab', 0)
-    _all_tabs = ["📝 Visitas", "🎯 Oportunidades", "💰 Ventas", "💸 Gastos"]
-    # Rotate so the desired tab is first (Streamlit opens first tab by default)
-    _tabs_ordered = _all_tabs[_tab_goto:] + _all_tabs[:_tab_goto]
-    _rendered = st.tabs(_tabs_ordered)
-    # Map back to original tab variables regardless of rotation
-    _tab_map = {name: widget for name, widget in zip(_tabs_ordered, _rendered)}
-    tab1 = _tab_map["📝 Visitas"]
-    tab2 = _tab_map["🎯 Oportunidades"]
-    tab3 = _tab_map["💰 Ventas"]
-    tab4 = _tab_map["💸 Gastos"]
-    
-    with tab1:
-        st.markdown("### Visitas Registradas")
-        
-        col1, col2 = st.columns(2)
-        with col1:
-            periodo = st.selectbox("Período", ["Esta Semana", "Este Mes", "Todo"])
-        
-        today = date.today()
-        
-        if periodo == "Esta Semana":
-            start_date = today - timedelta(days=today.weekday())
-            end_date = today
-        elif periodo == "Este Mes":
-            start_date = date(today.year, today.month, 1)
-            end_date = today
-        else:
-            start_date = date(2026, 1, 1)
-            end_date = today
-        
-        visitas = get_visitas_by_period(start_date, end_date)
-
-        if visitas:
-            st.info(f"📊 Total: {len(visitas)} visitas")
-            for v in visitas:
-                with st.expander(f"📅 {v['fecha']} | {v['nombre']} ({v['tipo_negocio']}) — Sem {v['semana']}"):
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        st.write(f"**Negocio:** {v['nombre']}")
-                        st.write(f"**Tipo:** {v['tipo_negocio']}")
-                        st.write(f"**Fecha:** {v['fecha']}")
-                        st.write(f"**Semana:** {v['semana']}")
-                    with col2:
-                        st.write(f"**Dirección:** {v.get('direccion', '')}")
-                        st.write(f"**Notas:** {v.get('notas', '')}")
-                    if st.button("✏️ Editar Visita", key=f"verreg_visita_{v['id']}"):
-                        st.session_state['visita_to_edit'] = v
-                        st.session_state['page'] = "📝 Registrar Visita"
-                        st.rerun()
-        else:
-            st.info("No hay visitas en este período.")
-    
-    with tab2:
-        st.markdown("### Oportunidades")
-
-        oportunidades = get_oportunidades_activas()
-
-        if oportunidades:
-            st.info(f"📊 Total: {len(oportunidades)} oportunidades activas")
-            for opp in oportunidades:
-                with st.expander(f"🎯 {opp['nombre']} ({opp['tipo_negocio']}) — {opp['m2_estimado']}m² | {opp['fecha_contacto']}"):
-                    col1, col2, col3 = st.columns(3)
-                    with col1:
-                        st.write(f"**ID:** {opp['id']}")
-                        st.write(f"**Negocio:** {opp['nombre']}")
-                        st.write(f"**Tipo:** {opp['tipo_negocio']}")
-                        st.write(f"**Dirección:** {opp.get('direccion', '')}")
-                    with col2:
-                        st.write(f"**Producto:** {opp.get('producto_interes', '')}")
-                        st.write(f"**m²:** {opp['m2_estimado']}")
-                        st.write(f"**Asignado a:** {opp.get('asignado_a', '')}")
-                        st.write(f"**Fuente:** {opp.get('source', '')}")
-                    with col3:
-                        st.write(f"**Contacto:** {opp.get('nombre_contacto', '')}")
-                        st.write(f"**Cargo:** {opp.get('cargo_contacto', '')}")
-                        st.write(f"**Celular:** {opp.get('celular_contacto', '')}")
-                        st.write(f"**Email:** {opp.get('email_contacto', '')}")
-                    st.write(f"**Siguiente acción:** {opp.get('siguiente_accion', '')}")
-                    st.write(f"**Notas:** {opp.get('notas', '')}")
-                    if st.button("✏️ Editar Oportunidad", key=f"verreg_edit_{opp['id']}"):
-                        st.session_state['opp_to_edit'] = opp
-                        st.session_state['page'] = "🎯 Registrar Oportunidad"
-                        st.rerun()
-        else:
-            st.info("No hay oportunidades activas.")
-    
-    with tab3:
-        st.markdown("### Ventas Cerradas")
-        
-        col1, col2 = st.columns(2)
-        with col1:
-            periodo_ventas = st.selectbox("Período", ["Este Mes", "Este Año", "Todo"], key="periodo_ventas")
-        
-        today = date.today()
-        
-        if periodo_ventas == "Este Mes":
-            start_date = date(today.year, today.month, 1)
-            end_date = today
-        elif periodo_ventas == "Este Año":
-            start_date = date(today.year, 1, 1)
-            end_date = today
-        else:
-            start_date = date(2026, 1, 1)
-            end_date = today
-        
-        ventas = get_ventas_by_period(start_date, end_date)
-
-        if ventas:
-            import pandas as _pd
-            _df = _pd.DataFrame(ventas)
-            total_m2 = _df['m2_real'].sum()
-            total_soles = _df['monto_soles'].sum()
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                st.metric("📊 Ventas", len(ventas))
-            with col2:
-                st.metric("📐 m² Totales", f"{total_m2:,}")
-            with col3:
-                st.metric("💰 Ingresos S/.", f"S/. {total_soles:,.2f}")
-            st.markdown("---")
-            for venta in ventas:
-                with st.expander(f"💰 {venta['venta_id']} | {venta['nombre']} — S/. {venta['monto_soles']:,.2f}"):
-                    col1, col2, col3 = st.columns(3)
-                    with col1:
-                        st.write(f"**ID:** {venta['venta_id']}")
-                        st.write(f"**Cliente:** {venta['nombre']}")
-                        st.write(f"**Tipo:** {venta['tipo_negocio']}")
-                    with col2:
-                        st.write(f"**Producto:** {venta.get('producto', '')}")
-                        st.write(f"**m²:** {venta['m2_real']}")
-                        st.write(f"**Monto:** S/. {venta['monto_soles']:,.2f}")
-                    with col3:
-                        st.write(f"**Fecha Cierre:** {venta['fecha_cierre']}")
-                        st.write(f"**Instalación:** {venta.get('fecha_instalacion', '')}")
-                        st.write(f"**Dirección:** {venta.get('direccion', '')}")
-                    if st.button("✏️ Editar Venta", key=f"verreg_venta_{venta['id']}"):
-                        st.session_state['venta_to_edit'] = venta
-                        st.session_state['page'] = "💰 Registrar Venta"
-                        st.rerun()
-        else:
-            st.info("No hay ventas en este período.")
-    
-    with tab4:
-        st.markdown("### Gastos y Costos (desde Excel)")
-        
-        # Show cloud warning if applicable
-        if IS_CLOUD:
-            st.warning("⚠️ **Modo Cloud**: El archivo Excel en Google Drive no está accesible desde la nube.")
-            
-            # File uploader
-            st.markdown("#### 📤 Subir Archivo Excel")
-            uploaded_file = st.file_uploader(
-                "Sube el archivo `Gastos_Semanal_Template_V2.xlsx` aquí:",
-                type=['xlsx', 'xls'],
-                help="El contador debe subir el archivo Excel con los gastos registrados"
-            )
-            
-            if uploaded_file is not None:
-                # Store in session state
-                st.session_state['uploaded_gastos'] = uploaded_file
-                st.success("✅ Archivo cargado exitosamente!")
-        
-        col1, col2 = st.columns(2)
-        with col1:
-            periodo_gastos = st.selectbox("Período", ["Este Mes", "Este Año", "Todo"], key="periodo_gastos")
-        
-        today = date.today()
-        
-        if periodo_gastos == "Este Mes":
-            start_date = date(today.year, today.month, 1)
-            end_date = today
-        elif periodo_gastos == "Este Año":
-            start_date = date(today.year, 1, 1)
-            end_date = today
-        else:
-            start_date = date(2026, 1, 1)
-            end_date = today
-        
-        # Read expenses from Excel
-        gastos_df = pd.DataFrame()
-        
-        try:
-            if IS_CLOUD and 'uploaded_gastos' in st.session_state:
-                # Read from uploaded file
-                gastos_df = read_gastos_from_uploaded_file(st.session_state['uploaded_gastos'])
-                # Filter by period
-                if not gastos_df.empty:
-                    mask = (gastos_df['Fecha'].dt.date >= start_date) & (gastos_df['Fecha'].dt.date <= end_date)
-                    gastos_df = gastos_df[mask]
-            else:
-                # Read from local file
-                gastos_df = get_gastos_by_period(start_date, end_date)
-        except Exception as e:
-            st.error(f"❌ Error al leer archivo Excel: {str(e)}")
-            gastos_df = pd.DataFrame()
-        
-        if not gastos_df.empty:
-            # Show data table
-            display_df = gastos_df.copy()
-            display_df['Fecha'] = display_df['Fecha'].dt.strftime('%Y-%m-%d')
-            st.dataframe(display_df[['Fecha', 'Semana', 'Tipo_Gasto', 'Categoría', 'Tipo_Negocio', 'Monto_Soles', 'Venta_ID']], 
-                        use_container_width=True)
-            
-            # Summary metrics
-            total_gastos = gastos_df['Monto_Soles'].sum()
-            costos_directos = gastos_df[gastos_df['Categoría'] == 'Costo Directo']['Monto_Soles'].sum()
-            costos_indirectos = gastos_df[gastos_df['Categoría'] == 'Costo Indirecto']['Monto_Soles'].sum()
-            
-            col1, col2, col3, col4 = st.columns(4)
-            with col1:
-                st.metric("📊 Total Gastos", f"S/. {total_gastos:,.0f}")
-            with col2:
-                st.metric("💰 Costos Directos", f"S/. {costos_directos:,.0f}")
-            with col3:
-                st.metric("🏢 Costos Indirectos", f"S/. {costos_indirectos:,.0f}")
-            with col4:
-                st.metric("📝 Registros", len(gastos_df))
-            
-            # Breakdown by type
-            st.markdown("#### 📊 Distribución por Tipo de Gasto")
-            tipo_gasto_sum = gastos_df.groupby('Tipo_Gasto')['Monto_Soles'].sum().sort_values(ascending=False)
-            
-            for tipo, monto in tipo_gasto_sum.items():
-                pct = (monto / total_gastos * 100) if total_gastos > 0 else 0
-                st.write(f"**{tipo}**: S/. {monto:,.2f} ({pct:.1f}%)")
-        else:
-            st.info("📝 No hay gastos registrados en este período.\n\nEl contador debe llenar el archivo Excel en Google Drive.")
-            st.caption(f"📁 Archivo: `G:\\My Drive\\NewLux\\KPIs_Accounting\\Gastos_Semanal_Template_V2.xlsx`")
-            
-            # Show instructions
-            with st.expander("ℹ️ Instrucciones para el Contador"):
-                st.markdown("""
-                **Cómo registrar gastos:**
-                
-                1. Abrir archivo Excel en Google Drive
-                2. Ir a la hoja "Gastos"
-                3. Llenar una fila por cada gasto:
-                   - **Fecha**: Fecha del gasto
-                   - **Semana**: Número de semana (se calcula automático)
-                   - **Tipo_Gasto**: Material, Mano de Obra, Transporte, u Otro
-                   - **Categoría**: Costo Directo o Indirecto
-                   - **Tipo_Negocio**: Taller Automotriz, Detailing, etc.
-                   - **Descripción**: Detalle del gasto
-                   - **Monto_Soles**: Cantidad en soles
-                   - **Venta_ID**: Si aplica a una venta específica (ej: LUX-2026-001)
-                4. Guardar el archivo
-                5. Recargar esta página para ver los datos actualizados
-                """)
-
-
-
-# ============= PAGE: KPIs Y REPORTES =============
-elif st.session_state['page'] == "📊 KPIs y Reportes":
-    st.title("📊 KPIs y Reportes")
-    st.info("🚧 Dashboard de KPIs en desarrollo - Próximamente con gráficos interactivos")
-    
-    # Quick summary
-    today = date.today()
-    week_start = today - timedelta(days=today.weekday())
-    month_start = date(today.year, today.month, 1)
-    
-    visitas_semana = get_visitas_by_period(week_start, today)
-    visitas_mes = get_visitas_by_period(month_start, today)
-    oportunidades = get_oportunidades_activas()
-    ventas_mes = get_ventas_by_period(month_start, today)
-    
-    st.markdown("### 📊 Resumen Mensual")
-    
-    col1, col2, col3, col4 = st.columns(4)
-    
-    with col1:
-        st.metric("Visitas (Mes)", len(visitas_mes))
-        st.caption(f"Esta semana: {len(visitas_semana)}")
-    
-    with col2:
-        st.metric("Oportunidades Activas", len(oportunidades))
-    
-    with col3:
-        st.metric("Ventas (Mes)", len(ventas_mes))
-    
-    with col4:
-        if ventas_mes:
-            total_ingresos = sum(v['monto_soles'] for v in ventas_mes)
-            st.metric("Ingresos S/.", f"{total_ingresos:,.0f}")
-        else:
-            st.metric("Ingresos S/.", "0")
-    
-    # Conversion rates
-    st.markdown("### 🎯 Tasas de Conversión")
-    
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        if len(visitas_mes) > 0:
-            tasa_vo = (len(oportunidades) / len(visitas_mes)) * 100
-            st.metric("Visitas → Oportunidades", f"{tasa_vo:.1f}%")
-        else:
-            st.metric("Visitas → Oportunidades", "N/A")
-    
-    with col2:
-        if len(oportunidades) > 0:
-            tasa_ov = (len(ventas_mes) / len(oportunidades)) * 100
-            st.metric("Oportunidades → Ventas", f"{tasa_ov:.1f}%")
-        else:
-            st.metric("Oportunidades → Ventas", "N/A")
+# Page bodies are imported lazily, only the selected one is loaded
+render_page(st.session_state['page'] if st.session_state['page'] in PAGES else PAGES[0])
+
+from views.diagnostics import panel_enabled, render_sidebar_panel
+if panel_enabled():
+    render_sidebar_panel((time.perf_counter() - _run_started) * 1000)
 
 
 # Footer
@@ -0,0 +1,149 @@
+"""
+Request-scoped data context for Lux Sales Dashboard
+
+One DataContext is created per full script run. Pages declare the date ranges
+they need up front, the context fetches the widest range once per table and
+every narrower period (week inside month, etc.) is sliced in memory, so a page
+view costs at most one round trip per table. Fragment reruns reuse the context
+of the last full run, so they don't query again either.
+"""
+
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import streamlit as st
+
+from repository import get_repository
+from change_feed import live_store
+from parallel_fetch import FetchTimings, fetch_parallel
+
+# Date column used to slice each period table
+DATE_COLUMNS = {
+    "visitas": "fecha",
+    "ventas": "fecha_cierre",
+}
+
+_SESSION_KEY = "_data_context"
+
+Range = Tuple[date, date]
+
+
+def _union(a: Optional[Range], b: Optional[Range]) -> Optional[Range]:
+    """Smallest range covering both (None means no range)"""
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return min(a[0], b[0]), max(a[1], b[1])
+
+
+def rows_to_frame(rows: List[Dict[str, Any]]):
+    """Build a DataFrame from flattened getter rows for the grid views"""
+    import pandas as pd  # only needed by the grid views
+
+    return pd.DataFrame(rows).drop(columns=["businesses"], errors="ignore")
+
+
+class DataContext:
+    """Memo of getter results for a single script run"""
+
+    def __init__(self, period_getters: Optional[Dict[str, Callable[[date, date], List[Dict[str, Any]]]]] = None,
+                 activas_getter: Optional[Callable[[], List[Dict[str, Any]]]] = None):
+        store = live_store()
+        if store is not None and period_getters is None:
+            # A change feed keeps the tables in memory: read from there instead
+            period_getters = {
+                "visitas": lambda s, e: store.period_rows("visitas", s, e),
+                "ventas": lambda s, e: store.period_rows("ventas", s, e),
+            }
+            activas_getter = activas_getter or store.oportunidades_activas
+        repo = get_repository()
+        self._getters = period_getters or {
+            "visitas": repo.get_visitas_by_period,
+            "ventas": repo.get_ventas_by_period,
+        }
+        self._activas_getter = activas_getter or repo.get_oportunidades_activas
+        self._reserved: Dict[str, Range] = {}
+        self._fetched: Dict[str, Tuple[Range, List[Dict[str, Any]]]] = {}
+        self._activas: Optional[List[Dict[str, Any]]] = None
+        self.round_trips = 0
+        self.timings: List[FetchTimings] = []
+
+    def reserve(self, table: str, start_date: date, end_date: date) -> None:
+        """Declare a range the page will read so it is included in the single fetch"""
+        self._reserved[table] = _union(self._reserved.get(table), (start_date, end_date))
+
+    def _covers(self, table: str, start_date: date, end_date: date) -> bool:
+        fetched = self._fetched.get(table)
+        return fetched is not None and fetched[0][0] <= start_date and end_date <= fetched[0][1]
+
+    def _wanted(self, table: str, start_date: date, end_date: date) -> Range:
+        fetched = self._fetched.get(table)
+        return _union(_union(fetched[0] if fetched else None, self._reserved.get(table)),
+                      (start_date, end_date))
+
+    def prefetch(self, activas: bool = False) -> Optional[FetchTimings]:
+        """
+        Fetch every reserved range (and optionally the active opportunities)
+        concurrently, so the page waits for the slowest query, not their sum.
+        """
+        calls = {}
+        for table, (start_date, end_date) in self._reserved.items():
+            if not self._covers(table, start_date, end_date):
+                wanted = self._wanted(table, start_date, end_date)
+                calls[table] = lambda t=table, w=wanted: (w, self._getters[t](*w))
+        if activas and self._activas is None:
+            calls["oportunidades"] = self._activas_getter
+        if not calls:
+            return None
+
+        results, timings = fetch_parallel(calls)
+        for name, result in results.items():
+            if name == "oportunidades":
+                self._activas = result
+            else:
+                self._fetched[name] = result
+        self.round_trips += len(calls)
+        self.timings.append(timings)
+        return timings
+
+    def period(self, table: str, start_date: date, end_date: date) -> List[Dict[str, Any]]:
+        """Rows of a period table within the range, newest first"""
+        if not self._covers(table, start_date, end_date):
+            wanted = self._wanted(table, start_date, end_date)
+            self._fetched[table] = (wanted, self._getters[table](*wanted))
+            self.round_trips += 1
+        fetched = self._fetched[table]
+
+        (fetched_start, fetched_end), rows = fetched
+        if (start_date, end_date) == (fetched_start, fetched_end):
+            return rows
+        # ISO dates compare correctly as strings, whatever type the backend returned
+        column = DATE_COLUMNS[table]
+        lo, hi = start_date.isoformat(), end_date.isoformat()
+        return [r for r in rows if lo <= str(r[column])[:10] <= hi]
+
+    def visitas(self, start_date: date, end_date: date) -> List[Dict[str, Any]]:
+        return self.period("visitas", start_date, end_date)
+
+    def ventas(self, start_date: date, end_date: date) -> List[Dict[str, Any]]:
+        return self.period("ventas", start_date, end_date)
+
+    def oportunidades_activas(self) -> List[Dict[str, Any]]:
+        if self._activas is None:
+            self._activas = self._activas_getter()
+            self.round_trips += 1
+        return self._activas
+
+
+def new_data_context() -> DataContext:
+    """Start a fresh context; called once at the top of every full run"""
+    ctx = DataContext()
+    st.session_state[_SESSION_KEY] = ctx
+    return ctx
+
+
+def current_data_context() -> DataContext:
+    """Context of the current run (fragment reruns get the last full run's context)"""
+    ctx = st.session_state.get(_SESSION_KEY)
+    return ctx if ctx is not None else new_data_context()
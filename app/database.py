@@ -1,120 +1,52 @@
-def delete_visita(visita_id: int) -> None:
-    """Delete a visit record by ID"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM visitas WHERE id = ?", (visita_id,))
-    conn.commit()
-    conn.close()
 """
 Database schema and operations for Lux Sales Dashboard
 Author: GitHub Copilot
 Date: 13 January 2026
 """
 
+import json
+import random
+import re
 import sqlite3
 from datetime import datetime, date
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterable
 from pathlib import Path
 
+from business_match import MAX_CANDIDATES, match_key, number_grams, rank_candidates, rare_gram_count, trigrams
+from constants import SALES_REPS, SALES_WEIGHTS, SNAPSHOTS_KEPT
+from events import ENTITIES, EVENT_PAGE, decode_event
+from followups import schedule_followup
+from migrations import SEARCH_KIND_SHIFT, SEARCH_KINDS, add_business_grams, migrate, remove_business_grams
+
+try:
+    from notifier import notify_new_assignment, notify_reassignment
+except ImportError:
+    # Graceful fallback if notifier is unavailable
+    def notify_new_assignment(*args, **kwargs): pass
+    def notify_reassignment(*args, **kwargs): pass
+
 # Database path
 DB_PATH = Path(__file__).parent / "data" / "lux_sales.db"
 
-def init_database():
-    """Create database tables if they don't exist"""
-    
-    # Ensure data directory exists
-    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
-    
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    # Table 1: Businesses (central registry)
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS businesses (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        nombre TEXT NOT NULL,
-        tipo_negocio TEXT NOT NULL,
-        direccion TEXT NOT NULL,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        UNIQUE(nombre, direccion)
-    )
-    """)
-    
-    # Table 2: Visits
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS visitas (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        business_id INTEGER NOT NULL,
-        fecha DATE NOT NULL,
-        semana TEXT NOT NULL,
-        notas TEXT,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY (business_id) REFERENCES businesses(id)
-    )
-    """)
-    
-    # Table 3: Opportunities
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS oportunidades (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        business_id INTEGER NOT NULL,
-        visita_id INTEGER,
-        fecha_contacto DATE NOT NULL,
-        semana TEXT NOT NULL,
-        m2_estimado INTEGER,
-        producto_interes TEXT,
-        siguiente_accion TEXT,
-        estado TEXT DEFAULT 'Activa',
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY (business_id) REFERENCES businesses(id),
-        FOREIGN KEY (visita_id) REFERENCES visitas(id)
-    )
-    """)
-    
-    # Table 4: Sales
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS ventas (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        venta_id TEXT UNIQUE NOT NULL,
-        business_id INTEGER NOT NULL,
-        oportunidad_id INTEGER,
-        fecha_cierre DATE NOT NULL,
-        semana TEXT NOT NULL,
-        m2_real INTEGER NOT NULL,
-        producto TEXT NOT NULL,
-        monto_soles DECIMAL(10,2) NOT NULL,
-        fecha_instalacion DATE,
-        estado TEXT DEFAULT 'Cerrada',
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY (business_id) REFERENCES businesses(id),
-        FOREIGN KEY (oportunidad_id) REFERENCES oportunidades(id)
-    )
-    """)
-    
-    # --- MIGRATIONS ---
-    # Add 'source' column to 'oportunidades' if it doesn't exist
-    try:
-        cursor.execute("ALTER TABLE oportunidades ADD COLUMN source TEXT")
-    except sqlite3.OperationalError:
-        pass # Column already exists
-    # ------------------
-    
-    # Create indexes for performance
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_visitas_fecha ON visitas(fecha)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_visitas_semana ON visitas(semana)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_oportunidades_fecha ON oportunidades(fecha_contacto)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_oportunidades_estado ON oportunidades(estado)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_ventas_fecha ON ventas(fecha_cierre)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_ventas_semana ON ventas(semana)")
-    
-    conn.commit()
-    conn.close()
-    
-    print(f"✅ Database initialized: {DB_PATH}")
+# Newest matches ranked per kind and search. Broad terms like "taller" match
+# a large share of all rows, and ranking every one of them is what makes a search slow
+SEARCH_CANDIDATES = 1000
+# search_index document kind -> search() hit tipo
+SEARCH_HIT_TYPES = {"businesses": "negocio", "visitas": "visita", "oportunidades": "oportunidad"}
+_ID_MASK = (1 << SEARCH_KIND_SHIFT) - 1
+
+# Ids per DELETE ... WHERE id IN (...) (older SQLite builds bind at most 999 parameters)
+DELETE_BATCH = 500
+
+def init_database(db_path: Optional[Path] = None):
+    """
+    Bring the schema in DB_PATH (or db_path) up to date with migrations.py.
+    Only the first call per process and file touches the database.
+    """
+    db_path = Path(db_path or DB_PATH)
+    applied = migrate(db_path)
+    if applied:
+        print(f"✅ Database initialized: {db_path} (migrations {', '.join(map(str, applied))})")
 
 
 def get_or_create_business(nombre: str, tipo_negocio: str, direccion: str) -> int:
@@ -149,6 +81,7 @@ def get_or_create_business(nombre: str, tipo_negocio: str, direccion: str) -> in
             VALUES (?, ?, ?)
         """, (nombre, tipo_negocio, direccion))
         business_id = cursor.lastrowid
+        add_business_grams(conn, [(business_id, nombre, direccion)])
     
     conn.commit()
     conn.close()
@@ -156,6 +89,108 @@ def get_or_create_business(nombre: str, tipo_negocio: str, direccion: str) -> in
     return business_id
 
 
+def _comparable(value: Any) -> Any:
+    """Form value vs stored value: dates as ISO text, empty text as NULL"""
+    if hasattr(value, "isoformat"):
+        return value.isoformat()[:10]
+    return None if value == "" else value
+
+
+def changed_fields(original: Optional[Dict[str, Any]], values: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The values an edit actually changes, compared with the record as it was
+    loaded into the form (a getter row). Without the original, all of them.
+    """
+    if original is None:
+        return dict(values)
+    return {k: v for k, v in values.items() if _comparable(original.get(k)) != _comparable(v)}
+
+
+def keeps_business(original: Optional[Dict[str, Any]], nombre: str, tipo_negocio: str, direccion: str) -> bool:
+    """True when an edit leaves the business fields as loaded, so its business_id stands"""
+    return (original is not None and original.get("business_id") is not None
+            and (original.get("nombre"), original.get("tipo_negocio"), original.get("direccion"))
+            == (nombre, tipo_negocio, direccion))
+
+
+def _update_changes(cursor: sqlite3.Cursor, table: str, row_id: int, changes: Dict[str, Any]) -> None:
+    """UPDATE only the changed columns of one row"""
+    assignments = ", ".join(f"{column} = ?" for column in changes)
+    cursor.execute(f"UPDATE {table} SET {assignments}, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+                   (*changes.values(), row_id))
+
+
+def find_similar_businesses(nombre: str, direccion: str, limit: int = 5) -> List[Dict[str, Any]]:
+    """
+    Stored businesses that look like the same one (business_match.py), best
+    first, with a score. Candidates are the businesses sharing the most of the
+    query's rarest trigrams, so the lookup reads the shortest posting lists.
+    """
+    grams = sorted(trigrams(match_key(nombre, direccion)))
+    if not grams:
+        return []
+    # With house numbers, only businesses at the same numbers are counted (see NgramIndex.candidates)
+    numbers = sorted(number_grams(direccion))
+    block = " INTERSECT ".join(["SELECT business_id FROM business_ngrams WHERE gram = ?"] * len(numbers))
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    try:
+        rows = conn.execute(f"""
+            WITH rare AS (
+                SELECT gram FROM business_gram_counts
+                WHERE gram IN ({", ".join("?" * len(grams))}) AND n > 0
+                ORDER BY n LIMIT ?
+            ), hits AS (
+                SELECT business_id, COUNT(*) AS shared FROM business_ngrams
+                WHERE gram IN (SELECT gram FROM rare) {f"AND business_id IN ({block})" if numbers else ""}
+                GROUP BY business_id ORDER BY shared DESC, business_id LIMIT ?
+            )
+            SELECT b.id, b.nombre, b.tipo_negocio, b.direccion
+            FROM hits JOIN businesses b ON b.id = hits.business_id
+        """, (*grams, rare_gram_count(len(grams)), *numbers, MAX_CANDIDATES)).fetchall()
+    finally:
+        conn.close()
+    return rank_candidates(nombre, direccion, [dict(r) for r in rows], limit=limit)
+
+
+def get_businesses() -> List[Dict[str, Any]]:
+    """Every business (id, nombre, tipo_negocio, direccion), oldest first"""
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    try:
+        return [dict(r) for r in conn.execute("SELECT id, nombre, tipo_negocio, direccion FROM businesses ORDER BY id")]
+    finally:
+        conn.close()
+
+
+def merge_businesses(keep_id: int, duplicate_ids: List[int]) -> int:
+    """
+    Re-point the visits, opportunities and sales of duplicate_ids to keep_id
+    and delete the duplicates, in one transaction.
+    Returns: number of records moved
+    """
+    duplicates = sorted(set(duplicate_ids) - {keep_id})
+    if not duplicates:
+        return 0
+    marks = ", ".join("?" * len(duplicates))
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        with conn:
+            moved = 0
+            for table in ["visitas", "oportunidades", "ventas"]:
+                moved += conn.execute(f"""
+                    UPDATE {table} SET business_id = ?, updated_at = CURRENT_TIMESTAMP
+                    WHERE business_id IN ({marks})
+                """, (keep_id, *duplicates)).rowcount
+            businesses = conn.execute(f"SELECT id, nombre, direccion FROM businesses WHERE id IN ({marks})",
+                                      duplicates).fetchall()
+            remove_business_grams(conn, businesses)
+            conn.execute(f"DELETE FROM businesses WHERE id IN ({marks})", duplicates)
+    finally:
+        conn.close()
+    return moved
+
+
 def create_visita(nombre: str, tipo_negocio: str, direccion: str, 
                   fecha: date, semana: str, notas: Optional[str] = None) -> int:
     """Create new visit record"""
@@ -178,74 +213,202 @@ def create_visita(nombre: str, tipo_negocio: str, direccion: str,
 
 
 def update_visita(visita_id: int, nombre: str, tipo_negocio: str, direccion: str,
-                  fecha: date, semana: str, notas: Optional[str] = None) -> None:
-    """Update an existing visit record by ID"""
-    business_id = get_or_create_business(nombre, tipo_negocio, direccion)
+                  fecha: date, semana: str, notas: Optional[str] = None,
+                  original: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Update an existing visit record by ID. With original (the row loaded
+    into the form) only the changed columns are written, and the business
+    is not looked up again when its fields are unchanged.
+    """
+    if keeps_business(original, nombre, tipo_negocio, direccion):
+        business_id = original["business_id"]
+    else:
+        business_id = get_or_create_business(nombre, tipo_negocio, direccion)
+    changes = changed_fields(original, {"business_id": business_id, "fecha": fecha, "semana": semana, "notas": notas})
+    if not changes:
+        return
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
-    cursor.execute("""
-        UPDATE visitas
-        SET business_id = ?, fecha = ?, semana = ?, notas = ?, updated_at = CURRENT_TIMESTAMP
-        WHERE id = ?
-    """, (business_id, fecha, semana, notas, visita_id))
+    _update_changes(cursor, "visitas", visita_id, changes)
+    conn.commit()
+    conn.close()
+
+
+def _delete_many(table: str, ids: Iterable[int]) -> int:
+    """
+    DELETE rows by id, DELETE_BATCH per statement, in one transaction. Foreign
+    keys are enforced on this connection so their ON DELETE SET NULL actions
+    unlink the dependents (migration 5).
+    """
+    ids = list(dict.fromkeys(ids))
+    conn = sqlite3.connect(DB_PATH)
+    conn.execute("PRAGMA foreign_keys = ON")
+    deleted = 0
+    for start in range(0, len(ids), DELETE_BATCH):
+        batch = ids[start:start + DELETE_BATCH]
+        placeholders = ", ".join("?" * len(batch))
+        deleted += conn.execute(f"DELETE FROM {table} WHERE id IN ({placeholders})", batch).rowcount
     conn.commit()
     conn.close()
+    return deleted
+
+
+def delete_visita(visita_id: int) -> None:
+    """Delete a visit record by ID (linked opportunities are unlinked)"""
+    _delete_many("visitas", [visita_id])
+
+
+def delete_visitas(visita_ids: Iterable[int]) -> int:
+    """
+    Delete visit records by ID; their opportunities stay, unlinked.
+    Returns: number of visits deleted
+    """
+    return _delete_many("visitas", visita_ids)
+
+
+def assign_sales_rep() -> str:
+    """Pick the rep for a new opportunity using the configured weights"""
+    return random.choices(SALES_REPS, weights=SALES_WEIGHTS, k=1)[0]
 
 
 def create_oportunidad(nombre: str, tipo_negocio: str, direccion: str,
                        fecha_contacto: date, semana: str, m2_estimado: Optional[int] = None,
                        producto_interes: Optional[str] = None, siguiente_accion: Optional[str] = None,
-                       visita_id: Optional[int] = None, source: Optional[str] = None) -> int:
-    """Create new opportunity record"""
+                       visita_id: Optional[int] = None, source: Optional[str] = None,
+                       nombre_contacto: Optional[str] = None, cargo_contacto: Optional[str] = None,
+                       celular_contacto: Optional[str] = None, email_contacto: Optional[str] = None,
+                       fecha_siguiente_accion: Optional[date] = None) -> int:
+    """Create new opportunity record, notify the assigned rep and schedule its follow-up"""
     
     business_id = get_or_create_business(nombre, tipo_negocio, direccion)
+    assigned_to = assign_sales_rep()
     
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
     
     cursor.execute("""
         INSERT INTO oportunidades (business_id, visita_id, fecha_contacto, semana, 
-                                   m2_estimado, producto_interes, siguiente_accion, source)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-    """, (business_id, visita_id, fecha_contacto, semana, m2_estimado, producto_interes, siguiente_accion, source))
+                                   m2_estimado, producto_interes, siguiente_accion, source,
+                                   nombre_contacto, cargo_contacto, celular_contacto, email_contacto,
+                                   asignado_a, fecha_siguiente_accion)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, (business_id, visita_id, fecha_contacto, semana, m2_estimado, producto_interes, siguiente_accion, source,
+          nombre_contacto, cargo_contacto, celular_contacto, email_contacto, assigned_to, fecha_siguiente_accion))
     
     oportunidad_id = cursor.lastrowid
     conn.commit()
     conn.close()
     
+    try:
+        notify_new_assignment(
+            rep_name=assigned_to,
+            opp_id=oportunidad_id,
+            nombre_negocio=nombre,
+            producto=producto_interes,
+            m2=m2_estimado,
+            siguiente_accion=siguiente_accion,
+            nombre_contacto=nombre_contacto,
+            celular_contacto=celular_contacto,
+            source=source,
+        )
+    except Exception:
+        pass  # Never let notification failure break the app
+    schedule_followup(oportunidad_id, fecha_siguiente_accion)
+    
     return oportunidad_id
 
 
 def update_oportunidad(oportunidad_id: int, nombre: str, tipo_negocio: str, direccion: str,
                        fecha_contacto: date, semana: str, m2_estimado: Optional[int] = None,
                        producto_interes: Optional[str] = None, siguiente_accion: Optional[str] = None,
-                       source: Optional[str] = None) -> None:
-    """Update existing opportunity"""
-    business_id = get_or_create_business(nombre, tipo_negocio, direccion)
+                       source: Optional[str] = None,
+                       nombre_contacto: Optional[str] = None, cargo_contacto: Optional[str] = None,
+                       celular_contacto: Optional[str] = None, email_contacto: Optional[str] = None,
+                       asignado_a: Optional[str] = None, fecha_siguiente_accion: Optional[date] = None,
+                       original: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Update existing opportunity. Notifies rep via WhatsApp if asignado_a changes
+    and reschedules the follow-up if fecha_siguiente_accion does.
+    With original, only the changed columns are written (see update_visita).
+    """
+    if keeps_business(original, nombre, tipo_negocio, direccion):
+        business_id = original["business_id"]
+    else:
+        business_id = get_or_create_business(nombre, tipo_negocio, direccion)
+    values = {
+        "business_id": business_id, "fecha_contacto": fecha_contacto, "semana": semana,
+        "m2_estimado": m2_estimado, "producto_interes": producto_interes, "siguiente_accion": siguiente_accion,
+        "source": source, "nombre_contacto": nombre_contacto, "cargo_contacto": cargo_contacto,
+        "celular_contacto": celular_contacto, "email_contacto": email_contacto,
+        "fecha_siguiente_accion": fecha_siguiente_accion,
+    }
+    # Only overwrite asignado_a when a value is given (same rule as the Supabase backend)
+    if asignado_a:
+        values["asignado_a"] = asignado_a
+    changes = changed_fields(original, values)
+    if not changes:
+        return
     
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
     
-    cursor.execute("""
-        UPDATE oportunidades
-        SET business_id = ?, fecha_contacto = ?, semana = ?, m2_estimado = ?,
-            producto_interes = ?, siguiente_accion = ?, source = ?, updated_at = CURRENT_TIMESTAMP
-        WHERE id = ?
-    """, (business_id, fecha_contacto, semana, m2_estimado, producto_interes, siguiente_accion, source, oportunidad_id))
+    # The edit form passes the row it loaded, so an edit is a single UPDATE
+    if original is not None and "asignado_a" in original:
+        prev_assigned = original["asignado_a"]
+    else:
+        cursor.execute("SELECT asignado_a FROM oportunidades WHERE id = ?", (oportunidad_id,))
+        row = cursor.fetchone()
+        prev_assigned = row[0] if row else None
+    _update_changes(cursor, "oportunidades", oportunidad_id, changes)
     
     conn.commit()
     conn.close()
+    if "fecha_siguiente_accion" in changes:
+        schedule_followup(oportunidad_id, fecha_siguiente_accion)
+    
+    try:
+        if asignado_a and prev_assigned and asignado_a.lower() != prev_assigned.lower():
+            notify_reassignment(
+                new_rep_name=asignado_a,
+                prev_rep_name=prev_assigned,
+                opp_id=oportunidad_id,
+                nombre_negocio=nombre,
+                producto=producto_interes,
+                m2=m2_estimado,
+                siguiente_accion=siguiente_accion,
+                nombre_contacto=nombre_contacto,
+                celular_contacto=celular_contacto,
+            )
+    except Exception:
+        pass  # Never let notification failure break the app
 
 
-def delete_oportunidad(oportunidad_id: int) -> None:
-    """Delete opportunity (soft delete or hard delete - using hard delete for now)"""
+def mark_opportunity_lost(oportunidad_id: int, motivo_perdida: str) -> None:
+    """Mark opportunity as lost with a reason"""
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
-    cursor.execute("DELETE FROM oportunidades WHERE id = ?", (oportunidad_id,))
+    cursor.execute("""
+        UPDATE oportunidades
+        SET estado = 'Perdida', motivo_perdida = ?, updated_at = CURRENT_TIMESTAMP
+        WHERE id = ?
+    """, (motivo_perdida, oportunidad_id))
     conn.commit()
     conn.close()
 
 
+def delete_oportunidad(oportunidad_id: int) -> None:
+    """Delete opportunity (hard delete; its sales are unlinked)"""
+    _delete_many("oportunidades", [oportunidad_id])
+
+
+def delete_oportunidades(oportunidad_ids: Iterable[int]) -> int:
+    """
+    Delete opportunities by ID; their sales stay, unlinked.
+    Returns: number of opportunities deleted
+    """
+    return _delete_many("oportunidades", oportunidad_ids)
+
+
 def create_venta(venta_id: str, nombre: str, tipo_negocio: str, direccion: str,
                  fecha_cierre: date, semana: str, m2_real: int, producto: str,
                  monto_soles: float, fecha_instalacion: Optional[date] = None,
@@ -280,72 +443,151 @@ def create_venta(venta_id: str, nombre: str, tipo_negocio: str, direccion: str,
     return sale_id
 
 
-def get_visitas_by_period(start_date: date, end_date: date) -> List[Dict[str, Any]]:
-    """Get visits within date range with business details"""
-    
+def update_venta(venta_pk: int, nombre: str, tipo_negocio: str, direccion: str,
+                 fecha_cierre: date, semana: str, m2_real: int, producto: str,
+                 monto_soles: float, fecha_instalacion: Optional[date] = None,
+                 original: Optional[Dict[str, Any]] = None) -> None:
+    """Update existing sale record; with original, only the changed columns (see update_visita)"""
+    if keeps_business(original, nombre, tipo_negocio, direccion):
+        business_id = original["business_id"]
+    else:
+        business_id = get_or_create_business(nombre, tipo_negocio, direccion)
+    changes = changed_fields(original, {
+        "business_id": business_id, "fecha_cierre": fecha_cierre, "semana": semana, "m2_real": m2_real,
+        "producto": producto, "monto_soles": monto_soles, "fecha_instalacion": fecha_instalacion,
+    })
+    if not changes:
+        return
     conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    _update_changes(cursor, "ventas", venta_pk, changes)
+    conn.commit()
+    conn.close()
+
+
+def delete_ventas(venta_pks: Iterable[int]) -> int:
+    """
+    Delete sale records by primary key (e.g. test or duplicate data).
+    Returns: number of sales deleted
+    """
+    return _delete_many("ventas", venta_pks)
+
+
+def query_visitas_by_period(conn: sqlite3.Connection, start_date: date, end_date: date) -> List[Dict[str, Any]]:
+    """Visits within date range with business details, on an open connection"""
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
     
     cursor.execute("""
-        SELECT v.id, v.fecha, v.semana, v.notas,
-               b.nombre, b.tipo_negocio, b.direccion
+        SELECT v.*, b.nombre, b.tipo_negocio, b.direccion
         FROM visitas v
         JOIN businesses b ON v.business_id = b.id
         WHERE v.fecha BETWEEN ? AND ?
         ORDER BY v.fecha DESC
-    """, (start_date, end_date))
+    """, (str(start_date), str(end_date)))
     
-    results = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-    
-    return results
+    return [dict(row) for row in cursor.fetchall()]
 
 
-def get_oportunidades_activas() -> List[Dict[str, Any]]:
-    """Get active opportunities with business details"""
-    
-    conn = sqlite3.connect(DB_PATH)
+def query_oportunidades_activas(conn: sqlite3.Connection) -> List[Dict[str, Any]]:
+    """Active opportunities with business details, on an open connection"""
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
     
     cursor.execute("""
-        SELECT o.id, o.fecha_contacto, o.semana, o.m2_estimado, 
-               o.producto_interes, o.siguiente_accion, o.estado, o.source,
-               b.nombre, b.tipo_negocio, b.direccion
+        SELECT o.*, b.nombre, b.tipo_negocio, b.direccion
         FROM oportunidades o
         JOIN businesses b ON o.business_id = b.id
         WHERE o.estado = 'Activa'
         ORDER BY o.fecha_contacto DESC
     """)
     
-    results = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-    
-    return results
+    return [dict(row) for row in cursor.fetchall()]
 
 
-def get_ventas_by_period(start_date: date, end_date: date) -> List[Dict[str, Any]]:
-    """Get sales within date range with business details"""
-    
-    conn = sqlite3.connect(DB_PATH)
+def query_ventas_by_period(conn: sqlite3.Connection, start_date: date, end_date: date) -> List[Dict[str, Any]]:
+    """Sales within date range with business details, on an open connection"""
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
     
     cursor.execute("""
-        SELECT v.id, v.venta_id, v.fecha_cierre, v.semana, v.m2_real,
-               v.producto, v.monto_soles, v.fecha_instalacion, v.estado,
-               b.nombre, b.tipo_negocio, b.direccion
+        SELECT v.*, b.nombre, b.tipo_negocio, b.direccion
         FROM ventas v
         JOIN businesses b ON v.business_id = b.id
         WHERE v.fecha_cierre BETWEEN ? AND ?
         ORDER BY v.fecha_cierre DESC
-    """, (start_date, end_date))
+    """, (str(start_date), str(end_date)))
     
-    results = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-    
-    return results
+    return [dict(row) for row in cursor.fetchall()]
+
+
+def get_visitas_by_period(start_date: date, end_date: date) -> List[Dict[str, Any]]:
+    """Get visits within date range with business details"""
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        return query_visitas_by_period(conn, start_date, end_date)
+    finally:
+        conn.close()
+
+
+def get_oportunidades_activas() -> List[Dict[str, Any]]:
+    """Get active opportunities with business details"""
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        return query_oportunidades_activas(conn)
+    finally:
+        conn.close()
+
+
+def get_ventas_by_period(start_date: date, end_date: date) -> List[Dict[str, Any]]:
+    """Get sales within date range with business details"""
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        return query_ventas_by_period(conn, start_date, end_date)
+    finally:
+        conn.close()
+
+
+def get_events(since_id: int = 0, entity: Optional[str] = None, row_id: Optional[int] = None,
+               limit: int = EVENT_PAGE) -> List[Dict[str, Any]]:
+    """
+    Audit events after since_id, oldest first (events.py): all of them, or
+    the history of one record when entity and row_id are given
+    """
+    sql, params = "SELECT id, entity, row_id, kind, at, data FROM events WHERE id > ?", [since_id]
+    if entity is not None:
+        sql += " AND entity = ? AND row_id = ?"
+        params += [ENTITIES[entity], row_id]
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    try:
+        rows = conn.execute(sql + " ORDER BY id LIMIT ?", (*params, limit)).fetchall()
+    finally:
+        conn.close()
+    return [decode_event(row) for row in rows]
+
+
+def save_kpi_snapshot(data: Dict[str, Any]) -> int:
+    """Store a KPIs page snapshot (snapshots.py), keeping the latest SNAPSHOTS_KEPT; returns its id"""
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        with conn:
+            snapshot_id = conn.execute("INSERT INTO kpi_snapshots (data) VALUES (?)",
+                                       (json.dumps(data, ensure_ascii=False),)).lastrowid
+            conn.execute("DELETE FROM kpi_snapshots WHERE id <= ?", (snapshot_id - SNAPSHOTS_KEPT,))
+    finally:
+        conn.close()
+    return snapshot_id
+
+
+def get_kpi_snapshot() -> Optional[Dict[str, Any]]:
+    """Latest KPIs page snapshot: id, created_at and data, or None if none was saved"""
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        row = conn.execute("SELECT id, created_at, data FROM kpi_snapshots ORDER BY id DESC LIMIT 1").fetchone()
+    finally:
+        conn.close()
+    return None if row is None else {"id": row[0], "created_at": row[1], "data": json.loads(row[2])}
 
 
 def generate_venta_id() -> str:
@@ -357,21 +599,20 @@ def generate_venta_id() -> str:
     # Get current year
     year = datetime.now().year
     
-    # Find highest number for this year
+    # Find highest number for this year. A range on the UNIQUE index instead of
+    # LIKE (which can't use it), and numeric MAX since LUX-2026-1000 < LUX-2026-999 as text
+    prefix = f"LUX-{year}-"
     cursor.execute("""
-        SELECT venta_id FROM ventas 
-        WHERE venta_id LIKE ?
-        ORDER BY venta_id DESC LIMIT 1
-    """, (f"LUX-{year}-%",))
+        SELECT MAX(CAST(SUBSTR(venta_id, ?) AS INTEGER)) FROM ventas
+        WHERE venta_id >= ? AND venta_id < ?
+    """, (len(prefix) + 1, prefix, f"LUX-{year}."))
     
     result = cursor.fetchone()
     conn.close()
     
-    if result:
-        # Extract number and increment
-        last_id = result[0]
-        last_num = int(last_id.split('-')[-1])
-        next_num = last_num + 1
+    if result[0] is not None:
+        # Increment the highest number
+        next_num = result[0] + 1
     else:
         # First sale of the year
         next_num = 1
@@ -379,6 +620,82 @@ def generate_venta_id() -> str:
     return f"LUX-{year}-{next_num:03d}"
 
 
+def search_terms(text: str) -> List[str]:
+    """Words of a search box entry (letters and digits, accents kept)"""
+    return re.findall(r"\w+", text.lower())
+
+
+def query_search(conn: sqlite3.Connection, text: str, limit: int = 20) -> List[Dict[str, Any]]:
+    """
+    Full-text search (search_index) over businesses (nombre, direccion),
+    visit notes and opportunities (siguiente_accion, contact fields), best
+    matches first, on an open connection. Every word must match; the last one
+    also matches as a prefix, so the box finds "Taller Los And" while typing.
+
+    Returns:
+        Hits with tipo (negocio/visita/oportunidad), id, business_id, nombre,
+        direccion, fecha, coincidencia (snippet with **marks**) and score
+    """
+    terms = search_terms(text)
+    if not terms:
+        return []
+    match = " ".join(f'"{t}"' for t in terms[:-1]) + f' "{terms[-1]}"*'
+
+    # Per kind (a rowid range): the newest SEARCH_CANDIDATES matches, found by
+    # walking rowids backwards, so businesses compete with the far more numerous notes
+    candidates, params = [], []
+    for kind in SEARCH_KINDS.values():
+        candidates.append("""
+            SELECT * FROM (
+                SELECT rowid AS doc, business_id,
+                       snippet(search_index, -1, '**', '**', '…', 10) AS coincidencia,
+                       bm25(search_index, 0, 10.0, 4.0, 1.0, 2.0) AS score
+                FROM search_index
+                WHERE search_index MATCH ? AND rowid >= ? AND rowid < ?
+                ORDER BY rowid DESC
+                LIMIT ?
+            )""")
+        params += [match, kind << SEARCH_KIND_SHIFT, (kind + 1) << SEARCH_KIND_SHIFT, SEARCH_CANDIDATES]
+
+    conn.row_factory = sqlite3.Row
+    # Only the top hits are joined for display
+    rows = conn.execute(f"""
+        SELECT hit.doc, hit.business_id, b.nombre, b.direccion,
+               COALESCE(v.fecha, o.fecha_contacto) AS fecha, hit.coincidencia, hit.score
+        FROM ({" UNION ALL ".join(candidates)}
+            ORDER BY score
+            LIMIT ?
+        ) hit
+        JOIN businesses b ON b.id = hit.business_id
+        LEFT JOIN visitas v ON hit.doc >> {SEARCH_KIND_SHIFT} = {SEARCH_KINDS["visitas"]}
+            AND v.id = hit.doc & {_ID_MASK}
+        LEFT JOIN oportunidades o ON hit.doc >> {SEARCH_KIND_SHIFT} = {SEARCH_KINDS["oportunidades"]}
+            AND o.id = hit.doc & {_ID_MASK}
+        ORDER BY hit.score
+    """, params + [limit]).fetchall()
+    kinds = {kind: table for table, kind in SEARCH_KINDS.items()}
+    return [{
+        "tipo": SEARCH_HIT_TYPES[kinds[row["doc"] >> SEARCH_KIND_SHIFT]],
+        "id": row["doc"] & _ID_MASK,
+        "business_id": row["business_id"],
+        "nombre": row["nombre"],
+        "direccion": row["direccion"],
+        "fecha": row["fecha"],
+        "coincidencia": row["coincidencia"],
+        # bm25 is lower-is-better; flip it so higher means more relevant
+        "score": -row["score"],
+    } for row in rows]
+
+
+def search(text: str, limit: int = 20) -> List[Dict[str, Any]]:
+    """Full-text search over businesses, visit notes and opportunities (see query_search)"""
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        return query_search(conn, text, limit)
+    finally:
+        conn.close()
+
+
 def get_week_number(date_obj: date) -> str:
     """Get ISO week number formatted as W##"""
     return f"W{date_obj.isocalendar()[1]:02d}"
@@ -0,0 +1,499 @@
+"""
+In-memory storage engine for Lux Sales Dashboard
+
+Same functions as database.py (SQLite) and database_supabase.py, backed by
+plain Python lists. Nothing is persisted: the tables live as long as the
+process, which is what tests and benchmarks want. ``reset()`` empties them.
+
+Rows are stored the way the other engines return them (dates as ISO strings,
+``estado`` defaults, ``created_at``/``updated_at`` timestamps), and the getters
+return the same flattened shape with the business fields merged in.
+"""
+
+import json
+import threading
+import unicodedata
+from datetime import date, datetime
+from typing import Optional, List, Dict, Any, Iterable
+
+from business_match import NgramIndex, rank_candidates
+from events import EVENT_PAGE, diff, row_data, update_kind
+from constants import SNAPSHOTS_KEPT
+from database import assign_sales_rep, changed_fields, get_week_number, keeps_business, search_terms
+from followups import schedule_followup
+
+try:
+    from notifier import notify_new_assignment, notify_reassignment
+except ImportError:
+    # Graceful fallback if notifier is unavailable
+    def notify_new_assignment(*args, **kwargs): pass
+    def notify_reassignment(*args, **kwargs): pass
+
+TABLES = ["businesses", "visitas", "oportunidades", "ventas"]
+
+_lock = threading.RLock()
+_tables: Dict[str, List[Dict[str, Any]]] = {t: [] for t in TABLES}
+_ids: Dict[str, int] = {t: 0 for t in TABLES}
+_events: List[Dict[str, Any]] = []
+_snapshots: List[Dict[str, Any]] = []
+_business_index = NgramIndex()
+
+
+def _now() -> str:
+    return datetime.now().isoformat(sep=" ", timespec="seconds")
+
+
+def _iso(value: Optional[date]) -> Optional[str]:
+    return value.isoformat() if hasattr(value, "isoformat") else value
+
+
+def _log(table: str, row_id: int, kind: str, data: Dict[str, Any]) -> None:
+    """Append an audit event (events.py), same shape as get_events returns"""
+    _events.append({"id": len(_events) + 1, "entity": table, "row_id": row_id, "kind": kind,
+                    "at": _now(), "data": data})
+
+
+def _insert(table: str, row: Dict[str, Any]) -> int:
+    _ids[table] += 1
+    now = _now()
+    _tables[table].append({"id": _ids[table], **row, "created_at": now, "updated_at": now})
+    _log(table, _ids[table], "created", row_data(row))
+    return _ids[table]
+
+
+def _find(table: str, row_id: int) -> Optional[Dict[str, Any]]:
+    return next((r for r in _tables[table] if r["id"] == row_id), None)
+
+
+def _update(table: str, row_id: int, values: Dict[str, Any]) -> None:
+    row = _find(table, row_id)
+    if row is not None:
+        changes = diff(row, values)
+        row.update(values, updated_at=_now())
+        if changes:
+            _log(table, row_id, update_kind(table, changes), changes)
+
+
+def _remove(table: str, ids: Iterable[int]) -> int:
+    """Delete rows by id, logging each; returns how many were deleted"""
+    ids = set(ids)
+    kept = []
+    for row in _tables[table]:
+        if row["id"] in ids:
+            _log(table, row["id"], "deleted", row_data(row))
+        else:
+            kept.append(row)
+    deleted = len(_tables[table]) - len(kept)
+    _tables[table] = kept
+    return deleted
+
+
+def _flatten(row: Dict[str, Any]) -> Dict[str, Any]:
+    business = _find("businesses", row["business_id"]) or {}
+    return {**row, "nombre": business.get("nombre"), "tipo_negocio": business.get("tipo_negocio"),
+            "direccion": business.get("direccion")}
+
+
+def init_database() -> None:
+    """Nothing to create: tables exist as soon as the module is imported"""
+
+
+def reset() -> None:
+    """Drop every row and restart the id sequences"""
+    global _business_index
+    with _lock:
+        for table in TABLES:
+            _tables[table] = []
+            _ids[table] = 0
+        _events.clear()
+        _snapshots.clear()
+        _business_index = NgramIndex()
+
+
+def get_or_create_business(nombre: str, tipo_negocio: str, direccion: str) -> int:
+    """
+    Get existing business ID or create new one
+    Automatic linking by nombre + direccion (case-insensitive)
+    Returns: business_id
+    """
+    with _lock:
+        for business in _tables["businesses"]:
+            if business["nombre"].lower() == nombre.lower() and business["direccion"].lower() == direccion.lower():
+                _update("businesses", business["id"], {"tipo_negocio": tipo_negocio})
+                return business["id"]
+        business_id = _insert("businesses", {"nombre": nombre, "tipo_negocio": tipo_negocio, "direccion": direccion})
+        _business_index.add(business_id, nombre, direccion)
+        return business_id
+
+
+def find_similar_businesses(nombre: str, direccion: str, limit: int = 5) -> List[Dict[str, Any]]:
+    """Stored businesses that look like the same one (see business_match), best first"""
+    with _lock:
+        candidates = [_find("businesses", i) for i in _business_index.candidates(nombre, direccion)]
+        rows = [{k: b[k] for k in ("id", "nombre", "tipo_negocio", "direccion")} for b in candidates if b]
+    return rank_candidates(nombre, direccion, rows, limit=limit)
+
+
+def get_businesses() -> List[Dict[str, Any]]:
+    """Every business (id, nombre, tipo_negocio, direccion), oldest first"""
+    with _lock:
+        return [{k: b[k] for k in ("id", "nombre", "tipo_negocio", "direccion")} for b in _tables["businesses"]]
+
+
+def merge_businesses(keep_id: int, duplicate_ids: List[int]) -> int:
+    """
+    Re-point the visits, opportunities and sales of duplicate_ids to keep_id
+    and delete the duplicates. Returns the number of records moved.
+    """
+    duplicates = set(duplicate_ids) - {keep_id}
+    moved = 0
+    with _lock:
+        for table in ["visitas", "oportunidades", "ventas"]:
+            for row in _tables[table]:
+                if row["business_id"] in duplicates:
+                    _update(table, row["id"], {"business_id": keep_id})
+                    moved += 1
+        _remove("businesses", duplicates)
+        for business_id in duplicates:
+            _business_index.remove(business_id)
+    return moved
+
+
+def create_visita(nombre: str, tipo_negocio: str, direccion: str,
+                  fecha: date, semana: str, notas: Optional[str] = None) -> int:
+    """Create new visit record"""
+    with _lock:
+        business_id = get_or_create_business(nombre, tipo_negocio, direccion)
+        return _insert("visitas", {"business_id": business_id, "fecha": _iso(fecha), "semana": semana,
+                                   "notas": notas})
+
+
+def _business_for_update(original: Optional[Dict[str, Any]], nombre: str, tipo_negocio: str,
+                         direccion: str) -> int:
+    if keeps_business(original, nombre, tipo_negocio, direccion):
+        return original["business_id"]
+    return get_or_create_business(nombre, tipo_negocio, direccion)
+
+
+def update_visita(visita_id: int, nombre: str, tipo_negocio: str, direccion: str,
+                  fecha: date, semana: str, notas: Optional[str] = None,
+                  original: Optional[Dict[str, Any]] = None) -> None:
+    """Update an existing visit record by ID (only the fields changed since original)"""
+    with _lock:
+        business_id = _business_for_update(original, nombre, tipo_negocio, direccion)
+        changes = changed_fields(original, {"business_id": business_id, "fecha": _iso(fecha), "semana": semana,
+                                            "notas": notas})
+        if changes:
+            _update("visitas", visita_id, changes)
+
+
+def _delete_many(table: str, ids: Iterable[int], child: str, column: str) -> int:
+    """Delete rows by id and unlink child rows, like ON DELETE SET NULL"""
+    ids = set(ids)
+    with _lock:
+        for row in _tables[child]:
+            if row[column] in ids:
+                _update(child, row["id"], {column: None})
+        return _remove(table, ids)
+
+
+def delete_visita(visita_id: int) -> None:
+    """Delete a visit record by ID (linked opportunities keep existing, unlinked)"""
+    _delete_many("visitas", [visita_id], "oportunidades", "visita_id")
+
+
+def delete_visitas(visita_ids: Iterable[int]) -> int:
+    """Delete visit records by ID, unlinking their opportunities. Returns: number deleted"""
+    return _delete_many("visitas", visita_ids, "oportunidades", "visita_id")
+
+
+def create_oportunidad(nombre: str, tipo_negocio: str, direccion: str,
+                       fecha_contacto: date, semana: str, m2_estimado: Optional[int] = None,
+                       producto_interes: Optional[str] = None, siguiente_accion: Optional[str] = None,
+                       visita_id: Optional[int] = None, source: Optional[str] = None,
+                       nombre_contacto: Optional[str] = None, cargo_contacto: Optional[str] = None,
+                       celular_contacto: Optional[str] = None, email_contacto: Optional[str] = None,
+                       fecha_siguiente_accion: Optional[date] = None) -> int:
+    """Create new opportunity record, notify the assigned rep and schedule its follow-up"""
+    assigned_to = assign_sales_rep()
+    with _lock:
+        business_id = get_or_create_business(nombre, tipo_negocio, direccion)
+        opp_id = _insert("oportunidades", {
+            "business_id": business_id,
+            "visita_id": visita_id,
+            "fecha_contacto": _iso(fecha_contacto),
+            "semana": semana,
+            "m2_estimado": m2_estimado,
+            "producto_interes": producto_interes,
+            "siguiente_accion": siguiente_accion,
+            "estado": "Activa",
+            "motivo_perdida": None,
+            "source": source,
+            "nombre_contacto": nombre_contacto,
+            "cargo_contacto": cargo_contacto,
+            "celular_contacto": celular_contacto,
+            "email_contacto": email_contacto,
+            "asignado_a": assigned_to,
+            "fecha_siguiente_accion": _iso(fecha_siguiente_accion),
+        })
+
+    try:
+        notify_new_assignment(
+            rep_name=assigned_to,
+            opp_id=opp_id,
+            nombre_negocio=nombre,
+            producto=producto_interes,
+            m2=m2_estimado,
+            siguiente_accion=siguiente_accion,
+            nombre_contacto=nombre_contacto,
+            celular_contacto=celular_contacto,
+            source=source,
+        )
+    except Exception:
+        pass  # Never let notification failure break the app
+    schedule_followup(opp_id, fecha_siguiente_accion)
+
+    return opp_id
+
+
+def update_oportunidad(oportunidad_id: int, nombre: str, tipo_negocio: str, direccion: str,
+                       fecha_contacto: date, semana: str, m2_estimado: Optional[int] = None,
+                       producto_interes: Optional[str] = None, siguiente_accion: Optional[str] = None,
+                       source: Optional[str] = None,
+                       nombre_contacto: Optional[str] = None, cargo_contacto: Optional[str] = None,
+                       celular_contacto: Optional[str] = None, email_contacto: Optional[str] = None,
+                       asignado_a: Optional[str] = None, fecha_siguiente_accion: Optional[date] = None,
+                       original: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Update existing opportunity. Notifies rep via WhatsApp if asignado_a changes
+    and reschedules the follow-up if fecha_siguiente_accion does.
+    """
+    with _lock:
+        business_id = _business_for_update(original, nombre, tipo_negocio, direccion)
+        current = _find("oportunidades", oportunidad_id)
+        prev_assigned = current["asignado_a"] if current else None
+        values = {
+            "business_id": business_id,
+            "fecha_contacto": _iso(fecha_contacto),
+            "semana": semana,
+            "m2_estimado": m2_estimado,
+            "producto_interes": producto_interes,
+            "siguiente_accion": siguiente_accion,
+            "source": source,
+            "nombre_contacto": nombre_contacto,
+            "cargo_contacto": cargo_contacto,
+            "celular_contacto": celular_contacto,
+            "email_contacto": email_contacto,
+            "fecha_siguiente_accion": _iso(fecha_siguiente_accion),
+        }
+        if asignado_a:
+            values["asignado_a"] = asignado_a
+        changes = changed_fields(original, values)
+        if not changes:
+            return
+        _update("oportunidades", oportunidad_id, changes)
+    if "fecha_siguiente_accion" in changes:
+        schedule_followup(oportunidad_id, fecha_siguiente_accion)
+
+    try:
+        if asignado_a and prev_assigned and asignado_a.lower() != prev_assigned.lower():
+            notify_reassignment(
+                new_rep_name=asignado_a,
+                prev_rep_name=prev_assigned,
+                opp_id=oportunidad_id,
+                nombre_negocio=nombre,
+                producto=producto_interes,
+                m2=m2_estimado,
+                siguiente_accion=siguiente_accion,
+                nombre_contacto=nombre_contacto,
+                celular_contacto=celular_contacto,
+            )
+    except Exception:
+        pass  # Never let notification failure break the app
+
+
+def mark_opportunity_lost(oportunidad_id: int, motivo_perdida: str) -> None:
+    """Mark opportunity as lost with a reason"""
+    with _lock:
+        _update("oportunidades", oportunidad_id, {"estado": "Perdida", "motivo_perdida": motivo_perdida})
+
+
+def delete_oportunidad(oportunidad_id: int) -> None:
+    """Delete opportunity (its sales are unlinked)"""
+    _delete_many("oportunidades", [oportunidad_id], "ventas", "oportunidad_id")
+
+
+def delete_oportunidades(oportunidad_ids: Iterable[int]) -> int:
+    """Delete opportunities by ID, unlinking their sales. Returns: number deleted"""
+    return _delete_many("oportunidades", oportunidad_ids, "ventas", "oportunidad_id")
+
+
+def create_venta(venta_id: str, nombre: str, tipo_negocio: str, direccion: str,
+                 fecha_cierre: date, semana: str, m2_real: int, producto: str,
+                 monto_soles: float, fecha_instalacion: Optional[date] = None,
+                 oportunidad_id: Optional[int] = None) -> int:
+    """Create new sale record and mark its opportunity converted"""
+    with _lock:
+        if any(r["venta_id"] == venta_id for r in _tables["ventas"]):
+            raise ValueError(f"Venta {venta_id} already exists")
+        business_id = get_or_create_business(nombre, tipo_negocio, direccion)
+        sale_id = _insert("ventas", {
+            "venta_id": venta_id,
+            "business_id": business_id,
+            "oportunidad_id": oportunidad_id,
+            "fecha_cierre": _iso(fecha_cierre),
+            "semana": semana,
+            "m2_real": m2_real,
+            "producto": producto,
+            "monto_soles": monto_soles,
+            "fecha_instalacion": _iso(fecha_instalacion),
+            "estado": "Cerrada",
+        })
+        if oportunidad_id:
+            _update("oportunidades", oportunidad_id, {"estado": "Convertida"})
+        return sale_id
+
+
+def update_venta(venta_pk: int, nombre: str, tipo_negocio: str, direccion: str,
+                 fecha_cierre: date, semana: str, m2_real: int, producto: str,
+                 monto_soles: float, fecha_instalacion: Optional[date] = None,
+                 original: Optional[Dict[str, Any]] = None) -> None:
+    """Update existing sale record (only the fields changed since original)"""
+    with _lock:
+        business_id = _business_for_update(original, nombre, tipo_negocio, direccion)
+        changes = changed_fields(original, {
+            "business_id": business_id,
+            "fecha_cierre": _iso(fecha_cierre),
+            "semana": semana,
+            "m2_real": m2_real,
+            "producto": producto,
+            "monto_soles": monto_soles,
+            "fecha_instalacion": _iso(fecha_instalacion),
+        })
+        if changes:
+            _update("ventas", venta_pk, changes)
+
+
+def delete_ventas(venta_pks: Iterable[int]) -> int:
+    """Delete sale records by primary key. Returns: number deleted"""
+    with _lock:
+        return _remove("ventas", venta_pks)
+
+
+def _period(table: str, column: str, start_date: date, end_date: date) -> List[Dict[str, Any]]:
+    lo, hi = start_date.isoformat(), end_date.isoformat()
+    with _lock:
+        rows = [_flatten(r) for r in _tables[table] if lo <= r[column][:10] <= hi]
+    return sorted(rows, key=lambda r: r[column], reverse=True)
+
+
+def get_visitas_by_period(start_date: date, end_date: date) -> List[Dict[str, Any]]:
+    """Get visits within date range with business details"""
+    return _period("visitas", "fecha", start_date, end_date)
+
+
+def get_oportunidades_activas() -> List[Dict[str, Any]]:
+    """Get active opportunities with business details"""
+    with _lock:
+        rows = [_flatten(r) for r in _tables["oportunidades"] if r["estado"] == "Activa"]
+    return sorted(rows, key=lambda r: r["fecha_contacto"], reverse=True)
+
+
+def get_ventas_by_period(start_date: date, end_date: date) -> List[Dict[str, Any]]:
+    """Get sales within date range with business details"""
+    return _period("ventas", "fecha_cierre", start_date, end_date)
+
+
+def get_events(since_id: int = 0, entity: Optional[str] = None, row_id: Optional[int] = None,
+               limit: int = EVENT_PAGE) -> List[Dict[str, Any]]:
+    """Audit events after since_id, oldest first (optionally of one record)"""
+    with _lock:
+        rows = [e for e in _events[since_id:]
+                if entity is None or (e["entity"] == entity and e["row_id"] == row_id)]
+        return [{**e, "data": dict(e["data"])} for e in rows[:limit]]
+
+
+def save_kpi_snapshot(data: Dict[str, Any]) -> int:
+    """Store a KPIs page snapshot (snapshots.py), keeping the latest SNAPSHOTS_KEPT; returns its id"""
+    with _lock:
+        snapshot_id = _snapshots[-1]["id"] + 1 if _snapshots else 1
+        # Stored as JSON like the other engines, so callers get their own copy back
+        _snapshots.append({"id": snapshot_id, "created_at": _now(), "data": json.dumps(data)})
+        del _snapshots[:-SNAPSHOTS_KEPT]
+    return snapshot_id
+
+
+def get_kpi_snapshot() -> Optional[Dict[str, Any]]:
+    """Latest KPIs page snapshot: id, created_at and data, or None if none was saved"""
+    with _lock:
+        if not _snapshots:
+            return None
+        latest = _snapshots[-1]
+    return {**latest, "data": json.loads(latest["data"])}
+
+
+def generate_venta_id() -> str:
+    """Generate next sequential sale ID (LUX-YYYY-XXX)"""
+    prefix = f"LUX-{datetime.now().year}-"
+    with _lock:
+        numbers = [int(r["venta_id"][len(prefix):]) for r in _tables["ventas"]
+                   if r["venta_id"].startswith(prefix) and r["venta_id"][len(prefix):].isdigit()]
+    return f"{prefix}{max(numbers, default=0) + 1:03d}"
+
+
+def _fold(text: Optional[str]) -> str:
+    """Lowercase without accents, like the SQLite index's remove_diacritics"""
+    decomposed = unicodedata.normalize("NFKD", (text or "").lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def search(text: str, limit: int = 20) -> List[Dict[str, Any]]:
+    """
+    Search businesses, visit notes and opportunities (next action, contact);
+    every word must appear, the last one as a prefix. Same hit shape as
+    database.search, scored by weighted field matches.
+    """
+    terms = [_fold(t) for t in search_terms(text)]
+    if not terms:
+        return []
+
+    def score(fields: List[tuple]) -> float:
+        words = [(weight, _fold(value).split()) for weight, value in fields]
+        total = 0.0
+        for i, term in enumerate(terms):
+            prefix = i == len(terms) - 1
+            hits = sum(weight for weight, ws in words
+                       for w in ws if (w.startswith(term) if prefix else w.strip(".,") == term))
+            if not hits:
+                return 0.0
+            total += hits
+        return total
+
+    hits = []
+    with _lock:
+        for b in _tables["businesses"]:
+            hits.append(("negocio", b, None, score([(10.0, b["nombre"]), (4.0, b["direccion"])]), b["nombre"]))
+        for v in _tables["visitas"]:
+            hits.append(("visita", v, v["fecha"], score([(1.0, v.get("notas"))]), v.get("notas")))
+        for o in _tables["oportunidades"]:
+            contacto = " ".join(filter(None, [o.get("nombre_contacto"), o.get("cargo_contacto"),
+                                              o.get("celular_contacto"), o.get("email_contacto")]))
+            hits.append(("oportunidad", o, o["fecha_contacto"],
+                         score([(1.0, o.get("siguiente_accion")), (2.0, contacto)]),
+                         o.get("siguiente_accion") or contacto))
+        ranked = sorted((h for h in hits if h[3] > 0), key=lambda h: h[3], reverse=True)[:limit]
+        results = []
+        for tipo, row, fecha, points, text_hit in ranked:
+            business_id = row["id"] if tipo == "negocio" else row["business_id"]
+            business = _find("businesses", business_id) or {}
+            results.append({
+                "tipo": tipo,
+                "id": row["id"],
+                "business_id": business_id,
+                "nombre": business.get("nombre"),
+                "direccion": business.get("direccion"),
+                "fecha": fecha,
+                "coincidencia": text_hit,
+                "score": points,
+            })
+    return results
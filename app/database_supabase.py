@@ -1,11 +1,19 @@
 
-import os
-import streamlit as st
-from supabase import create_client, Client
+import logging
 from datetime import date, datetime
-import random
-from typing import Optional, List, Dict, Any
-from pathlib import Path
+from typing import Optional, List, Dict, Any, Iterable
+from functools import wraps
+import inspect
+
+from business_match import MAX_CANDIDATES, match_key, rank_candidates
+from clients import get_supabase_client
+from events import ENTITIES, EVENT_PAGE, decode_event
+from constants import ASSIGNED_TO, SNAPSHOTS_KEPT
+from database import assign_sales_rep, changed_fields, keeps_business, search_terms
+from followups import schedule_followup
+from migrations import check_supabase
+from replica import PAGE_SIZE, active_replica
+from write_queue import PENDING_VENTA_ID, active_write_queue
 
 try:
     from notifier import notify_new_assignment, notify_reassignment
@@ -14,23 +22,93 @@ except ImportError:
     def notify_new_assignment(*args, **kwargs): pass
     def notify_reassignment(*args, **kwargs): pass
 
-# --- Configuration ---
-# Uses st.secrets for production (Streamlit Cloud)
-# Uses os.environ or .env for local development (if not using st.secrets locally)
+logger = logging.getLogger(__name__)
+
+# Ids per delete request: PostgREST takes the in.(...) filter in the URL
+DELETE_CHUNK = 200
 
-SALES_REPS = ["Emmanuel", "Sebastian", "Ingemar", "Adolfo"]
-SALES_WEIGHTS = [0.40, 0.30, 0.20, 0.10]
-ASSIGNED_TO = ["Sebastian", "Ingemar", "Emmanuel", "Adolfo"]
+# --- Configuration ---
+# Credentials come from config.py ([supabase] in secrets.toml or the environment),
+# so these functions also work outside Streamlit (worker threads, CLI jobs)
 
-@st.cache_resource
 def init_connection():
-    try:
-        url = st.secrets["supabase"]["url"]
-        key = st.secrets["supabase"]["key"]
-        return create_client(url, key)
-    except Exception as e:
-        st.error(f"❌ Error connecting to Supabase: {e}")
-        st.stop()
+    """Shared Supabase client (raises config.ConfigError if credentials are missing)"""
+    return get_supabase_client()
+
+# --- Row builders (shared with the offline write queue) ---
+
+def visita_record(business_id: int, fecha: date, semana: str, notas: Optional[str] = None) -> Dict[str, Any]:
+    return {
+        "business_id": business_id,
+        "fecha": fecha.isoformat(),
+        "semana": semana,
+        "notas": notas
+    }
+
+def oportunidad_record(business_id: int, fecha_contacto: date, semana: str, m2_estimado: Optional[int],
+                       producto_interes: Optional[str], siguiente_accion: Optional[str],
+                       visita_id: Optional[int], source: Optional[str],
+                       nombre_contacto: Optional[str], cargo_contacto: Optional[str],
+                       celular_contacto: Optional[str], email_contacto: Optional[str],
+                       asignado_a: str, fecha_siguiente_accion: Optional[date] = None) -> Dict[str, Any]:
+    return {
+        "business_id": business_id,
+        "fecha_contacto": fecha_contacto.isoformat(),
+        "semana": semana,
+        "m2_estimado": m2_estimado,
+        "producto_interes": producto_interes,
+        "siguiente_accion": siguiente_accion,
+        "visita_id": visita_id,
+        "estado": "Activa",
+        "source": source,
+        "nombre_contacto": nombre_contacto,
+        "cargo_contacto": cargo_contacto,
+        "celular_contacto": celular_contacto,
+        "email_contacto": email_contacto,
+        "asignado_a": asignado_a,
+        "fecha_siguiente_accion": fecha_siguiente_accion.isoformat() if fecha_siguiente_accion else None,
+    }
+
+def venta_record(venta_id: str, business_id: int, fecha_cierre: date, semana: str, m2_real: int,
+                 producto: str, monto_soles: float, fecha_instalacion: Optional[date] = None,
+                 oportunidad_id: Optional[int] = None) -> Dict[str, Any]:
+    return {
+        "venta_id": venta_id,
+        "business_id": business_id,
+        "fecha_cierre": fecha_cierre.isoformat(),
+        "semana": semana,
+        "m2_real": m2_real,
+        "producto": producto,
+        "monto_soles": monto_soles,
+        "fecha_instalacion": fecha_instalacion.isoformat() if fecha_instalacion else None,
+        "oportunidad_id": oportunidad_id,
+        "estado": "Cerrada"
+    }
+
+def _queueable(func):
+    """Hand creates/updates to the offline write queue when it is enabled"""
+    signature = inspect.signature(func)
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        queue = active_write_queue()
+        if queue is None:
+            return func(*args, **kwargs)
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        return queue.enqueue(func.__name__, dict(bound.arguments))
+    return wrapper
+
+def _writes(func):
+    """Mark the local read replica stale after a write so its background thread syncs it"""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        result = func(*args, **kwargs)
+        replica = active_replica()
+        if replica is not None:
+            replica.mark_stale()
+        return result
+    return wrapper
 
 # --- Database Initialization ---
 # Tables must be created in Supabase SQL Editor.
@@ -73,83 +151,128 @@ def get_or_create_business(nombre: str, tipo_negocio: str, direccion: str) -> in
         return response.data[0]['id']
 
     except Exception as e:
-        st.error(f"Database Error: {e}")
+        logger.error(f"Database Error: {e}")
         raise e
 
+def find_similar_businesses(nombre: str, direccion: str, limit: int = 5) -> List[Dict[str, Any]]:
+    """
+    Stored businesses that look like the same one (business_match.py), best
+    first. Candidates come from pg_trgm (similar_businesses in
+    migrations/supabase/0006_business_match.sql) and are rescored here.
+    """
+    supabase = init_connection()
+    response = supabase.rpc("similar_businesses", {"q": match_key(nombre, direccion),
+                                                   "max_results": MAX_CANDIDATES}).execute()
+    return rank_candidates(nombre, direccion, response.data or [], limit=limit)
+
+def get_businesses() -> List[Dict[str, Any]]:
+    """Every business (id, nombre, tipo_negocio, direccion), oldest first, paged"""
+    supabase = init_connection()
+    rows, offset = [], 0
+    while True:
+        batch = supabase.table("businesses").select("id, nombre, tipo_negocio, direccion")\
+            .order("id").range(offset, offset + PAGE_SIZE - 1).execute().data
+        rows.extend(batch)
+        if len(batch) < PAGE_SIZE:
+            return rows
+        offset += PAGE_SIZE
+
+@_writes
+def merge_businesses(keep_id: int, duplicate_ids: List[int]) -> int:
+    """
+    Re-point the visits, opportunities and sales of duplicate_ids to keep_id
+    and delete the duplicates, in one transaction (merge_businesses RPC).
+    Returns: number of records moved
+    """
+    supabase = init_connection()
+    response = supabase.rpc("merge_businesses", {"keep_id": keep_id, "duplicate_ids": list(duplicate_ids)}).execute()
+    return response.data or 0
+
+@_writes
+@_queueable
 def create_visita(nombre: str, tipo_negocio: str, direccion: str, 
                   fecha: date, semana: str, notas: Optional[str] = None) -> int:
     """Create new visit record in Supabase"""
     supabase = init_connection()
     business_id = get_or_create_business(nombre, tipo_negocio, direccion)
     
-    new_visita = {
-        "business_id": business_id,
-        "fecha": fecha.isoformat(),
-        "semana": semana,
-        "notas": notas
-    }
+    new_visita = visita_record(business_id, fecha, semana, notas)
     
     response = supabase.table("visitas").insert(new_visita).execute()
     return response.data[0]['id']
 
+def _business_for_update(original: Optional[Dict[str, Any]], nombre: str, tipo_negocio: str,
+                         direccion: str) -> int:
+    """The edited record's business_id as loaded when its fields are unchanged (saves the lookup)"""
+    if keeps_business(original, nombre, tipo_negocio, direccion):
+        return original["business_id"]
+    return get_or_create_business(nombre, tipo_negocio, direccion)
+
+@_writes
+@_queueable
 def update_visita(visita_id: int, nombre: str, tipo_negocio: str, direccion: str,
-                  fecha: date, semana: str, notas: Optional[str] = None) -> None:
-    """Update an existing visit record"""
+                  fecha: date, semana: str, notas: Optional[str] = None,
+                  original: Optional[Dict[str, Any]] = None) -> None:
+    """Update an existing visit record (only the fields changed since original)"""
     supabase = init_connection()
-    # Update business info first (could change links, but keeping simple for now)
-    # Ideally should update business record if details changed
-    business_id = get_or_create_business(nombre, tipo_negocio, direccion)
+    business_id = _business_for_update(original, nombre, tipo_negocio, direccion)
     
-    update_data = {
+    update_data = changed_fields(original, {
         "business_id": business_id,
         "fecha": fecha.isoformat(),
         "semana": semana,
         "notas": notas,
-        "updated_at": "now()"
-    }
+    })
+    if not update_data:
+        return
+    update_data["updated_at"] = "now()"
     
     supabase.table("visitas").update(update_data).eq("id", visita_id).execute()
 
-def delete_visita(visita_id: int) -> None:
-    """Delete a visit record by ID"""
+def _delete_many(table: str, ids: Iterable[int]) -> int:
+    """
+    Delete rows by id, DELETE_CHUNK per request. Dependents are unlinked by
+    the foreign keys (ON DELETE SET NULL, migrations/supabase/0009_delete_set_null.sql).
+    """
     supabase = init_connection()
-    
-    # First, decouple any linked opportunities (set visita_id to NULL)
-    # This prevents foreign key constraint errors
-    supabase.table("oportunidades").update({"visita_id": None}).eq("visita_id", visita_id).execute()
-    
-    # Now safe to delete the visit
-    supabase.table("visitas").delete().eq("id", visita_id).execute()
+    ids = list(dict.fromkeys(ids))
+    deleted = 0
+    for start in range(0, len(ids), DELETE_CHUNK):
+        response = supabase.table(table).delete().in_("id", ids[start:start + DELETE_CHUNK]).execute()
+        deleted += len(response.data or [])
+    return deleted
+
+@_writes
+def delete_visita(visita_id: int) -> None:
+    """Delete a visit record by ID (linked opportunities are unlinked)"""
+    _delete_many("visitas", [visita_id])
 
+@_writes
+def delete_visitas(visita_ids: Iterable[int]) -> int:
+    """Delete visit records by ID, unlinking their opportunities. Returns: number deleted"""
+    return _delete_many("visitas", visita_ids)
+
+@_writes
+@_queueable
 def create_oportunidad(nombre: str, tipo_negocio: str, direccion: str,
                        fecha_contacto: date, semana: str, m2_estimado: Optional[int] = None,
                        producto_interes: Optional[str] = None, siguiente_accion: Optional[str] = None,
                        visita_id: Optional[int] = None, source: Optional[str] = None,
                        nombre_contacto: Optional[str] = None, cargo_contacto: Optional[str] = None, 
-                       celular_contacto: Optional[str] = None, email_contacto: Optional[str] = None) -> int:
-    """Create new opportunity record in Supabase. Updated logic for email_contacto."""
+                       celular_contacto: Optional[str] = None, email_contacto: Optional[str] = None,
+                       fecha_siguiente_accion: Optional[date] = None) -> int:
+    """Create new opportunity record in Supabase and schedule its follow-up. Updated logic for email_contacto."""
     supabase = init_connection()
     business_id = get_or_create_business(nombre, tipo_negocio, direccion)
     
     # Assign sales rep automatically
-    assigned_to = random.choices(SALES_REPS, weights=SALES_WEIGHTS, k=1)[0]
+    assigned_to = assign_sales_rep()
     
-    new_opp = {
-        "business_id": business_id,
-        "fecha_contacto": fecha_contacto.isoformat(),
-        "semana": semana,
-        "m2_estimado": m2_estimado,
-        "producto_interes": producto_interes,
-        "siguiente_accion": siguiente_accion,
-        "visita_id": visita_id,
-        "estado": "Activa",
-        "source": source,
-        "nombre_contacto": nombre_contacto,
-        "cargo_contacto": cargo_contacto,
-        "celular_contacto": celular_contacto,
-        "email_contacto": email_contacto,
-        "asignado_a": assigned_to,
-    }
+    new_opp = oportunidad_record(
+        business_id, fecha_contacto, semana, m2_estimado, producto_interes, siguiente_accion,
+        visita_id, source, nombre_contacto, cargo_contacto, celular_contacto, email_contacto,
+        assigned_to, fecha_siguiente_accion
+    )
     
     response = supabase.table("oportunidades").insert(new_opp).execute()
     opp_id = response.data[0]['id']
@@ -169,33 +292,31 @@ def create_oportunidad(nombre: str, tipo_negocio: str, direccion: str,
         )
     except Exception:
         pass  # Never let notification failure break the app
+    schedule_followup(opp_id, fecha_siguiente_accion)
 
     return opp_id
 
+@_writes
+@_queueable
 def update_oportunidad(oportunidad_id: int, nombre: str, tipo_negocio: str, direccion: str,
                        fecha_contacto: date, semana: str, m2_estimado: Optional[int] = None,
                        producto_interes: Optional[str] = None, siguiente_accion: Optional[str] = None,
                        source: Optional[str] = None,
                        nombre_contacto: Optional[str] = None, cargo_contacto: Optional[str] = None,
                        celular_contacto: Optional[str] = None, email_contacto: Optional[str] = None,
-                       asignado_a: Optional[str] = None) -> None:
-    """Update existing opportunity. Notifies rep via WhatsApp if asignado_a changes."""
+                       asignado_a: Optional[str] = None, fecha_siguiente_accion: Optional[date] = None,
+                       original: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Update existing opportunity. Notifies rep via WhatsApp if asignado_a changes
+    and reschedules the follow-up if fecha_siguiente_accion does.
+    With original only the changed fields are sent, in one update_oportunidad_changes
+    call (migrations/supabase/0008_update_oportunidad.sql) that also returns the
+    previous asignado_a.
+    """
     supabase = init_connection()
-    business_id = get_or_create_business(nombre, tipo_negocio, direccion)
-
-    # Fetch current asignado_a BEFORE updating to detect reassignment
-    prev_assigned = None
-    try:
-        prev_response = supabase.table("oportunidades")\
-            .select("asignado_a")\
-            .eq("id", oportunidad_id)\
-            .single()\
-            .execute()
-        prev_assigned = prev_response.data.get("asignado_a") if prev_response.data else None
-    except Exception:
-        pass
+    business_id = _business_for_update(original, nombre, tipo_negocio, direccion)
 
-    update_data = {
+    values = {
         "business_id": business_id,
         "fecha_contacto": fecha_contacto.isoformat(),
         "semana": semana,
@@ -207,17 +328,40 @@ def update_oportunidad(oportunidad_id: int, nombre: str, tipo_negocio: str, dire
         "cargo_contacto": cargo_contacto,
         "celular_contacto": celular_contacto,
         "email_contacto": email_contacto,
-        "updated_at": "now()"
+        "fecha_siguiente_accion": fecha_siguiente_accion.isoformat() if fecha_siguiente_accion else None,
     }
 
     if asignado_a:
-        update_data["asignado_a"] = asignado_a
+        values["asignado_a"] = asignado_a
     # If asignado_a is explicitly passed as None or empty, we generally don't want to clear it 
     # unless that's intended. Here we only update if a value is provided. 
     # To prevent accidental overwrites, we rely on the callers to pass the existing value if they want to keep it,
     # or a new value if they want to change it.
-    
-    supabase.table("oportunidades").update(update_data).eq("id", oportunidad_id).execute()
+    update_data = changed_fields(original, values)
+    if not update_data:
+        return
+
+    try:
+        response = supabase.rpc("update_oportunidad_changes",
+                                {"opp_id": oportunidad_id, "changes": update_data}).execute()
+        prev_assigned = response.data
+    except Exception as e:
+        # Project without migration 0008: read the assignee, then update
+        logger.warning("update_oportunidad_changes failed (%s); falling back to select + update", e)
+        prev_assigned = None
+        try:
+            prev_response = supabase.table("oportunidades")\
+                .select("asignado_a")\
+                .eq("id", oportunidad_id)\
+                .single()\
+                .execute()
+            prev_assigned = prev_response.data.get("asignado_a") if prev_response.data else None
+        except Exception:
+            pass
+        supabase.table("oportunidades").update({**update_data, "updated_at": "now()"})\
+            .eq("id", oportunidad_id).execute()
+    if "fecha_siguiente_accion" in update_data:
+        schedule_followup(oportunidad_id, fecha_siguiente_accion)
 
     # Notify new rep if assignment changed
     try:
@@ -241,6 +385,7 @@ def update_oportunidad(oportunidad_id: int, nombre: str, tipo_negocio: str, dire
     except Exception:
         pass  # Never let notification failure break the app
 
+@_writes
 def mark_opportunity_lost(oportunidad_id: int, motivo_perdida: str) -> None:
     """Mark opportunity as lost with a reason"""
     supabase = init_connection()
@@ -250,11 +395,18 @@ def mark_opportunity_lost(oportunidad_id: int, motivo_perdida: str) -> None:
         "updated_at": "now()"
     }).eq("id", oportunidad_id).execute()
 
+@_writes
 def delete_oportunidad(oportunidad_id: int) -> None:
-    """Delete opportunity"""
-    supabase = init_connection()
-    supabase.table("oportunidades").delete().eq("id", oportunidad_id).execute()
+    """Delete opportunity (its sales are unlinked)"""
+    _delete_many("oportunidades", [oportunidad_id])
 
+@_writes
+def delete_oportunidades(oportunidad_ids: Iterable[int]) -> int:
+    """Delete opportunities by ID, unlinking their sales. Returns: number deleted"""
+    return _delete_many("oportunidades", oportunidad_ids)
+
+@_writes
+@_queueable
 def create_venta(venta_id: str, nombre: str, tipo_negocio: str, direccion: str,
                  fecha_cierre: date, semana: str, m2_real: int, producto: str,
                  monto_soles: float, fecha_instalacion: Optional[date] = None,
@@ -263,39 +415,37 @@ def create_venta(venta_id: str, nombre: str, tipo_negocio: str, direccion: str,
     supabase = init_connection()
     business_id = get_or_create_business(nombre, tipo_negocio, direccion)
     
-    new_sale = {
-        "venta_id": venta_id,
-        "business_id": business_id,
-        "fecha_cierre": fecha_cierre.isoformat(),
-        "semana": semana,
-        "m2_real": m2_real,
-        "producto": producto,
-        "monto_soles": monto_soles,
-        "fecha_instalacion": fecha_instalacion.isoformat() if fecha_instalacion else None,
-        "oportunidad_id": oportunidad_id,
-        "estado": "Cerrada"
-    }
+    new_sale = venta_record(venta_id, business_id, fecha_cierre, semana, m2_real, producto,
+                            monto_soles, fecha_instalacion, oportunidad_id)
     
     response = supabase.table("ventas").insert(new_sale).execute()
     
     # Mark opportunity as converted
     if oportunidad_id:
-        supabase.table("oportunidades").update({
-            "estado": "Convertida",
-            "updated_at": "now()"
-        }).eq("id", oportunidad_id).execute()
+        mark_opportunities_converted([oportunidad_id])
         
     return response.data[0]['id']
 
+@_writes
+def mark_opportunities_converted(oportunidad_ids: List[int]) -> None:
+    """Set opportunities to Convertida (their sale was registered)"""
+    init_connection().table("oportunidades").update({
+        "estado": "Convertida",
+        "updated_at": "now()"
+    }).in_("id", list(oportunidad_ids)).execute()
 
+
+@_writes
+@_queueable
 def update_venta(venta_pk: int, nombre: str, tipo_negocio: str, direccion: str,
                  fecha_cierre: date, semana: str, m2_real: int, producto: str,
-                 monto_soles: float, fecha_instalacion=None) -> None:
-    """Update existing sale record in Supabase"""
+                 monto_soles: float, fecha_instalacion=None,
+                 original: Optional[Dict[str, Any]] = None) -> None:
+    """Update existing sale record in Supabase (only the fields changed since original)"""
     supabase = init_connection()
-    business_id = get_or_create_business(nombre, tipo_negocio, direccion)
+    business_id = _business_for_update(original, nombre, tipo_negocio, direccion)
 
-    update_data = {
+    update_data = changed_fields(original, {
         "business_id": business_id,
         "fecha_cierre": fecha_cierre.isoformat() if hasattr(fecha_cierre, 'isoformat') else str(fecha_cierre),
         "semana": semana,
@@ -303,15 +453,28 @@ def update_venta(venta_pk: int, nombre: str, tipo_negocio: str, direccion: str,
         "producto": producto,
         "monto_soles": monto_soles,
         "fecha_instalacion": fecha_instalacion.isoformat() if fecha_instalacion and hasattr(fecha_instalacion, 'isoformat') else (str(fecha_instalacion) if fecha_instalacion else None),
-    }
+    })
+    if not update_data:
+        return
+    update_data["updated_at"] = "now()"
 
     supabase.table("ventas").update(update_data).eq("id", venta_pk).execute()
 
 
+@_writes
+def delete_ventas(venta_pks: Iterable[int]) -> int:
+    """Delete sale records by primary key. Returns: number deleted"""
+    return _delete_many("ventas", venta_pks)
+
+
 # --- Getters ---
 
 def get_visitas_by_period(start_date: date, end_date: date) -> List[Dict[str, Any]]:
     """Get visits within date range with business details"""
+    replica = active_replica()
+    if replica is not None:
+        return replica.get_visitas_by_period(start_date, end_date)
+
     supabase = init_connection()
     
     # Perform a join using Supabase syntax
@@ -337,6 +500,10 @@ def get_visitas_by_period(start_date: date, end_date: date) -> List[Dict[str, An
 
 def get_oportunidades_activas() -> List[Dict[str, Any]]:
     """Get active opportunities"""
+    replica = active_replica()
+    if replica is not None:
+        return replica.get_oportunidades_activas()
+
     supabase = init_connection()
     
     response = supabase.table("oportunidades")\
@@ -358,6 +525,10 @@ def get_oportunidades_activas() -> List[Dict[str, Any]]:
 
 def get_ventas_by_period(start_date: date, end_date: date) -> List[Dict[str, Any]]:
     """Get sales within date range"""
+    replica = active_replica()
+    if replica is not None:
+        return replica.get_ventas_by_period(start_date, end_date)
+
     supabase = init_connection()
     
     response = supabase.table("ventas")\
@@ -378,37 +549,100 @@ def get_ventas_by_period(start_date: date, end_date: date) -> List[Dict[str, Any
         
     return results
 
+def get_events(since_id: int = 0, entity: Optional[str] = None, row_id: Optional[int] = None,
+               limit: int = EVENT_PAGE) -> List[Dict[str, Any]]:
+    """
+    Audit events after since_id, oldest first, optionally of one record
+    (public.events, migrations/supabase/0010_events.sql). PostgREST caps a
+    response at PAGE_SIZE rows, so larger limits are read in pages.
+    """
+    supabase = init_connection()
+    rows: List[Dict[str, Any]] = []
+    while len(rows) < limit:
+        size = min(PAGE_SIZE, limit - len(rows))
+        query = supabase.table("events").select("id, entity, row_id, kind, at, data")\
+            .gt("id", rows[-1]["id"] if rows else since_id)
+        if entity is not None:
+            query = query.eq("entity", ENTITIES[entity]).eq("row_id", row_id)
+        batch = query.order("id").limit(size).execute().data
+        rows.extend(batch)
+        if len(batch) < size:
+            break
+    return [decode_event(row) for row in rows]
+
+def save_kpi_snapshot(data: Dict[str, Any]) -> int:
+    """
+    Store a KPIs page snapshot (public.kpi_snapshots,
+    migrations/supabase/0012_kpi_snapshots.sql), keeping the latest
+    SNAPSHOTS_KEPT; returns its id
+    """
+    supabase = init_connection()
+    snapshot_id = supabase.table("kpi_snapshots").insert({"data": data}).execute().data[0]["id"]
+    supabase.table("kpi_snapshots").delete().lte("id", snapshot_id - SNAPSHOTS_KEPT).execute()
+    return snapshot_id
+
+def get_kpi_snapshot() -> Optional[Dict[str, Any]]:
+    """Latest KPIs page snapshot: id, created_at and data, or None if none was saved"""
+    supabase = init_connection()
+    rows = supabase.table("kpi_snapshots").select("id, created_at, data")\
+        .order("id", desc=True).limit(1).execute().data
+    return rows[0] if rows else None
+
 def generate_venta_id() -> str:
-    """Generate next sequential sale ID (LUX-YYYY-XXX)"""
+    """
+    Generate next sequential sale ID (LUX-YYYY-XXX). While writes go through
+    the offline queue this is PENDING_VENTA_ID: the queue assigns the real ID
+    when it inserts the sale.
+    """
+    if active_write_queue() is not None:
+        return PENDING_VENTA_ID
+    return next_venta_ids(1)[0]
+
+def next_venta_ids(count: int) -> List[str]:
+    """The next count sequential sale IDs (LUX-YYYY-XXX) after this year's highest one"""
     supabase = init_connection()
     current_year = datetime.now().year
     prefix = f"LUX-{current_year}-"
     
-    # Get last sale ID for this year
-    response = supabase.table("ventas")\
-        .select("venta_id")\
-        .ilike("venta_id", f"{prefix}%")\
-        .order("venta_id", desc=True)\
-        .limit(1)\
-        .execute()
-        
-    if response.data:
-        last_id = response.data[0]['venta_id']
-        try:
-            last_num = int(last_id.split('-')[-1])
-            next_num = last_num + 1
-        except ValueError:
-            next_num = 1
-    else:
-        next_num = 1
+    # Highest number of this year's IDs, compared as numbers since LUX-2026-1000 <
+    # LUX-2026-999 as text (PostgREST can only order by the text). A range on the
+    # UNIQUE index instead of ilike, read in pages like get_businesses
+    last_num, offset = 0, 0
+    while True:
+        batch = supabase.table("ventas").select("venta_id")\
+            .gte("venta_id", prefix).lt("venta_id", f"LUX-{current_year}.")\
+            .order("id").range(offset, offset + PAGE_SIZE - 1).execute().data
+        numbers = [int(row['venta_id'][len(prefix):]) for row in batch
+                   if row['venta_id'][len(prefix):].isdigit()]
+        last_num = max(numbers + [last_num])
+        if len(batch) < PAGE_SIZE:
+            break
+        offset += PAGE_SIZE
+    next_num = last_num + 1
         
-    return f"{prefix}{next_num:03d}"
+    return [f"{prefix}{next_num + i:03d}" for i in range(count)]
+
+def search(text: str, limit: int = 20) -> List[Dict[str, Any]]:
+    """
+    Full-text search over businesses, visit notes and opportunities, best
+    matches first (search_records in migrations/supabase/0003_search.sql).
+    Same hit shape as database.search.
+    """
+    replica = active_replica()
+    if replica is not None:
+        return replica.search(text, limit)
+
+    if not search_terms(text):
+        return []
+    supabase = init_connection()
+    response = supabase.rpc("search_records", {"q": text, "max_results": limit}).execute()
+    return response.data or []
 
 def get_week_number(date_obj: date) -> str:
     """Get ISO week number formatted as W##"""
     return f"W{date_obj.isocalendar()[1]:02d}"
 
-# This initialization function is kept for compatibility but does nothing with Supabase directly
-# Tables must be set up manually or via SQL migration script
+# PostgREST can't run DDL: the schema is migrated with `python app/migrations.py --supabase --apply`
 def init_database():
-    pass
+    """Log the Supabase migrations this project is missing (one version read per process)"""
+    check_supabase(init_connection())
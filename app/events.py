@@ -0,0 +1,347 @@
+"""
+Audit event log for Lux Sales Dashboard
+
+Every write to businesses, visitas, oportunidades and ventas appends one row
+to an append-only ``events`` table (SQLite triggers from migrations.py,
+Postgres triggers from migrations/supabase/0010_events.sql, the memory engine
+in Python). Rows are compact: entity and kind are small integer codes and
+``data`` holds the full row (without nulls) for created/deleted and only the
+changed fields for updates. Rows that existed before the log was added have
+one seed "created" event.
+
+Kinds: created, updated, reassigned (asignado_a changed), converted and lost
+(estado changed to Convertida / Perdida), deleted.
+
+History comes straight from the log (``opportunity_timeline``). Current rows,
+KPI rollups and daily series are projections: ``Projector.catch_up(db)`` reads only the
+events after the last one it applied and updates each projection in O(1)
+per event, so a refresh costs O(new events) instead of a full read.
+
+Pure Python, no Streamlit; the engines only store and return the rows.
+"""
+
+import json
+import threading
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+ENTITIES = {"businesses": 1, "visitas": 2, "oportunidades": 3, "ventas": 4}
+KINDS = {"created": 1, "updated": 2, "reassigned": 3, "converted": 4, "lost": 5, "deleted": 6}
+ENTITY_NAMES = {code: name for name, code in ENTITIES.items()}
+KIND_NAMES = {code: name for name, code in KINDS.items()}
+
+# Events per get_events call (Projector.catch_up pages until a short page)
+EVENT_PAGE = 5000
+
+# Columns kept out of event data (the event has its own row_id and timestamp)
+SKIP_COLUMNS = {"id", "created_at", "updated_at"}
+
+Row = Dict[str, Any]
+
+
+@dataclass
+class Event:
+    id: int
+    entity: str
+    row_id: int
+    kind: str
+    at: str
+    data: Row
+
+
+def decode_event(row: Row) -> Row:
+    """Stored event row (integer codes, JSON text or dict data) -> getter row with names"""
+    data = row["data"]
+    return {
+        "id": row["id"],
+        "entity": ENTITY_NAMES[row["entity"]],
+        "row_id": row["row_id"],
+        "kind": KIND_NAMES[row["kind"]],
+        "at": str(row["at"]),
+        "data": json.loads(data) if isinstance(data, str) else (data or {}),
+    }
+
+
+def update_kind(entity: str, changes: Row) -> str:
+    """Kind of an update event from its changed fields (mirrors the triggers' CASE)"""
+    if entity == "oportunidades":
+        if changes.get("estado") == "Convertida":
+            return "converted"
+        if changes.get("estado") == "Perdida":
+            return "lost"
+        if "asignado_a" in changes:
+            return "reassigned"
+    return "updated"
+
+
+def row_data(row: Row) -> Row:
+    """Event data of a created/deleted row: its fields without nulls"""
+    return {k: v for k, v in row.items() if k not in SKIP_COLUMNS and v is not None}
+
+
+def diff(before: Row, after: Row) -> Row:
+    """Event data of an update: the fields whose value changed"""
+    return {k: v for k, v in after.items() if k not in SKIP_COLUMNS and before.get(k) != v}
+
+
+# --- History ---
+
+def current_row(db, entity: str, row_id: int) -> Optional[Row]:
+    """One record as of its latest event (None if deleted or never logged), from one indexed read"""
+    row: Optional[Row] = None
+    for event in db.get_events(entity=entity, row_id=row_id):
+        row = None if event["kind"] == "deleted" else {**(row or {}), **event["data"], "id": row_id}
+    return row
+
+
+def opportunity_timeline(events: Iterable[Row]) -> List[Row]:
+    """
+    Readable history of one opportunity from its events (oldest first):
+    at, kind, and what changed, with the previous asignado_a on reassignments
+    and the motivo_perdida on losses.
+    """
+    state: Row = {}
+    timeline = []
+    for event in events:
+        data = event["data"]
+        entry = {"at": event["at"], "kind": event["kind"], "cambios": data}
+        if event["kind"] == "reassigned":
+            entry["de"], entry["a"] = state.get("asignado_a"), data.get("asignado_a")
+        elif event["kind"] == "lost":
+            entry["motivo"] = data.get("motivo_perdida", state.get("motivo_perdida"))
+        elif event["kind"] == "created":
+            entry["a"] = data.get("asignado_a")
+        timeline.append(entry)
+        state = {} if event["kind"] == "deleted" else {**state, **data}
+    return timeline
+
+
+# --- Projections ---
+
+class Projection(ABC):
+    """Derived view updated one event at a time, given the row before and after it"""
+
+    @abstractmethod
+    def apply(self, event: Event, before: Optional[Row], after: Optional[Row]) -> None: ...
+
+
+class KpiRollup(Projection):
+    """
+    Weekly and per-rep totals: each row contributes to a few (group, metric)
+    cells, and an event subtracts the row's old contribution and adds its new
+    one, so updates, reassignments and deletes stay O(1).
+    """
+
+    # entity -> date field whose ISO week the row counts in
+    DATE_FIELDS = {"visitas": "fecha", "oportunidades": "fecha_contacto", "ventas": "fecha_cierre"}
+
+    def __init__(self):
+        self.by_week: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(int))
+        self.by_rep: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(int))
+
+    @classmethod
+    def _week(cls, entity: str, row: Row) -> str:
+        """ISO "YYYY-Www" of the row's date; its semana label only when it has no date"""
+        try:
+            year, week, _ = date.fromisoformat(str(row.get(cls.DATE_FIELDS[entity]) or "")[:10]).isocalendar()
+        except ValueError:
+            return row.get("semana") or "?"
+        return f"{year}-W{week:02d}"
+
+    @classmethod
+    def _cells(cls, entity: str, row: Optional[Row]) -> List[Tuple[str, str, str, float]]:
+        if row is None or entity not in cls.DATE_FIELDS:
+            return []
+        semana = cls._week(entity, row)
+        if entity == "visitas":
+            return [("week", semana, "visitas", 1)]
+        if entity == "oportunidades":
+            estado = row.get("estado") or "Activa"
+            rep = row.get("asignado_a") or "Sin asignar"
+            metric = {"Convertida": "convertidas", "Perdida": "perdidas"}.get(estado, "activas")
+            return [("week", semana, "oportunidades", 1), ("week", semana, metric, 1),
+                    ("rep", rep, "oportunidades", 1), ("rep", rep, metric, 1)]
+        if entity == "ventas":
+            return [("week", semana, "ventas", 1),
+                    ("week", semana, "monto_soles", float(row.get("monto_soles") or 0)),
+                    ("week", semana, "m2", float(row.get("m2_real") or 0))]
+        return []
+
+    def apply(self, event: Event, before: Optional[Row], after: Optional[Row]) -> None:
+        for sign, row in ((-1, before), (1, after)):
+            for group, key, metric, value in self._cells(event.entity, row):
+                (self.by_week if group == "week" else self.by_rep)[key][metric] += sign * value
+
+    def weeks(self) -> List[Row]:
+        """One row per ISO week (oldest first, undated semana labels before them) with the rolled-up metrics"""
+        weeks = sorted(self.by_week.items(), key=lambda item: (item[0][:1].isdigit(), item[0]))
+        return [{"semana": semana, **{k: v for k, v in cells.items() if v}}
+                for semana, cells in weeks if any(cells.values())]
+
+    def reps(self) -> List[Row]:
+        """One row per asignado_a with its opportunities by estado"""
+        return [{"asignado_a": rep, **{k: v for k, v in cells.items() if v}}
+                for rep, cells in sorted(self.by_rep.items()) if any(cells.values())]
+
+
+class DailySeries(Projection):
+    """
+    Per-day totals by rep and business type (series.py buckets them). Each
+    row's contribution is remembered, so an event swaps it in O(1) whatever
+    changed. Sales are credited to their opportunity's rep and counted again
+    when it is reassigned; the rows of a business whose tipo_negocio changes
+    are counted again too (one pass, edits of a business are rare). Visits
+    have no rep ("Sin asignar").
+    """
+
+    # entity -> (metric, date field, summed field or None to count)
+    METRICS = {
+        "visitas": [("visitas", "fecha", None)],
+        "oportunidades": [("oportunidades", "fecha_contacto", None)],
+        "ventas": [("ventas", "fecha_cierre", None), ("ingresos", "fecha_cierre", "monto_soles"),
+                   ("m2", "fecha_cierre", "m2_real")],
+    }
+
+    def __init__(self, rows: Dict[str, Dict[int, Row]]):
+        # The projector's current rows, for business types and sale reps
+        self.rows = rows
+        self.cells: Dict[Tuple[str, str, str, str], float] = defaultdict(float)
+        self._contributions: Dict[Tuple[str, int], List[Tuple[Tuple[str, str, str, str], float]]] = {}
+        # oportunidad_id -> ids of its sales
+        self._sales: Dict[int, Set[int]] = defaultdict(set)
+
+    def _cells(self, entity: str, row: Row) -> List[Tuple[Tuple[str, str, str, str], float]]:
+        tipo = (self.rows["businesses"].get(row.get("business_id")) or {}).get("tipo_negocio") or "Sin dato"
+        owner = self.rows["oportunidades"].get(row.get("oportunidad_id")) or {} if entity == "ventas" else row
+        rep = owner.get("asignado_a") or "Sin asignar"
+        cells = []
+        for metric, date_field, value_field in self.METRICS[entity]:
+            day = str(row.get(date_field) or "")[:10]
+            if day:
+                cells.append(((metric, day, rep, tipo), float(row.get(value_field) or 0) if value_field else 1.0))
+        return cells
+
+    def _count(self, entity: str, row_id: int, row: Optional[Row]) -> None:
+        for key, value in self._contributions.pop((entity, row_id), ()):
+            self.cells[key] -= value
+            if abs(self.cells[key]) < 1e-9:
+                del self.cells[key]
+        if row is not None:
+            contribution = self._cells(entity, row)
+            for key, value in contribution:
+                self.cells[key] += value
+            self._contributions[(entity, row_id)] = contribution
+
+    def apply(self, event: Event, before: Optional[Row], after: Optional[Row]) -> None:
+        if event.entity in self.METRICS:
+            self._count(event.entity, event.row_id, after)
+        if event.entity == "ventas":
+            if before and before.get("oportunidad_id"):
+                self._sales[before["oportunidad_id"]].discard(event.row_id)
+            if after and after.get("oportunidad_id"):
+                self._sales[after["oportunidad_id"]].add(event.row_id)
+        elif event.entity == "oportunidades" and (before or {}).get("asignado_a") != (after or {}).get("asignado_a"):
+            for sale_id in self._sales.get(event.row_id, ()):
+                self._count("ventas", sale_id, self.rows["ventas"].get(sale_id))
+        elif event.entity == "businesses" and before and after \
+                and before.get("tipo_negocio") != after.get("tipo_negocio"):
+            # Rare (an edited business): one pass over the rows to find its records
+            for entity in self.METRICS:
+                for row_id, row in self.rows[entity].items():
+                    if row.get("business_id") == event.row_id:
+                        self._count(entity, row_id, row)
+
+
+class Projector:
+    """
+    Current rows of every entity, folded from the events, feeding the
+    projections. catch_up() applies only the events after last_id.
+    """
+
+    def __init__(self, projections: Iterable[Projection] = ()):
+        self.projections = list(projections)
+        self.rows: Dict[str, Dict[int, Row]] = {name: {} for name in ENTITIES}
+        self.last_id = 0
+
+    def apply(self, event: Event) -> None:
+        rows = self.rows[event.entity]
+        before = rows.get(event.row_id)
+        if event.kind == "deleted":
+            after = None
+            rows.pop(event.row_id, None)
+        else:
+            # Updates carry only the changed fields
+            after = {**(before or {}), **event.data, "id": event.row_id}
+            rows[event.row_id] = after
+        for projection in self.projections:
+            projection.apply(event, before, after)
+        self.last_id = max(self.last_id, event.id)
+
+    def catch_up(self, db) -> int:
+        """Apply the events written since the last call; returns how many"""
+        applied = 0
+        while True:
+            batch = db.get_events(since_id=self.last_id)
+            for row in batch:
+                self.apply(Event(**row))
+            applied += len(batch)
+            if not batch or len(batch) < EVENT_PAGE:
+                return applied
+
+
+# Process-wide rollups per engine (and database file), caught up on each read
+_projectors: Dict[Tuple[str, str], Projector] = {}
+_lock = threading.Lock()
+
+
+def _projector(db) -> Projector:
+    """The process projector of an engine (call with _lock held), caught up"""
+    key = (db.__name__, str(getattr(db, "DB_PATH", "")))
+    projector = _projectors.get(key)
+    if projector is None:
+        projector = _projectors[key] = Projector([KpiRollup()])
+        projector.projections.append(DailySeries(projector.rows))
+    projector.catch_up(db)
+    return projector
+
+
+def kpi_rollups(db) -> Dict[str, List[Row]]:
+    """
+    Weekly and per-rep rollups of an engine (KpiRollup), after applying the
+    events written since the previous call in this process.
+
+    Returns:
+        dict with semanas (KpiRollup.weeks) and asignados (KpiRollup.reps)
+    """
+    with _lock:
+        rollup = _projector(db).projections[0]
+        return {"semanas": rollup.weeks(), "asignados": rollup.reps()}
+
+
+def current_rows(db, entity: str) -> Tuple[List[Row], int]:
+    """
+    Every current row of an entity (all estados), folded from the event log,
+    and the id of the last event applied (later events are not reflected)
+    """
+    with _lock:
+        projector = _projector(db)
+        return [dict(row) for row in projector.rows[entity].values()], projector.last_id
+
+
+def last_event_id(db) -> int:
+    """Id of the last event in the log (the engine's data version), without copying rows"""
+    with _lock:
+        return _projector(db).last_id
+
+
+def daily_cells(db) -> Tuple[Dict[Tuple[str, str, str, str], float], int]:
+    """
+    DailySeries totals of an engine, (metric, day, rep, tipo_negocio) ->
+    value, and the id of the last event applied
+    """
+    with _lock:
+        projector = _projector(db)
+        return dict(projector.projections[1].cells), projector.last_id
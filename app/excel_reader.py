@@ -1,8 +1,15 @@
 """
 Excel Reader for Cost/Expense Data
 Reads accountant's Excel file from Google Drive
+
+Parsed sheets are cached per process: the Drive file by path, modification
+time and size (saving the workbook invalidates it), an upload by a hash of
+its bytes. Every reader returns its own copy of the cached DataFrame.
 """
 
+import hashlib
+import io
+import threading
 import pandas as pd
 from pathlib import Path
 from datetime import datetime
@@ -15,6 +22,54 @@ EXCEL_PATH = r"G:\My Drive\NewLux\KPIs_Accounting\Gastos_Semanal_Template_V2.xls
 # Check if we're in cloud environment
 IS_CLOUD = not os.path.exists(EXCEL_PATH)
 
+REQUIRED_COLUMNS = ['Fecha', 'Semana', 'Tipo_Gasto', 'Categoría', 'Tipo_Negocio',
+                    'Descripción', 'Monto_Soles', 'Venta_ID']
+
+# Parsed workbooks kept (a new save or upload adds one, the oldest is dropped)
+CACHE_ENTRIES = 4
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _clean_gastos(df):
+    """Template check and row cleanup shared by both readers"""
+    # Check if required columns exist
+    if not all(col in df.columns for col in REQUIRED_COLUMNS):
+        print(f"Warning: Excel file missing required columns")
+        return pd.DataFrame()
+
+    # Filter out empty rows (where Fecha is null)
+    df = df[df['Fecha'].notna()].copy()
+
+    # Convert Fecha to datetime if it's not already
+    if not df.empty:
+        df['Fecha'] = pd.to_datetime(df['Fecha'], errors='coerce')
+        # Remove rows where date conversion failed
+        df = df[df['Fecha'].notna()]
+
+    return df
+
+
+def _parse_gastos(source, key):
+    """The cleaned "Gastos" sheet of source, parsed once per key"""
+    with _cache_lock:
+        df = _cache.get(key)
+    if df is None:
+        df = _clean_gastos(pd.read_excel(source, sheet_name="Gastos"))
+        with _cache_lock:
+            while len(_cache) >= CACHE_ENTRIES:
+                _cache.pop(next(iter(_cache)))
+            _cache[key] = df
+    return df.copy()
+
+
+def clear_cache():
+    """Forget the parsed workbooks"""
+    with _cache_lock:
+        _cache.clear()
+
+
 def read_gastos_from_uploaded_file(uploaded_file):
     """
     Read expense data from uploaded Excel file (Streamlit UploadedFile object)
@@ -26,27 +81,10 @@ def read_gastos_from_uploaded_file(uploaded_file):
         pandas.DataFrame with expense data
     """
     try:
-        # Read directly from uploaded file
-        df = pd.read_excel(uploaded_file, sheet_name="Gastos")
-        
-        # Check if required columns exist
-        required_cols = ['Fecha', 'Semana', 'Tipo_Gasto', 'Categoría', 'Tipo_Negocio', 
-                        'Descripción', 'Monto_Soles', 'Venta_ID']
-        
-        if not all(col in df.columns for col in required_cols):
-            print(f"Warning: Excel file missing required columns")
-            return pd.DataFrame()
-        
-        # Filter out empty rows (where Fecha is null)
-        df = df[df['Fecha'].notna()].copy()
-        
-        # Convert Fecha to datetime if it's not already
-        if not df.empty:
-            df['Fecha'] = pd.to_datetime(df['Fecha'], errors='coerce')
-            # Remove rows where date conversion failed
-            df = df[df['Fecha'].notna()]
-        
-        return df
+        # Same bytes on every rerun: parsed once, keyed by their hash
+        content = uploaded_file.getvalue() if hasattr(uploaded_file, "getvalue") else uploaded_file.read()
+        key = ("upload", hashlib.sha1(content).hexdigest())
+        return _parse_gastos(io.BytesIO(content), key)
         
     except Exception as e:
         print(f"Error reading uploaded Excel: {str(e)}")
@@ -67,27 +105,9 @@ def read_gastos_excel(file_path=EXCEL_PATH):
         if IS_CLOUD or not Path(file_path).exists():
             return pd.DataFrame()
         
-        # Read the "Gastos" sheet
-        df = pd.read_excel(file_path, sheet_name="Gastos")
-        
-        # Check if required columns exist
-        required_cols = ['Fecha', 'Semana', 'Tipo_Gasto', 'Categoría', 'Tipo_Negocio', 
-                        'Descripción', 'Monto_Soles', 'Venta_ID']
-        
-        if not all(col in df.columns for col in required_cols):
-            print(f"Warning: Excel file missing required columns")
-            return pd.DataFrame()
-        
-        # Filter out empty rows (where Fecha is null)
-        df = df[df['Fecha'].notna()].copy()
-        
-        # Convert Fecha to datetime if it's not already
-        if not df.empty:
-            df['Fecha'] = pd.to_datetime(df['Fecha'], errors='coerce')
-            # Remove rows where date conversion failed
-            df = df[df['Fecha'].notna()]
-        
-        return df
+        # Read the "Gastos" sheet, again only once the file changed
+        stat = Path(file_path).stat()
+        return _parse_gastos(file_path, (str(file_path), stat.st_mtime_ns, stat.st_size))
         
     except FileNotFoundError:
         return pd.DataFrame()
@@ -157,9 +177,9 @@ def get_gastos_by_venta_id(venta_id, file_path=EXCEL_PATH):
     return df[df['Venta_ID'] == venta_id]
 
 
-def get_costos_summary(file_path=EXCEL_PATH):
+def costos_summary(df):
     """
-    Get summary statistics of costs
+    Summary statistics of an expense DataFrame (the whole sheet or a slice)
     
     Returns:
         dict with:
@@ -169,8 +189,6 @@ def get_costos_summary(file_path=EXCEL_PATH):
         - by_tipo_gasto: Breakdown by type
         - by_tipo_negocio: Breakdown by business type
     """
-    df = read_gastos_excel(file_path)
-    
     if df.empty:
         return {
             'total_gastos': 0,
@@ -191,6 +209,13 @@ def get_costos_summary(file_path=EXCEL_PATH):
     return summary
 
 
+def get_costos_summary(file_path=EXCEL_PATH):
+    """
+    Get summary statistics of costs (costos_summary of the whole sheet)
+    """
+    return costos_summary(read_gastos_excel(file_path))
+
+
 if __name__ == "__main__":
     # Test the reader
     print("Testing Excel Reader...")
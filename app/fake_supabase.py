@@ -0,0 +1,298 @@
+"""
+In-memory stand-in for the Supabase client
+
+Implements the subset of the supabase-py / postgrest query builder used by the
+app (table().select/insert/update/upsert/delete with eq, ilike, gte, lte,
+in_, order, limit, range, single and one level of embedded resources, plus
+rpc with registered Python functions), so the replica, the write queue and
+the load tests can run without a network or a Supabase project.
+
+    client = FakeSupabase()
+    client.table("businesses").insert({"nombre": "A", ...}).execute()
+"""
+
+import copy
+import re
+import threading
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+# Embedded resource name -> foreign key column on the parent row
+FOREIGN_KEYS = {
+    "businesses": "business_id",
+    "visitas": "visita_id",
+    "oportunidades": "oportunidad_id",
+}
+
+# Column defaults applied on insert, like the SQL schema
+DEFAULTS = {
+    "oportunidades": {"estado": "Activa"},
+    "ventas": {"estado": "Cerrada"},
+}
+
+# Parent table -> (child table, foreign key column) unlinked on delete (ON DELETE SET NULL)
+ON_DELETE_SET_NULL = {
+    "visitas": [("oportunidades", "visita_id")],
+    "oportunidades": [("ventas", "oportunidad_id")],
+}
+
+# Unique constraints per table
+UNIQUE = {
+    "businesses": [("nombre", "direccion")],
+    "ventas": [("venta_id",)],
+}
+
+
+class FakeAPIError(Exception):
+    """Raised where PostgREST would return an error (e.g. unique violation)"""
+
+
+class FakeResponse:
+    def __init__(self, data: Any, count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _comparable(value: Any) -> Any:
+    """Numbers compare as numbers (ids: 9 < 10), everything else as text (ISO dates sort right)"""
+    return value if isinstance(value, (int, float)) and not isinstance(value, bool) else str(value)
+
+
+def _like(pattern: str, value: Any, case_insensitive: bool) -> bool:
+    if value is None:
+        return False
+    regex = "^" + ".*".join(re.escape(part) for part in pattern.split("%")) + "$"
+    return re.match(regex, str(value), re.IGNORECASE if case_insensitive else 0) is not None
+
+
+class _Query:
+    def __init__(self, client: "FakeSupabase", table: str):
+        self._client = client
+        self._table = table
+        self._op = "select"
+        self._columns = "*"
+        self._payload: Any = None
+        self._on_conflict: Optional[str] = None
+        self._filters: List[Callable[[Dict[str, Any]], bool]] = []
+        self._order: List[tuple] = []
+        self._limit: Optional[int] = None
+        self._offset = 0
+        self._single = False
+        self._count = None
+
+    # --- operations ---
+    def select(self, columns: str = "*", count: Optional[str] = None) -> "_Query":
+        self._op, self._columns, self._count = "select", columns, count
+        return self
+
+    def insert(self, payload) -> "_Query":
+        self._op, self._payload = "insert", payload
+        return self
+
+    def upsert(self, payload, on_conflict: Optional[str] = None) -> "_Query":
+        self._op, self._payload, self._on_conflict = "upsert", payload, on_conflict
+        return self
+
+    def update(self, payload: Dict[str, Any]) -> "_Query":
+        self._op, self._payload = "update", payload
+        return self
+
+    def delete(self) -> "_Query":
+        self._op = "delete"
+        return self
+
+    # --- filters ---
+    def eq(self, column, value):
+        self._filters.append(lambda r: r.get(column) == value)
+        return self
+
+    def neq(self, column, value):
+        self._filters.append(lambda r: r.get(column) != value)
+        return self
+
+    def gt(self, column, value):
+        self._filters.append(lambda r: r.get(column) is not None and _comparable(r[column]) > _comparable(value))
+        return self
+
+    def gte(self, column, value):
+        self._filters.append(lambda r: r.get(column) is not None and _comparable(r[column]) >= _comparable(value))
+        return self
+
+    def lt(self, column, value):
+        self._filters.append(lambda r: r.get(column) is not None and _comparable(r[column]) < _comparable(value))
+        return self
+
+    def lte(self, column, value):
+        self._filters.append(lambda r: r.get(column) is not None and _comparable(r[column]) <= _comparable(value))
+        return self
+
+    def like(self, column, pattern):
+        self._filters.append(lambda r: _like(pattern, r.get(column), False))
+        return self
+
+    def ilike(self, column, pattern):
+        self._filters.append(lambda r: _like(pattern, r.get(column), True))
+        return self
+
+    def in_(self, column, values):
+        values = set(values)
+        self._filters.append(lambda r: r.get(column) in values)
+        return self
+
+    def is_(self, column, value):
+        expected = None if value in (None, "null") else value
+        self._filters.append(lambda r: r.get(column) is expected or r.get(column) == expected)
+        return self
+
+    # --- modifiers ---
+    def order(self, column, desc: bool = False):
+        self._order.append((column, desc))
+        return self
+
+    def limit(self, n: int):
+        self._limit = n
+        return self
+
+    def range(self, start: int, end: int):
+        self._offset, self._limit = start, end - start + 1
+        return self
+
+    def single(self):
+        self._single = True
+        return self
+
+    def execute(self) -> FakeResponse:
+        with self._client._lock:
+            return getattr(self, f"_run_{self._op}")()
+
+    # --- execution ---
+    def _rows(self) -> List[Dict[str, Any]]:
+        return self._client._tables.setdefault(self._table, [])
+
+    def _matching(self) -> List[Dict[str, Any]]:
+        return [r for r in self._rows() if all(f(r) for f in self._filters)]
+
+    def _project(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        out: Dict[str, Any] = {}
+        # Split on commas outside parentheses
+        for part in re.findall(r"[^,(]+(?:\([^)]*\))?", self._columns):
+            part = part.strip()
+            if not part:
+                continue
+            embedded = re.match(r"(\w+)\((.*)\)", part)
+            if embedded:
+                name, cols = embedded.group(1), [c.strip() for c in embedded.group(2).split(",")]
+                ref = next((r for r in self._client._tables.get(name, [])
+                            if r["id"] == row.get(FOREIGN_KEYS[name])), None)
+                out[name] = None if ref is None else (
+                    dict(ref) if cols == ["*"] else {c: ref.get(c) for c in cols})
+            elif part == "*":
+                out.update(row)
+            else:
+                out[part] = row.get(part)
+        return out
+
+    def _run_select(self) -> FakeResponse:
+        rows = self._matching()
+        for column, desc in reversed(self._order):
+            rows.sort(key=lambda r: (r.get(column) is None, _comparable(r.get(column))), reverse=desc)
+        count = len(rows) if self._count else None
+        if self._limit is not None:
+            rows = rows[self._offset:self._offset + self._limit]
+        data = [copy.deepcopy(self._project(r)) for r in rows]
+        if self._single:
+            if len(data) != 1:
+                raise FakeAPIError(f"single() expected 1 row, got {len(data)}")
+            data = data[0]
+        return FakeResponse(data, count)
+
+    def _conflict(self, row: Dict[str, Any], keys: tuple) -> Optional[Dict[str, Any]]:
+        return next((r for r in self._rows() if all(r.get(k) == row.get(k) for k in keys)), None)
+
+    def _insert_row(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        for keys in UNIQUE.get(self._table, []):
+            if self._conflict(row, keys):
+                raise FakeAPIError(f"duplicate key value violates unique constraint on {self._table}{keys}")
+        now = _now()
+        new = {**DEFAULTS.get(self._table, {}), "created_at": now, "updated_at": now, **row}
+        new["id"] = self._client._next_id(self._table)
+        self._rows().append(new)
+        return new
+
+    def _run_insert(self) -> FakeResponse:
+        payload = self._payload if isinstance(self._payload, list) else [self._payload]
+        return FakeResponse([copy.deepcopy(self._insert_row(dict(r))) for r in payload])
+
+    def _run_upsert(self) -> FakeResponse:
+        payload = self._payload if isinstance(self._payload, list) else [self._payload]
+        keys = tuple(k.strip() for k in self._on_conflict.split(",")) if self._on_conflict else ("id",)
+        out = []
+        for row in payload:
+            existing = self._conflict(row, keys)
+            if existing:
+                existing.update({k: v for k, v in row.items() if k != "id"}, updated_at=_now())
+                out.append(copy.deepcopy(existing))
+            else:
+                out.append(copy.deepcopy(self._insert_row(dict(row))))
+        return FakeResponse(out)
+
+    def _run_update(self) -> FakeResponse:
+        values = {k: (_now() if v == "now()" else v) for k, v in self._payload.items()}
+        # Like the updated_at trigger (migrations/supabase/0013_updated_at.sql)
+        values.setdefault("updated_at", _now())
+        rows = self._matching()
+        for row in rows:
+            row.update(values)
+        return FakeResponse(copy.deepcopy(rows))
+
+    def _run_delete(self) -> FakeResponse:
+        rows = self._matching()
+        ids = {id(r) for r in rows}
+        deleted = {r["id"] for r in rows}
+        for child, column in ON_DELETE_SET_NULL.get(self._table, []):
+            for row in self._client._tables.get(child, []):
+                if row.get(column) in deleted:
+                    row.update({column: None, "updated_at": _now()})
+        self._client._tables[self._table] = [r for r in self._rows() if id(r) not in ids]
+        return FakeResponse(copy.deepcopy(rows))
+
+
+class _RPC:
+    def __init__(self, fn: Callable[..., Any], params: Dict[str, Any]):
+        self._fn, self._params = fn, params
+
+    def execute(self) -> FakeResponse:
+        return FakeResponse(self._fn(**self._params))
+
+
+class FakeSupabase:
+    """Thread-safe in-memory Supabase client"""
+
+    def __init__(self, tables: Optional[Dict[str, List[Dict[str, Any]]]] = None):
+        self._lock = threading.RLock()
+        self._tables: Dict[str, List[Dict[str, Any]]] = copy.deepcopy(tables) if tables else {}
+        self._ids = {name: max((r["id"] for r in rows), default=0) for name, rows in self._tables.items()}
+        self._functions: Dict[str, Callable[..., Any]] = {}
+        self.requests = 0
+
+    def _next_id(self, table: str) -> int:
+        self._ids[table] = self._ids.get(table, 0) + 1
+        return self._ids[table]
+
+    def table(self, name: str) -> _Query:
+        self.requests += 1
+        return _Query(self, name)
+
+    def register_rpc(self, name: str, fn: Callable[..., Any]) -> None:
+        """Make client.rpc(name, params) call fn(**params)"""
+        self._functions[name] = fn
+
+    def rpc(self, name: str, params: Optional[Dict[str, Any]] = None) -> _RPC:
+        self.requests += 1
+        if name not in self._functions:
+            raise FakeAPIError(f"function {name} does not exist")
+        return _RPC(self._functions[name], params or {})
@@ -0,0 +1,228 @@
+"""
+Follow-up scheduler for Lux Sales Dashboard
+
+Opportunities carry a structured due date for their next action
+(``fecha_siguiente_accion``). The scheduler keeps the pending due dates in a
+heap ordered by reminder time and a single background thread sleeps until
+the earliest one, then sends the assigned rep a WhatsApp reminder
+(notifier.notify_followup_due). Nothing polls the oportunidades table:
+
+- ``load()`` reads the active pipeline once at start;
+- the engines call ``schedule_followup()`` when a write sets or changes a
+  due date, which pushes a new heap entry and wakes the thread;
+- a heap entry whose due date was changed since is skipped when it comes up
+  (lazy deletion), and right before sending, the opportunity is read back
+  from the audit log (events.current_row) so lost, converted, deleted or
+  rescheduled-elsewhere opportunities get no reminder.
+
+Reminders go out at ``hour`` (default 9:00) on the due date, in ``timezone``
+(default America/Lima). Due dates already past when the scheduler starts are
+not reminded (they show up as overdue in kpis.aging_report), so restarting
+the app never repeats a reminder.
+
+Enable it in secrets.toml:
+
+    [followups]
+    enabled = true
+    hour = 9
+    timezone = "America/Lima"
+"""
+
+import heapq
+import logging
+import threading
+import time
+from datetime import date, datetime, time as dtime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from events import current_row
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:
+    ZoneInfo = None
+
+try:
+    from notifier import notify_followup_due
+except ImportError:
+    # Graceful fallback if notifier is unavailable
+    def notify_followup_due(*args, **kwargs): return False
+
+logger = logging.getLogger(__name__)
+
+REMINDER_HOUR = 9
+TIMEZONE = "America/Lima"
+
+# Longest single sleep; the heap is re-checked after it (clock changes, suspend)
+MAX_WAIT = 3600.0
+
+_scheduler: Optional["FollowUpScheduler"] = None
+
+
+def _day(value: Any) -> Optional[str]:
+    """Due date as YYYY-MM-DD (dates, ISO strings or timestamps), None when unset"""
+    return str(value)[:10] if value not in (None, "") else None
+
+
+def _zone(name: Optional[str]):
+    """tzinfo for name, or None (server local time) if unknown"""
+    if not name or ZoneInfo is None:
+        return None
+    try:
+        return ZoneInfo(name)
+    except Exception:
+        logger.warning(f"Unknown timezone '{name}', follow-up reminders use server time")
+        return None
+
+
+class FollowUpScheduler:
+    """Heap of pending follow-up reminders and the thread that sends them"""
+
+    def __init__(self, db, hour: int = REMINDER_HOUR, timezone: Optional[str] = TIMEZONE,
+                 clock: Callable[[], float] = time.time):
+        """
+        Args:
+            db: Repository the opportunities are read back from before reminding
+            hour: Hour of the day reminders are sent on the due date
+            timezone: IANA zone of that hour (None: server local time)
+            clock: Current time as a Unix timestamp
+        """
+        self.db = db
+        self.hour = hour
+        self.tz = _zone(timezone)
+        self.clock = clock
+        self.sent = 0
+        self._heap: List[Tuple[float, int, str]] = []
+        # opp_id -> due date of its live heap entry; older entries are stale
+        self._due: Dict[int, str] = {}
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def fire_time(self, due: str) -> float:
+        """Unix time of the reminder for a due date"""
+        return datetime.combine(date.fromisoformat(due), dtime(self.hour), tzinfo=self.tz).timestamp()
+
+    # --- scheduling ---
+
+    def schedule(self, opp_id: int, due: Any) -> bool:
+        """
+        Set (or clear, with due None) the reminder of an opportunity.
+        Returns False if its reminder time has already passed.
+        """
+        day = _day(due)
+        with self._cond:
+            self._due.pop(opp_id, None)
+            if day is None:
+                return False
+            at = self.fire_time(day)
+            if at <= self.clock():
+                return False
+            self._due[opp_id] = day
+            heapq.heappush(self._heap, (at, opp_id, day))
+            self._cond.notify()
+        return True
+
+    def load(self, oportunidades: Iterable[Dict[str, Any]]) -> int:
+        """Schedule the upcoming due dates of the active pipeline; returns how many"""
+        return sum(self.schedule(o["id"], o.get("fecha_siguiente_accion"))
+                   for o in oportunidades if o.get("fecha_siguiente_accion"))
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._due)
+
+    def next_reminder(self) -> Optional[float]:
+        """Unix time of the earliest pending reminder"""
+        with self._cond:
+            self._drop_stale()
+            return self._heap[0][0] if self._heap else None
+
+    def _drop_stale(self) -> None:
+        while self._heap and self._due.get(self._heap[0][1]) != self._heap[0][2]:
+            heapq.heappop(self._heap)
+
+    def _pop_due(self) -> List[Tuple[int, str]]:
+        now = self.clock()
+        due = []
+        with self._cond:
+            self._drop_stale()
+            while self._heap and self._heap[0][0] <= now:
+                # The top is live after _drop_stale
+                _, opp_id, day = heapq.heappop(self._heap)
+                del self._due[opp_id]
+                due.append((opp_id, day))
+                self._drop_stale()
+        return due
+
+    # --- reminders ---
+
+    def remind(self, opp_id: int, due: str) -> bool:
+        """Send the reminder if the opportunity is still active and due that day"""
+        opp = current_row(self.db, "oportunidades", opp_id)
+        if opp is None or opp.get("estado", "Activa") != "Activa" or _day(opp.get("fecha_siguiente_accion")) != due:
+            return False
+        if not opp.get("asignado_a"):
+            logger.info(f"Follow-up #{opp_id} due {due} has no rep assigned, no reminder sent")
+            return False
+        business = current_row(self.db, "businesses", opp["business_id"]) or {}
+        return bool(notify_followup_due(
+            rep_name=opp["asignado_a"],
+            opp_id=opp_id,
+            nombre_negocio=business.get("nombre", f"Negocio #{opp['business_id']}"),
+            siguiente_accion=opp.get("siguiente_accion"),
+            fecha=due,
+            nombre_contacto=opp.get("nombre_contacto"),
+            celular_contacto=opp.get("celular_contacto"),
+        ))
+
+    def run_pending(self) -> int:
+        """Send every reminder whose time has come; returns how many were sent"""
+        sent = 0
+        for opp_id, due in self._pop_due():
+            try:
+                sent += self.remind(opp_id, due)
+            except Exception as e:
+                logger.warning(f"Follow-up reminder #{opp_id} failed: {e}")
+        self.sent += sent
+        return sent
+
+    # --- background thread ---
+
+    def start(self) -> None:
+        """Send reminders from a background thread as they come due"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="lux-followups", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                self._drop_stale()
+                delay = self._heap[0][0] - self.clock() if self._heap else MAX_WAIT
+                if delay > 0:
+                    # schedule() wakes the thread early when an earlier reminder is added
+                    self._cond.wait(min(delay, MAX_WAIT))
+                    continue
+            self.run_pending()
+
+
+def start_followups(db, hour: int = REMINDER_HOUR, timezone: Optional[str] = TIMEZONE) -> FollowUpScheduler:
+    """Create the process-wide scheduler, load the active pipeline and start it"""
+    global _scheduler
+    scheduler = FollowUpScheduler(db, hour, timezone)
+    loaded = scheduler.load(db.get_oportunidades_activas())
+    scheduler.start()
+    _scheduler = scheduler
+    logger.info(f"Follow-up scheduler started with {loaded} pending reminder(s)")
+    return scheduler
+
+
+def active_scheduler() -> Optional[FollowUpScheduler]:
+    """The running scheduler (for status display), or None"""
+    return _scheduler
+
+
+def schedule_followup(opp_id: int, due: Any) -> None:
+    """Hand a new or changed due date to the running scheduler (no-op when none runs)"""
+    if _scheduler is not None and opp_id and opp_id > 0:
+        _scheduler.schedule(opp_id, due)
@@ -0,0 +1,302 @@
+"""
+Revenue and pipeline forecasting for Lux Sales Dashboard
+
+Monthly forecasts of ``ventas.monto_soles`` and ``m2_real`` from their
+weekly series, plus the active pipeline weighted by how often similar
+opportunities converted:
+
+- the weekly series (complete ISO weeks, Monday start, empty weeks as 0)
+  gets an additive seasonal index per ISO week number, estimated from the
+  deviations to a centered 13-week mean and shrunk toward 0 for weeks seen
+  only once (so one year of history gives a damped seasonality);
+- the deseasonalized series is fitted with damped-trend exponential
+  smoothing, ETS(A,Ad,N). Every (alpha, beta, phi) of the grid is run at
+  once as NumPy vectors, one time step per iteration, and the lowest
+  one-step squared error wins;
+- weeks are spread over the days they cover; a month's forecast is its
+  sales up to today plus the forecast of its remaining days. Its interval
+  uses the exact covariance of the ETS forecast errors (each h-step error is
+  a known combination of the future shocks), not a sum of independent
+  variances;
+- each active opportunity's m2_estimado is weighted by the conversion rate
+  (Convertida out of Convertida + Perdida) of its source and rep, pulled
+  toward the source's rate and that toward the overall one when there are
+  few decided opportunities.
+
+Rows come from the audit log projection (events.current_rows), and
+``sales_forecast`` caches its result per engine, event id and arguments, so
+the page pays for a fit only after a write. Pure NumPy/pandas, no Streamlit.
+"""
+
+import threading
+from dataclasses import dataclass
+from datetime import date, timedelta
+from statistics import NormalDist
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from events import current_rows, last_event_id
+
+Rows = List[Dict[str, Any]]
+
+# Parameter grid of the exponential smoothing fit (beta as a share of alpha, so beta <= alpha)
+ALPHAS = np.linspace(0.05, 0.95, 19)
+TREND_SHARES = np.array([0.0, 0.05, 0.1, 0.2, 0.3])
+PHIS = np.array([0.8, 0.9, 0.98])
+
+# Fewer complete weeks than this and there is no forecast
+MIN_WEEKS = 8
+# A seasonal index needs this many weeks (one full year)
+SEASON_WEEKS = 52
+# Pseudo-observations pulling a seasonal index toward 0 / a conversion rate toward its parent rate
+SEASON_SHRINK = 1.0
+RATE_SHRINK = 5.0
+
+# Results kept by sales_forecast (a new event or another argument adds one, the oldest is dropped)
+CACHE_ENTRIES = 4
+
+_alpha, _share, _phi = (grid.ravel() for grid in np.meshgrid(ALPHAS, TREND_SHARES, PHIS, indexing="ij"))
+_beta = _alpha * _share
+
+_cache: Dict[Tuple, Dict[str, Any]] = {}
+_cache_lock = threading.Lock()
+
+
+@dataclass
+class Model:
+    """A fitted series: ETS state after the last complete week and its seasonal index"""
+    alpha: float
+    beta: float
+    phi: float
+    level: float
+    trend: float
+    sigma: float
+    seasonal: np.ndarray  # additive index per ISO week number (0..53)
+    last_week: date  # Monday of the last complete week fitted
+    weeks: int
+
+    def _c(self, horizon: int) -> np.ndarray:
+        """Weights of the future shocks in the h-step errors: c_0 = 1, c_j = alpha + beta phi (1 - phi^j) / (1 - phi)"""
+        j = np.arange(horizon)
+        c = self.alpha + self.beta * self.phi * (1 - self.phi ** j) / (1 - self.phi)
+        c[0] = 1.0
+        return c
+
+    def forecast(self, horizon: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Means of the next ``horizon`` weeks and the matrix E with
+        error_h = sum_k E[h, k] shock_k (covariance sigma^2 E E^T)
+        """
+        steps = np.arange(1, horizon + 1)
+        damped = np.cumsum(self.phi ** steps)
+        mondays = [self.last_week + timedelta(weeks=int(h)) for h in steps]
+        season = self.seasonal[[monday.isocalendar()[1] for monday in mondays]]
+        c = self._c(horizon)
+        # Lower-triangular Toeplitz: E[h, k] = c[h - k] for k <= h
+        lag = steps[:, None] - steps[None, :]
+        errors = np.where(lag >= 0, c[np.clip(lag, 0, None)], 0.0)
+        return self.level + self.trend * damped + season, errors
+
+
+def weekly_series(rows: Rows, column: str, date_column: str, end: date) -> pd.Series:
+    """Sum of column per ISO week (Monday index) up to the week before end's, empty weeks as 0"""
+    frame = pd.DataFrame(rows, columns=[date_column, column])
+    fecha = pd.to_datetime(frame[date_column].astype("string").str[:10], errors="coerce")
+    value = pd.to_numeric(frame[column], errors="coerce").fillna(0.0)
+    last_monday = pd.Timestamp(end - timedelta(days=end.weekday() + 7))
+    monday = (fecha - pd.to_timedelta(fecha.dt.weekday, unit="D")).dt.normalize()
+    keep = monday.notna() & (monday <= last_monday)
+    weekly = value[keep].groupby(monday[keep]).sum()
+    if weekly.empty:
+        return weekly
+    return weekly.reindex(pd.date_range(weekly.index.min(), last_monday, freq="7D"), fill_value=0.0)
+
+
+def seasonal_index(series: pd.Series) -> np.ndarray:
+    """Additive index per ISO week number (0..53), zeros with less than SEASON_WEEKS of history"""
+    index = np.zeros(54)
+    if len(series) < SEASON_WEEKS:
+        return index
+    deviation = series - series.rolling(13, center=True, min_periods=1).mean()
+    week = series.index.isocalendar().week.to_numpy(dtype=int)
+    totals = np.bincount(week, weights=deviation.to_numpy(), minlength=54)
+    counts = np.bincount(week, minlength=54)
+    index = totals / (counts + SEASON_SHRINK)
+    seen = counts > 0
+    index[seen] -= index[seen].mean()
+    return index
+
+
+def fit(series: pd.Series) -> Optional[Model]:
+    """Fit ETS(A,Ad,N) on the deseasonalized weekly series (None below MIN_WEEKS)"""
+    if len(series) < MIN_WEEKS:
+        return None
+    seasonal = seasonal_index(series)
+    y = series.to_numpy(dtype=float) - seasonal[series.index.isocalendar().week.to_numpy(dtype=int)]
+
+    # One column per grid point: all the candidate models advance together
+    level = np.full(_alpha.shape, y[:4].mean())
+    trend = np.zeros(_alpha.shape)
+    sse = np.zeros(_alpha.shape)
+    for t, value in enumerate(y):
+        predicted = level + _phi * trend
+        error = value - predicted
+        if t >= 4:  # the first weeks only settle the level
+            sse += error * error
+        level = predicted + _alpha * error
+        trend = _phi * trend + _beta * error
+
+    best = int(np.argmin(sse))
+    return Model(
+        alpha=float(_alpha[best]), beta=float(_beta[best]), phi=float(_phi[best]),
+        level=float(level[best]), trend=float(trend[best]),
+        sigma=float(np.sqrt(sse[best] / max(1, len(y) - 4))),
+        seasonal=seasonal, last_week=series.index[-1].date(), weeks=len(y),
+    )
+
+
+def monthly_forecast(rows: Rows, column: str, today: date, months: int = 3, level: float = 0.8) -> pd.DataFrame:
+    """
+    This month and the next ones: real up to today plus the forecast of the
+    remaining days, with a ``level`` prediction interval
+
+    Args:
+        rows: Sale rows with fecha_cierre and column (all of them)
+        column: monto_soles or m2_real
+
+    Returns:
+        DataFrame with mes (YYYY-MM), real, pronostico, bajo and alto; empty
+        with less than MIN_WEEKS weeks of history
+    """
+    columns = ["mes", "real", "pronostico", "bajo", "alto"]
+    model = fit(weekly_series(rows, column, "fecha_cierre", today))
+    if model is None:
+        return pd.DataFrame(columns=columns)
+
+    starts = [pd.Timestamp(today.year, today.month, 1) + pd.DateOffset(months=m) for m in range(months + 1)]
+    horizon = (starts[-1].date() - model.last_week).days // 7 + 1
+    means, errors = model.forecast(horizon)
+
+    # Weight of forecast week h in month m: its days after today in that month, / 7
+    days = pd.date_range(model.last_week + timedelta(weeks=1), periods=horizon * 7, freq="D")
+    future = days > pd.Timestamp(today)
+    month = np.searchsorted(np.array(starts[1:], dtype="datetime64[ns]"), days.values, side="right")
+    weights = np.zeros((months, horizon))
+    np.add.at(weights, (month[future & (month < months)], np.arange(horizon * 7)[future & (month < months)] // 7),
+              1 / 7)
+
+    frame = pd.DataFrame(rows, columns=["fecha_cierre", column])
+    fecha = frame["fecha_cierre"].astype("string").str[:10]
+    value = pd.to_numeric(frame[column], errors="coerce").fillna(0.0)
+    real = np.zeros(months)
+    real[0] = value[(fecha >= starts[0].date().isoformat()) & (fecha <= today.isoformat())].sum()
+
+    mean = np.clip(weights @ means, 0, None)
+    spread = NormalDist().inv_cdf((1 + level) / 2) * model.sigma * np.sqrt(((weights @ errors) ** 2).sum(axis=1))
+    return pd.DataFrame({
+        "mes": [start.strftime("%Y-%m") for start in starts[:-1]],
+        "real": real.round(2),
+        "pronostico": (real + mean).round(2),
+        "bajo": (real + np.clip(mean - spread, 0, None)).round(2),
+        "alto": (real + mean + spread).round(2),
+    })
+
+
+def conversion_rates(oportunidades: Rows) -> pd.DataFrame:
+    """
+    Conversion rate per source and rep, shrunk toward the source's rate and
+    that toward the overall one (RATE_SHRINK pseudo-opportunities each)
+
+    Returns:
+        DataFrame with source, asignado_a, convertidas, decididas and probabilidad
+    """
+    frame = pd.DataFrame(oportunidades, columns=["source", "asignado_a", "estado"])
+    frame[["source", "asignado_a"]] = frame[["source", "asignado_a"]].fillna("Sin dato").replace("", "Sin dato")
+    frame["convertidas"] = (frame["estado"] == "Convertida").astype(int)
+    frame["decididas"] = frame["estado"].isin(["Convertida", "Perdida"]).astype(int)
+
+    overall = (frame["convertidas"].sum() + RATE_SHRINK * 0.5) / (frame["decididas"].sum() + RATE_SHRINK)
+    by_source = frame.groupby("source")[["convertidas", "decididas"]].sum()
+    source_rate = (by_source["convertidas"] + RATE_SHRINK * overall) / (by_source["decididas"] + RATE_SHRINK)
+    rates = frame.groupby(["source", "asignado_a"])[["convertidas", "decididas"]].sum().reset_index()
+    prior = rates["source"].map(source_rate)
+    rates["probabilidad"] = (rates["convertidas"] + RATE_SHRINK * prior) / (rates["decididas"] + RATE_SHRINK)
+    return rates
+
+
+def pipeline_forecast(oportunidades: Rows, precio_m2: float) -> Dict[str, Any]:
+    """
+    Active pipeline weighted by conversion_rates
+
+    Args:
+        oportunidades: Every opportunity, all estados (events.current_rows)
+        precio_m2: S/. per m2 to value the expected m2
+
+    Returns:
+        dict with m2_pipeline, m2_esperado, soles_esperados and detalle
+        (DataFrame per source and rep: activas, m2_estimado, probabilidad,
+        m2_esperado, largest expected m2 first)
+    """
+    rates = conversion_rates(oportunidades)
+    frame = pd.DataFrame(oportunidades, columns=["source", "asignado_a", "estado", "m2_estimado"])
+    active = frame[frame["estado"].fillna("Activa") == "Activa"].copy()
+    active[["source", "asignado_a"]] = active[["source", "asignado_a"]].fillna("Sin dato").replace("", "Sin dato")
+    active["m2_estimado"] = pd.to_numeric(active["m2_estimado"], errors="coerce").fillna(0.0)
+
+    detail = active.groupby(["source", "asignado_a"]).agg(activas=("estado", "size"),
+                                                          m2_estimado=("m2_estimado", "sum")).reset_index()
+    detail = detail.merge(rates[["source", "asignado_a", "probabilidad"]], on=["source", "asignado_a"], how="left")
+    detail["m2_esperado"] = (detail["m2_estimado"] * detail["probabilidad"]).round(1)
+    detail["probabilidad"] = (detail["probabilidad"] * 100).round(1)
+    m2_esperado = float(detail["m2_esperado"].sum())
+    return {
+        "m2_pipeline": float(detail["m2_estimado"].sum()),
+        "m2_esperado": round(m2_esperado, 1),
+        "soles_esperados": round(m2_esperado * precio_m2, 2),
+        "detalle": detail.sort_values("m2_esperado", ascending=False).reset_index(drop=True),
+    }
+
+
+def price_per_m2(ventas: Rows, today: date, days: int = 365) -> float:
+    """S/. per m2 of the sales closed in the last ``days`` (0 without any)"""
+    frame = pd.DataFrame(ventas, columns=["fecha_cierre", "monto_soles", "m2_real"])
+    recent = frame[frame["fecha_cierre"].astype("string").str[:10] > (today - timedelta(days=days)).isoformat()]
+    m2 = pd.to_numeric(recent["m2_real"], errors="coerce").sum()
+    return float(pd.to_numeric(recent["monto_soles"], errors="coerce").sum() / m2) if m2 else 0.0
+
+
+def sales_forecast(db, today: Optional[date] = None, months: int = 3, level: float = 0.8) -> Dict[str, Any]:
+    """
+    Monthly revenue and m2 forecasts and the weighted pipeline of an engine,
+    computed once per data version (the last audit event id). The result is
+    shared between callers: do not modify it.
+
+    Returns:
+        dict with version (event id), soles and m2 (monthly_forecast frames),
+        pipeline (pipeline_forecast) and precio_m2
+    """
+    today = today or date.today()
+    version = last_event_id(db)
+    key = (db.__name__, str(getattr(db, "DB_PATH", "")), version, today, months, level)
+    with _cache_lock:
+        cached = _cache.get(key)
+    if cached is not None:
+        return cached
+
+    ventas, _ = current_rows(db, "ventas")
+    oportunidades, _ = current_rows(db, "oportunidades")
+    precio_m2 = price_per_m2(ventas, today)
+    result = {
+        "version": version,
+        "soles": monthly_forecast(ventas, "monto_soles", today, months, level),
+        "m2": monthly_forecast(ventas, "m2_real", today, months, level),
+        "pipeline": pipeline_forecast(oportunidades, precio_m2),
+        "precio_m2": round(precio_m2, 2),
+    }
+    with _cache_lock:
+        while len(_cache) >= CACHE_ENTRIES:
+            _cache.pop(next(iter(_cache)))
+        _cache[key] = result
+    return result
@@ -0,0 +1,357 @@
+"""
+Call timing and slow-query instrumentation for Lux Sales Dashboard
+
+``install()`` wraps every public function of the data modules (database,
+database_supabase, excel_reader) so each call records:
+
+- latency into a fixed-bucket histogram per function (a bisect and a few
+  integer adds under a lock)
+- rows returned (len of the list/DataFrame) and an estimated payload size
+- a warning on the ``lux.slow_queries`` logger when it takes longer than
+  the threshold, also appended to ``slow_log`` when that is set
+
+Modules not imported yet are wrapped as soon as they are (excel_reader pulls
+in pandas, so it stays lazy). Calls are also collected per script run for
+the "⏱️ Diagnóstico" sidebar panel, and ``write_prometheus`` dumps all
+histograms in the Prometheus text format for a node_exporter textfile
+collector or any scraper that reads files.
+
+Settings ([instrumentation] in secrets.toml):
+
+    enabled = true              # wrap the data modules
+    slow_ms = 500               # slow-query log threshold
+    slow_log = "data/slow_queries.log"   # optional file (relative to app/), off by default
+    prometheus_file = "data/lux_metrics.prom"
+    export_every = 15           # seconds between exporter writes
+"""
+
+import contextvars
+import functools
+import importlib.abc
+import importlib.util
+import inspect
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import config
+
+logger = logging.getLogger(__name__)
+slow_logger = logging.getLogger("lux.slow_queries")
+
+INSTRUMENTED_MODULES = ["database", "database_supabase", "excel_reader"]
+
+# Histogram upper bounds in milliseconds (the last bucket is +Inf)
+BUCKETS_MS = [1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+DEFAULT_SLOW_MS = 500.0
+APP_DIR = Path(__file__).parent
+
+# Rows sampled to estimate the payload size of large results
+_SIZE_SAMPLE = 20
+
+
+class Histogram:
+    """Cumulative latency histogram with fixed buckets (thread-safe)"""
+
+    def __init__(self, bounds: List[float] = BUCKETS_MS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        i = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.total += value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile (None if empty or past the last bound)"""
+        if not self.count:
+            return None
+        target, seen = q * self.count, 0
+        for bound, n in zip(self.bounds, self.counts):
+            seen += n
+            if seen >= target:
+                return bound
+        return None
+
+
+@dataclass
+class FunctionStats:
+    latency: Histogram = field(default_factory=Histogram)
+    rows: int = 0
+    payload_bytes: int = 0
+    errors: int = 0
+
+
+@dataclass
+class CallRecord:
+    """One instrumented call, kept for the per-rerun panel"""
+    name: str
+    ms: float
+    rows: Optional[int]
+    payload_bytes: Optional[int]
+    error: bool = False
+
+
+_stats: Dict[str, FunctionStats] = {}
+_stats_lock = threading.Lock()
+_run_calls: contextvars.ContextVar[Optional[List[CallRecord]]] = contextvars.ContextVar("lux_run_calls", default=None)
+_slow_ms = DEFAULT_SLOW_MS
+_installed = False
+
+
+def _function_stats(name: str) -> FunctionStats:
+    stats = _stats.get(name)
+    if stats is None:
+        with _stats_lock:
+            stats = _stats.setdefault(name, FunctionStats())
+    return stats
+
+
+def _rows(result: Any) -> Optional[int]:
+    if isinstance(result, (list, tuple)) or hasattr(result, "shape"):
+        return len(result)
+    return None
+
+
+def _payload_bytes(result: Any) -> Optional[int]:
+    """Approximate serialized size; large lists are extrapolated from a sample"""
+    if result is None:
+        return 0
+    if hasattr(result, "memory_usage"):  # DataFrame
+        try:
+            return int(result.memory_usage(index=True, deep=False).sum())
+        except Exception:
+            return None
+    try:
+        if isinstance(result, (list, tuple)) and len(result) > _SIZE_SAMPLE:
+            sample = json.dumps(result[:_SIZE_SAMPLE], default=str)
+            return len(sample) * len(result) // _SIZE_SAMPLE
+        return len(json.dumps(result, default=str))
+    except Exception:
+        return None
+
+
+def _record(name: str, ms: float, result: Any, error: bool) -> None:
+    rows = None if error else _rows(result)
+    size = None if error else _payload_bytes(result)
+    stats = _function_stats(name)
+    stats.latency.observe(ms)
+    if error:
+        stats.errors += 1
+    else:
+        stats.rows += rows or 0
+        stats.payload_bytes += size or 0
+
+    calls = _run_calls.get()
+    if calls is not None:
+        calls.append(CallRecord(name, ms, rows, size, error))
+
+    if ms >= _slow_ms:
+        slow_logger.warning(f"{name} took {ms:.0f} ms (rows={rows}, bytes={size}{', error' if error else ''})")
+
+
+def instrument(func: Callable, name: str) -> Callable:
+    """Wrap one function so its calls are timed and recorded under name"""
+    if getattr(func, "__instrumented__", False):
+        return func
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except BaseException:
+            _record(name, (time.perf_counter() - start) * 1000, None, error=True)
+            raise
+        _record(name, (time.perf_counter() - start) * 1000, result, error=False)
+        return result
+
+    wrapper.__instrumented__ = True
+    return wrapper
+
+
+def instrument_module(module) -> List[str]:
+    """Replace the module's own public functions with instrumented wrappers"""
+    wrapped = []
+    for attr, value in list(vars(module).items()):
+        if attr.startswith("_") or not inspect.isfunction(value):
+            continue
+        if getattr(value, "__module__", None) != module.__name__:
+            continue  # imported from elsewhere, wrapped (or not) in its own module
+        setattr(module, attr, instrument(value, f"{module.__name__}.{attr}"))
+        wrapped.append(attr)
+    return wrapped
+
+
+class _InstrumentOnImport(importlib.abc.MetaPathFinder):
+    """Wrap the target modules right after they are first imported"""
+
+    def __init__(self, names: List[str]):
+        self.names = set(names)
+
+    def find_spec(self, fullname, path, target=None):
+        if fullname not in self.names:
+            return None
+        self.names.discard(fullname)
+        try:
+            spec = importlib.util.find_spec(fullname)
+        finally:
+            self.names.add(fullname)
+        if spec is None or spec.loader is None:
+            return None
+        loader = spec.loader
+        exec_module = loader.exec_module
+
+        def exec_and_instrument(module):
+            exec_module(module)
+            instrument_module(module)
+        loader.exec_module = exec_and_instrument
+        return spec
+
+
+def _configure_slow_log(path: Optional[str]) -> None:
+    if not path or slow_logger.handlers:
+        return
+    path = Path(path)
+    if not path.is_absolute():
+        path = APP_DIR / path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    handler = logging.FileHandler(path, encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+    slow_logger.addHandler(handler)
+
+
+def install(modules: Optional[List[str]] = None) -> bool:
+    """
+    Instrument the data modules (already imported ones now, the rest on import)
+    and start the Prometheus exporter if configured. Safe to call repeatedly.
+
+    Returns:
+        False if disabled with [instrumentation] enabled = false
+    """
+    global _installed, _slow_ms
+    cfg = config.section("instrumentation")
+    if not cfg.get("enabled", True):
+        return False
+    if _installed:
+        return True
+    _installed = True
+    _slow_ms = float(cfg.get("slow_ms", DEFAULT_SLOW_MS))
+    _configure_slow_log(cfg.get("slow_log"))
+
+    pending = []
+    for name in modules or INSTRUMENTED_MODULES:
+        if name in sys.modules:
+            instrument_module(sys.modules[name])
+        else:
+            pending.append(name)
+    if pending:
+        sys.meta_path.insert(0, _InstrumentOnImport(pending))
+
+    if cfg.get("prometheus_file"):
+        start_exporter(cfg["prometheus_file"], float(cfg.get("export_every", 15)))
+    return True
+
+
+# --- per-run collection ---
+
+def begin_run() -> List[CallRecord]:
+    """Collect calls made by the current script run (and threads copying its context)"""
+    calls: List[CallRecord] = []
+    _run_calls.set(calls)
+    return calls
+
+
+def run_calls() -> List[CallRecord]:
+    return _run_calls.get() or []
+
+
+# --- reporting ---
+
+def snapshot() -> Dict[str, Dict[str, Any]]:
+    """Per-function totals and bucket quantiles since the process started"""
+    out = {}
+    for name, stats in sorted(_stats.items()):
+        h = stats.latency
+        out[name] = {
+            "calls": h.count,
+            "errors": stats.errors,
+            "mean_ms": h.total / h.count if h.count else 0.0,
+            "p50_ms": h.quantile(0.5),
+            "p95_ms": h.quantile(0.95),
+            "rows": stats.rows,
+            "payload_bytes": stats.payload_bytes,
+        }
+    return out
+
+
+def _labels(name: str) -> str:
+    module, _, function = name.rpartition(".")
+    return f'module="{module}",function="{function}"'
+
+
+def prometheus_text() -> str:
+    """All histograms and counters in the Prometheus text exposition format"""
+    lines = [
+        "# HELP lux_call_duration_seconds Latency of data-layer calls",
+        "# TYPE lux_call_duration_seconds histogram",
+    ]
+    items = sorted(_stats.items())
+    for name, stats in items:
+        h, labels = stats.latency, _labels(name)
+        cumulative = 0
+        for bound, n in zip(h.bounds, h.counts):
+            cumulative += n
+            lines.append(f'lux_call_duration_seconds_bucket{{{labels},le="{bound / 1000:g}"}} {cumulative}')
+        lines.append(f'lux_call_duration_seconds_bucket{{{labels},le="+Inf"}} {h.count}')
+        lines.append(f"lux_call_duration_seconds_sum{{{labels}}} {h.total / 1000:.6f}")
+        lines.append(f"lux_call_duration_seconds_count{{{labels}}} {h.count}")
+    for metric, help_text, attr in [
+        ("lux_call_rows_total", "Rows returned by data-layer calls", "rows"),
+        ("lux_call_payload_bytes_total", "Estimated bytes returned by data-layer calls", "payload_bytes"),
+        ("lux_call_errors_total", "Data-layer calls that raised", "errors"),
+    ]:
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} counter")
+        for name, stats in items:
+            lines.append(f"{metric}{{{_labels(name)}}} {getattr(stats, attr)}")
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path) -> None:
+    """Atomically replace path with the current metrics"""
+    path = Path(path)
+    if not path.is_absolute():
+        path = APP_DIR / path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(prometheus_text(), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def start_exporter(path, interval: float = 15.0) -> threading.Thread:
+    """Rewrite the Prometheus file every interval seconds in a daemon thread"""
+    def run():
+        while True:
+            try:
+                write_prometheus(path)
+            except Exception as e:
+                logger.warning(f"Prometheus export failed: {e}")
+            time.sleep(interval)
+
+    thread = threading.Thread(target=run, name="lux-metrics-exporter", daemon=True)
+    thread.start()
+    return thread
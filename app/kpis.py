@@ -0,0 +1,143 @@
+"""
+KPI computations for Lux Sales Dashboard
+
+Pure functions over the rows returned by the getters (no Streamlit, no
+database access), so the KPIs page, benchmarks and background jobs compute
+the same numbers.
+"""
+
+from collections import defaultdict
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+Rows = List[Dict[str, Any]]
+
+# Days open (since fecha_contacto) per aging_report column: upper bound -> label
+AGE_BUCKETS = {7: "0-7 días", 15: "8-15 días", 30: "16-30 días", 60: "31-60 días", 90: "61-90 días",
+               float("inf"): "+90 días"}
+
+# Groupings of the aging report: opportunity field -> column title
+AGING_GROUPS = {"asignado_a": "Asesor", "source": "Fuente", "producto_interes": "Producto"}
+
+# Counters of each rep_leaderboard row, in display order
+LEADERBOARD_COUNTS = ["oportunidades_mes", "activas", "convertidas", "perdidas", "ventas_mes", "monto_mes"]
+
+
+def _rate(numerator: int, denominator: int) -> Optional[float]:
+    """Percentage, or None when the denominator is zero (shown as N/A)"""
+    return (numerator / denominator) * 100 if denominator > 0 else None
+
+
+def monthly_summary(visitas_semana: Rows, visitas_mes: Rows, oportunidades: Rows, ventas_mes: Rows) -> Dict[str, Any]:
+    """
+    Figures of the KPIs page summary
+
+    Returns:
+        dict with visitas_semana, visitas_mes, oportunidades_activas, ventas_mes
+        (counts), ingresos_mes (S/.), tasa_visita_oportunidad and
+        tasa_oportunidad_venta (percent or None)
+    """
+    return {
+        "visitas_semana": len(visitas_semana),
+        "visitas_mes": len(visitas_mes),
+        "oportunidades_activas": len(oportunidades),
+        "ventas_mes": len(ventas_mes),
+        "ingresos_mes": sum(v['monto_soles'] or 0 for v in ventas_mes),
+        "tasa_visita_oportunidad": _rate(len(oportunidades), len(visitas_mes)),
+        "tasa_oportunidad_venta": _rate(len(ventas_mes), len(oportunidades)),
+    }
+
+
+def _opened_since(oportunidad: Dict[str, Any], start: date) -> bool:
+    return str(oportunidad.get('fecha_contacto') or '')[:10] >= start.isoformat()
+
+
+def sales_funnel(visitas_mes: Rows, oportunidades: Rows, month_start: date) -> Rows:
+    """
+    This month's funnel: visits, opportunities opened this month (any estado)
+    and how many of those were converted
+
+    Args:
+        oportunidades: Every opportunity, all estados (events.current_rows)
+
+    Returns:
+        list of dicts with etapa, cantidad and tasa (percent of the previous
+        stage, None for the first)
+    """
+    opened = [o for o in oportunidades if _opened_since(o, month_start)]
+    stages = [("Visitas", len(visitas_mes)), ("Oportunidades", len(opened)),
+              ("Convertidas", sum(1 for o in opened if o.get('estado') == 'Convertida'))]
+    return [{"etapa": etapa, "cantidad": cantidad, "tasa": _rate(cantidad, stages[i - 1][1]) if i else None}
+            for i, (etapa, cantidad) in enumerate(stages)]
+
+
+def rep_leaderboard(oportunidades: Rows, ventas_mes: Rows, month_start: date) -> Rows:
+    """
+    One row per asignado_a: opportunities opened this month, current ones by
+    estado, this month's sales (credited through their oportunidad_id) and
+    the close rate (convertidas of the decided ones)
+
+    Args:
+        oportunidades: Every opportunity, all estados (events.current_rows)
+
+    Returns:
+        list of dicts with asignado_a, LEADERBOARD_COUNTS and tasa_cierre,
+        highest monto_mes first
+    """
+    rep_of = {o['id']: o.get('asignado_a') or "Sin asignar" for o in oportunidades}
+    board: Dict[str, Dict[str, float]] = defaultdict(lambda: dict.fromkeys(LEADERBOARD_COUNTS, 0))
+    for o in oportunidades:
+        cells = board[rep_of[o['id']]]
+        estado = o.get('estado') or 'Activa'
+        cells['oportunidades_mes'] += _opened_since(o, month_start)
+        cells['activas'] += estado == 'Activa'
+        cells['convertidas'] += estado == 'Convertida'
+        cells['perdidas'] += estado == 'Perdida'
+    for v in ventas_mes:
+        cells = board[rep_of.get(v.get('oportunidad_id'), "Sin asignar")]
+        cells['ventas_mes'] += 1
+        cells['monto_mes'] += float(v.get('monto_soles') or 0)
+
+    rows = []
+    for rep, cells in board.items():
+        tasa = _rate(cells['convertidas'], cells['convertidas'] + cells['perdidas'])
+        rows.append({"asignado_a": rep, **cells, "monto_mes": round(cells['monto_mes'], 2),
+                     "tasa_cierre": round(tasa, 1) if tasa is not None else None})
+    return sorted(rows, key=lambda r: (-r['monto_mes'], -r['ventas_mes'], r['asignado_a']))
+
+
+def aging_report(oportunidades: Rows, today: date, by: str = "asignado_a") -> pd.DataFrame:
+    """
+    Active pipeline by days open, one row per value of ``by`` (a key of
+    AGING_GROUPS). The days, buckets and follow-up flags are computed as
+    whole columns and all the counts come from a single groupby-sum.
+
+    Returns:
+        DataFrame with the group column (titled as in AGING_GROUPS), one count
+        column per AGE_BUCKETS label, total, dias_promedio, vencidas (next
+        action due before today) and sin_fecha (no next-action date), largest
+        groups first
+    """
+    title = AGING_GROUPS[by]
+    columns = [title, *AGE_BUCKETS.values(), "total", "dias_promedio", "vencidas", "sin_fecha"]
+    if not oportunidades:
+        return pd.DataFrame(columns=columns)
+
+    frame = pd.DataFrame(oportunidades, columns=[by, "fecha_contacto", "fecha_siguiente_accion"])
+    now = pd.Timestamp(today)
+    opened = pd.to_datetime(frame["fecha_contacto"].astype("string").str[:10], errors="coerce")
+    due = pd.to_datetime(frame["fecha_siguiente_accion"].astype("string").str[:10], errors="coerce")
+    dias = (now - opened).dt.days.clip(lower=0)
+    buckets = pd.cut(dias, bins=[-1, *AGE_BUCKETS], labels=list(AGE_BUCKETS.values()))
+
+    counts = pd.get_dummies(buckets).astype(int).assign(
+        total=1,
+        dias=dias.fillna(0),
+        vencidas=(due < now).astype(int),
+        sin_fecha=due.isna().astype(int),
+    )
+    report = counts.groupby(frame[by].fillna("Sin dato").replace("", "Sin dato").rename(title)).sum()
+    report["dias_promedio"] = (report.pop("dias") / report["total"]).round(1)
+    return report.reset_index().sort_values(["total", title], ascending=[False, True])[columns]
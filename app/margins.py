@@ -0,0 +1,102 @@
+"""
+Per-sale margins for Lux Sales Dashboard
+
+Joins the sales (getter rows) with the accountant's Gastos sheet
+(excel_reader) in one pass instead of one workbook lookup per sale:
+
+- expense rows with a Venta_ID are summed per Venta_ID once (a hash
+  aggregate) and mapped onto the sales by venta_id: the sale's direct cost,
+  whatever their Categoría;
+- expense rows without a Venta_ID are overhead: each month's total is
+  allocated to the sales closed that month in proportion to their revenue
+  (the indirect cost). Months with overhead but no sales are reported as
+  unallocated;
+- expense rows whose Venta_ID matches no sale (a typo in the sheet, a
+  deleted sale) are returned as orphans and left out of the margins.
+
+Pure pandas, no Streamlit. Pass all the sales, not one period's, or the
+expenses of other periods' sales show up as orphans; filter the per-sale
+result by fecha_cierre instead.
+"""
+
+from typing import Any, Dict, List
+
+import pandas as pd
+
+Rows = List[Dict[str, Any]]
+
+GASTOS_COLUMNS = ["Fecha", "Monto_Soles", "Venta_ID"]
+
+# Columns of the per-sale result, in display order
+SALE_COLUMNS = ["venta_id", "fecha_cierre", "nombre", "producto", "m2_real", "ingresos",
+                "costo_directo", "costo_indirecto", "margen", "margen_pct", "margen_m2"]
+
+_TOTALS = ["m2_real", "ingresos", "costo_directo", "costo_indirecto", "margen"]
+
+
+def _ratios(frame: pd.DataFrame) -> pd.DataFrame:
+    """margen_pct (of revenue) and margen_m2, empty where the base is zero"""
+    frame["margen_pct"] = (frame["margen"] / frame["ingresos"].where(frame["ingresos"] > 0) * 100).round(1)
+    frame["margen_m2"] = (frame["margen"] / frame["m2_real"].where(frame["m2_real"] > 0)).round(2)
+    return frame
+
+
+def sale_margins(ventas: Rows, gastos: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """
+    Revenue, direct cost, allocated indirect cost and margin of every sale
+
+    Args:
+        ventas: Sale rows (get_ventas_by_period), all of them
+        gastos: The Gastos sheet (excel_reader.read_gastos_excel), may be empty
+
+    Returns:
+        dict with ventas (one row per sale, SALE_COLUMNS), huerfanos (the
+        expense rows whose Venta_ID matches no sale) and sin_asignar (mes,
+        monto: overhead of months without sales)
+    """
+    sales = pd.DataFrame(ventas, columns=["venta_id", "fecha_cierre", "nombre", "producto", "m2_real", "monto_soles"])
+    sales = sales.rename(columns={"monto_soles": "ingresos"})
+    sales["ingresos"] = pd.to_numeric(sales["ingresos"], errors="coerce").fillna(0.0)
+    sales["m2_real"] = pd.to_numeric(sales["m2_real"], errors="coerce").fillna(0)
+    mes = pd.to_datetime(sales["fecha_cierre"].astype("string").str[:10], errors="coerce").dt.to_period("M")
+
+    rows = gastos.reindex(columns=GASTOS_COLUMNS) if gastos.empty else gastos
+    monto = pd.to_numeric(rows["Monto_Soles"], errors="coerce").fillna(0.0)
+    venta_key = rows["Venta_ID"].astype("string").str.strip().replace("", pd.NA)
+    linked = venta_key.notna()
+    known = linked & venta_key.isin(sales["venta_id"])
+
+    # Direct: one sum per Venta_ID, then a lookup per sale
+    direct = monto[known].groupby(venta_key[known]).sum()
+    sales["costo_directo"] = sales["venta_id"].map(direct).fillna(0.0)
+
+    # Indirect: each month's overhead split by the month's revenue (evenly if it had none)
+    fecha = pd.to_datetime(rows["Fecha"], errors="coerce")
+    overhead = monto[~linked].groupby(fecha[~linked].dt.to_period("M")).sum()
+    month_revenue = sales.groupby(mes)["ingresos"].transform("sum")
+    month_sales = sales.groupby(mes)["ingresos"].transform("size")
+    share = (sales["ingresos"] / month_revenue).where(month_revenue > 0, 1 / month_sales)
+    sales["costo_indirecto"] = (mes.map(overhead).fillna(0.0) * share.fillna(0.0)).round(2)
+
+    sales["margen"] = (sales["ingresos"] - sales["costo_directo"] - sales["costo_indirecto"]).round(2)
+    unallocated = overhead[~overhead.index.isin(mes.dropna().unique())]
+    return {
+        "ventas": _ratios(sales)[SALE_COLUMNS],
+        "huerfanos": rows[linked & ~known],
+        "sin_asignar": pd.DataFrame({"mes": unallocated.index.astype(str), "monto": unallocated.round(2).values}),
+    }
+
+
+def product_margins(per_sale: pd.DataFrame) -> pd.DataFrame:
+    """
+    Totals per producto of a sale_margins()["ventas"] frame (or a slice of it)
+
+    Returns:
+        DataFrame with producto, ventas (count), m2_real, ingresos,
+        costo_directo, costo_indirecto, margen, margen_pct and margen_m2,
+        highest margin first
+    """
+    groups = per_sale.groupby(per_sale["producto"].fillna("Sin producto"))
+    totals = groups[_TOTALS].sum()
+    totals.insert(0, "ventas", groups.size())
+    return _ratios(totals.round(2)).sort_values("margen", ascending=False).reset_index()
@@ -0,0 +1,676 @@
+"""
+Versioned schema migrations for Lux Sales Dashboard
+
+Each database records the migrations it has applied in a ``schema_version``
+table. ``migrate()`` reads that version once per process and database file
+and applies only the pending migrations, so a dashboard start on an
+up-to-date database costs a single ``SELECT MAX(version)``.
+
+SQLite migrations are defined below as ordered steps (SQL strings or
+callables taking the connection), each migration applied in one
+transaction. The Supabase schema lives in ``migrations/supabase/NNNN_name.sql``
+(applied with ``--supabase --apply`` or pasted into the SQL editor); the app
+only reads the remote version and logs what is pending.
+
+Usage:
+    python app/migrations.py [--db PATH]                  apply SQLite migrations
+    python app/migrations.py --supabase [--apply|--sql]   Supabase status / apply / print pending SQL
+"""
+
+import argparse
+import logging
+import re
+import sqlite3
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from business_match import index_grams
+from events import ENTITIES, KINDS, SKIP_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+SUPABASE_DIR = Path(__file__).parent.parent / "migrations" / "supabase"
+
+# Tables whose inserts/updates/deletes are recorded in change_log
+CHANGE_LOG_TABLES = ["businesses", "visitas", "oportunidades", "ventas"]
+
+SCHEMA_VERSION_DDL = """
+CREATE TABLE IF NOT EXISTS schema_version (
+    version INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+
+Step = Union[str, Callable[[sqlite3.Connection], object]]
+
+
+@dataclass
+class Migration:
+    version: int
+    name: str
+    steps: Sequence[Step]
+
+
+def _add_columns(table: str, columns: Dict[str, str]) -> Callable[[sqlite3.Connection], None]:
+    """ALTER TABLE ADD COLUMN for the columns the table doesn't have yet"""
+    def step(conn: sqlite3.Connection) -> None:
+        existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        for column, decl in columns.items():
+            if column not in existing:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+    return step
+
+
+def _change_log_triggers(conn: sqlite3.Connection) -> None:
+    for table in CHANGE_LOG_TABLES:
+        for op, ref in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD")):
+            conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_{op.lower()}_log
+            AFTER {op} ON {table}
+            BEGIN
+                INSERT INTO change_log (table_name, op, row_id) VALUES ('{table}', '{op}', {ref}.id);
+            END
+            """)
+
+
+# Full-text search documents (search_index): one per business, visit and
+# opportunity. The rowid is (kind << SEARCH_KIND_SHIFT) + id, so each kind is
+# a contiguous rowid range and triggers and lookups go straight to a row.
+SEARCH_KINDS = {"businesses": 1, "visitas": 2, "oportunidades": 3}
+SEARCH_KIND_SHIFT = 40
+_CONTACT = ("COALESCE(NEW.nombre_contacto, '') || ' ' || COALESCE(NEW.cargo_contacto, '') || ' ' || "
+            "COALESCE(NEW.celular_contacto, '') || ' ' || COALESCE(NEW.email_contacto, '')")
+# table -> (columns whose update re-indexes the row, document values after the rowid)
+SEARCH_DOCUMENTS = {
+    "businesses": ("nombre, direccion", "NEW.id, NEW.nombre, NEW.direccion, NULL, NULL"),
+    "visitas": ("business_id, notas", "NEW.business_id, NULL, NULL, NEW.notas, NULL"),
+    "oportunidades": ("business_id, siguiente_accion, nombre_contacto, cargo_contacto, celular_contacto, email_contacto",
+                      f"NEW.business_id, NULL, NULL, NEW.siguiente_accion, {_CONTACT}"),
+}
+_SEARCH_COLUMNS = "rowid, business_id, nombre, direccion, texto, contacto"
+
+
+def _search_base(table: str) -> int:
+    return SEARCH_KINDS[table] << SEARCH_KIND_SHIFT
+
+
+def _search_triggers(conn: sqlite3.Connection) -> None:
+    """Keep search_index current on every insert, relevant update and delete"""
+    for table, (watched, doc) in SEARCH_DOCUMENTS.items():
+        base = _search_base(table)
+        conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_search_insert AFTER INSERT ON {table}
+        BEGIN
+            -- INSERT OR REPLACE (replica sync) deletes the old row without firing the delete trigger
+            DELETE FROM search_index WHERE rowid = {base} + NEW.id;
+            INSERT INTO search_index ({_SEARCH_COLUMNS}) VALUES ({base} + NEW.id, {doc});
+        END
+        """)
+        conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_search_update AFTER UPDATE OF {watched} ON {table}
+        BEGIN
+            DELETE FROM search_index WHERE rowid = {base} + OLD.id;
+            INSERT INTO search_index ({_SEARCH_COLUMNS}) VALUES ({base} + NEW.id, {doc});
+        END
+        """)
+        conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_search_delete AFTER DELETE ON {table}
+        BEGIN
+            DELETE FROM search_index WHERE rowid = {base} + OLD.id;
+        END
+        """)
+
+
+def _populate_search(conn: sqlite3.Connection) -> None:
+    for table, (_, doc) in SEARCH_DOCUMENTS.items():
+        conn.execute(f"""
+            INSERT INTO search_index ({_SEARCH_COLUMNS})
+            SELECT {_search_base(table)} + id, {doc.replace("NEW.", "")} FROM {table}
+        """)
+
+
+# Near-duplicate lookup (business_match.py): business_ngrams maps each trigram
+# of a business's normalized nombre + direccion (and each house number) to the business, and
+# business_gram_counts keeps how many businesses have each trigram so a lookup
+# reads only its rarest ones. Normalization is Python, so database.py keeps
+# both tables current when it creates or merges businesses (not triggers).
+_GRAM_COUNT_UPSERT = """
+    INSERT INTO business_gram_counts (gram, n) VALUES (?, ?)
+    ON CONFLICT (gram) DO UPDATE SET n = n + excluded.n
+"""
+
+
+def add_business_grams(conn: sqlite3.Connection, businesses: Iterable[Tuple[int, str, str]]) -> None:
+    """Index (id, nombre, direccion) rows in business_ngrams"""
+    counts: Counter = Counter()
+    for business_id, nombre, direccion in businesses:
+        grams = index_grams(nombre, direccion)
+        conn.executemany("INSERT OR IGNORE INTO business_ngrams (gram, business_id) VALUES (?, ?)",
+                         [(gram, business_id) for gram in grams])
+        counts.update(grams)
+    conn.executemany(_GRAM_COUNT_UPSERT, counts.items())
+
+
+def remove_business_grams(conn: sqlite3.Connection, businesses: Iterable[Tuple[int, str, str]]) -> None:
+    """Drop (id, nombre, direccion) rows from business_ngrams"""
+    counts: Counter = Counter()
+    for business_id, nombre, direccion in businesses:
+        grams = index_grams(nombre, direccion)
+        conn.executemany("DELETE FROM business_ngrams WHERE gram = ? AND business_id = ?",
+                         [(gram, business_id) for gram in grams])
+        counts.update(grams)
+    conn.executemany(_GRAM_COUNT_UPSERT, [(gram, -n) for gram, n in counts.items()])
+
+
+def _populate_business_grams(conn: sqlite3.Connection) -> None:
+    add_business_grams(conn, conn.execute("SELECT id, nombre, direccion FROM businesses").fetchall())
+
+
+# Audit log (events.py): triggers append one events row per insert, update and
+# delete. The JSON is built from the table's columns when the triggers are
+# created, so a migration that adds columns to these tables must run
+# _event_triggers again.
+def _event_json(table: str, conn: sqlite3.Connection, ref: str) -> str:
+    columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})") if row[1] not in SKIP_COLUMNS]
+    return "json_object(" + ", ".join(f"'{c}', {ref}.{c}" for c in columns) + ")"
+
+
+def _event_triggers(conn: sqlite3.Connection) -> None:
+    for table, entity in ENTITIES.items():
+        new, old = _event_json(table, conn, "NEW"), _event_json(table, conn, "OLD")
+        kind = KINDS["updated"]
+        if table == "oportunidades":
+            kind = f"""CASE
+                WHEN NEW.estado IS NOT OLD.estado AND NEW.estado = 'Convertida' THEN {KINDS['converted']}
+                WHEN NEW.estado IS NOT OLD.estado AND NEW.estado = 'Perdida' THEN {KINDS['lost']}
+                WHEN NEW.asignado_a IS NOT OLD.asignado_a THEN {KINDS['reassigned']}
+                ELSE {KINDS['updated']} END"""
+        for op in ("insert", "update", "delete"):
+            conn.execute(f"DROP TRIGGER IF EXISTS trg_{table}_event_{op}")
+        # json_patch('{{}}', ...) drops the null fields
+        conn.execute(f"""
+        CREATE TRIGGER trg_{table}_event_insert AFTER INSERT ON {table}
+        BEGIN
+            INSERT INTO events (entity, row_id, kind, data)
+            VALUES ({entity}, NEW.id, {KINDS['created']}, json_patch('{{}}', {new}));
+        END
+        """)
+        # Only the changed fields; an update that changes nothing logs nothing
+        conn.execute(f"""
+        CREATE TRIGGER trg_{table}_event_update AFTER UPDATE ON {table}
+        BEGIN
+            INSERT INTO events (entity, row_id, kind, data)
+            SELECT {entity}, NEW.id, {kind}, changes FROM (
+                SELECT json_group_object(n.key, n.value) AS changes
+                FROM json_each({new}) n JOIN json_each({old}) o ON o.key = n.key
+                WHERE n.value IS NOT o.value
+            ) WHERE changes <> '{{}}';
+        END
+        """)
+        conn.execute(f"""
+        CREATE TRIGGER trg_{table}_event_delete AFTER DELETE ON {table}
+        BEGIN
+            INSERT INTO events (entity, row_id, kind, data)
+            VALUES ({entity}, OLD.id, {KINDS['deleted']}, json_patch('{{}}', {old}));
+        END
+        """)
+
+
+def _seed_events(conn: sqlite3.Connection) -> None:
+    """One created event per existing row, dated with its created_at"""
+    for table, entity in ENTITIES.items():
+        row = _event_json(table, conn, table)
+        conn.execute(f"""
+            INSERT INTO events (entity, row_id, kind, at, data)
+            SELECT {entity}, id, {KINDS['created']}, COALESCE(created_at, CURRENT_TIMESTAMP), json_patch('{{}}', {row})
+            FROM {table} ORDER BY id
+        """)
+
+
+def _on_delete(table: str, column: str, action: str) -> Callable[[sqlite3.Connection], None]:
+    """
+    Give table's foreign key on column an ON DELETE action. SQLite can't alter
+    a constraint, so the table is rebuilt: created under a new name with the
+    edited definition, copied, dropped and renamed, then its indexes and
+    triggers recreated and its AUTOINCREMENT counter restored.
+    """
+    def step(conn: sqlite3.Connection) -> None:
+        ddl = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()[0]
+        ddl, found = re.subn(rf"(FOREIGN KEY\s*\(\s*{column}\s*\)\s*REFERENCES\s+\w+\s*\(\s*\w+\s*\))(?!\s*ON DELETE)",
+                             rf"\1 ON DELETE {action}", ddl, flags=re.IGNORECASE)
+        if not found:
+            return
+        rebuilt = f"{table}_rebuild"
+        companions = [row[0] for row in conn.execute(
+            "SELECT sql FROM sqlite_master WHERE tbl_name = ? AND type IN ('index', 'trigger') AND sql IS NOT NULL",
+            (table,))]
+        seq = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,)).fetchone()
+        columns = ", ".join(row[1] for row in conn.execute(f"PRAGMA table_info({table})"))
+
+        conn.execute(re.sub(r"^CREATE TABLE\s+(IF NOT EXISTS\s+)?[\"`]?\w+[\"`]?", f"CREATE TABLE {rebuilt}", ddl))
+        conn.execute(f"INSERT INTO {rebuilt} ({columns}) SELECT {columns} FROM {table}")
+        conn.execute(f"DROP TABLE {table}")
+        conn.execute(f"ALTER TABLE {rebuilt} RENAME TO {table}")
+        for sql in companions:
+            conn.execute(sql)
+        if seq:
+            conn.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = ?", (seq[0], table))
+    return step
+
+
+# Version 1 is the schema init_database used to create on every start (all
+# IF NOT EXISTS), so databases created before schema_version adopt it as is.
+SQLITE_MIGRATIONS: List[Migration] = [
+    Migration(1, "baseline", [
+        """
+        CREATE TABLE IF NOT EXISTS businesses (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nombre TEXT NOT NULL,
+            tipo_negocio TEXT NOT NULL,
+            direccion TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(nombre, direccion)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS visitas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            business_id INTEGER NOT NULL,
+            fecha DATE NOT NULL,
+            semana TEXT NOT NULL,
+            notas TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (business_id) REFERENCES businesses(id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS oportunidades (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            business_id INTEGER NOT NULL,
+            visita_id INTEGER,
+            fecha_contacto DATE NOT NULL,
+            semana TEXT NOT NULL,
+            m2_estimado INTEGER,
+            producto_interes TEXT,
+            siguiente_accion TEXT,
+            estado TEXT DEFAULT 'Activa',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (business_id) REFERENCES businesses(id),
+            FOREIGN KEY (visita_id) REFERENCES visitas(id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS ventas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            venta_id TEXT UNIQUE NOT NULL,
+            business_id INTEGER NOT NULL,
+            oportunidad_id INTEGER,
+            fecha_cierre DATE NOT NULL,
+            semana TEXT NOT NULL,
+            m2_real INTEGER NOT NULL,
+            producto TEXT NOT NULL,
+            monto_soles DECIMAL(10,2) NOT NULL,
+            fecha_instalacion DATE,
+            estado TEXT DEFAULT 'Cerrada',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (business_id) REFERENCES businesses(id),
+            FOREIGN KEY (oportunidad_id) REFERENCES oportunidades(id)
+        )
+        """,
+        # Columns added to the Supabase schema later (lead source, contact info, assignment, lost reason)
+        _add_columns("oportunidades", {
+            "source": "TEXT", "nombre_contacto": "TEXT", "cargo_contacto": "TEXT", "celular_contacto": "TEXT",
+            "email_contacto": "TEXT", "asignado_a": "TEXT", "motivo_perdida": "TEXT",
+        }),
+        "CREATE INDEX IF NOT EXISTS idx_visitas_fecha ON visitas(fecha)",
+        "CREATE INDEX IF NOT EXISTS idx_visitas_semana ON visitas(semana)",
+        "CREATE INDEX IF NOT EXISTS idx_oportunidades_fecha ON oportunidades(fecha_contacto)",
+        "CREATE INDEX IF NOT EXISTS idx_ventas_fecha ON ventas(fecha_cierre)",
+        "CREATE INDEX IF NOT EXISTS idx_ventas_semana ON ventas(semana)",
+        # Change log for the local change feed (see change_feed.py)
+        """
+        CREATE TABLE IF NOT EXISTS change_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            op TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        _change_log_triggers,
+    ]),
+    # Found by benchmarks/check_query_plans.py
+    Migration(2, "query_plan_indexes", [
+        # Active pipeline: filter by estado, newest first, without a sort step
+        "DROP INDEX IF EXISTS idx_oportunidades_estado",
+        "CREATE INDEX IF NOT EXISTS idx_oportunidades_estado_fecha ON oportunidades(estado, fecha_contacto)",
+        # delete_visita unlinks opportunities by visita_id
+        "CREATE INDEX IF NOT EXISTS idx_oportunidades_visita ON oportunidades(visita_id)",
+        # Case-insensitive business lookup in get_or_create_business
+        "CREATE INDEX IF NOT EXISTS idx_businesses_lower ON businesses(LOWER(nombre), LOWER(direccion))",
+    ]),
+    Migration(3, "search_index", [
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+            business_id UNINDEXED, nombre, direccion, texto, contacto,
+            tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+        )
+        """,
+        _search_triggers,
+        _populate_search,
+    ]),
+    Migration(4, "business_ngrams", [
+        """
+        CREATE TABLE IF NOT EXISTS business_ngrams (
+            gram TEXT NOT NULL,
+            business_id INTEGER NOT NULL,
+            PRIMARY KEY (gram, business_id)
+        ) WITHOUT ROWID
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS business_gram_counts (
+            gram TEXT PRIMARY KEY,
+            n INTEGER NOT NULL
+        ) WITHOUT ROWID
+        """,
+        _populate_business_grams,
+        # merge_businesses re-points records by business_id
+        "CREATE INDEX IF NOT EXISTS idx_visitas_business ON visitas(business_id)",
+        "CREATE INDEX IF NOT EXISTS idx_oportunidades_business ON oportunidades(business_id)",
+        "CREATE INDEX IF NOT EXISTS idx_ventas_business ON ventas(business_id)",
+    ]),
+    # Deleting a visit unlinks its opportunities and deleting an opportunity its
+    # sales in the same statement (the delete connections enable foreign_keys)
+    Migration(5, "delete_set_null", [
+        _on_delete("oportunidades", "visita_id", "SET NULL"),
+        _on_delete("ventas", "oportunidad_id", "SET NULL"),
+        # The foreign key finds the sales of a deleted opportunity by oportunidad_id
+        "CREATE INDEX IF NOT EXISTS idx_ventas_oportunidad ON ventas(oportunidad_id)",
+    ]),
+    Migration(6, "events", [
+        """
+        CREATE TABLE IF NOT EXISTS events (
+            id INTEGER PRIMARY KEY,
+            entity INTEGER NOT NULL,
+            row_id INTEGER NOT NULL,
+            kind INTEGER NOT NULL,
+            at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            data TEXT NOT NULL
+        )
+        """,
+        # History of one record (opportunity_timeline)
+        "CREATE INDEX IF NOT EXISTS idx_events_row ON events(entity, row_id)",
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_events_no_update BEFORE UPDATE ON events
+        BEGIN
+            SELECT RAISE(ABORT, 'events is append-only');
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_events_no_delete BEFORE DELETE ON events
+        BEGIN
+            SELECT RAISE(ABORT, 'events is append-only');
+        END
+        """,
+        _seed_events,
+        _event_triggers,
+    ]),
+    # Structured due date of the next action (followups.py, kpis.aging_report)
+    Migration(7, "followups", [
+        _add_columns("oportunidades", {"fecha_siguiente_accion": "DATE"}),
+        # The event JSON lists the columns, rebuild it with the new one
+        _event_triggers,
+    ]),
+    # Precomputed KPIs page figures (snapshots.py)
+    Migration(8, "kpi_snapshots", [
+        """
+        CREATE TABLE IF NOT EXISTS kpi_snapshots (
+            id INTEGER PRIMARY KEY,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            data TEXT NOT NULL
+        )
+        """,
+    ]),
+]
+
+# Database files already migrated by this process: path -> (inode, version).
+# The inode catches a file deleted and recreated under the same name.
+_migrated: Dict[str, Tuple[int, int]] = {}
+_lock = threading.Lock()
+# Seconds to wait for another process's migration to finish (large backfills take a while)
+LOCK_TIMEOUT = 300
+
+
+def _inode(path: Path) -> Optional[int]:
+    try:
+        return path.stat().st_ino
+    except FileNotFoundError:
+        return None
+
+
+def _is_migrated(key: str, db_path: Path) -> bool:
+    inode = _inode(db_path)
+    return inode is not None and key in _migrated and _migrated[key][0] == inode
+
+
+def current_version(conn: sqlite3.Connection) -> int:
+    """Highest applied version (0 for a new database or one from before schema_version)"""
+    try:
+        return conn.execute("SELECT MAX(version) FROM schema_version").fetchone()[0] or 0
+    except sqlite3.OperationalError:
+        return 0
+
+
+def _apply(conn: sqlite3.Connection, migration: Migration) -> bool:
+    """
+    Run one migration in a transaction.
+
+    Returns:
+        False if another process applied it first (sessions started together
+        race to migrate the same file)
+    """
+    # Take the write lock before checking, so the loser waits and then skips
+    conn.execute("BEGIN IMMEDIATE")
+    if current_version(conn) >= migration.version:
+        conn.execute("ROLLBACK")
+        return False
+    logger.info(f"Applying migration {migration.version} ({migration.name})")
+    try:
+        for step in migration.steps:
+            if callable(step):
+                step(conn)
+            else:
+                conn.execute(step)
+        conn.execute(SCHEMA_VERSION_DDL)
+        conn.execute("INSERT OR IGNORE INTO schema_version (version, name) VALUES (?, ?)",
+                     (migration.version, migration.name))
+    except BaseException:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+    return True
+
+
+def migrate(db_path: Path, migrations: Sequence[Migration] = SQLITE_MIGRATIONS) -> List[int]:
+    """
+    Apply pending migrations to db_path, once per process per file.
+
+    Returns:
+        Versions applied by this call (empty when already up to date)
+    """
+    db_path = Path(db_path)
+    key = str(db_path.resolve())
+    if _is_migrated(key, db_path):
+        return []
+    with _lock:
+        if _is_migrated(key, db_path):
+            return []
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        # Autocommit mode: _apply issues BEGIN/COMMIT itself so DDL is transactional
+        conn = sqlite3.connect(db_path, isolation_level=None, timeout=LOCK_TIMEOUT)
+        try:
+            version = current_version(conn)
+            applied = []
+            for migration in migrations:
+                if migration.version > version:
+                    if _apply(conn, migration):
+                        applied.append(migration.version)
+                    version = migration.version
+        finally:
+            conn.close()
+        _migrated[key] = (_inode(db_path), version)
+        return applied
+
+
+# --- Supabase ---
+
+_FILE_NAME = re.compile(r"^(\d+)_(\w+)\.sql$")
+_supabase_checked = False
+
+
+@dataclass
+class SqlMigration:
+    version: int
+    name: str
+    path: Path
+
+    @property
+    def sql(self) -> str:
+        return self.path.read_text(encoding="utf-8")
+
+    def directive(self, name: str) -> bool:
+        """``-- migrate: <name>`` header line"""
+        return re.search(rf"^--\s*migrate:\s*{name}\s*$", self.sql, re.MULTILINE) is not None
+
+
+def supabase_migrations(directory: Path = SUPABASE_DIR) -> List[SqlMigration]:
+    found = []
+    for path in sorted(directory.glob("*.sql")):
+        match = _FILE_NAME.match(path.name)
+        if match:
+            found.append(SqlMigration(int(match.group(1)), match.group(2), path))
+    return found
+
+
+def supabase_version(client) -> int:
+    """Remote schema version through PostgREST (0 if schema_version doesn't exist yet)"""
+    try:
+        response = client.table("schema_version").select("version").order("version", desc=True).limit(1).execute()
+    except Exception:
+        return 0
+    return response.data[0]["version"] if response.data else 0
+
+
+def check_supabase(client) -> List[SqlMigration]:
+    """
+    Log the migrations the Supabase project is missing (once per process).
+    PostgREST can't run DDL, so the app never applies them itself.
+    """
+    global _supabase_checked
+    if _supabase_checked:
+        return []
+    _supabase_checked = True
+    version = supabase_version(client)
+    pending = [m for m in supabase_migrations() if m.version > version]
+    if pending:
+        logger.warning(
+            f"Supabase schema at version {version}, pending: "
+            f"{', '.join(p.path.name for p in pending)} (python app/migrations.py --supabase --apply)"
+        )
+    return pending
+
+
+def _statements(sql: str) -> List[str]:
+    """Statements of a migration file: split at a ; ending a line, comment-only chunks dropped"""
+    statements = []
+    for chunk in re.split(r";[ \t]*$", sql, flags=re.MULTILINE):
+        code = [line for line in chunk.splitlines() if line.strip() and not line.strip().startswith("--")]
+        if code:
+            statements.append(chunk.strip())
+    return statements
+
+
+def apply_supabase(db_url: str, migrations: Optional[List[SqlMigration]] = None) -> List[int]:
+    """
+    Apply pending Supabase migrations over a direct Postgres connection.
+
+    Files run in one transaction unless marked ``-- migrate: no-transaction``
+    (needed for CREATE INDEX CONCURRENTLY). ``-- migrate: batched`` files run
+    each statement until it updates no more rows, committing every batch.
+    """
+    try:
+        import psycopg
+    except ImportError as e:
+        raise RuntimeError("Applying Supabase migrations needs psycopg: pip install 'psycopg[binary]'") from e
+
+    applied = []
+    with psycopg.connect(db_url, autocommit=True) as conn:
+        # 0001 creates schema_version itself
+        exists = conn.execute("SELECT to_regclass('public.schema_version')").fetchone()[0]
+        version = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()[0] or 0 if exists else 0
+        for migration in migrations or supabase_migrations():
+            if migration.version <= version:
+                continue
+            logger.info(f"Applying Supabase migration {migration.path.name}")
+            if migration.directive("batched"):
+                for statement in _statements(migration.sql):
+                    while conn.execute(statement).rowcount > 0:
+                        pass
+            elif migration.directive("no-transaction"):
+                for statement in _statements(migration.sql):
+                    conn.execute(statement)
+            else:
+                with conn.transaction():
+                    conn.execute(migration.sql)
+            conn.execute("INSERT INTO schema_version (version, name) VALUES (%s, %s)",
+                         (migration.version, migration.name))
+            applied.append(migration.version)
+    return applied
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", type=Path, help="SQLite file (default: database.DB_PATH)")
+    parser.add_argument("--supabase", action="store_true", help="Work on the Supabase schema instead")
+    parser.add_argument("--apply", action="store_true", help="Apply pending Supabase migrations ([supabase] db_url)")
+    parser.add_argument("--sql", action="store_true", help="Print the pending Supabase SQL for the SQL editor")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    if not args.supabase:
+        import database
+
+        db_path = args.db or database.DB_PATH
+        applied = migrate(db_path)
+        print(f"✅ {db_path}: versión {_migrated[str(Path(db_path).resolve())][1]}"
+              + (f" (aplicadas: {', '.join(map(str, applied))})" if applied else " (al día)"))
+        return
+
+    import config
+    from clients import get_supabase_client
+
+    if args.apply:
+        applied = apply_supabase(config.require("supabase", "db_url"))
+        print(f"✅ Supabase: aplicadas {', '.join(map(str, applied)) or 'ninguna (al día)'}")
+        return
+    version = supabase_version(get_supabase_client())
+    pending = [m for m in supabase_migrations() if m.version > version]
+    print(f"Supabase: versión {version}, pendientes: {', '.join(m.path.name for m in pending) or 'ninguna'}")
+    if args.sql:
+        for migration in pending:
+            print(f"\n-- {migration.path.name}\n{migration.sql}")
+            print(f"INSERT INTO schema_version (version, name) VALUES ({migration.version}, '{migration.name}');")
+
+
+if __name__ == "__main__":
+    main()
@@ -17,11 +17,11 @@ secrets.toml structure:
   emmanuel_phone  = "+51XXXXXXXXX"
 """
 
-import requests
-import streamlit as st
 from typing import Optional
 import logging
 
+import config
+
 logger = logging.getLogger(__name__)
 
 # Map rep names (lowercase) to their phone secret key
@@ -34,9 +34,9 @@ REP_PHONE_KEYS = {
 
 
 def _get_green_api_config() -> dict:
-    """Retrieve Green API config from st.secrets."""
+    """Retrieve Green API config ([green_api] in secrets.toml or LUX_GREEN_API_* env vars)."""
     try:
-        return st.secrets.get("green_api", {})
+        return config.section("green_api")
     except Exception:
         return {}
 
@@ -77,6 +77,9 @@ def send_whatsapp(rep_name: str, message: str) -> bool:
         logger.warning(f"WhatsApp: no phone configured for rep '{rep_name}'. Skipping.")
         return False
 
+    # Imported lazily, only needed when a message is actually sent
+    import requests
+
     try:
         cfg = _get_green_api_config()
         instance_id = cfg["instance_id"]
@@ -176,3 +179,33 @@ def notify_reassignment(
     )
 
     send_whatsapp(new_rep_name, message)
+
+
+def notify_followup_due(
+    rep_name: str,
+    opp_id: int,
+    nombre_negocio: str,
+    siguiente_accion: Optional[str],
+    fecha: str,
+    nombre_contacto: Optional[str],
+    celular_contacto: Optional[str],
+) -> bool:
+    """
+    Remind a rep that the next action of one of their opportunities is due today.
+    Returns True if the message was sent.
+    """
+    accion_str = siguiente_accion or "Pendiente definir"
+    contacto_str = nombre_contacto or "Sin nombre"
+    celular_str = celular_contacto or "Sin número"
+
+    message = (
+        f"⏰ *Seguimiento Pendiente* | Lux Dashboard\n\n"
+        f"Hola {rep_name}! Hoy ({fecha}) vence la siguiente acción de la oportunidad #{opp_id}.\n\n"
+        f"🏢 *Negocio:* {nombre_negocio}\n"
+        f"👤 *Contacto:* {contacto_str} | {celular_str}\n"
+        f"➡️ *Siguiente Acción:* {accion_str}\n\n"
+        f"👉 Gestiona esta oportunidad aquí:\n"
+        f"https://lux-dashboard.streamlit.app"
+    )
+
+    return send_whatsapp(rep_name, message)
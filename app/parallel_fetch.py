@@ -0,0 +1,109 @@
+"""
+Concurrent fetch of independent getters
+
+Each Supabase getter is a blocking HTTP round trip. Issuing the independent
+ones together on a small thread pool makes page latency the slowest round
+trip instead of the sum of all of them.
+"""
+
+import contextvars
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_MAX_WORKERS = 8
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+@dataclass
+class FetchTimings:
+    """Per-call durations of one parallel fetch, in milliseconds"""
+    calls: Dict[str, float] = field(default_factory=dict)
+    wall_ms: float = 0.0
+
+    @property
+    def sequential_ms(self) -> float:
+        """What the same calls would have cost one after another"""
+        return sum(self.calls.values())
+
+    def summary(self) -> str:
+        parts = " ".join(f"{name}={ms:.0f}ms" for name, ms in self.calls.items())
+        return f"{parts} | wall {self.wall_ms:.0f}ms vs sequential {self.sequential_ms:.0f}ms"
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=_MAX_WORKERS, thread_name_prefix="lux-fetch")
+        return _executor
+
+
+def _with_script_context(fn: Callable[[], Any]) -> Callable[[], Any]:
+    """Let worker threads use st.cache_resource/st.secrets like the calling script"""
+    try:
+        from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+    except ImportError:
+        return fn
+    script_ctx = get_script_run_ctx()
+    if script_ctx is None:
+        return fn
+
+    def run():
+        add_script_run_ctx(threading.current_thread(), script_ctx)
+        return fn()
+    return run
+
+
+def fetch_parallel(calls: Dict[str, Callable[[], Any]]) -> Tuple[Dict[str, Any], FetchTimings]:
+    """
+    Run independent zero-argument calls concurrently and wait for all of them
+
+    Args:
+        calls: Name -> callable, e.g. {"visitas": lambda: get_visitas_by_period(a, b)}
+
+    Returns:
+        (results by name, timings). If a call raised, its exception is re-raised
+        after every call has finished.
+    """
+    timings = FetchTimings()
+    start = time.perf_counter()
+
+    if len(calls) == 1:
+        # Nothing to overlap, skip the pool hop
+        (name, fn), = calls.items()
+        results = {name: fn()}
+        timings.calls[name] = timings.wall_ms = (time.perf_counter() - start) * 1000
+        return results, timings
+
+    def timed(name: str, fn: Callable[[], Any]):
+        t0 = time.perf_counter()
+        try:
+            return fn()
+        finally:
+            timings.calls[name] = (time.perf_counter() - t0) * 1000
+
+    executor = _get_executor()
+    # Each call runs in a copy of the caller's context (per-run instrumentation, see instrumentation.py)
+    futures = {name: executor.submit(contextvars.copy_context().run,
+                                     _with_script_context(lambda n=name, f=fn: timed(n, f)))
+               for name, fn in calls.items()}
+
+    results, error = {}, None
+    for name, future in futures.items():
+        try:
+            results[name] = future.result()
+        except Exception as e:
+            error = error or e
+    timings.wall_ms = (time.perf_counter() - start) * 1000
+    logger.info(f"Parallel fetch: {timings.summary()}")
+
+    if error is not None:
+        raise error
+    return results, timings
@@ -0,0 +1,242 @@
+"""
+Local SQLite read replica of the Supabase tables
+
+Mirrors businesses, visitas, oportunidades and ventas into a SQLite database
+with the schema from database.py and serves the getters from it. Syncs are
+incremental: each table keeps an ``updated_at`` high-water mark and only rows
+changed since then are pulled (migrations/supabase/0013_updated_at.sql keeps
+``updated_at`` current on every update). Deletes don't move ``updated_at``, so every few
+syncs the local ids are reconciled against the remote ids.
+
+Syncs (and reconciles) only run on a background thread: every
+``max_staleness`` seconds, and sooner when a write (database_supabase marks
+the replica stale) or a read on a stale replica wakes it. Reads never wait for
+a sync, they serve the replica as it is meanwhile. Until the first sync of the
+process is in, getters go straight to Supabase (``active_replica`` is None).
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import database
+
+logger = logging.getLogger(__name__)
+
+REPLICA_PATH = Path(__file__).parent / "data" / "lux_replica.db"
+
+# Parents first so foreign keys resolve when rows are applied in order
+TABLES = ["businesses", "visitas", "oportunidades", "ventas"]
+
+PAGE_SIZE = 1000
+# Re-read a little before the high-water mark: rows committed by slow
+# transactions can carry an updated_at slightly older than rows already seen
+OVERLAP = timedelta(seconds=5)
+
+_replica: Optional["Replica"] = None
+
+
+class Replica:
+    """SQLite mirror of the Supabase tables with bounded staleness"""
+
+    def __init__(self, client, db_path: Path = REPLICA_PATH, max_staleness: float = 30.0,
+                 reconcile_every: int = 20):
+        """
+        Args:
+            client: Supabase client (or fake_supabase.FakeSupabase) used to pull rows
+            db_path: Replica database file
+            max_staleness: Seconds between background syncs
+            reconcile_every: Syncs between full id reconciliations (to drop deletes)
+        """
+        self.client = client
+        self.db_path = Path(db_path)
+        self.max_staleness = max_staleness
+        self.reconcile_every = reconcile_every
+        self.last_sync = 0.0
+        self._syncs = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        database.init_database(self.db_path)
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS replica_state (
+                table_name TEXT PRIMARY KEY,
+                high_water_mark TEXT
+            )
+        """)
+        conn.commit()
+        self._columns = {t: [r[1] for r in conn.execute(f"PRAGMA table_info({t})")] for t in TABLES}
+        conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path)
+
+    # --- sync ---
+
+    def _high_water_mark(self, conn: sqlite3.Connection, table: str) -> Optional[str]:
+        row = conn.execute("SELECT high_water_mark FROM replica_state WHERE table_name = ?", (table,)).fetchone()
+        return row[0] if row else None
+
+    def _pull(self, table: str, since: Optional[str]) -> List[Dict[str, Any]]:
+        """Rows changed since the mark, oldest change first, paginated"""
+        rows, offset = [], 0
+        while True:
+            query = self.client.table(table).select("*")
+            if since:
+                query = query.gte("updated_at", since)
+            batch = query.order("updated_at").order("id").range(offset, offset + PAGE_SIZE - 1).execute().data
+            rows.extend(batch)
+            if len(batch) < PAGE_SIZE:
+                return rows
+            offset += PAGE_SIZE
+
+    def _upsert(self, conn: sqlite3.Connection, table: str, rows: List[Dict[str, Any]]) -> None:
+        columns = [c for c in self._columns[table] if c in rows[0]]
+        placeholders = ", ".join("?" * len(columns))
+        conn.executemany(
+            f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) VALUES ({placeholders})",
+            [tuple(r.get(c) for c in columns) for r in rows]
+        )
+
+    def _reconcile(self, conn: sqlite3.Connection, table: str) -> int:
+        """Delete local rows whose id no longer exists remotely"""
+        remote_ids, offset = set(), 0
+        while True:
+            batch = self.client.table(table).select("id").order("id").range(offset, offset + PAGE_SIZE - 1).execute().data
+            remote_ids.update(r['id'] for r in batch)
+            if len(batch) < PAGE_SIZE:
+                break
+            offset += PAGE_SIZE
+        local_ids = {r[0] for r in conn.execute(f"SELECT id FROM {table}")}
+        gone = local_ids - remote_ids
+        conn.executemany(f"DELETE FROM {table} WHERE id = ?", [(i,) for i in gone])
+        return len(gone)
+
+    def sync(self) -> Dict[str, int]:
+        """
+        Pull changes from Supabase into the replica
+
+        Returns:
+            Rows applied per table
+        """
+        with self._lock:
+            conn = self._connect()
+            applied = {}
+            try:
+                reconcile = self._syncs % self.reconcile_every == 0
+                # Children first on reconcile so parent deletes don't trip foreign keys
+                if reconcile:
+                    for table in reversed(TABLES):
+                        self._reconcile(conn, table)
+
+                for table in TABLES:
+                    mark = self._high_water_mark(conn, table)
+                    since = None
+                    if mark:
+                        since = (datetime.fromisoformat(mark) - OVERLAP).isoformat()
+                    rows = self._pull(table, since)
+                    if rows:
+                        self._upsert(conn, table, rows)
+                        new_mark = max(str(r['updated_at']) for r in rows)
+                        if not mark or new_mark > mark:
+                            conn.execute(
+                                "INSERT OR REPLACE INTO replica_state (table_name, high_water_mark) VALUES (?, ?)",
+                                (table, new_mark)
+                            )
+                    applied[table] = len(rows)
+                conn.commit()
+            finally:
+                conn.close()
+            self._syncs += 1
+            self.last_sync = time.monotonic()
+        logger.info(f"Replica sync: {applied}")
+        return applied
+
+    def trigger(self) -> None:
+        """Sync on the background thread now instead of at the next interval"""
+        self._wake.set()
+
+    def mark_stale(self) -> None:
+        """Sync soon (e.g. right after a write) without waiting for it"""
+        self.last_sync = 0.0
+        self.trigger()
+
+    def ensure_fresh(self) -> None:
+        """Wake the background sync if the replica is stale; the read goes on with it as it is"""
+        if time.monotonic() - self.last_sync > self.max_staleness:
+            self.trigger()
+
+    def start(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, daemon=True, name="lux-replica")
+            self._thread.start()
+
+    def _run(self) -> None:
+        global _replica
+        while True:
+            try:
+                self.sync()
+                # Route getters here once the replica holds a full copy
+                _replica = self
+            except Exception:
+                logger.exception("Replica sync failed")
+            self._wake.wait(self.max_staleness)
+            self._wake.clear()
+
+    @property
+    def staleness(self) -> float:
+        """Seconds since the last sync"""
+        return time.monotonic() - self.last_sync
+
+    # --- getters (same shape as database_supabase's) ---
+
+    def get_visitas_by_period(self, start_date: date, end_date: date) -> List[Dict[str, Any]]:
+        self.ensure_fresh()
+        conn = self._connect()
+        try:
+            return database.query_visitas_by_period(conn, start_date, end_date)
+        finally:
+            conn.close()
+
+    def get_oportunidades_activas(self) -> List[Dict[str, Any]]:
+        self.ensure_fresh()
+        conn = self._connect()
+        try:
+            return database.query_oportunidades_activas(conn)
+        finally:
+            conn.close()
+
+    def get_ventas_by_period(self, start_date: date, end_date: date) -> List[Dict[str, Any]]:
+        self.ensure_fresh()
+        conn = self._connect()
+        try:
+            return database.query_ventas_by_period(conn, start_date, end_date)
+        finally:
+            conn.close()
+
+    def search(self, text: str, limit: int = 20) -> List[Dict[str, Any]]:
+        # The replica has the SQLite schema, so its search_index is filled by the sync's inserts
+        self.ensure_fresh()
+        conn = self._connect()
+        try:
+            return database.query_search(conn, text, limit)
+        finally:
+            conn.close()
+
+
+def start_replica(client, db_path: Path = REPLICA_PATH, max_staleness: float = 30.0) -> Replica:
+    """Create the process-wide replica and start its sync thread (getters move to it after the first sync)"""
+    replica = Replica(client, db_path, max_staleness)
+    replica.start()
+    return replica
+
+
+def active_replica() -> Optional[Replica]:
+    """The running replica, or None if reads go straight to Supabase"""
+    return _replica
@@ -0,0 +1,138 @@
+"""
+Storage engine selection for Lux Sales Dashboard
+
+Pages talk to a Repository instead of importing a backend module. Each engine
+is a module exposing the same functions:
+
+    supabase  database_supabase   Supabase/Postgres (default, Streamlit Cloud)
+    sqlite    database            local SQLite file (data/lux_sales.db)
+    memory    database_memory     in-process lists, for tests and benchmarks
+
+The engine comes from the LUX_DB_ENGINE environment variable, or from
+secrets.toml:
+
+    [database]
+    engine = "sqlite"
+"""
+
+import importlib
+import os
+from datetime import date
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Protocol
+
+import config
+
+ENGINES = {
+    "supabase": "database_supabase",
+    "sqlite": "database",
+    "memory": "database_memory",
+}
+
+DEFAULT_ENGINE = "supabase"
+
+
+class Repository(Protocol):
+    """Functions every engine module provides (engines stay at feature parity)"""
+
+    def init_database(self) -> None: ...
+
+    def get_or_create_business(self, nombre: str, tipo_negocio: str, direccion: str) -> int: ...
+
+    def find_similar_businesses(self, nombre: str, direccion: str, limit: int = 5) -> List[Dict[str, Any]]: ...
+
+    def get_businesses(self) -> List[Dict[str, Any]]: ...
+
+    def merge_businesses(self, keep_id: int, duplicate_ids: List[int]) -> int: ...
+
+    def create_visita(self, nombre: str, tipo_negocio: str, direccion: str,
+                      fecha: date, semana: str, notas: Optional[str] = None) -> int: ...
+
+    def update_visita(self, visita_id: int, nombre: str, tipo_negocio: str, direccion: str,
+                      fecha: date, semana: str, notas: Optional[str] = None,
+                      original: Optional[Dict[str, Any]] = None) -> None: ...
+
+    def delete_visita(self, visita_id: int) -> None: ...
+
+    def delete_visitas(self, visita_ids: Iterable[int]) -> int: ...
+
+    def create_oportunidad(self, nombre: str, tipo_negocio: str, direccion: str,
+                           fecha_contacto: date, semana: str, m2_estimado: Optional[int] = None,
+                           producto_interes: Optional[str] = None, siguiente_accion: Optional[str] = None,
+                           visita_id: Optional[int] = None, source: Optional[str] = None,
+                           nombre_contacto: Optional[str] = None, cargo_contacto: Optional[str] = None,
+                           celular_contacto: Optional[str] = None, email_contacto: Optional[str] = None,
+                           fecha_siguiente_accion: Optional[date] = None) -> int: ...
+
+    def update_oportunidad(self, oportunidad_id: int, nombre: str, tipo_negocio: str, direccion: str,
+                           fecha_contacto: date, semana: str, m2_estimado: Optional[int] = None,
+                           producto_interes: Optional[str] = None, siguiente_accion: Optional[str] = None,
+                           source: Optional[str] = None,
+                           nombre_contacto: Optional[str] = None, cargo_contacto: Optional[str] = None,
+                           celular_contacto: Optional[str] = None, email_contacto: Optional[str] = None,
+                           asignado_a: Optional[str] = None, fecha_siguiente_accion: Optional[date] = None,
+                           original: Optional[Dict[str, Any]] = None) -> None: ...
+
+    def mark_opportunity_lost(self, oportunidad_id: int, motivo_perdida: str) -> None: ...
+
+    def delete_oportunidad(self, oportunidad_id: int) -> None: ...
+
+    def delete_oportunidades(self, oportunidad_ids: Iterable[int]) -> int: ...
+
+    def create_venta(self, venta_id: str, nombre: str, tipo_negocio: str, direccion: str,
+                     fecha_cierre: date, semana: str, m2_real: int, producto: str,
+                     monto_soles: float, fecha_instalacion: Optional[date] = None,
+                     oportunidad_id: Optional[int] = None) -> int: ...
+
+    def update_venta(self, venta_pk: int, nombre: str, tipo_negocio: str, direccion: str,
+                     fecha_cierre: date, semana: str, m2_real: int, producto: str,
+                     monto_soles: float, fecha_instalacion: Optional[date] = None,
+                     original: Optional[Dict[str, Any]] = None) -> None: ...
+
+    def delete_ventas(self, venta_pks: Iterable[int]) -> int: ...
+
+    def get_visitas_by_period(self, start_date: date, end_date: date) -> List[Dict[str, Any]]: ...
+
+    def get_oportunidades_activas(self) -> List[Dict[str, Any]]: ...
+
+    def get_ventas_by_period(self, start_date: date, end_date: date) -> List[Dict[str, Any]]: ...
+
+    def get_events(self, since_id: int = 0, entity: Optional[str] = None, row_id: Optional[int] = None,
+                   limit: int = 5000) -> List[Dict[str, Any]]: ...
+
+    def save_kpi_snapshot(self, data: Dict[str, Any]) -> int: ...
+
+    def get_kpi_snapshot(self) -> Optional[Dict[str, Any]]: ...
+
+    def generate_venta_id(self) -> str: ...
+
+    def search(self, text: str, limit: int = 20) -> List[Dict[str, Any]]: ...
+
+    def get_week_number(self, date_obj: date) -> str: ...
+
+
+# Names every engine module must define
+OPERATIONS = [name for name in vars(Repository) if not name.startswith("_")]
+
+
+def engine_name() -> str:
+    """Configured engine: LUX_DB_ENGINE, then [database] engine in secrets, then supabase"""
+    name = os.environ.get("LUX_DB_ENGINE") or config.get("database", "engine")
+    return (name or DEFAULT_ENGINE).lower()
+
+
+def load_engine(name: str) -> Repository:
+    """Import an engine module and check it implements every operation"""
+    if name not in ENGINES:
+        raise ValueError(f"Unknown database engine '{name}' (expected one of: {', '.join(ENGINES)})")
+    module = importlib.import_module(ENGINES[name])
+    missing = [op for op in OPERATIONS if not callable(getattr(module, op, None))]
+    if missing:
+        raise AttributeError(f"Engine '{name}' ({module.__name__}) is missing: {', '.join(missing)}")
+    return module
+
+
+@lru_cache(maxsize=None)
+def get_repository(name: Optional[str] = None) -> Repository:
+    """The repository for the given engine (the configured one by default)"""
+    return load_engine(name or engine_name())
@@ -0,0 +1,225 @@
+"""
+KPI time series for Lux Sales Dashboard
+
+Charts get pre-aggregated series, never rows: the audit log projection
+(events.DailySeries) keeps per-day totals by rep and business type, updated
+per event, and ``series()`` buckets them into at most POINT_BUDGET points:
+
+- the bucket (day, ISO week, month, quarter, year) is the finest one whose
+  periods times the number of plotted groups fit the budget, so a multi-year
+  range comes back by month or quarter; a requested bucket that would exceed
+  the budget is coarsened the same way;
+- when grouped by rep or business type, the TOP_GROUPS largest groups of
+  the range get a series each and the rest are summed as "Otros";
+- empty buckets are 0, so lines do not interpolate over gaps.
+
+Expenses come from the Gastos workbook (passed in by the caller, grouped by
+its Tipo_Negocio; they have no rep). The daily table is rebuilt only when
+the last event id changes. ``trends()`` computes every series the KPIs page
+can show (metric x group x RANGES x bucket) for the snapshot worker, so the
+page charts without folding events. Pure pandas, no Streamlit.
+"""
+
+import threading
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from events import daily_cells, last_event_id
+
+# metric -> label; all but gastos come from events.DailySeries
+METRICS = {"visitas": "Visitas", "oportunidades": "Oportunidades", "ventas": "Ventas",
+           "ingresos": "Ingresos S/.", "m2": "m² vendidos", "gastos": "Gastos S/."}
+
+# Groupings: key -> (daily table column or None for one total series, label)
+GROUPS = {"total": (None, "Total"), "asesor": ("asesor", "Asesor"), "tipo_negocio": ("tipo_negocio", "Tipo de negocio")}
+
+# Buckets from finest to coarsest: pandas period frequency -> label (weeks start on Monday)
+BUCKETS = {"D": "Día", "W-SUN": "Semana", "M": "Mes", "Q": "Trimestre", "Y": "Año"}
+
+# Date ranges offered by the KPIs page: key -> label (see range_start)
+RANGES = {"3m": "Últimos 3 meses", "12m": "Últimos 12 meses", "anio": "Este año", "todo": "Todo"}
+
+POINT_BUDGET = 500
+TOP_GROUPS = 6
+
+COLUMNS = ["metric", "dia", "asesor", "tipo_negocio", "valor"]
+
+# Daily table per engine: key -> (event id, frame)
+_daily: Dict[Tuple[str, str], Tuple[int, pd.DataFrame]] = {}
+_daily_lock = threading.Lock()
+
+
+def daily_table(db) -> pd.DataFrame:
+    """events.DailySeries cells as a frame (COLUMNS), rebuilt only after new events"""
+    key = (db.__name__, str(getattr(db, "DB_PATH", "")))
+    version = last_event_id(db)
+    with _daily_lock:
+        cached = _daily.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    cells, version = daily_cells(db)
+    frame = pd.DataFrame(list(cells), columns=COLUMNS[:4])
+    frame["dia"] = pd.to_datetime(frame["dia"], errors="coerce")
+    frame["valor"] = list(cells.values())
+    frame = frame[frame["dia"].notna()]
+    with _daily_lock:
+        _daily[key] = (version, frame)
+    return frame
+
+
+def gastos_table(gastos: Optional[pd.DataFrame]) -> pd.DataFrame:
+    """The Gastos sheet (excel_reader) as daily-table rows (metric gastos, no rep)"""
+    if gastos is None or gastos.empty:
+        return pd.DataFrame({"metric": [], "dia": pd.Series(dtype="datetime64[ns]"), "asesor": [],
+                             "tipo_negocio": [], "valor": pd.Series(dtype=float)})
+    return pd.DataFrame({
+        "metric": "gastos",
+        "dia": pd.to_datetime(gastos["Fecha"], errors="coerce").dt.normalize(),
+        "asesor": "Sin asignar",
+        "tipo_negocio": gastos["Tipo_Negocio"].fillna("Sin dato"),
+        "valor": pd.to_numeric(gastos["Monto_Soles"], errors="coerce").fillna(0.0),
+    }).dropna(subset=["dia"])
+
+
+def pick_bucket(start: date, end: date, groups: int, bucket: str = "auto", budget: int = POINT_BUDGET) -> str:
+    """The requested bucket (or the finest for "auto"), coarsened until periods x groups fit the budget"""
+    names = list(BUCKETS)
+    for freq in names[0 if bucket == "auto" else names.index(bucket):]:
+        if len(pd.period_range(start, end, freq=freq)) * max(1, groups) <= budget:
+            return freq
+    return names[-1]
+
+
+def _select(rows: pd.DataFrame, metric: str, start: Optional[date], end: date,
+            by: str) -> Tuple[pd.DataFrame, pd.Series, List[str], date]:
+    """Rows of metric between start and end, their plotted group (top groups, rest "Otros"), the column names and start"""
+    rows = rows[rows["metric"] == metric]
+    if start is None:
+        start = rows["dia"].min().date() if not rows.empty else end
+    rows = rows[(rows["dia"] >= pd.Timestamp(start)) & (rows["dia"] <= pd.Timestamp(end))]
+
+    column, label = GROUPS[by]
+    group = rows[column] if column else pd.Series(label, index=rows.index)
+    totals = rows["valor"].groupby(group).sum().sort_values(ascending=False)
+    top = list(totals.index[:TOP_GROUPS])
+    group = group.where(group.isin(top), "Otros")
+    names = top + (["Otros"] if len(totals) > TOP_GROUPS else [])
+    return rows, group, names or [label], start
+
+
+def _bucket(rows: pd.DataFrame, group: pd.Series, names: List[str], start: date, end: date, freq: str) -> pd.DataFrame:
+    periods = pd.period_range(start, end, freq=freq)
+    wide = rows["valor"].groupby([rows["dia"].dt.to_period(freq), group]).sum().unstack(fill_value=0)
+    wide = wide.reindex(index=periods, columns=names, fill_value=0)
+    wide.index = wide.index.to_timestamp()
+    wide.index.name = BUCKETS[freq]
+    return wide
+
+
+def series(db, metric: str, start: Optional[date], end: date, by: str = "total", bucket: str = "auto",
+           budget: int = POINT_BUDGET, gastos: Optional[pd.DataFrame] = None) -> Tuple[pd.DataFrame, str]:
+    """
+    One metric between start and end, bucketed to fit the point budget
+
+    Args:
+        metric: Key of METRICS
+        start: First day (None: the metric's first day)
+        by: Key of GROUPS
+        bucket: Key of BUCKETS, or "auto"
+        gastos: The Gastos sheet, for metric gastos
+
+    Returns:
+        (frame indexed by bucket start with one column per group, largest
+        first and "Otros" last, the bucket used)
+    """
+    table = gastos_table(gastos) if metric == "gastos" else daily_table(db)
+    rows, group, names, start = _select(table, metric, start, end, by)
+    freq = pick_bucket(start, end, len(names), bucket, budget)
+    return _bucket(rows, group, names, start, end, freq), freq
+
+
+def range_start(rango: str, today: date) -> Optional[date]:
+    """First day of a RANGES key (None: all data)"""
+    return {"3m": today - timedelta(days=90), "12m": today - timedelta(days=365),
+            "anio": date(today.year, 1, 1)}.get(rango)
+
+
+def trends(db, today: date, gastos: Optional[pd.DataFrame] = None) -> Dict[str, Any]:
+    """
+    Every series the KPIs page can chart, for a snapshot (snapshots.py):
+    metric -> group -> range -> {"buckets": requested bucket or "auto" ->
+    bucket used, "frames": bucket used -> encode(frame)}. Metric gastos only
+    with a Gastos sheet. Same frames as series(), from one dense daily
+    matrix per metric and group whose coarser buckets are sums over
+    contiguous days.
+    """
+    table = daily_table(db)
+    if gastos is not None and not gastos.empty:
+        table = pd.concat([table, gastos_table(gastos)], ignore_index=True)
+    starts = {rango: range_start(rango, today) for rango in RANGES}
+    first = min([s for s in starts.values() if s is not None]
+                + ([table["dia"].min().date()] if not table.empty else []))
+    days = pd.date_range(first, today, freq="D")
+    # Per bucket: the start of each day's bucket
+    bucket_starts = {freq: days.to_period(freq).to_timestamp() for freq in BUCKETS}
+
+    result: Dict[str, Any] = {}
+    for metric in METRICS:
+        rows = table[table["metric"] == metric]
+        if metric == "gastos" and rows.empty:
+            continue
+        result[metric] = {}
+        for by in GROUPS:
+            column, label = GROUPS[by]
+            if column and rows.empty:
+                values = counts = pd.DataFrame(index=days)
+            elif column:
+                cells = rows.groupby(["dia", column])["valor"].agg(["sum", "size"]).unstack(fill_value=0)
+                values, counts = cells["sum"].reindex(days, fill_value=0), cells["size"].reindex(days, fill_value=0)
+            else:
+                cells = rows.groupby("dia")["valor"].agg(["sum", "size"]).reindex(days, fill_value=0)
+                values, counts = cells[["sum"]].set_axis([label], axis=1), cells[["size"]].set_axis([label], axis=1)
+
+            result[metric][by] = {}
+            for rango, start in starts.items():
+                if start is None:
+                    start = rows["dia"].min().date() if not rows.empty else today
+                offset = days.searchsorted(pd.Timestamp(start))
+                window = values.iloc[offset:]
+                # Groups with rows in the range, largest first (as in _select)
+                present = counts.columns[counts.iloc[offset:].sum().to_numpy() > 0]
+                totals = window[present].sum().sort_values(ascending=False)
+                top = list(totals.index[:TOP_GROUPS])
+                names = top + (["Otros"] if len(totals) > TOP_GROUPS else [])
+                matrix = window[top].to_numpy(dtype=float)
+                if "Otros" in names:
+                    matrix = np.column_stack([matrix, window.drop(columns=top).to_numpy(dtype=float).sum(axis=1)])
+                if not names:
+                    names, matrix = [label], np.zeros((len(window), 1))
+
+                buckets = {b: pick_bucket(start, today, len(names), b) for b in ["auto", *BUCKETS]}
+                frames = {}
+                for freq in set(buckets.values()):
+                    stamps = bucket_starts[freq][offset:]
+                    edges = np.flatnonzero(np.r_[True, stamps[1:] != stamps[:-1]])
+                    wide = pd.DataFrame(np.add.reduceat(matrix, edges, axis=0), index=stamps[edges], columns=names)
+                    frames[freq] = encode(wide)
+                result[metric][by][rango] = {"buckets": buckets, "frames": frames}
+    return result
+
+
+def encode(frame: pd.DataFrame) -> Dict[str, Any]:
+    """A series() frame as JSON-serializable lists"""
+    return {"index": [d.strftime("%Y-%m-%d") for d in frame.index], "columns": [str(c) for c in frame.columns],
+            "values": frame.round(2).values.tolist()}
+
+
+def decode(data: Dict[str, Any], freq: str) -> pd.DataFrame:
+    """The frame of encode()"""
+    frame = pd.DataFrame(data["values"], index=pd.to_datetime(data["index"]), columns=data["columns"])
+    frame.index.name = BUCKETS[freq]
+    return frame
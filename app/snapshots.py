@@ -0,0 +1,342 @@
+"""
+KPI snapshots for Lux Sales Dashboard
+
+The KPIs page figures (monthly summary, funnel, per-rep leaderboard, the
+month's expense breakdown, the pipeline aging report, every trend chart and
+the weekly and per-rep rollups) are computed off the request path and stored
+as one JSON row in ``kpi_snapshots``; the page renders the latest row and
+shows how old it is, without reading or folding the event log.
+
+A worker refreshes the snapshot:
+
+- every ``interval`` seconds (default 15 min), so date-relative figures
+  (this month, days open) move on even without writes;
+- after writes: every ``check_every`` seconds it reads at most one audit
+  event after the snapshot's ``last_event_id`` (one indexed read), so writes
+  from any process or rep are reflected within seconds;
+- on demand with ``trigger()`` (the page's "Actualizar ahora").
+
+It runs in the dashboard process (secrets.toml) or as a separate worker:
+
+    [snapshots]
+    enabled = true
+    interval = 900
+    check_every = 10
+
+    python app/snapshots.py [--engine sqlite] [--interval 900] [--once]
+
+When the latest snapshot is stale (from another day or older than
+STALE_AFTER) the page still renders it, marked as such, and kicks a refresh
+in the background: the worker's ``trigger()``, or a one-off thread when this
+process runs no worker. It only computes one inline when there is nothing to
+render (no snapshot yet, or one of an older SNAPSHOT_FORMAT), once per
+deploy or format change.
+
+On a Supabase project without the ``kpi_snapshots`` table (migration
+0012_kpi_snapshots.sql) snapshots are computed live and kept in memory;
+without the ``events`` table (0010_events.sql) they leave out the trends
+and rollups and count only active opportunities. Both log a warning.
+"""
+
+import argparse
+import logging
+import threading
+import time
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, Optional
+
+import pandas as pd
+
+from constants import SNAPSHOT_FORMAT
+from events import current_rows, kpi_rollups
+from excel_reader import costos_summary, read_gastos_excel
+from kpis import AGING_GROUPS, aging_report, monthly_summary, rep_leaderboard, sales_funnel
+from series import trends
+
+logger = logging.getLogger(__name__)
+
+REFRESH_INTERVAL = 900.0
+CHECK_EVERY = 10.0
+
+# Age after which the page marks a snapshot as stale and refreshes it in the background
+STALE_AFTER = 2 * REFRESH_INTERVAL
+
+# Weeks of weekly rollups kept in a snapshot
+ROLLUP_WEEKS = 12
+
+# Error codes/messages of a read from a missing table: PostgREST, Postgres, SQLite
+MISSING_TABLE = ("PGRST205", "42P01", "no such table")
+
+_worker: Optional["SnapshotWorker"] = None
+
+# Latest snapshot computed by this process when it could not be stored
+_unstored: Optional[Dict[str, Any]] = None
+
+# Held while a one-off background refresh (no worker in this process) runs
+_refreshing = threading.Lock()
+
+# Missing tables already warned about
+_warned = set()
+
+
+def _missing_table(error: Exception, table: str, migration: str) -> bool:
+    """Whether error is a read from a missing table (logged once per table)"""
+    if not any(marker in f"{getattr(error, 'code', '')} {error}" for marker in MISSING_TABLE):
+        return False
+    if table not in _warned:
+        _warned.add(table)
+        logger.warning(f"No {table} table (Supabase migration {migration} pending): {error}")
+    return True
+
+
+def _expenses(gastos: Optional[pd.DataFrame], month_start: date, today: date) -> Optional[Dict[str, Any]]:
+    """costos_summary of the month's expense rows, as plain floats; None without a workbook"""
+    if gastos is None or gastos.empty:
+        return None
+    summary = costos_summary(gastos[(gastos['Fecha'].dt.date >= month_start) & (gastos['Fecha'].dt.date <= today)])
+    return {key: ({str(k): round(float(v), 2) for k, v in value.items()} if isinstance(value, dict)
+                  else round(float(value), 2))
+            for key, value in summary.items()}
+
+
+def compute_snapshot(db, today: Optional[date] = None, gastos: Optional[pd.DataFrame] = None) -> Dict[str, Any]:
+    """
+    Every KPIs page figure, from the engine's getters and the audit log
+
+    Args:
+        db: Storage engine (repository.get_repository)
+        today: Reference day (default: today)
+        gastos: The Gastos sheet (excel_reader), or None to leave out the expenses
+
+    Returns:
+        JSON-serializable dict with formato (SNAPSHOT_FORMAT), generado
+        (epoch seconds), fecha, last_event_id, resumen (kpis.monthly_summary),
+        embudo (kpis.sales_funnel), asesores (kpis.rep_leaderboard),
+        gastos_mes (excel_reader.costos_summary of the month or None),
+        antiguedad (kpis.aging_report rows per AGING_GROUPS key), tendencias
+        (series.trends) and rollups (events.kpi_rollups, last ROLLUP_WEEKS
+        weeks). Without an event log last_event_id, tendencias and rollups
+        are None.
+    """
+    today = today or date.today()
+    week_start = today - timedelta(days=today.weekday())
+    month_start = date(today.year, today.month, 1)
+    generado = time.time()
+
+    # All estados, from the projection; writes after last_event_id trigger the next refresh
+    try:
+        oportunidades, last_event_id = current_rows(db, "oportunidades")
+    except Exception as e:
+        if not _missing_table(e, "events", "0010_events.sql"):
+            raise
+        oportunidades, last_event_id = db.get_oportunidades_activas(), None
+    rollups = kpi_rollups(db) if last_event_id is not None else None
+    activas = [o for o in oportunidades if (o.get('estado') or 'Activa') == 'Activa']
+    visitas_mes = db.get_visitas_by_period(min(week_start, month_start), today)
+    visitas_semana = [v for v in visitas_mes if str(v['fecha'])[:10] >= week_start.isoformat()]
+    visitas_mes = [v for v in visitas_mes if str(v['fecha'])[:10] >= month_start.isoformat()]
+    ventas_mes = db.get_ventas_by_period(month_start, today)
+
+    return {
+        "formato": SNAPSHOT_FORMAT,
+        "generado": generado,
+        "fecha": today.isoformat(),
+        "last_event_id": last_event_id,
+        "resumen": monthly_summary(visitas_semana, visitas_mes, activas, ventas_mes),
+        "embudo": sales_funnel(visitas_mes, oportunidades, month_start),
+        "asesores": rep_leaderboard(oportunidades, ventas_mes, month_start),
+        "gastos_mes": _expenses(gastos, month_start, today),
+        "antiguedad": {by: aging_report(activas, today, by).to_dict("records") for by in AGING_GROUPS},
+        "tendencias": trends(db, today, gastos) if last_event_id is not None else None,
+        "rollups": {"semanas": rollups["semanas"][-ROLLUP_WEEKS:], "asignados": rollups["asignados"]}
+                   if rollups is not None else None,
+    }
+
+
+def _stored(db) -> Optional[Dict[str, Any]]:
+    """The latest stored snapshot's data, or None (also when there is no kpi_snapshots table)"""
+    try:
+        stored = db.get_kpi_snapshot()
+    except Exception as e:
+        if not _missing_table(e, "kpi_snapshots", "0012_kpi_snapshots.sql"):
+            raise
+        return _unstored
+    return stored["data"] if stored else None
+
+
+def _save(db, data: Dict[str, Any]) -> None:
+    """Store a snapshot, in memory when there is no kpi_snapshots table"""
+    global _unstored
+    try:
+        db.save_kpi_snapshot(data)
+    except Exception as e:
+        if not _missing_table(e, "kpi_snapshots", "0012_kpi_snapshots.sql"):
+            raise
+        _unstored = data
+
+
+def _current(data: Optional[Dict[str, Any]], max_age: float) -> bool:
+    """Whether a snapshot exists, has this format, is from today and is at most max_age seconds old"""
+    return (data is not None and data.get("formato") == SNAPSHOT_FORMAT
+            and data.get("fecha") == date.today().isoformat() and snapshot_age(data) < max_age)
+
+
+def is_stale(data: Dict[str, Any]) -> bool:
+    """Whether the page should mark a snapshot as outdated (a refresh is on its way)"""
+    return not _current(data, STALE_AFTER)
+
+
+def snapshot_age(data: Dict[str, Any]) -> float:
+    """Seconds since a snapshot was computed"""
+    return max(0.0, time.time() - data["generado"])
+
+
+class SnapshotWorker:
+    """Background thread keeping the latest KPI snapshot fresh (see module docstring)"""
+
+    def __init__(self, db, interval: float = REFRESH_INTERVAL, check_every: float = CHECK_EVERY,
+                 gastos: Callable[[], pd.DataFrame] = read_gastos_excel):
+        self.db = db
+        self.interval = interval
+        self.check_every = check_every
+        self.gastos = gastos
+        self.latest: Optional[Dict[str, Any]] = None
+        self.refreshes = 0
+        self._refresh_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def due(self) -> bool:
+        """Whether the latest snapshot is missing, outdated (see _current) or behind the event log"""
+        latest = self.latest
+        if not _current(latest, self.interval):
+            return True
+        if latest["last_event_id"] is None:
+            return False  # No event log: refreshed on the interval only
+        return bool(self.db.get_events(since_id=latest["last_event_id"], limit=1))
+
+    def refresh(self) -> Dict[str, Any]:
+        """Compute and store a snapshot now (one at a time)"""
+        with self._refresh_lock:
+            data = compute_snapshot(self.db, gastos=self.gastos())
+            _save(self.db, data)
+            self.latest = data
+            self.refreshes += 1
+            return data
+
+    def trigger(self) -> None:
+        """Refresh on the next loop iteration instead of waiting for due()"""
+        self._wake.set()
+
+    def start(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, daemon=True, name="kpi-snapshots")
+            self._thread.start()
+
+    def _run(self) -> None:
+        forced = False
+        try:
+            # A fresh snapshot from before a restart is reused
+            self.latest = _stored(self.db)
+        except Exception:
+            logger.exception("KPI snapshot read failed")
+        while True:
+            try:
+                if forced or self.due():
+                    self.refresh()
+            except Exception:
+                logger.exception("KPI snapshot refresh failed")
+            forced = self._wake.wait(self.check_every)
+            self._wake.clear()
+
+
+def start_snapshot_worker(db, interval: float = REFRESH_INTERVAL, check_every: float = CHECK_EVERY) -> SnapshotWorker:
+    """Create the process-wide worker and start it"""
+    global _worker
+    worker = SnapshotWorker(db, interval, check_every)
+    worker.start()
+    _worker = worker
+    logger.info(f"KPI snapshot worker started (every {interval:.0f}s, checking writes every {check_every:.0f}s)")
+    return worker
+
+
+def active_worker() -> Optional[SnapshotWorker]:
+    """The running worker (for status display), or None"""
+    return _worker
+
+
+def refresh_snapshot(db) -> Dict[str, Any]:
+    """Compute and store a snapshot now, through the running worker when there is one"""
+    if _worker is not None:
+        return _worker.refresh()
+    data = compute_snapshot(db, gastos=read_gastos_excel())
+    _save(db, data)
+    return data
+
+
+def _refresh_in_background(db) -> None:
+    """Refresh off the request path: wake the running worker, else one thread at a time"""
+    if _worker is not None:
+        _worker.trigger()
+        return
+    if not _refreshing.acquire(blocking=False):
+        return
+
+    def run():
+        try:
+            refresh_snapshot(db)
+        except Exception:
+            logger.exception("KPI snapshot refresh failed")
+        finally:
+            _refreshing.release()
+
+    threading.Thread(target=run, daemon=True, name="kpi-snapshot-refresh").start()
+
+
+def latest_snapshot(db) -> Dict[str, Any]:
+    """
+    The snapshot the KPIs page renders: the running worker's, else the latest
+    stored one (kept fresh by a separate worker). A stale one (is_stale) is
+    returned as is and refreshed in the background; one is computed here only
+    when there is nothing of this SNAPSHOT_FORMAT to render.
+    """
+    data = _worker.latest if _worker is not None else None
+    if data is None:
+        data = _stored(db)
+    if data is None or data.get("formato") != SNAPSHOT_FORMAT:
+        return refresh_snapshot(db)
+    if is_stale(data):
+        _refresh_in_background(db)
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--engine", help="Storage engine (default: the configured one)")
+    parser.add_argument("--interval", type=float, default=REFRESH_INTERVAL, help="Seconds between refreshes")
+    parser.add_argument("--check-every", type=float, default=CHECK_EVERY, help="Seconds between write checks")
+    parser.add_argument("--once", action="store_true", help="Store one snapshot and exit")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    from repository import get_repository
+
+    db = get_repository(args.engine)
+    db.init_database()
+    if args.once:
+        started = time.perf_counter()
+        data = refresh_snapshot(db)
+        print(f"💾 Snapshot de KPIs guardado en {time.perf_counter() - started:.2f}s "
+              f"(evento {data['last_event_id']}, {len(data['asesores'])} asesor(es))")
+        return
+    worker = start_snapshot_worker(db, args.interval, args.check_every)
+    print(f"🔄 Snapshots de KPIs cada {args.interval:.0f}s y tras cada cambio (Ctrl+C para salir)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        print(f"\n✅ {worker.refreshes} snapshot(s) guardados")
+
+
+if __name__ == "__main__":
+    main()
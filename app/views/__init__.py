@@ -0,0 +1,26 @@
+"""
+Page modules for the dashboard.
+
+Each page lives in its own module exposing ``render()``. Modules are imported
+on first use so a rerun only pays for the page being shown (e.g. pandas and
+openpyxl are not loaded until "Ver Registros" is opened).
+"""
+
+import importlib
+
+# Page label -> module name inside this package
+PAGE_MODULES = {
+    "🏠 Inicio": "inicio",
+    "📝 Registrar Visita": "visitas",
+    "🎯 Registrar Oportunidad": "oportunidades",
+    "💰 Registrar Venta": "ventas",
+    "📋 Ver Registros": "registros",
+    "📊 KPIs y Reportes": "kpis",
+    "🔎 Buscar": "buscar",
+}
+
+
+def render_page(page: str) -> None:
+    """Import (once) and render the module for the given page label"""
+    module = importlib.import_module(f"{__name__}.{PAGE_MODULES[page]}")
+    module.render()
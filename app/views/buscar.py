@@ -0,0 +1,52 @@
+"""
+Página Buscar - búsqueda de texto en negocios, notas de visitas y oportunidades
+"""
+
+import time
+
+import pandas as pd
+import streamlit as st
+
+from repository import get_repository
+
+# Hit type -> label shown in the table
+TIPOS = {"negocio": "🏢 Negocio", "visita": "📝 Visita", "oportunidad": "🎯 Oportunidad"}
+
+RESULT_COLUMNS = {
+    "tipo": "Tipo",
+    "nombre": "Negocio",
+    "direccion": "Dirección",
+    "fecha": "Fecha",
+    "coincidencia": "Coincidencia",
+}
+
+
+def render() -> None:
+    st.title("🔎 Buscar")
+    st.caption("Busca en nombres y direcciones de negocios, notas de visitas, "
+               "siguiente acción y contactos de oportunidades. No distingue tildes ni mayúsculas.")
+
+    col1, col2 = st.columns([4, 1])
+    with col1:
+        text = st.text_input("Buscar", placeholder="Ej: taller los andes, Surco, gerente…",
+                             label_visibility="collapsed")
+    with col2:
+        limit = st.selectbox("Resultados", [20, 50, 100], label_visibility="collapsed")
+
+    if len(text.strip()) < 2:
+        st.info("Escribe al menos 2 letras para buscar")
+        return
+
+    start = time.perf_counter()
+    hits = get_repository().search(text, limit)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    if not hits:
+        st.warning(f"Sin resultados para \"{text}\"")
+        return
+
+    df = pd.DataFrame(hits)
+    df["tipo"] = df["tipo"].map(TIPOS)
+    df = df[list(RESULT_COLUMNS)].rename(columns=RESULT_COLUMNS)
+    st.dataframe(df, hide_index=True, use_container_width=True)
+    st.caption(f"{len(hits)} resultado(s) en {elapsed_ms:.0f} ms")
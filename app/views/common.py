@@ -0,0 +1,122 @@
+"""
+Helpers shared by the page modules
+"""
+
+import logging
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+import streamlit as st
+
+logger = logging.getLogger(__name__)
+
+
+def section_rows(key: str, params: Hashable, fetch: Callable[[], Any]) -> Any:
+    """
+    Rows for a list section, reused across fragment reruns.
+
+    The rows are kept in session state under ``key`` and only fetched again
+    when ``params`` (e.g. the selected date range) change or the section was
+    invalidated by a full page run.
+    """
+    entry = st.session_state.get(key)
+    if entry is None or entry[0] != params:
+        entry = (params, fetch())
+        st.session_state[key] = entry
+    return entry[1]
+
+
+def invalidate_section(key: str) -> None:
+    """Force the next render of the section to fetch fresh rows"""
+    st.session_state.pop(key, None)
+
+
+def drop_section_row(key: str, row_id: Any) -> None:
+    """Remove a row (e.g. after delete) without fetching the section again"""
+    entry = st.session_state.get(key)
+    if entry is None:
+        return
+    rows = entry[1]
+    if isinstance(rows, list):
+        rows = [r for r in rows if r['id'] != row_id]
+    else:
+        rows = rows[rows['id'] != row_id].reset_index(drop=True)
+    st.session_state[key] = (entry[0], rows)
+
+
+def _plain(value: Any) -> Any:
+    """
+    NaN -> None and numpy scalars -> Python values, so records behave like
+    getter rows. Whole floats become int: pandas stores a nullable integer
+    column (m2_estimado) as float64, and the forms' number inputs take ints.
+    """
+    if hasattr(value, 'item'):
+        value = value.item()
+    if isinstance(value, float):
+        if value != value:
+            return None
+        if value.is_integer():
+            return int(value)
+    return value
+
+
+def record_grid(df, columns: Dict[str, str], key: str) -> Optional[Dict[str, Any]]:
+    """
+    Render a DataFrame as one selectable grid and return the selected record.
+
+    Args:
+        df: Rows from a DataFrame getter
+        columns: Column name -> header label, in display order
+        key: Widget key; use reset_grid(key) to clear the selection
+
+    Returns:
+        The selected row as a plain dict (same shape as the list getters), or None
+    """
+    widget_key = f"{key}_{st.session_state.get(f'{key}_gen', 0)}"
+    event = st.dataframe(
+        df[[c for c in columns if c in df.columns]],
+        column_config={c: label for c, label in columns.items()},
+        key=widget_key,
+        on_select="rerun",
+        selection_mode="single-row",
+        hide_index=True,
+        use_container_width=True,
+    )
+    # Positions refer to the original frame, independent of client-side sorting
+    selected = event.selection.rows
+    if not selected or selected[0] >= len(df):
+        return None
+    return {k: _plain(v) for k, v in df.iloc[selected[0]].items()}
+
+
+def reset_grid(key: str) -> None:
+    """Clear the selection of a record_grid (e.g. after its row was deleted)"""
+    st.session_state[f'{key}_gen'] = st.session_state.get(f'{key}_gen', 0) + 1
+
+
+def confirm_new_business(db, nombre: str, direccion: str, key: str) -> bool:
+    """
+    Check a form's business before saving it: False (after warning) when it
+    would create a business that looks like an existing one. Submitting the
+    same nombre + direccion again confirms it really is a new business.
+    """
+    if not nombre or not direccion:
+        return True
+    entry = (nombre.strip().lower(), direccion.strip().lower())
+    state_key = f"_new_business_ok_{key}"
+    if st.session_state.get(state_key) == entry:
+        return True
+    try:
+        similar = db.find_similar_businesses(nombre, direccion)
+    except Exception as e:
+        # The check is advisory: never block a save because it failed
+        logger.warning(f"Duplicate business check failed: {e}")
+        return True
+    if not similar or any((b["nombre"].lower(), b["direccion"].lower()) == entry for b in similar):
+        return True
+
+    st.session_state[state_key] = entry
+    lines = "\n".join(f"- **{b['nombre']}** — {b['direccion']} ({b['score']:.0%})" for b in similar)
+    st.warning(f"⚠️ ¿Es un negocio ya registrado? Se parece a:\n{lines}\n\n"
+               "Si es el mismo, escriba el nombre y la dirección como aparecen arriba. "
+               "Si es un negocio nuevo, presione guardar otra vez.")
+    return False
@@ -0,0 +1,53 @@
+"""
+Panel "⏱️ Diagnóstico" - tiempos de las llamadas a datos de la última ejecución
+
+Hidden by default: open the app with ``?diag=1`` or set
+``[instrumentation] panel = true`` in secrets.toml.
+"""
+
+import streamlit as st
+
+import config
+import instrumentation
+
+
+def panel_enabled() -> bool:
+    return st.query_params.get("diag") == "1" or bool(config.get("instrumentation", "panel", False))
+
+
+def render_sidebar_panel(run_ms: float) -> None:
+    """Calls of this script run, slowest first, plus process-wide percentiles"""
+    calls = instrumentation.run_calls()
+    with st.sidebar.expander("⏱️ Diagnóstico", expanded=False):
+        data_ms = sum(c.ms for c in calls)
+        st.caption(f"Ejecución: {run_ms:.0f} ms · {len(calls)} llamadas · {data_ms:.0f} ms en datos")
+        if calls:
+            st.dataframe(
+                [{
+                    "Llamada": c.name,
+                    "ms": round(c.ms, 1),
+                    "Filas": c.rows,
+                    "KB": round(c.payload_bytes / 1024, 1) if c.payload_bytes is not None else None,
+                    "Error": "⚠️" if c.error else "",
+                } for c in sorted(calls, key=lambda c: c.ms, reverse=True)],
+                hide_index=True,
+                use_container_width=True,
+            )
+
+        st.markdown("**Desde el inicio del proceso**")
+        totals = instrumentation.snapshot()
+        if totals:
+            st.dataframe(
+                [{
+                    "Función": name,
+                    "Llamadas": s["calls"],
+                    "Media ms": round(s["mean_ms"], 1),
+                    "p50 ≤ ms": s["p50_ms"],
+                    "p95 ≤ ms": s["p95_ms"],
+                    "Errores": s["errors"],
+                } for name, s in totals.items()],
+                hide_index=True,
+                use_container_width=True,
+            )
+        else:
+            st.caption("Sin llamadas registradas")
@@ -0,0 +1,111 @@
+"""
+Página Inicio - resumen semanal y accesos rápidos
+"""
+
+from datetime import date, timedelta
+
+import streamlit as st
+
+from data_context import current_data_context
+
+
+def render() -> None:
+    st.title("🏠 Bienvenido al Dashboard Lux")
+    st.markdown("### Sistema de Control de Ventas B2B - Pisos Industriales")
+    
+    col1, col2, col3 = st.columns(3)
+    
+    # Quick stats for this week
+    today = date.today()
+    week_start = today - timedelta(days=today.weekday())
+    month_start = date(today.year, today.month, 1)
+    
+    # The month and week share one visits query (the week may start last month)
+    ctx = current_data_context()
+    ctx.reserve("visitas", week_start, today)
+    ctx.reserve("visitas", month_start, today)
+    ctx.reserve("ventas", week_start, today)
+    # Independent queries go out together
+    ctx.prefetch(activas=True)
+    visitas = ctx.visitas(week_start, today)
+    visitas_mes = ctx.visitas(month_start, today)
+    oportunidades = ctx.oportunidades_activas()
+    ventas_semana = ctx.ventas(week_start, today)
+    
+    # Custom CSS for the nav buttons
+    st.markdown("""
+    <style>
+    div[data-testid="stButton"] > button {
+        border-radius: 12px;
+        padding: 0.55rem 0rem;
+        font-size: 0.95rem;
+        font-weight: 600;
+        transition: opacity 0.2s;
+    }
+    div[data-testid="stButton"] > button:hover { opacity: 0.85; }
+    div.nav-btn-visitas > div[data-testid="stButton"] > button {
+        background: linear-gradient(135deg, #1a73e8, #0d47a1);
+        color: white; border: none;
+    }
+    div.nav-btn-opps > div[data-testid="stButton"] > button {
+        background: linear-gradient(135deg, #e65100, #bf360c);
+        color: white; border: none;
+    }
+    div.nav-btn-ventas > div[data-testid="stButton"] > button {
+        background: linear-gradient(135deg, #2e7d32, #1b5e20);
+        color: white; border: none;
+    }
+    </style>
+    """, unsafe_allow_html=True)
+
+    # Metrics row
+    with col1:
+        st.metric("✅ Visitas esta Semana", len(visitas), delta=f"{len(visitas_mes)} en el mes")
+    with col2:
+        st.metric("🎯 Oportunidades Activas", len(oportunidades))
+    with col3:
+        st.metric("💰 Ventas esta Semana", len(ventas_semana))
+
+    # Buttons row — separate columns so they are always perfectly aligned
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.markdown('<div class="nav-btn-visitas">', unsafe_allow_html=True)
+        if st.button("📝 Ver Visitas →", key="home_ver_visitas", use_container_width=True):
+            st.session_state['ver_registros_tab'] = 0
+            st.session_state['page'] = "📋 Ver Registros"
+            st.rerun()
+        st.markdown('</div>', unsafe_allow_html=True)
+    with col2:
+        st.markdown('<div class="nav-btn-opps">', unsafe_allow_html=True)
+        if st.button("🎯 Ver Oportunidades →", key="home_ver_opps", use_container_width=True):
+            st.session_state['ver_registros_tab'] = 1
+            st.session_state['page'] = "📋 Ver Registros"
+            st.rerun()
+        st.markdown('</div>', unsafe_allow_html=True)
+    with col3:
+        st.markdown('<div class="nav-btn-ventas">', unsafe_allow_html=True)
+        if st.button("💰 Ver Ventas →", key="home_ver_ventas", use_container_width=True):
+            st.session_state['ver_registros_tab'] = 2
+            st.session_state['page'] = "📋 Ver Registros"
+            st.rerun()
+        st.markdown('</div>', unsafe_allow_html=True)
+    
+    st.markdown("---")
+    st.markdown("### 📌 Acciones Rápidas")
+    
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        if st.button("➕ Nueva Visita", use_container_width=True):
+            st.session_state['page'] = "📝 Registrar Visita"
+            st.rerun()
+    
+    with col2:
+        if st.button("🎯 Nueva Oportunidad", use_container_width=True):
+            st.session_state['page'] = "🎯 Registrar Oportunidad"
+            st.rerun()
+    
+    with col3:
+        if st.button("💰 Nueva Venta", use_container_width=True):
+            st.session_state['page'] = "💰 Registrar Venta"
+            st.rerun()
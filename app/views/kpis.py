@@ -0,0 +1,293 @@
+"""
+Página KPIs y Reportes - resumen mensual, embudo, asesores, tendencias, gastos y antigüedad
+
+Las cifras salen del último snapshot precalculado (snapshots.py), así la
+página no consulta ni calcula nada al abrirse; se muestra su antigüedad.
+"""
+
+import time
+from datetime import date
+
+import pandas as pd
+import streamlit as st
+
+from data_context import current_data_context
+from excel_reader import IS_CLOUD, costos_summary, read_gastos_excel, read_gastos_from_uploaded_file
+from followups import active_scheduler
+from forecast import sales_forecast
+from kpis import AGING_GROUPS
+from margins import product_margins, sale_margins
+from repository import get_repository
+from series import BUCKETS, GROUPS, METRICS, POINT_BUDGET, RANGES, decode, range_start, series
+from snapshots import active_worker, is_stale, latest_snapshot, refresh_snapshot, snapshot_age
+
+
+def _edad(seconds: float) -> str:
+    if seconds < 60:
+        return "hace unos segundos"
+    if seconds < 3600:
+        return f"hace {seconds // 60:.0f} min"
+    return f"hace {seconds // 3600:.0f} h {seconds % 3600 // 60:.0f} min"
+
+
+def render() -> None:
+    st.title("📊 KPIs y Reportes")
+
+    today = date.today()
+    month_start = date(today.year, today.month, 1)
+    db = get_repository()
+
+    col1, col2 = st.columns([4, 1])
+    with col2:
+        refresh = st.button("🔄 Actualizar ahora", key="refresh_kpis", use_container_width=True)
+    snapshot = refresh_snapshot(db) if refresh else latest_snapshot(db)
+    with col1:
+        worker = active_worker()
+        st.caption(f"🕒 Actualizado {_edad(snapshot_age(snapshot))} "
+                   f"({time.strftime('%H:%M', time.localtime(snapshot['generado']))})"
+                   + (" · se recalcula tras cada cambio" if worker is not None else ""))
+    if is_stale(snapshot):
+        st.warning(f"⚠️ Cifras desactualizadas: calculadas el "
+                   f"{time.strftime('%d/%m a las %H:%M', time.localtime(snapshot['generado']))}. "
+                   "Se están recalculando en segundo plano, recarga la página en unos momentos.")
+
+    kpis = snapshot['resumen']
+    
+    st.markdown("### 📊 Resumen Mensual")
+    
+    col1, col2, col3, col4 = st.columns(4)
+    
+    with col1:
+        st.metric("Visitas (Mes)", kpis['visitas_mes'])
+        st.caption(f"Esta semana: {kpis['visitas_semana']}")
+    
+    with col2:
+        st.metric("Oportunidades Activas", kpis['oportunidades_activas'])
+    
+    with col3:
+        st.metric("Ventas (Mes)", kpis['ventas_mes'])
+    
+    with col4:
+        st.metric("Ingresos S/.", f"{kpis['ingresos_mes']:,.0f}" if kpis['ventas_mes'] else "0")
+    
+    # Conversion rates
+    st.markdown("### 🎯 Tasas de Conversión")
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        tasa_vo = kpis['tasa_visita_oportunidad']
+        st.metric("Visitas → Oportunidades", f"{tasa_vo:.1f}%" if tasa_vo is not None else "N/A")
+    
+    with col2:
+        tasa_ov = kpis['tasa_oportunidad_venta']
+        st.metric("Oportunidades → Ventas", f"{tasa_ov:.1f}%" if tasa_ov is not None else "N/A")
+
+    # This month's funnel: opportunities opened this month and how many converted
+    st.markdown("### 🔻 Embudo del Mes")
+    for col, etapa in zip(st.columns(len(snapshot['embudo'])), snapshot['embudo']):
+        with col:
+            st.metric(etapa['etapa'], etapa['cantidad'])
+            if etapa['tasa'] is not None:
+                st.caption(f"{etapa['tasa']:.1f}% de la etapa anterior")
+
+    st.markdown("### 🏆 Asesores")
+    if snapshot['asesores']:
+        st.dataframe(snapshot['asesores'], hide_index=True, use_container_width=True, column_config={
+            "asignado_a": "Asesor", "oportunidades_mes": "Oport. (Mes)", "activas": "Activas",
+            "convertidas": "Convertidas", "perdidas": "Perdidas", "ventas_mes": "Ventas (Mes)",
+            "monto_mes": st.column_config.NumberColumn("Monto S/. (Mes)", format="%.0f"),
+            "tasa_cierre": st.column_config.NumberColumn("Tasa de cierre", format="%.1f%%"),
+        })
+    else:
+        st.info("Sin oportunidades registradas")
+
+    _tendencias(snapshot, today)
+
+    _gastos_mes(snapshot, today, month_start)
+
+    # Active pipeline by days open
+    with st.expander("⏳ Antigüedad del pipeline"):
+        by = st.radio("Agrupar por", list(AGING_GROUPS), format_func=AGING_GROUPS.get,
+                      horizontal=True, key="aging_by")
+        aging = pd.DataFrame(snapshot['antiguedad'][by])
+        if aging.empty:
+            st.info("No hay oportunidades activas.")
+        else:
+            col1, col2 = st.columns(2)
+            with col1:
+                st.metric("Siguiente acción vencida", int(aging['vencidas'].sum()))
+            with col2:
+                st.metric("Sin fecha de siguiente acción", int(aging['sin_fecha'].sum()))
+            st.dataframe(aging, hide_index=True, use_container_width=True)
+        scheduler = active_scheduler()
+        if scheduler is not None:
+            st.caption(f"⏰ {scheduler.pending()} recordatorio(s) de seguimiento programados")
+
+    # Fitted once per data version (last audit event), cached between reruns
+    if st.toggle("🔮 Pronóstico", key="show_forecast"):
+        _pronostico(db, today)
+
+    # Loaded on demand: all sales joined with the Gastos workbook (parsed once per file)
+    if st.toggle("💹 Márgenes por venta", key="show_margins"):
+        _margenes(current_data_context(), today, month_start)
+
+    # Rolled up from the audit event log by the snapshot worker
+    with st.expander("📅 Resumen semanal y por asesor"):
+        rollups = snapshot['rollups']
+        if rollups is None:
+            st.info("Requiere el registro de eventos (migración 0010_events de Supabase).")
+        elif not rollups['semanas'] and not rollups['asignados']:
+            st.info("Sin eventos registrados")
+        else:
+            if rollups['semanas']:
+                st.dataframe(rollups['semanas'][::-1], hide_index=True, use_container_width=True)
+            if rollups['asignados']:
+                st.dataframe(rollups['asignados'], hide_index=True, use_container_width=True)
+
+
+def _tendencias(snapshot, today: date) -> None:
+    """Charts of a metric over time, bucketed by the snapshot worker (series.trends)"""
+    st.markdown("### 📈 Tendencias")
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        metric = st.selectbox("Métrica", list(METRICS), format_func=METRICS.get, key="serie_metrica")
+    with col2:
+        by = st.selectbox("Agrupar por", list(GROUPS), format_func=lambda g: GROUPS[g][1], key="serie_grupo")
+    with col3:
+        rango = st.selectbox("Rango", list(RANGES), format_func=RANGES.get, index=1, key="serie_rango")
+    with col4:
+        bucket = st.selectbox("Intervalo", ["auto", *BUCKETS], key="serie_intervalo",
+                              format_func=lambda b: "Automático" if b == "auto" else BUCKETS[b])
+
+    tendencias = snapshot['tendencias']
+    if tendencias is None:
+        st.info("Las tendencias requieren el registro de eventos (migración 0010_events de Supabase).")
+        return
+    if metric in tendencias:
+        cached = tendencias[metric][by][rango]
+        freq = cached['buckets'][bucket]
+        frame = decode(cached['frames'][freq], freq)
+    elif metric == "gastos" and IS_CLOUD:
+        # The background worker cannot see a browser upload: bucketed here (parsed once per file)
+        uploaded = st.session_state.get('uploaded_gastos')
+        if uploaded is None:
+            st.info("📤 Suba el archivo de gastos en 📋 Ver Registros → Gastos para ver su evolución.")
+            return
+        frame, freq = series(None, metric, range_start(rango, today), today, by, bucket,
+                             gastos=read_gastos_from_uploaded_file(uploaded))
+    else:
+        st.info("Sin datos para esta métrica.")
+        return
+    st.line_chart(frame, y_label=METRICS[metric])
+    st.caption(f"{frame.size} puntos (máx. {POINT_BUDGET}) · por {BUCKETS[freq].lower()}"
+               + (f" (más grueso que {BUCKETS[bucket].lower()} para no exceder el máximo)"
+                  if bucket != "auto" and freq != bucket else ""))
+
+
+def _gastos_mes(snapshot, today: date, month_start: date) -> None:
+    """The month's expenses by category, type and business type"""
+    gastos = snapshot['gastos_mes']
+    uploaded = st.session_state.get('uploaded_gastos')
+    if gastos is None and IS_CLOUD and uploaded is not None:
+        # The background worker cannot see a browser upload: summarized here (parsed once per file)
+        df = read_gastos_from_uploaded_file(uploaded)
+        if not df.empty:
+            gastos = costos_summary(df[(df['Fecha'].dt.date >= month_start) & (df['Fecha'].dt.date <= today)])
+    if gastos is None:
+        return
+
+    st.markdown("### 💸 Gastos del Mes")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Total S/.", f"{gastos['total_gastos']:,.0f}")
+    with col2:
+        st.metric("Costos Directos S/.", f"{gastos['costos_directos']:,.0f}")
+    with col3:
+        st.metric("Costos Indirectos S/.", f"{gastos['costos_indirectos']:,.0f}")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.dataframe(pd.DataFrame(gastos['by_tipo_gasto'].items(), columns=["Tipo de gasto", "Monto S/."]),
+                     hide_index=True, use_container_width=True)
+    with col2:
+        st.dataframe(pd.DataFrame(gastos['by_tipo_negocio'].items(), columns=["Tipo de negocio", "Monto S/."]),
+                     hide_index=True, use_container_width=True)
+
+
+def _pronostico(db, today: date) -> None:
+    """Monthly revenue and m2 forecasts (80% interval) and the weighted active pipeline"""
+    result = sales_forecast(db, today)
+    soles, m2 = result['soles'], result['m2']
+    if soles.empty:
+        st.info("Se necesitan al menos 8 semanas de ventas para pronosticar.")
+    else:
+        col1, col2 = st.columns(2)
+        for col, fila in zip((col1, col2), soles.head(2).itertuples()):
+            with col:
+                st.metric(f"Ingresos {fila.mes} S/.", f"{fila.pronostico:,.0f}")
+                st.caption(f"80%: {fila.bajo:,.0f} – {fila.alto:,.0f}"
+                           + (f" · real a la fecha: {fila.real:,.0f}" if fila.real else ""))
+        st.markdown("#### Por mes")
+        st.dataframe(soles.merge(m2, on="mes", suffixes=("_soles", "_m2")), hide_index=True,
+                     use_container_width=True)
+
+    pipeline = result['pipeline']
+    st.markdown("#### Pipeline ponderado")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("m² en pipeline", f"{pipeline['m2_pipeline']:,.0f}")
+    with col2:
+        st.metric("m² esperados", f"{pipeline['m2_esperado']:,.0f}")
+    with col3:
+        st.metric("S/. esperados", f"{pipeline['soles_esperados']:,.0f}")
+    st.caption(f"Probabilidad por fuente y asesor según su historial de conversión; "
+               f"S/. {result['precio_m2']:,.2f} por m² (últimos 12 meses)")
+    if not pipeline['detalle'].empty:
+        st.dataframe(pipeline['detalle'], hide_index=True, use_container_width=True, column_config={
+            "source": "Fuente", "asignado_a": "Asesor", "activas": "Activas", "m2_estimado": "m² estimados",
+            "probabilidad": st.column_config.NumberColumn("Probabilidad", format="%.1f%%"),
+            "m2_esperado": "m² esperados",
+        })
+
+
+def _margenes(ctx, today: date, month_start: date) -> None:
+    """Per-sale and per-product margins, with expense rows that match no sale"""
+    uploaded = st.session_state.get('uploaded_gastos')
+    if IS_CLOUD and uploaded is None:
+        st.info("📤 Suba el archivo de gastos en 📋 Ver Registros → Gastos para calcular márgenes.")
+        return
+    gastos = read_gastos_from_uploaded_file(uploaded) if IS_CLOUD else read_gastos_excel()
+
+    # Every sale, so expenses of other periods' sales are not taken for orphans
+    result = sale_margins(ctx.ventas(date.min, today), gastos)
+    periodo = st.selectbox("Período", ["Este Mes", "Este Año", "Todo"], key="periodo_margenes")
+    start = {"Este Mes": month_start, "Este Año": date(today.year, 1, 1)}.get(periodo, date.min)
+    ventas = result['ventas'][result['ventas']['fecha_cierre'].astype(str).str[:10] >= start.isoformat()]
+
+    if ventas.empty:
+        st.info("No hay ventas en este período.")
+    else:
+        ingresos, margen = ventas['ingresos'].sum(), ventas['margen'].sum()
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Ingresos S/.", f"{ingresos:,.0f}")
+        with col2:
+            st.metric("Costo Directo S/.", f"{ventas['costo_directo'].sum():,.0f}")
+        with col3:
+            st.metric("Costo Indirecto S/.", f"{ventas['costo_indirecto'].sum():,.0f}")
+        with col4:
+            st.metric("Margen S/.", f"{margen:,.0f}",
+                      f"{margen / ingresos * 100:.1f}%" if ingresos else None)
+        st.markdown("#### Por producto")
+        st.dataframe(product_margins(ventas), hide_index=True, use_container_width=True)
+        st.markdown("#### Por venta")
+        st.dataframe(ventas, hide_index=True, use_container_width=True)
+
+    huerfanos = result['huerfanos']
+    if not huerfanos.empty:
+        st.warning(f"⚠️ {len(huerfanos)} gasto(s) con un Venta_ID que no corresponde a ninguna venta "
+                   f"(S/. {huerfanos['Monto_Soles'].sum():,.0f}), no incluidos en los márgenes")
+        st.dataframe(huerfanos, hide_index=True, use_container_width=True)
+    if not result['sin_asignar'].empty:
+        st.caption("Gastos sin Venta_ID en meses sin ventas (no asignados): "
+                   + ", ".join(f"{r.mes} S/. {r.monto:,.0f}" for r in result['sin_asignar'].itertuples()))
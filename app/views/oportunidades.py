@@ -0,0 +1,324 @@
+"""
+Página Registrar Oportunidad - formulario y lista de oportunidades activas
+"""
+
+from datetime import datetime, date
+
+import streamlit as st
+
+from repository import get_repository
+from constants import TIPOS_NEGOCIO, PRODUCTOS, SOURCES, ASSIGNED_TO
+from events import opportunity_timeline
+from views.common import section_rows, invalidate_section, drop_section_row, confirm_new_business
+
+SECTION_KEY = "_section_oportunidades_activas"
+
+EVENT_LABELS = {
+    "created": "🆕 Creada", "updated": "✏️ Editada", "reassigned": "🔁 Reasignada",
+    "converted": "💰 Convertida", "lost": "📉 Perdida", "deleted": "🗑️ Eliminada",
+}
+
+
+def describe_event(entry) -> str:
+    """One line of an opportunity_timeline entry"""
+    label = EVENT_LABELS.get(entry['kind'], entry['kind'])
+    if entry['kind'] == "reassigned":
+        return f"{label}: {entry['de'] or 'Sin asignar'} → {entry['a']}"
+    if entry['kind'] == "lost":
+        return f"{label}: {entry.get('motivo') or 'sin motivo'}"
+    if entry['kind'] == "created":
+        return f"{label} (asignada a {entry['a'] or 'nadie'})"
+    if entry['kind'] == "updated":
+        return f"{label}: {', '.join(entry['cambios'])}"
+    return label
+
+
+def render() -> None:
+    db = get_repository()
+    st.title("🎯 Gestión de Oportunidades")
+    
+    # Check if converting from visit
+    visita_convert = st.session_state.get('visita_to_convert', None)
+    # Check if editing existing opportunity
+    opp_to_edit = st.session_state.get('opp_to_edit', None)
+    
+    if opp_to_edit:
+        st.info(f"✏️ Editando oportunidad: {opp_to_edit['nombre']}")
+        if st.button("❌ Cancelar Edición"):
+            del st.session_state['opp_to_edit']
+            st.rerun()
+
+    title_text = "Editar Oportunidad" if opp_to_edit else "Registrar Nueva Oportunidad"
+    
+    with st.form("form_oportunidad"):
+        st.markdown(f"### {title_text}")
+        
+        col1, col2 = st.columns(2)
+        
+        # Defaults
+        def_nombre = opp_to_edit['nombre'] if opp_to_edit else (visita_convert['nombre'] if visita_convert else "")
+        def_tipo_idx = TIPOS_NEGOCIO.index(opp_to_edit['tipo_negocio']) if opp_to_edit else (TIPOS_NEGOCIO.index(visita_convert['tipo_negocio']) if visita_convert else 0)
+        
+        # Handle source default properly
+        def_source_idx = 0
+        if opp_to_edit and opp_to_edit.get('source') in SOURCES:
+            def_source_idx = SOURCES.index(opp_to_edit['source'])
+            
+        def_fecha = datetime.strptime(opp_to_edit['fecha_contacto'], '%Y-%m-%d').date() if opp_to_edit and isinstance(opp_to_edit['fecha_contacto'], str) else (opp_to_edit['fecha_contacto'] if opp_to_edit else date.today())
+        
+        with col1:
+            nombre = st.text_input("Nombre del Negocio *", 
+                                   value=def_nombre,
+                                   placeholder="Ej: Taller Los Andes")
+            tipo_negocio = st.selectbox("Tipo de Negocio *", TIPOS_NEGOCIO,
+                                       index=def_tipo_idx)
+            source = st.selectbox("Fuente de Oportunidad *", SOURCES,
+                                 index=def_source_idx)
+        
+        with col2:
+            fecha_contacto = st.date_input("Fecha de Contacto *", value=def_fecha)
+            semana = db.get_week_number(fecha_contacto)
+            st.text_input("Semana", value=semana, disabled=True)
+            
+        def_direccion = opp_to_edit['direccion'] if opp_to_edit else (visita_convert['direccion'] if visita_convert else "")
+        direccion = st.text_area("Dirección *", 
+                                 value=def_direccion,
+                                 placeholder="Ej: Av. Argentina 890, Callao", height=80)
+        
+        # --- Contact Info ---
+        col_c1, col_c2, col_c3, col_c4 = st.columns(4)
+        def_contacto = opp_to_edit.get('nombre_contacto', "") if opp_to_edit else ""
+        def_cargo = opp_to_edit.get('cargo_contacto', "") if opp_to_edit else ""
+        def_celular = opp_to_edit.get('celular_contacto', "") if opp_to_edit else ""
+        def_email = opp_to_edit.get('email_contacto', "") if opp_to_edit else ""
+        
+        with col_c1:
+            nombre_contacto = st.text_input("Nombre de Contacto", value=def_contacto, placeholder="Ej: Juan Pérez")
+        with col_c2:
+            cargo_contacto = st.text_input("Cargo", value=def_cargo, placeholder="Ej: Jefe de Mantenimiento")
+        with col_c3:
+            celular_contacto = st.text_input("Nro Celular", value=def_celular, placeholder="Ej: 999 888 777")
+        with col_c4:
+            email_contacto = st.text_input("Email", value=def_email, placeholder="Ej: juan@empresa.com")
+        # --------------------
+        
+        st.markdown("### Detalles de la Oportunidad")
+        
+        col1, col2 = st.columns(2)
+        
+        def_m2 = opp_to_edit['m2_estimado'] if opp_to_edit else 100
+        
+        # Product default
+        def_prod_idx = 0
+        if opp_to_edit and opp_to_edit.get('producto_interes') in PRODUCTOS:
+            def_prod_idx = PRODUCTOS.index(opp_to_edit['producto_interes']) + 1 # +1 because of [""]
+        elif opp_to_edit and opp_to_edit.get('producto_interes'):
+             # If product exists but not in current list, handle it or just default 0
+             pass 
+        
+        with col1:
+            m2_estimado = st.number_input("m² Estimado", min_value=0, value=int(def_m2 or 0), step=10)
+            
+            # Handle product selection carefully
+            prod_options = [""] + PRODUCTOS
+            # Recalculate index based on full list
+            curr_prod = opp_to_edit['producto_interes'] if opp_to_edit else ""
+            try:
+                prod_idx = prod_options.index(curr_prod)
+            except ValueError:
+                prod_idx = 0
+                
+            producto_interes = st.selectbox("Producto de Interés", prod_options, index=prod_idx)
+        
+        with col2:
+            def_accion = opp_to_edit['siguiente_accion'] if opp_to_edit else ""
+            siguiente_accion = st.text_area("Siguiente Acción", 
+                                           value=def_accion or "",
+                                           placeholder="Ej: Visita técnica programada para 20-Ene",
+                                           height=100)
+            def_fecha_accion = opp_to_edit.get('fecha_siguiente_accion') if opp_to_edit else None
+            fecha_siguiente_accion = st.date_input(
+                "Fecha Siguiente Acción",
+                value=date.fromisoformat(str(def_fecha_accion)[:10]) if def_fecha_accion else None,
+                help="El asesor asignado recibe un recordatorio por WhatsApp ese día")
+            
+            # --- Auto-Assignment Display / Edit ---
+            if opp_to_edit:
+                curr_assigned = opp_to_edit.get('asignado_a')
+                # If current assigned is not in list (e.g. None), default to first or handle it
+                try:
+                    assigned_idx = ASSIGNED_TO.index(curr_assigned)
+                except ValueError:
+                    assigned_idx = 0
+                
+                # Allow manual reassignment
+                asignado_a = st.selectbox("Asignado a", ASSIGNED_TO, index=assigned_idx)
+            else:
+                # For new opportunities, assignment happens automatically on creation
+                # We do NOT let the user pick here to ensure the probabilities are respected
+                st.info("ℹ️ La oportunidad será asignada automáticamente a un vendedor al guardar.")
+                asignado_a = None
+            # --------------------------------------
+        
+        btn_label = "💾 Actualizar Oportunidad" if opp_to_edit else "💾 Guardar Oportunidad"
+        submitted = st.form_submit_button(btn_label, use_container_width=True)
+        
+        if submitted and confirm_new_business(db, nombre, direccion, "oportunidad"):
+            if nombre and tipo_negocio and direccion and source:
+                try:
+                    m2_val = m2_estimado if m2_estimado > 0 else None
+                    prod_val = producto_interes if producto_interes else None
+                    accion_val = siguiente_accion if siguiente_accion else None
+                    
+                    if opp_to_edit:
+                        # Update
+                        db.update_oportunidad(
+                            opp_to_edit['id'], nombre, tipo_negocio, direccion,
+                            fecha_contacto, semana, m2_val, prod_val, accion_val, source,
+                            nombre_contacto, cargo_contacto, celular_contacto,
+                            email_contacto=email_contacto,
+                            asignado_a=asignado_a,
+                            fecha_siguiente_accion=fecha_siguiente_accion,
+                            original=opp_to_edit
+                        )
+                        st.success(f"✅ Oportunidad actualizada exitosamente!")
+                        del st.session_state['opp_to_edit']
+                        st.balloons()
+                        st.rerun()
+                    else:
+                        # Create
+                        visita_id = visita_convert['id'] if visita_convert else None
+                        opp_id = db.create_oportunidad(
+                            nombre, tipo_negocio, direccion, fecha_contacto, semana,
+                            m2_val, prod_val, accion_val,
+                            visita_id, source,
+                            nombre_contacto, cargo_contacto, celular_contacto,
+                            email_contacto=email_contacto,
+                            fecha_siguiente_accion=fecha_siguiente_accion
+                        )
+                        if opp_id < 0:
+                            st.success("✅ Oportunidad guardada! Se sincronizará y asignará al recuperar conexión.")
+                        else:
+                            st.success(f"✅ Oportunidad registrada exitosamente! ID: {opp_id}")
+                        st.balloons()
+                        
+                        # Clear conversion state
+                        if 'visita_to_convert' in st.session_state:
+                            del st.session_state['visita_to_convert']
+                        
+                except Exception as e:
+                    st.error(f"❌ Error al guardar: {str(e)}")
+            else:
+                st.error("⚠️ Por favor complete todos los campos obligatorios (*)")
+    
+    # Show active opportunities
+    st.markdown("---")
+
+    # A full page run always shows fresh rows; fragment reruns reuse them
+    invalidate_section(SECTION_KEY)
+    _oportunidades_activas()
+
+
+@st.fragment
+def _oportunidades_activas() -> None:
+    """Oportunidades Activas list; lost/delete flows only rerun this section"""
+    db = get_repository()
+    st.markdown("### 📋 Oportunidades Activas")
+    
+    # Handle deletion state
+    if 'opp_to_delete' in st.session_state:
+        st.warning(f"¿Está seguro que desea eliminar la oportunidad de '{st.session_state['opp_to_delete']['nombre']}'? Esta acción no se puede deshacer.")
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("✅ Confirmar Eliminación", key="confirm_del_opp"):
+                db.delete_oportunidad(st.session_state['opp_to_delete']['id'])
+                st.success("Oportunidad eliminada.")
+                drop_section_row(SECTION_KEY, st.session_state['opp_to_delete']['id'])
+                del st.session_state['opp_to_delete']
+                st.rerun(scope="fragment")
+        with col2:
+            if st.button("❌ Cancelar", key="cancel_del_opp"):
+                del st.session_state['opp_to_delete']
+                st.rerun(scope="fragment")
+
+    # Handle lost opportunity state
+    if 'opp_to_lose' in st.session_state:
+        st.info(f"Marcando como PERDIDA la oportunidad de '{st.session_state['opp_to_lose']['nombre']}'")
+        with st.form("form_lost_opp"):
+            motivo = st.text_area("Motivo de la pérdida *", 
+                                 placeholder="Ej: Precio muy alto, competencia ganó, proyecto cancelado...")
+            
+            c1, c2 = st.columns(2)
+            with c1:
+                confirm_lost = st.form_submit_button("📉 Confirmar Pérdida", use_container_width=True)
+            with c2:
+                cancel_lost = st.form_submit_button("❌ Cancelar", use_container_width=True)
+            
+            if confirm_lost:
+                if motivo:
+                    db.mark_opportunity_lost(st.session_state['opp_to_lose']['id'], motivo)
+                    st.success("Oportunidad marcada como perdida.")
+                    drop_section_row(SECTION_KEY, st.session_state['opp_to_lose']['id'])
+                    del st.session_state['opp_to_lose']
+                    st.rerun(scope="fragment")
+                else:
+                    st.error("⚠️ Debe ingresar un motivo.")
+            
+            if cancel_lost:
+                del st.session_state['opp_to_lose']
+                st.rerun(scope="fragment")
+
+    oportunidades = section_rows(SECTION_KEY, None, db.get_oportunidades_activas)
+    
+    if oportunidades:
+        for opp in oportunidades[:20]:  # Show first 20
+            with st.expander(f"🎯 {opp['nombre']} ({opp['tipo_negocio']}) - {opp['m2_estimado']}m²"):
+                st.write(f"**Dirección:** {opp['direccion']}")
+                
+                # Show contact info if available
+                if opp.get('nombre_contacto') or opp.get('celular_contacto') or opp.get('cargo_contacto') or opp.get('email_contacto'):
+                    contact_parts = []
+                    if opp.get('nombre_contacto'): contact_parts.append(opp['nombre_contacto'])
+                    if opp.get('cargo_contacto'): contact_parts.append(f"({opp['cargo_contacto']})")
+                    if opp.get('celular_contacto'): contact_parts.append(f"📞 {opp['celular_contacto']}")
+                    if opp.get('email_contacto'): contact_parts.append(f"📧 {opp['email_contacto']}")
+                    
+                    st.write(f"**Contacto:** {' '.join(contact_parts)}")
+
+                st.write(f"**Fuente:** {opp.get('source', 'N/A')}")
+                st.write(f"**Asignado a:** {opp.get('asignado_a', 'Pendiente')}")
+                st.write(f"**Fecha Contacto:** {opp['fecha_contacto']} ({opp['semana']})")
+                if opp['producto_interes']:
+                    st.write(f"**Producto:** {opp['producto_interes']}")
+                if opp['siguiente_accion']:
+                    st.write(f"**Siguiente Acción:** {opp['siguiente_accion']}")
+                if opp.get('fecha_siguiente_accion'):
+                    vence = str(opp['fecha_siguiente_accion'])[:10]
+                    vencida = " ⚠️ Vencida" if vence < date.today().isoformat() else ""
+                    st.write(f"**Fecha Siguiente Acción:** {vence}{vencida}")
+                
+                col1, col2, col3, col4 = st.columns(4)
+                with col1:
+                    if st.button("💰 Convertir", key=f"convventa_{opp['id']}"):
+                        st.session_state['opp_to_convert'] = opp
+                        st.session_state['page'] = "💰 Registrar Venta"
+                        st.rerun()
+                with col2:
+                    if st.button("✏️ Editar", key=f"edit_{opp['id']}"):
+                        st.session_state['opp_to_edit'] = opp
+                        st.rerun()
+                with col3:
+                    if st.button("📉 Perdida", key=f"lost_{opp['id']}"):
+                        st.session_state['opp_to_lose'] = opp
+                        st.rerun(scope="fragment")
+                with col4:
+                    if st.button("🗑️ Eliminar", key=f"del_{opp['id']}"):
+                        st.session_state['opp_to_delete'] = opp
+                        st.rerun(scope="fragment")
+
+                # Loaded on demand: one events read per opportunity
+                if st.toggle("🕓 Historial", key=f"hist_{opp['id']}"):
+                    for entry in opportunity_timeline(db.get_events(entity="oportunidades", row_id=opp['id'])):
+                        st.caption(f"{entry['at'][:16]} · {describe_event(entry)}")
+    else:
+        st.info("No hay oportunidades activas.")
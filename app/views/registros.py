@@ -0,0 +1,280 @@
+"""
+Página Ver Registros - historial de visitas, oportunidades, ventas y gastos
+"""
+
+from datetime import date, timedelta
+
+import pandas as pd
+import streamlit as st
+
+from data_context import current_data_context, rows_to_frame
+from excel_reader import get_gastos_by_period, IS_CLOUD, read_gastos_from_uploaded_file
+from views.common import record_grid
+
+# Grid columns (name -> header), in display order
+VISITAS_COLUMNS = {
+    "fecha": "Fecha",
+    "semana": "Semana",
+    "nombre": "Negocio",
+    "tipo_negocio": "Tipo",
+    "direccion": "Dirección",
+    "notas": "Notas",
+}
+OPORTUNIDADES_COLUMNS = {
+    "id": "ID",
+    "fecha_contacto": "Fecha Contacto",
+    "nombre": "Negocio",
+    "tipo_negocio": "Tipo",
+    "m2_estimado": "m²",
+    "producto_interes": "Producto",
+    "asignado_a": "Asignado a",
+    "source": "Fuente",
+    "nombre_contacto": "Contacto",
+    "cargo_contacto": "Cargo",
+    "celular_contacto": "Celular",
+    "email_contacto": "Email",
+    "siguiente_accion": "Siguiente acción",
+    "fecha_siguiente_accion": "Fecha sig. acción",
+    "direccion": "Dirección",
+}
+VENTAS_COLUMNS = {
+    "venta_id": "ID",
+    "fecha_cierre": "Fecha Cierre",
+    "nombre": "Cliente",
+    "tipo_negocio": "Tipo",
+    "producto": "Producto",
+    "m2_real": "m²",
+    "monto_soles": "Monto S/.",
+    "fecha_instalacion": "Instalación",
+    "direccion": "Dirección",
+}
+
+
+def render() -> None:
+    st.title("📋 Historial de Registros")
+    
+    # Pre-select tab if navigated from home page
+    _tab_goto = st.session_state.pop('ver_registros_tab', 0)
+    _all_tabs = ["📝 Visitas", "🎯 Oportunidades", "💰 Ventas", "💸 Gastos"]
+    # Rotate so the desired tab is first (Streamlit opens first tab by default)
+    _tabs_ordered = _all_tabs[_tab_goto:] + _all_tabs[:_tab_goto]
+    _rendered = st.tabs(_tabs_ordered)
+    # Map back to original tab variables regardless of rotation
+    _tab_map = {name: widget for name, widget in zip(_tabs_ordered, _rendered)}
+    tab1 = _tab_map["📝 Visitas"]
+    tab2 = _tab_map["🎯 Oportunidades"]
+    tab3 = _tab_map["💰 Ventas"]
+    tab4 = _tab_map["💸 Gastos"]
+    
+    # Each tab is its own fragment: changing a period only reruns that tab.
+    # Rows come from the run's data context, shared with the other pages and
+    # reused by fragment reruns.
+    with tab1:
+        _tab_visitas()
+    with tab2:
+        _tab_oportunidades()
+    with tab3:
+        _tab_ventas()
+    with tab4:
+        _tab_gastos()
+
+
+@st.fragment
+def _tab_visitas() -> None:
+    st.markdown("### Visitas Registradas")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        periodo = st.selectbox("Período", ["Esta Semana", "Este Mes", "Todo"])
+
+    today = date.today()
+
+    if periodo == "Esta Semana":
+        start_date = today - timedelta(days=today.weekday())
+        end_date = today
+    elif periodo == "Este Mes":
+        start_date = date(today.year, today.month, 1)
+        end_date = today
+    else:
+        start_date = date(2026, 1, 1)
+        end_date = today
+
+    visitas = rows_to_frame(current_data_context().visitas(start_date, end_date))
+
+    if not visitas.empty:
+        st.info(f"📊 Total: {len(visitas)} visitas")
+        v = record_grid(visitas, VISITAS_COLUMNS, key="grid_registros_visitas")
+        if v and st.button("✏️ Editar Visita", key=f"verreg_visita_{v['id']}"):
+            st.session_state['visita_to_edit'] = v
+            st.session_state['page'] = "📝 Registrar Visita"
+            st.rerun()
+    else:
+        st.info("No hay visitas en este período.")
+
+
+@st.fragment
+def _tab_oportunidades() -> None:
+    st.markdown("### Oportunidades")
+
+    oportunidades = rows_to_frame(current_data_context().oportunidades_activas())
+
+    if not oportunidades.empty:
+        st.info(f"📊 Total: {len(oportunidades)} oportunidades activas")
+        opp = record_grid(oportunidades, OPORTUNIDADES_COLUMNS, key="grid_registros_oportunidades")
+        if opp and st.button("✏️ Editar Oportunidad", key=f"verreg_edit_{opp['id']}"):
+            st.session_state['opp_to_edit'] = opp
+            st.session_state['page'] = "🎯 Registrar Oportunidad"
+            st.rerun()
+    else:
+        st.info("No hay oportunidades activas.")
+
+
+@st.fragment
+def _tab_ventas() -> None:
+    st.markdown("### Ventas Cerradas")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        periodo_ventas = st.selectbox("Período", ["Este Mes", "Este Año", "Todo"], key="periodo_ventas")
+
+    today = date.today()
+
+    if periodo_ventas == "Este Mes":
+        start_date = date(today.year, today.month, 1)
+        end_date = today
+    elif periodo_ventas == "Este Año":
+        start_date = date(today.year, 1, 1)
+        end_date = today
+    else:
+        start_date = date(2026, 1, 1)
+        end_date = today
+
+    ventas = rows_to_frame(current_data_context().ventas(start_date, end_date))
+
+    if not ventas.empty:
+        total_m2 = ventas['m2_real'].sum()
+        total_soles = ventas['monto_soles'].sum()
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("📊 Ventas", len(ventas))
+        with col2:
+            st.metric("📐 m² Totales", f"{total_m2:,}")
+        with col3:
+            st.metric("💰 Ingresos S/.", f"S/. {total_soles:,.2f}")
+        st.markdown("---")
+        venta = record_grid(ventas, VENTAS_COLUMNS, key="grid_registros_ventas")
+        if venta and st.button("✏️ Editar Venta", key=f"verreg_venta_{venta['id']}"):
+            st.session_state['venta_to_edit'] = venta
+            st.session_state['page'] = "💰 Registrar Venta"
+            st.rerun()
+    else:
+        st.info("No hay ventas en este período.")
+
+
+@st.fragment
+def _tab_gastos() -> None:
+    st.markdown("### Gastos y Costos (desde Excel)")
+
+    # Show cloud warning if applicable
+    if IS_CLOUD:
+        st.warning("⚠️ **Modo Cloud**: El archivo Excel en Google Drive no está accesible desde la nube.")
+
+        # File uploader
+        st.markdown("#### 📤 Subir Archivo Excel")
+        uploaded_file = st.file_uploader(
+            "Sube el archivo `Gastos_Semanal_Template_V2.xlsx` aquí:",
+            type=['xlsx', 'xls'],
+            help="El contador debe subir el archivo Excel con los gastos registrados"
+        )
+
+        if uploaded_file is not None:
+            # Store in session state
+            st.session_state['uploaded_gastos'] = uploaded_file
+            st.success("✅ Archivo cargado exitosamente!")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        periodo_gastos = st.selectbox("Período", ["Este Mes", "Este Año", "Todo"], key="periodo_gastos")
+
+    today = date.today()
+
+    if periodo_gastos == "Este Mes":
+        start_date = date(today.year, today.month, 1)
+        end_date = today
+    elif periodo_gastos == "Este Año":
+        start_date = date(today.year, 1, 1)
+        end_date = today
+    else:
+        start_date = date(2026, 1, 1)
+        end_date = today
+
+    # Read expenses from Excel
+    gastos_df = pd.DataFrame()
+
+    try:
+        if IS_CLOUD and 'uploaded_gastos' in st.session_state:
+            # Read from uploaded file
+            gastos_df = read_gastos_from_uploaded_file(st.session_state['uploaded_gastos'])
+            # Filter by period
+            if not gastos_df.empty:
+                mask = (gastos_df['Fecha'].dt.date >= start_date) & (gastos_df['Fecha'].dt.date <= end_date)
+                gastos_df = gastos_df[mask]
+        else:
+            # Read from local file
+            gastos_df = get_gastos_by_period(start_date, end_date)
+    except Exception as e:
+        st.error(f"❌ Error al leer archivo Excel: {str(e)}")
+        gastos_df = pd.DataFrame()
+
+    if not gastos_df.empty:
+        # Show data table
+        display_df = gastos_df.copy()
+        display_df['Fecha'] = display_df['Fecha'].dt.strftime('%Y-%m-%d')
+        st.dataframe(display_df[['Fecha', 'Semana', 'Tipo_Gasto', 'Categoría', 'Tipo_Negocio', 'Monto_Soles', 'Venta_ID']], 
+                    use_container_width=True)
+
+        # Summary metrics
+        total_gastos = gastos_df['Monto_Soles'].sum()
+        costos_directos = gastos_df[gastos_df['Categoría'] == 'Costo Directo']['Monto_Soles'].sum()
+        costos_indirectos = gastos_df[gastos_df['Categoría'] == 'Costo Indirecto']['Monto_Soles'].sum()
+
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("📊 Total Gastos", f"S/. {total_gastos:,.0f}")
+        with col2:
+            st.metric("💰 Costos Directos", f"S/. {costos_directos:,.0f}")
+        with col3:
+            st.metric("🏢 Costos Indirectos", f"S/. {costos_indirectos:,.0f}")
+        with col4:
+            st.metric("📝 Registros", len(gastos_df))
+
+        # Breakdown by type
+        st.markdown("#### 📊 Distribución por Tipo de Gasto")
+        tipo_gasto_sum = gastos_df.groupby('Tipo_Gasto')['Monto_Soles'].sum().sort_values(ascending=False)
+
+        for tipo, monto in tipo_gasto_sum.items():
+            pct = (monto / total_gastos * 100) if total_gastos > 0 else 0
+            st.write(f"**{tipo}**: S/. {monto:,.2f} ({pct:.1f}%)")
+    else:
+        st.info("📝 No hay gastos registrados en este período.\n\nEl contador debe llenar el archivo Excel en Google Drive.")
+        st.caption(f"📁 Archivo: `G:\\My Drive\\NewLux\\KPIs_Accounting\\Gastos_Semanal_Template_V2.xlsx`")
+
+        # Show instructions
+        with st.expander("ℹ️ Instrucciones para el Contador"):
+            st.markdown("""
+            **Cómo registrar gastos:**
+
+            1. Abrir archivo Excel en Google Drive
+            2. Ir a la hoja "Gastos"
+            3. Llenar una fila por cada gasto:
+               - **Fecha**: Fecha del gasto
+               - **Semana**: Número de semana (se calcula automático)
+               - **Tipo_Gasto**: Material, Mano de Obra, Transporte, u Otro
+               - **Categoría**: Costo Directo o Indirecto
+               - **Tipo_Negocio**: Taller Automotriz, Detailing, etc.
+               - **Descripción**: Detalle del gasto
+               - **Monto_Soles**: Cantidad en soles
+               - **Venta_ID**: Si aplica a una venta específica (ej: LUX-2026-001)
+            4. Guardar el archivo
+            5. Recargar esta página para ver los datos actualizados
+            """)
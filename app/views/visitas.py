@@ -0,0 +1,176 @@
+"""
+Página Registrar Visita - formulario y lista de visitas recientes
+"""
+
+from datetime import date, timedelta
+
+import streamlit as st
+
+from repository import get_repository
+from data_context import rows_to_frame
+from constants import TIPOS_NEGOCIO
+from views.common import section_rows, invalidate_section, drop_section_row, record_grid, reset_grid, confirm_new_business
+
+SECTION_KEY = "_section_visitas_recientes"
+
+GRID_COLUMNS = {
+    "fecha": "Fecha",
+    "nombre": "Negocio",
+    "tipo_negocio": "Tipo",
+    "direccion": "Dirección",
+    "semana": "Semana",
+    "notas": "Notas",
+}
+
+
+def render() -> None:
+    db = get_repository()
+    # Check if editing an existing visit
+    editing_visita = st.session_state.get('visita_to_edit', None)
+    st.title("📝 " + ("Editar Visita" if editing_visita else "Registrar Nueva Visita"))
+
+    with st.form("form_visita"):
+        st.markdown("### Datos del Negocio")
+
+        col1, col2 = st.columns(2)
+
+        with col1:
+            nombre = st.text_input("Nombre del Negocio *", value=editing_visita['nombre'] if editing_visita else "", placeholder="Ej: Taller El Rayo")
+            tipo_negocio = st.selectbox("Tipo de Negocio *", TIPOS_NEGOCIO, index=TIPOS_NEGOCIO.index(editing_visita['tipo_negocio']) if editing_visita else 0)
+
+        with col2:
+            fecha = st.date_input("Fecha de Visita *", value=editing_visita['fecha'] if editing_visita else date.today())
+            semana = db.get_week_number(fecha)
+            st.text_input("Semana", value=semana, disabled=True)
+
+        direccion = st.text_area("Dirección *", value=editing_visita['direccion'] if editing_visita else "", placeholder="Ej: Av. Arriola 234, Urb. Industrial, La Victoria", height=100)
+
+        notas = st.text_area("Notas / Observaciones", value=editing_visita['notas'] if editing_visita and editing_visita['notas'] else "", placeholder="Ej: Hablé con el dueño, mostró interés en JS02Y, tiene 150m²", height=100)
+
+        submitted = st.form_submit_button("💾 Guardar Visita", use_container_width=True)
+
+        if submitted and confirm_new_business(db, nombre, direccion, "visita"):
+            if nombre and tipo_negocio and direccion:
+                try:
+                    if editing_visita:
+                        db.update_visita(editing_visita['id'], nombre, tipo_negocio, direccion, fecha, semana, notas,
+                                         original=editing_visita)
+                        st.success(f"✅ Visita actualizada exitosamente! ID: {editing_visita['id']}")
+                        del st.session_state['visita_to_edit']
+                        st.rerun()
+                    else:
+                        visita_id = db.create_visita(nombre, tipo_negocio, direccion, fecha, semana, notas)
+                        if visita_id < 0:
+                            st.success("✅ Visita guardada! Se sincronizará al recuperar conexión.")
+                        else:
+                            st.success(f"✅ Visita registrada exitosamente! ID: {visita_id}")
+                    st.balloons()
+                except Exception as e:
+                    st.error(f"❌ Error al guardar: {str(e)}")
+            else:
+                st.error("⚠️ Por favor complete todos los campos obligatorios (*)")
+
+    # Show recent visits
+    st.markdown("---")
+
+    # A full page run always shows fresh rows; fragment reruns reuse them
+    invalidate_section(SECTION_KEY)
+    _visitas_recientes()
+
+
+@st.fragment
+def _visitas_recientes() -> None:
+    """Visitas Recientes list; filter, delete and confirm only rerun this section"""
+    db = get_repository()
+    # Filter controls for the list
+    col_filter1, col_filter2 = st.columns([2, 1])
+    with col_filter1:
+        st.markdown(f"### 📋 Visitas Recientes")
+    with col_filter2:
+        # Week number display in corner as requested
+        current_week_num = db.get_week_number(date.today())
+        st.markdown(f"#### 🗓️ Semana Actual: {current_week_num}")
+
+    # Date selector for the list
+    col_d1, col_d2 = st.columns(2)
+    with col_d1:
+        filter_option = st.selectbox(
+            "Filtrar lista por:", 
+            ["Esta Semana (Lun-Dom)", "Últimos 15 días", "Seleccionar Rango"],
+            index=1 # Default to last 15 days so we see recent entries even if they were last week
+        )
+    
+    today = date.today()
+    if filter_option == "Esta Semana (Lun-Dom)":
+        start_date = today - timedelta(days=today.weekday())
+        end_date = today + timedelta(days=6 - today.weekday())
+    elif filter_option == "Últimos 15 días":
+        start_date = today - timedelta(days=15)
+        end_date = today
+    else: # Select Range
+        with col_d2:
+            date_range = st.date_input(
+                "Selecciona rango",
+                value=(today - timedelta(days=7), today),
+                key="visit_date_range"
+            )
+            if isinstance(date_range, tuple) and len(date_range) == 2:
+                start_date, end_date = date_range
+            else:
+                start_date = today - timedelta(days=7)
+                end_date = today
+
+    visitas = section_rows(SECTION_KEY, (start_date, end_date),
+                           lambda: rows_to_frame(db.get_visitas_by_period(start_date, end_date)))
+
+    if not visitas.empty:
+        st.info(f"Mostrando {len(visitas)} visitas del {start_date} al {end_date}")
+        visita = record_grid(visitas, GRID_COLUMNS, key="grid_visitas_recientes")
+
+        if visita:
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                if st.button("✏️ Editar Visita", key=f"edit_{visita['id']}"):
+                    st.session_state['visita_to_edit'] = visita
+                    st.session_state['page'] = "📝 Registrar Visita"
+                    st.rerun()
+            with col2:
+                if st.button("🎯 Convertir a Oportunidad", key=f"conv_{visita['id']}"):
+                    st.session_state['visita_to_convert'] = visita
+                    st.session_state['page'] = "🎯 Registrar Oportunidad"
+                    st.rerun()
+            with col3:
+                if st.button("🗑️ Eliminar Visita", key=f"del_{visita['id']}"):
+                    st.session_state['visita_to_delete'] = visita['id']
+                    st.session_state['show_delete_confirm'] = True
+                    st.rerun(scope="fragment")
+        else:
+            st.caption("Seleccione una fila para editar, convertir o eliminar.")
+    else:
+        st.info("No hay visitas registradas en este período.")
+
+    # Delete confirmation dialog
+    if st.session_state.get('show_delete_confirm', False):
+        visita_id = st.session_state.get('visita_to_delete')
+        if visita_id:
+            st.warning("¿Está seguro que desea eliminar esta visita? Esta acción no se puede deshacer.")
+            col1, col2 = st.columns(2)
+            with col1:
+                # Use a specific key for the confirm button that doesn't conflict
+                if st.button("✅ Confirmar Eliminación", key="confirm_delete_btn"):
+                    try:
+                        db.delete_visita(visita_id)
+                        st.success("Visita eliminada exitosamente.")
+                        drop_section_row(SECTION_KEY, visita_id)
+                        reset_grid("grid_visitas_recientes")
+                        # Clear state
+                        del st.session_state['visita_to_delete']
+                        del st.session_state['show_delete_confirm']
+                        st.rerun(scope="fragment")
+                    except Exception as e:
+                        st.error(f"Error al eliminar: {e}")
+            with col2:
+                if st.button("❌ Cancelar", key="cancel_delete_btn"):
+                    del st.session_state['visita_to_delete']
+                    del st.session_state['show_delete_confirm']
+                    st.rerun(scope="fragment")
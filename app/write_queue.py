@@ -0,0 +1,349 @@
+"""
+Offline-first write queue for Lux Sales Dashboard
+
+Creates and updates are stored in a local SQLite queue and acknowledged
+immediately; a background thread replays them to Supabase when the network is
+available. Replay is batched: all pending businesses go out in one upsert, the
+pending creates of each table in one insert, and opportunities converted by
+queued sales in one update.
+
+Queued records get a negative local id (-queue entry id) until they are
+replayed. Later queued writes that reference them (an opportunity converted
+from a queued visit, an edit of a queued sale) are resolved through the
+``id_map`` table at replay time. Queued sales carry PENDING_VENTA_ID and get
+their sequential ``venta_id`` when they are inserted, so sales saved offline
+or before a replay never collide.
+
+Side effects of replayed creates (marking converted opportunities, scheduling
+follow-ups) are queued as entries of their own in the same transaction that
+removes the creates, so a failure retries them instead of losing them.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+QUEUE_PATH = Path(__file__).parent / "data" / "lux_queue.db"
+
+# Create operation -> target table, in replay order (parents first)
+CREATE_TABLES = {
+    "create_visita": "visitas",
+    "create_oportunidad": "oportunidades",
+    "create_venta": "ventas",
+}
+
+# Arguments that hold record ids (possibly local ids of queued creates)
+ID_ARGS = ["visita_id", "oportunidad_id", "venta_pk"]
+
+# Arguments that travel as ISO strings in the queue
+DATE_ARGS = ["fecha", "fecha_contacto", "fecha_cierre", "fecha_instalacion", "fecha_siguiente_accion"]
+
+# venta_id of queued sales until replay assigns the real one
+PENDING_VENTA_ID = "LUX-PENDIENTE"
+
+_queue: Optional["WriteQueue"] = None
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"Cannot queue value of type {type(value).__name__}")
+
+
+class WriteQueue:
+    """Durable SQLite queue of pending Supabase writes"""
+
+    def __init__(self, client_factory, db_path: Path = QUEUE_PATH, interval: float = 5.0):
+        """
+        Args:
+            client_factory: Returns the Supabase client (called at replay time)
+            db_path: Queue database file
+            interval: Seconds between replay attempts while entries are pending
+        """
+        self.client_factory = client_factory
+        self.db_path = Path(db_path)
+        self.interval = interval
+        self.last_error: Optional[str] = None
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._local = threading.local()
+        self._thread: Optional[threading.Thread] = None
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS pending_writes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                op TEXT NOT NULL,
+                args TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                attempts INTEGER DEFAULT 0,
+                last_error TEXT
+            );
+            CREATE TABLE IF NOT EXISTS id_map (
+                local_id INTEGER PRIMARY KEY,
+                remote_id INTEGER NOT NULL
+            );
+        """)
+        conn.commit()
+        conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @property
+    def replaying(self) -> bool:
+        """True on the thread replaying the queue (its writes must go straight through)"""
+        return getattr(self._local, "replaying", False)
+
+    # --- enqueue ---
+
+    def enqueue(self, op: str, args: Dict[str, Any]) -> int:
+        """
+        Store a write and return its local id (negative until replayed)
+        """
+        conn = self._connect()
+        try:
+            entry_id = self._insert(conn, op, args)
+            conn.commit()
+        finally:
+            conn.close()
+        self._wake.set()
+        return -entry_id
+
+    def _insert(self, conn: sqlite3.Connection, op: str, args: Dict[str, Any]) -> int:
+        cursor = conn.execute(
+            "INSERT INTO pending_writes (op, args, created_at) VALUES (?, ?, ?)",
+            (op, json.dumps(args, default=_encode), time.time())
+        )
+        return cursor.lastrowid
+
+    # --- status ---
+
+    def pending_count(self) -> int:
+        conn = self._connect()
+        try:
+            return conn.execute("SELECT COUNT(*) FROM pending_writes").fetchone()[0]
+        finally:
+            conn.close()
+
+    def sync_lag(self) -> float:
+        """Age in seconds of the oldest write not yet in Supabase (0 when in sync)"""
+        conn = self._connect()
+        try:
+            oldest = conn.execute("SELECT MIN(created_at) FROM pending_writes").fetchone()[0]
+        finally:
+            conn.close()
+        return time.time() - oldest if oldest else 0.0
+
+    # --- replay ---
+
+    def _resolve(self, conn: sqlite3.Connection, args: Dict[str, Any]) -> Dict[str, Any]:
+        """Swap local ids of queued creates for their Supabase ids and parse dates"""
+        for name in ID_ARGS:
+            value = args.get(name)
+            if isinstance(value, int) and value < 0:
+                row = conn.execute("SELECT remote_id FROM id_map WHERE local_id = ?", (value,)).fetchone()
+                if row is None:
+                    raise LookupError(f"{name}={value} refers to a write that is not synced yet")
+                args[name] = row[0]
+        for name in DATE_ARGS:
+            if isinstance(args.get(name), str):
+                args[name] = date.fromisoformat(args[name])
+        return args
+
+    def _done(self, conn: sqlite3.Connection, entry_id: int, remote_id: Optional[int] = None) -> None:
+        if remote_id is not None:
+            conn.execute("INSERT OR REPLACE INTO id_map (local_id, remote_id) VALUES (?, ?)", (-entry_id, remote_id))
+        conn.execute("DELETE FROM pending_writes WHERE id = ?", (entry_id,))
+
+    def _follow_up(self, conn: sqlite3.Connection, op: str, args: Dict[str, Any]) -> Dict[str, Any]:
+        """Queue a side effect of replayed creates (committed with their _done)"""
+        return {"id": self._insert(conn, op, args), "op": op, "args": json.loads(json.dumps(args, default=_encode))}
+
+    def _failed(self, conn: sqlite3.Connection, entry_ids: List[int], error: Exception) -> None:
+        self.last_error = str(error)
+        conn.executemany(
+            "UPDATE pending_writes SET attempts = attempts + 1, last_error = ? WHERE id = ?",
+            [(str(error), i) for i in entry_ids]
+        )
+
+    def _upsert_businesses(self, client, entries: List[Dict[str, Any]]) -> Dict[tuple, int]:
+        """One upsert for every business referenced by pending creates"""
+        businesses = {}
+        for entry in entries:
+            args = entry['args']
+            businesses[(args['nombre'], args['direccion'])] = {
+                "nombre": args['nombre'],
+                "tipo_negocio": args['tipo_negocio'],
+                "direccion": args['direccion'],
+            }
+        if not businesses:
+            return {}
+        rows = client.table("businesses").upsert(list(businesses.values()), on_conflict="nombre,direccion").execute().data
+        return {(r['nombre'], r['direccion']): r['id'] for r in rows}
+
+    def flush(self) -> int:
+        """
+        Replay pending writes to Supabase
+
+        Returns:
+            Number of writes replayed. Stops at the first failing batch and keeps
+            the rest queued in order.
+        """
+        import database_supabase as db
+
+        with self._flush_lock:
+            self._local.replaying = True
+            conn = self._connect()
+            replayed = 0
+            try:
+                entries = [
+                    {"id": r['id'], "op": r['op'], "args": json.loads(r['args'])}
+                    for r in conn.execute("SELECT id, op, args FROM pending_writes ORDER BY id")
+                ]
+                if not entries:
+                    return 0
+                client = self.client_factory()
+                creates = [e for e in entries if e['op'] in CREATE_TABLES]
+
+                try:
+                    business_ids = self._upsert_businesses(client, creates)
+                except Exception as e:
+                    self._failed(conn, [entry['id'] for entry in creates], e)
+                    return 0
+
+                # One insert per table, parents first so children can resolve them
+                for op, table in CREATE_TABLES.items():
+                    batch = [e for e in creates if e['op'] == op]
+                    if not batch:
+                        continue
+                    try:
+                        if op == "create_venta":
+                            venta_ids = iter(db.next_venta_ids(len(batch)))
+                        records = []
+                        for entry in batch:
+                            args = self._resolve(conn, entry['args'])
+                            business_id = business_ids[(args['nombre'], args['direccion'])]
+                            if op == "create_visita":
+                                records.append(db.visita_record(
+                                    business_id, args['fecha'], args['semana'], args['notas']))
+                            elif op == "create_oportunidad":
+                                args['asignado_a'] = db.assign_sales_rep()
+                                records.append(db.oportunidad_record(
+                                    business_id, args['fecha_contacto'], args['semana'], args['m2_estimado'],
+                                    args['producto_interes'], args['siguiente_accion'], args['visita_id'],
+                                    args['source'], args['nombre_contacto'], args['cargo_contacto'],
+                                    args['celular_contacto'], args['email_contacto'], args['asignado_a'],
+                                    args.get('fecha_siguiente_accion')))
+                            else:
+                                args['venta_id'] = next(venta_ids)
+                                records.append(db.venta_record(
+                                    args['venta_id'], business_id, args['fecha_cierre'], args['semana'],
+                                    args['m2_real'], args['producto'], args['monto_soles'],
+                                    args['fecha_instalacion'], args['oportunidad_id']))
+                        rows = client.table(table).insert(records).execute().data
+                    except Exception as e:
+                        self._failed(conn, [entry['id'] for entry in batch], e)
+                        conn.commit()
+                        return replayed
+
+                    # PostgREST returns inserted rows in payload order
+                    follow_ups = []
+                    if op == "create_oportunidad":
+                        follow_ups = [("schedule_followup", {"opp_id": row['id'], "due": entry['args']['fecha_siguiente_accion']})
+                                      for entry, row in zip(batch, rows) if entry['args'].get('fecha_siguiente_accion')]
+                    elif op == "create_venta":
+                        converted = [e['args']['oportunidad_id'] for e in batch if e['args']['oportunidad_id']]
+                        if converted:
+                            follow_ups = [("mark_opportunities_converted", {"oportunidad_ids": converted})]
+                    for entry, row in zip(batch, rows):
+                        self._done(conn, entry['id'], row['id'])
+                    entries.extend(self._follow_up(conn, name, args) for name, args in follow_ups)
+                    conn.commit()
+                    replayed += len(batch)
+
+                    if op == "create_oportunidad":
+                        for entry, row in zip(batch, rows):
+                            args = entry['args']
+                            try:
+                                db.notify_new_assignment(
+                                    rep_name=args['asignado_a'], opp_id=row['id'], nombre_negocio=args['nombre'],
+                                    producto=args['producto_interes'], m2=args['m2_estimado'],
+                                    siguiente_accion=args['siguiente_accion'],
+                                    nombre_contacto=args['nombre_contacto'],
+                                    celular_contacto=args['celular_contacto'], source=args['source'],
+                                )
+                            except Exception:
+                                pass  # Never let notification failure break the sync
+
+                # Updates (and the creates' side effects) replay in order through the normal functions
+                for entry in entries:
+                    if entry['op'] in CREATE_TABLES:
+                        continue
+                    try:
+                        getattr(db, entry['op'])(**self._resolve(conn, entry['args']))
+                    except Exception as e:
+                        self._failed(conn, [entry['id']], e)
+                        conn.commit()
+                        return replayed
+                    self._done(conn, entry['id'])
+                    conn.commit()
+                    replayed += 1
+
+                self.last_error = None
+                return replayed
+            finally:
+                conn.commit()
+                conn.close()
+                self._local.replaying = False
+
+    # --- background replay ---
+
+    def start(self) -> None:
+        """Replay in a background thread, retrying with backoff while offline"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="lux-write-queue", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        failures = 0
+        while True:
+            self._wake.wait(self.interval if failures == 0 else min(60, self.interval * 2 ** failures))
+            self._wake.clear()
+            try:
+                if self.pending_count():
+                    self.flush()
+                failures = failures + 1 if self.last_error else 0
+            except Exception as e:
+                failures += 1
+                logger.warning(f"Write queue replay failed: {e}")
+
+
+def start_write_queue(client_factory, db_path: Path = QUEUE_PATH, interval: float = 5.0) -> WriteQueue:
+    """Create the process-wide queue and start replaying it"""
+    global _queue
+    _queue = WriteQueue(client_factory, db_path, interval)
+    _queue.start()
+    return _queue
+
+
+def active_write_queue() -> Optional[WriteQueue]:
+    """The queue that should accept writes, or None to write straight to Supabase"""
+    if _queue is None or _queue.replaying:
+        return None
+    return _queue
+
+
+def write_queue() -> Optional[WriteQueue]:
+    """The running queue (for status display), regardless of the calling thread"""
+    return _queue
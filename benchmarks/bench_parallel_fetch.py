@@ -0,0 +1,49 @@
+"""
+Parallel vs sequential fetch of the Inicio/KPIs getters
+
+Simulates the three independent Supabase round trips (visits, active
+opportunities, sales) with a fixed latency and compares page data latency when
+they run one after another vs through parallel_fetch.fetch_parallel.
+
+Usage:
+    python benchmarks/bench_parallel_fetch.py [--latency-ms 120] [--runs 10]
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+from parallel_fetch import fetch_parallel
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency-ms", type=float, default=120, help="Simulated round trip per query")
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    # Slightly different latencies, like real queries
+    latencies = {"visitas": args.latency_ms, "oportunidades": args.latency_ms * 1.2, "ventas": args.latency_ms * 0.8}
+    calls = {name: (lambda ms=ms: time.sleep(ms / 1000)) for name, ms in latencies.items()}
+
+    sequential, parallel = [], []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        for fn in calls.values():
+            fn()
+        sequential.append((time.perf_counter() - start) * 1000)
+
+        _, timings = fetch_parallel(calls)
+        parallel.append(timings.wall_ms)
+
+    print(f"secuencial  {statistics.median(sequential):7.1f} ms (suma de round trips)")
+    print(f"paralelo    {statistics.median(parallel):7.1f} ms (máximo de round trips)")
+    print(f"última      {timings.summary()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Startup-time benchmark for the dashboard
+
+Compares the import cost of the old eager import set (everything loaded at the
+top of dashboard.py) against the lazy set the Inicio page needs now, using
+``python -X importtime`` in a fresh interpreter for each measurement, and the
+cost of ``init_database`` (schema migrations) on a new database, at process
+start and on later reruns.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 5] [--reruns 50]
+"""
+
+import argparse
+import contextlib
+import io
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent.parent / "app"
+
+# Modules dashboard.py used to import at the top of every run
+EAGER_IMPORTS = ["streamlit", "pandas", "supabase", "database_supabase", "excel_reader"]
+# Modules loaded before the Inicio page renders after the lazy split
+LAZY_IMPORTS = ["streamlit", "database_supabase", "constants", "views", "views.inicio"]
+
+
+def measure_import_time(modules):
+    """
+    Import the given modules in a fresh interpreter with -X importtime
+
+    Returns:
+        Total cumulative import time in milliseconds, or None if an import failed
+    """
+    code = f"import sys; sys.path.insert(0, {str(APP_DIR)!r}); " + "; ".join(f"import {m}" for m in modules)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        print(proc.stderr.strip().splitlines()[-1], file=sys.stderr)
+        return None
+
+    # Lines look like: "import time:   self [us] | cumulative | imported package"
+    # Top-level imports are the ones with no leading indentation in the package column
+    total_us = 0
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, package = line[len("import time:"):].split("|")
+        if not package.startswith(" ") or package.startswith("  "):
+            continue
+        total_us += int(cumulative)
+    return total_us / 1000
+
+
+def measure_init_database(reruns: int):
+    """
+    Time the SQLite init_database (migrations.py) on a new database, on the
+    first start of a process with an up-to-date database, and on later reruns
+
+    Returns:
+        (new_db_ms, process_start_ms, per_rerun_ms)
+    """
+    sys.path.insert(0, str(APP_DIR))
+    import database
+    import migrations
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = Path(tmp) / "bench.db"
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            database.init_database()
+            new_db = (time.perf_counter() - start) * 1000
+
+            samples = []
+            for _ in range(reruns):
+                migrations._migrated.clear()  # as in a new process: one schema_version read
+                start = time.perf_counter()
+                database.init_database()
+                samples.append((time.perf_counter() - start) * 1000)
+
+            start = time.perf_counter()
+            for _ in range(reruns):
+                database.init_database()
+            per_rerun = (time.perf_counter() - start) * 1000 / reruns
+    return new_db, statistics.median(samples), per_rerun
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per import set")
+    parser.add_argument("--reruns", type=int, default=50, help="Simulated reruns for init_database")
+    args = parser.parse_args()
+
+    print("⏱️ Cold start (python -X importtime, median of runs)")
+    results = {}
+    for label, modules in [("eager (antes)", EAGER_IMPORTS), ("lazy (Inicio)", LAZY_IMPORTS)]:
+        samples = [measure_import_time(modules) for _ in range(args.runs)]
+        if None in samples:
+            print(f"  {label:<16} no se pudo medir (dependencias faltantes)")
+            continue
+        results[label] = statistics.median(samples)
+        print(f"  {label:<16} {results[label]:8.1f} ms  ({', '.join(modules)})")
+    if len(results) == 2:
+        eager, lazy = results.values()
+        print(f"  reducción        {eager - lazy:8.1f} ms ({(1 - lazy / eager) * 100:.0f}%)")
+
+    print(f"\n🔁 init_database con migraciones ({args.reruns} reruns, SQLite)")
+    new_db, process_start, per_rerun = measure_init_database(args.reruns)
+    print(f"  base nueva       {new_db:8.3f} ms")
+    print(f"  inicio proceso   {process_start:8.3f} ms  (lectura de schema_version)")
+    print(f"  rerun            {per_rerun:8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,380 @@
+"""
+Benchmark suite for the SQLite backend, the Excel reader and the KPIs
+
+Generates (or reuses) a seeded dataset with datagen.py, then times every
+getter, every write function, generate_venta_id, the Excel reader paths and
+the KPI computations. Writes run against a copy of the dataset, so the cached
+data stays identical between runs.
+
+Results are written as JSON for comparing runs over time:
+
+    python benchmarks/bench_suite.py --scale 100k --output results/100k-before.json
+    python benchmarks/bench_suite.py --scale 100k --output results/100k-after.json \\
+        --compare results/100k-before.json
+
+Usage:
+    python benchmarks/bench_suite.py [--scale 1k|100k|1m] [--seed 42] [--repeat 20]
+                                     [--only getters,writes,...] [--output FILE] [--compare FILE]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+BENCH_DIR = Path(__file__).resolve().parent
+APP_DIR = BENCH_DIR.parent / "app"
+DATA_DIR = BENCH_DIR / ".data"
+sys.path.insert(0, str(APP_DIR))
+sys.path.insert(0, str(BENCH_DIR))
+
+import datagen  # noqa: E402
+
+GROUPS = ["getters", "writes", "venta_id", "excel", "kpis"]
+# Records per call in the batched delete benchmarks
+BULK_DELETE = 20
+
+
+def _stats(samples_ms: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples_ms)
+    return {
+        "runs": len(ordered),
+        "min_ms": round(ordered[0], 3),
+        "median_ms": round(statistics.median(ordered), 3),
+        "mean_ms": round(statistics.fmean(ordered), 3),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+        "max_ms": round(ordered[-1], 3),
+    }
+
+
+def timed(fn: Callable[[int], Any], repeat: int, warmup: int = 1) -> Dict[str, float]:
+    """Time fn(i) for i in range(repeat) after a warmup call; i lets writes use fresh values"""
+    for i in range(warmup):
+        fn(-1 - i)
+    samples = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        fn(i)
+        samples.append((time.perf_counter() - start) * 1000)
+    return _stats(samples)
+
+
+def dataset(scale: str, seed: int, with_excel: bool) -> Dict[str, Path]:
+    """Cached generated database (and workbook) for a scale and seed"""
+    DATA_DIR.mkdir(exist_ok=True)
+    db_path = DATA_DIR / f"lux_{scale}_{seed}.db"
+    xlsx_path = DATA_DIR / f"gastos_{scale}_{seed}.xlsx"
+    if not db_path.exists():
+        print(f"⚙️ Generando datos {scale} (seed {seed})...")
+        datagen.generate_sqlite(db_path, scale, seed)
+    if with_excel and not xlsx_path.exists():
+        print(f"⚙️ Generando libro de gastos {scale}...")
+        datagen.generate_gastos_xlsx(xlsx_path, db_path, scale, seed)
+    return {"db": db_path, "xlsx": xlsx_path}
+
+
+# --- groups ---
+
+def bench_getters(db, repeat: int) -> Dict[str, Dict[str, float]]:
+    today = date.today()
+    week_start = today - timedelta(days=today.weekday())
+    month_start = date(today.year, today.month, 1)
+    year_start = today - timedelta(days=365)
+    return {
+        "get_visitas_by_period[week]": timed(lambda i: db.get_visitas_by_period(week_start, today), repeat),
+        "get_visitas_by_period[month]": timed(lambda i: db.get_visitas_by_period(month_start, today), repeat),
+        "get_visitas_by_period[year]": timed(lambda i: db.get_visitas_by_period(year_start, today), repeat),
+        "get_oportunidades_activas": timed(lambda i: db.get_oportunidades_activas(), repeat),
+        "get_ventas_by_period[month]": timed(lambda i: db.get_ventas_by_period(month_start, today), repeat),
+        "get_ventas_by_period[year]": timed(lambda i: db.get_ventas_by_period(year_start, today), repeat),
+        "search[word]": timed(lambda i: db.search("taller"), repeat),
+        "search[prefix]": timed(lambda i: db.search("av la"), repeat),
+        "find_similar_businesses": timed(
+            lambda i: db.find_similar_businesses("Taller el Rayo SAC", "Avenida Colonial 120, Callao"), repeat),
+        "get_businesses": timed(lambda i: db.get_businesses(), repeat),
+        "get_events[page]": timed(lambda i: db.get_events(), repeat),
+        "get_events[history]": timed(lambda i: db.get_events(entity="oportunidades", row_id=1), repeat),
+        "get_kpi_snapshot": timed(lambda i: db.get_kpi_snapshot(), repeat),
+    }
+
+
+def bench_writes(db, repeat: int) -> Dict[str, Dict[str, float]]:
+    today = date.today()
+    semana = db.get_week_number(today)
+    results = {}
+
+    results["get_or_create_business[existing]"] = timed(
+        lambda i: db.get_or_create_business("Bench Existente", "Detailing", "Av. Bench 1"), repeat)
+    results["get_or_create_business[new]"] = timed(
+        lambda i: db.get_or_create_business(f"Bench Nuevo {i}", "Detailing", f"Av. Bench {i}"), repeat)
+
+    visitas: List[int] = []
+    results["create_visita"] = timed(
+        lambda i: visitas.append(db.create_visita(f"Bench V {i}", "Detailing", "Av. Bench", today, semana, "bench")),
+        repeat)
+    results["update_visita"] = timed(
+        lambda i: db.update_visita(visitas[i], f"Bench V {i}", "Detailing", "Av. Bench", today, semana, "editada"),
+        repeat, warmup=0)
+
+    opps: List[int] = []
+    results["create_oportunidad"] = timed(
+        lambda i: opps.append(db.create_oportunidad(
+            f"Bench O {i}", "Taller Automotriz", "Av. Bench", today, semana, 120, "JP01Y (Poliurea Alto Tránsito)",
+            "Enviar cotización", visitas[i] if i >= 0 else None, "Referral",
+            "Ana Torres", "Gerente General", "+51900000000", "ana@example.pe")),
+        repeat)
+    results["update_oportunidad"] = timed(
+        lambda i: db.update_oportunidad(
+            opps[i], f"Bench O {i}", "Taller Automotriz", "Av. Bench", today, semana, 150,
+            "JP01Y (Poliurea Alto Tránsito)", "Visita técnica", "Referral",
+            "Ana Torres", "Gerente General", "+51900000000", "ana@example.pe", "Adolfo"),
+        repeat, warmup=0)
+    # An edit from the form: the row as loaded, one field changed
+    created = set(opps)
+    loaded = {r["id"]: r for r in db.get_oportunidades_activas() if r["id"] in created}
+    results["update_oportunidad[edit]"] = timed(
+        lambda i: db.update_oportunidad(
+            opps[i], f"Bench O {i}", "Taller Automotriz", "Av. Bench", today, semana, 150,
+            "JP01Y (Poliurea Alto Tránsito)", "Enviar muestra", "Referral",
+            "Ana Torres", "Gerente General", "+51900000000", "ana@example.pe", "Adolfo",
+            original=loaded[opps[i]]),
+        repeat, warmup=0)
+
+    ventas: List[int] = []
+    results["create_venta"] = timed(
+        lambda i: ventas.append(db.create_venta(
+            db.generate_venta_id(), f"Bench O {i}", "Taller Automotriz", "Av. Bench", today, semana,
+            120, "JP01Y (Poliurea Alto Tránsito)", 6000.0, None, opps[i] if i >= 0 else None)),
+        repeat)
+    results["update_venta"] = timed(
+        lambda i: db.update_venta(
+            ventas[i], f"Bench O {i}", "Taller Automotriz", "Av. Bench", today, semana,
+            130, "JP01Y (Poliurea Alto Tránsito)", 6500.0, today),
+        repeat, warmup=0)
+
+    # Each merge folds a "SAC" duplicate with one visit into its business
+    pairs = {}
+    for i in range(-1, repeat):
+        duplicate = (f"Bench Merge {i} SAC", "Detailing", f"Avenida Bench {i}")
+        db.create_visita(*duplicate, today, semana)
+        pairs[i] = (db.get_or_create_business(f"Bench Merge {i}", "Detailing", f"Av. Bench {i}"),
+                    db.get_or_create_business(*duplicate))
+    results["merge_businesses"] = timed(lambda i: db.merge_businesses(pairs[i][0], [pairs[i][1]]), repeat)
+
+    results["mark_opportunity_lost"] = timed(lambda i: db.mark_opportunity_lost(opps[i], "Precio alto"),
+                                             repeat, warmup=0)
+    results["delete_oportunidad"] = timed(lambda i: db.delete_oportunidad(opps[i]), repeat, warmup=0)
+    results["delete_visita"] = timed(lambda i: db.delete_visita(visitas[i]), repeat, warmup=0)
+
+    # Bulk cleanup, BULK_DELETE records per call: visits linked to opportunities, then those opportunities
+    bulk = {}
+    for i in range(repeat):
+        visit_ids = [db.create_visita(f"Bench Bulk {i}", "Detailing", "Av. Bench", today, semana)
+                     for _ in range(BULK_DELETE)]
+        bulk[i] = (visit_ids, [db.create_oportunidad(f"Bench Bulk {i}", "Detailing", "Av. Bench", today, semana,
+                                                     visita_id=visita_id) for visita_id in visit_ids])
+    results["delete_visitas"] = timed(lambda i: db.delete_visitas(bulk[i][0]), repeat, warmup=0)
+    results["delete_oportunidades"] = timed(lambda i: db.delete_oportunidades(bulk[i][1]), repeat, warmup=0)
+    results["delete_ventas"] = timed(lambda i: db.delete_ventas(ventas), 1, warmup=0)
+    # Real snapshots are timed in bench_kpis; this one only exercises the insert and the pruning
+    results["save_kpi_snapshot"] = timed(
+        lambda i: db.save_kpi_snapshot({"generado": time.time(), "fecha": today.isoformat(), "last_event_id": i}),
+        repeat)
+    return results
+
+
+def bench_venta_id(db, repeat: int) -> Dict[str, Dict[str, float]]:
+    return {"generate_venta_id": timed(lambda i: db.generate_venta_id(), repeat)}
+
+
+def bench_excel(xlsx_path: Path, repeat: int, db=None) -> Dict[str, Dict[str, float]]:
+    import excel_reader
+    from margins import sale_margins
+
+    # The reader only looks at the accountant's Drive file when it exists locally
+    excel_reader.IS_CLOUD = False
+    today = date.today()
+    month_start = date(today.year, today.month, 1)
+    some_venta = excel_reader.read_gastos_excel(xlsx_path)['Venta_ID'].dropna()
+    venta_id = some_venta.iloc[0] if len(some_venta) else "LUX-2026-001"
+    content = xlsx_path.read_bytes()
+
+    def cold_read(i):
+        excel_reader.clear_cache()
+        return excel_reader.read_gastos_excel(xlsx_path)
+
+    results = {
+        "read_gastos_excel[cold]": timed(cold_read, repeat),
+        "read_gastos_excel": timed(lambda i: excel_reader.read_gastos_excel(xlsx_path), repeat),
+        "read_gastos_from_uploaded_file": timed(
+            lambda i: excel_reader.read_gastos_from_uploaded_file(io.BytesIO(content)), repeat),
+        "get_gastos_by_period[month]": timed(
+            lambda i: excel_reader.get_gastos_by_period(month_start, today, xlsx_path), repeat),
+        "get_gastos_by_week": timed(
+            lambda i: excel_reader.get_gastos_by_week(datagen.week_of(today), xlsx_path), repeat),
+        "get_gastos_by_venta_id": timed(
+            lambda i: excel_reader.get_gastos_by_venta_id(venta_id, xlsx_path), repeat),
+        "get_costos_summary": timed(lambda i: excel_reader.get_costos_summary(xlsx_path), repeat),
+    }
+    if db is not None:
+        ventas = db.get_ventas_by_period(today - timedelta(days=datagen.SPAN_DAYS), today)
+        gastos = excel_reader.read_gastos_excel(xlsx_path)
+        results["margins.sale_margins[all sales]"] = timed(lambda i: sale_margins(ventas, gastos), repeat)
+    return results
+
+
+def bench_kpis(db, repeat: int) -> Dict[str, Dict[str, float]]:
+    import forecast
+    import series
+    from events import current_rows
+    from kpis import aging_report, monthly_summary, rep_leaderboard, sales_funnel
+    from snapshots import compute_snapshot
+
+    today = date.today()
+    week_start = today - timedelta(days=today.weekday())
+    month_start = date(today.year, today.month, 1)
+
+    def fetch():
+        visitas_mes = db.get_visitas_by_period(min(week_start, month_start), today)
+        lo = week_start.isoformat()
+        visitas_semana = [v for v in visitas_mes if str(v['fecha'])[:10] >= lo]
+        return visitas_semana, visitas_mes, db.get_oportunidades_activas(), db.get_ventas_by_period(month_start, today)
+
+    rows = fetch()
+    # The first call folds the whole event log; later ones only read new events
+    results = {"snapshots.compute_snapshot[first]": timed(lambda i: compute_snapshot(db, today), 1, warmup=0)}
+    oportunidades, _ = current_rows(db, "oportunidades")
+    snapshot = compute_snapshot(db, today)
+    weekly = forecast.weekly_series(current_rows(db, "ventas")[0], "monto_soles", "fecha_cierre", today)
+    # Rebuilt from the projection's daily cells, as after a write
+    def rebuild_daily(i):
+        series._daily.clear()
+        return series.daily_table(db)
+
+    results["series.daily_table[rebuild]"] = timed(rebuild_daily, repeat)
+    # Another months argument each call: a cache miss, like the first call after a write
+    results["forecast.sales_forecast[uncached]"] = timed(
+        lambda i: forecast.sales_forecast(db, today, months=3 + i), 3, warmup=0)
+    results.update({
+        "kpis.monthly_summary[compute]": timed(lambda i: monthly_summary(*rows), repeat),
+        "kpis.monthly_summary[fetch+compute]": timed(lambda i: monthly_summary(*fetch()), repeat),
+        "kpis.aging_report[compute]": timed(lambda i: aging_report(rows[2], today), repeat),
+        "kpis.sales_funnel[compute]": timed(lambda i: sales_funnel(rows[1], oportunidades, month_start), repeat),
+        "kpis.rep_leaderboard[compute]": timed(
+            lambda i: rep_leaderboard(oportunidades, rows[3], month_start), repeat),
+        "snapshots.compute_snapshot": timed(lambda i: compute_snapshot(db, today), repeat),
+        "forecast.fit[weekly soles]": timed(lambda i: forecast.fit(weekly), repeat),
+        "forecast.sales_forecast[cached]": timed(lambda i: forecast.sales_forecast(db, today), repeat),
+        "series.series[2 years, auto, by rep]": timed(
+            lambda i: series.series(db, "ingresos", today - timedelta(days=730), today, "asesor"), repeat),
+        "series.series[2 years, by day]": timed(
+            lambda i: series.series(db, "visitas", today - timedelta(days=730), today, "total", "D", budget=10_000),
+            repeat),
+        # Every chart the page can show, for the snapshot
+        "series.trends": timed(lambda i: series.trends(db, today), repeat),
+        # What the page does instead: read the stored snapshot
+        "snapshots.save+get_kpi_snapshot": timed(
+            lambda i: (db.save_kpi_snapshot(snapshot), db.get_kpi_snapshot()), repeat),
+    })
+    return results
+
+
+# --- reporting ---
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def compare(current: Dict[str, Any], previous: Dict[str, Any]) -> None:
+    meta = previous["meta"]
+    print(f"\n📈 Comparación con {meta.get('commit')} ({meta.get('timestamp')}, escala {meta.get('scale')})")
+    for name, stats in current["results"].items():
+        before = previous["results"].get(name)
+        if not before:
+            continue
+        delta = (stats["median_ms"] - before["median_ms"]) / before["median_ms"] * 100 if before["median_ms"] else 0
+        print(f"  {name:<42} {before['median_ms']:10.3f} → {stats['median_ms']:10.3f} ms  ({delta:+.0f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=datagen.SCALES, default="1k")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=20, help="Timed calls per benchmark")
+    parser.add_argument("--only", default=",".join(GROUPS), help=f"Comma-separated groups ({', '.join(GROUPS)})")
+    parser.add_argument("--output", type=Path, help="Write results as JSON")
+    parser.add_argument("--compare", type=Path, help="Previous JSON results to compare medians against")
+    args = parser.parse_args()
+
+    groups = [g.strip() for g in args.only.split(",") if g.strip()]
+    files = dataset(args.scale, args.seed, with_excel="excel" in groups)
+
+    import database
+
+    results: Dict[str, Dict[str, float]] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        # Writes go to a copy so the cached dataset never changes between runs
+        database.DB_PATH = Path(tmp) / "bench.db"
+        shutil.copy(files["db"], database.DB_PATH)
+        # Cached datasets may predate the latest migrations; any group may run first
+        database.init_database()
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            for group in groups:
+                if group == "getters":
+                    results.update(bench_getters(database, args.repeat))
+                elif group == "writes":
+                    results.update(bench_writes(database, args.repeat))
+                elif group == "venta_id":
+                    results.update(bench_venta_id(database, args.repeat))
+                elif group == "excel":
+                    results.update(bench_excel(files["xlsx"], max(1, args.repeat // 4), database))
+                elif group == "kpis":
+                    results.update(bench_kpis(database, args.repeat))
+                else:
+                    raise SystemExit(f"Unknown group: {group}")
+
+    report = {
+        "meta": {
+            "scale": args.scale,
+            "seed": args.seed,
+            "rows": datagen.counts(args.scale),
+            "repeat": args.repeat,
+            "commit": _git_commit(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+
+    print(f"⏱️ Lux benchmarks - escala {args.scale} (seed {args.seed}, {args.repeat} repeticiones)")
+    for name, stats in results.items():
+        print(f"  {name:<42} mediana {stats['median_ms']:10.3f} ms   p95 {stats['p95_ms']:10.3f} ms")
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+        print(f"\n💾 {args.output}")
+    if args.compare:
+        compare(report, json.loads(args.compare.read_text()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+Query-plan check for the SQLite backend (app/database.py)
+
+Runs every public function of the database module against a copy of a
+seeded datagen.py database (the bench_suite getters and writes, once each),
+captures each SQL statement it executes with a trace callback, and runs
+``EXPLAIN QUERY PLAN`` on it. The check fails when a statement scans a large
+table from start to end instead of searching an index, or when a database
+function issues SQL the scenario never reached.
+
+    python benchmarks/check_query_plans.py [--scale 100k] [--min-rows 1000]
+
+Exit code 1 on any full scan, so deploy.sh stops before pushing.
+"""
+
+import argparse
+import contextlib
+import functools
+import inspect
+import io
+import os
+import re
+import shutil
+import sqlite3
+import sys
+import tempfile
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+BENCH_DIR = Path(__file__).resolve().parent
+APP_DIR = BENCH_DIR.parent / "app"
+sys.path.insert(0, str(APP_DIR))
+sys.path.insert(0, str(BENCH_DIR))
+
+import datagen  # noqa: E402
+from bench_suite import bench_getters, bench_venta_id, bench_writes, dataset  # noqa: E402
+
+# Public functions of database.py that run no per-row SQL
+NOT_QUERIES = {"init_database", "assign_sales_rep", "get_week_number", "search_terms",
+               "changed_fields", "keeps_business",
+               # reached through get_*; they take the caller's connection
+               "query_visitas_by_period", "query_oportunidades_activas", "query_ventas_by_period",
+               "query_search"}
+
+# Public functions that read a whole table on purpose (batch jobs)
+FULL_READS = {"get_businesses"}
+
+DML = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "REPLACE")
+SQL_KEYWORDS = {"where", "set", "on", "join", "inner", "left", "order", "group", "limit", "values", "select"}
+LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+TABLE_REF = re.compile(r"\b(?:FROM|JOIN|UPDATE|INTO)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?", re.IGNORECASE)
+
+
+class _TracingSqlite:
+    """Stands in for the sqlite3 module inside database.py, tracing every connection"""
+
+    def __init__(self, on_statement):
+        self._on_statement = on_statement
+
+    def __getattr__(self, name):
+        return getattr(sqlite3, name)
+
+    def connect(self, *args, **kwargs):
+        conn = sqlite3.connect(*args, **kwargs)
+        conn.set_trace_callback(self._on_statement)
+        return conn
+
+
+def _normalize(sql: str) -> str:
+    return " ".join(sql.split())
+
+
+def capture_statements(db) -> Dict[str, List[str]]:
+    """
+    Run the scenario and return the distinct statements issued by each database
+    function (one example per statement shape, with the traced parameter values)
+    """
+    calls: List[str] = []
+    statements: Dict[str, Dict[str, str]] = defaultdict(dict)
+
+    def on_statement(sql: str) -> None:
+        sql = _normalize(sql)
+        owner = next((name for name in reversed(calls) if name not in NOT_QUERIES), None)
+        if owner and sql.upper().startswith(DML):
+            statements[owner].setdefault(LITERAL.sub("?", sql), sql)
+
+    def traced(name, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            calls.append(name)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                calls.pop()
+        return wrapper
+
+    originals = {name: func for name, func in vars(db).items()
+                 if not name.startswith("_") and inspect.isfunction(func) and func.__module__ == db.__name__}
+    real_sqlite = db.sqlite3
+    db.sqlite3 = _TracingSqlite(on_statement)
+    for name, func in originals.items():
+        setattr(db, name, traced(name, func))
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            bench_getters(db, 1)
+            bench_writes(db, 1)
+            bench_venta_id(db, 1)
+    finally:
+        db.sqlite3 = real_sqlite
+        for name, func in originals.items():
+            setattr(db, name, func)
+
+    found = {name: list(shapes.values()) for name, shapes in statements.items()}
+    for name in set(originals) - NOT_QUERIES - set(found):
+        found[name] = []
+    return found
+
+
+def table_sizes(conn: sqlite3.Connection) -> Dict[str, int]:
+    tables = [r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+    return {t: conn.execute(f'SELECT COUNT(*) FROM "{t}"').fetchone()[0] for t in tables}
+
+
+def full_scans(conn: sqlite3.Connection, sql: str, sizes: Dict[str, int], min_rows: int) -> Tuple[List[str], List[str]]:
+    """Plan lines that scan a large table, and the rest of the plan (for the report)"""
+    aliases = {}
+    for table, alias in TABLE_REF.findall(sql):
+        aliases[table.lower()] = table.lower()
+        if alias and alias.lower() not in SQL_KEYWORDS:
+            aliases[alias.lower()] = table.lower()
+
+    scans, plan = [], []
+    for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}"):
+        detail = row[-1]
+        plan.append(detail)
+        match = re.match(r"SCAN (\w+)", detail)
+        # FTS5 tables report their own index lookups as "SCAN t VIRTUAL TABLE INDEX n:M…"
+        if not match or "VIRTUAL TABLE" in detail:
+            continue
+        table = aliases.get(match.group(1).lower(), match.group(1).lower())
+        if sizes.get(table, 0) >= min_rows:
+            scans.append(f"{detail} ({sizes[table]:,} filas)")
+    return scans, plan
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=datagen.SCALES, default="100k")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--min-rows", type=int, default=1000, help="Tables at least this big must not be scanned")
+    parser.add_argument("--verbose", action="store_true", help="Print every plan, not only the failures")
+    args = parser.parse_args()
+
+    # Keep the local secrets.toml (WhatsApp credentials) out of the check
+    os.environ["LUX_SECRETS_FILE"] = str(BENCH_DIR / ".data" / "no-secrets.toml")
+    import database
+
+    files = dataset(args.scale, args.seed, with_excel=False)
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = Path(tmp) / "plans.db"
+        shutil.copy(files["db"], database.DB_PATH)
+        with contextlib.redirect_stdout(io.StringIO()):
+            database.init_database()  # the cached dataset may predate the current indexes
+        conn = sqlite3.connect(database.DB_PATH)
+        conn.execute("ANALYZE")
+        sizes = table_sizes(conn)
+
+        statements = capture_statements(database)
+        print(f"🔎 Planes de consulta: {sum(map(len, statements.values()))} sentencias, "
+              f"{len(statements)} funciones, escala {args.scale}")
+        for name in sorted(statements):
+            if not statements[name]:
+                failures += 1
+                print(f"❌ {name}: no ejecutó SQL en el escenario (agregarlo a bench_suite)")
+                continue
+            for sql in statements[name]:
+                scans, plan = full_scans(conn, sql, sizes, args.min_rows)
+                if name in FULL_READS:
+                    scans = []
+                if scans:
+                    failures += 1
+                    print(f"❌ {name}: {sql[:120]}")
+                    for line in scans:
+                        print(f"     {line}")
+                elif args.verbose:
+                    print(f"✅ {name}: {sql[:120]}")
+                    for line in plan:
+                        print(f"     {line}")
+        conn.close()
+
+    if failures:
+        print(f"\n{failures} problema(s) de plan de consulta")
+        sys.exit(1)
+    print("✅ Sin escaneos completos de tablas grandes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""
+Seeded synthetic data for Lux Sales Dashboard benchmarks
+
+Generates businesses, visits, opportunities (with source, asignado_a and
+contact fields), sales and a Gastos workbook with the shapes the app
+expects. The same scale and seed always produce the same data.
+
+Scales are named by their number of visits; the other tables follow fixed
+ratios (1 business per 4 visits, 2 opportunities per 5 visits, 1 sale per 10
+visits, 1 expense per 4 visits):
+
+    1k     1,000 visits
+    100k   100,000 visits
+    1m     1,000,000 visits
+
+Usage:
+    python benchmarks/datagen.py --scale 100k --seed 42 --db out.db --xlsx gastos.xlsx
+"""
+
+import argparse
+import random
+import sqlite3
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+APP_DIR = Path(__file__).resolve().parent.parent / "app"
+sys.path.insert(0, str(APP_DIR))
+
+from constants import TIPOS_NEGOCIO, PRODUCTOS, SOURCES, SALES_REPS, SALES_WEIGHTS  # noqa: E402
+
+SCALES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+
+# Data spans the last two years up to today
+SPAN_DAYS = 730
+BATCH = 10_000
+# Excel sheets stop at 1,048,576 rows (one is the header)
+EXCEL_MAX_ROWS = 1_048_575
+
+NOMBRES = ["Taller", "Autos", "Servicentro", "Factoría", "Detailing", "Maestranza", "Comercial",
+           "Inversiones", "Distribuidora", "Industrias", "Salón", "Estudio", "Garage", "Multiservicios"]
+APELLIDOS = ["El Rayo", "San Martín", "Los Andes", "Pacífico", "Santa Rosa", "Huáscar", "Inca",
+             "Del Sur", "Norteño", "Lima Centro", "La Victoria", "Surco", "Miraflores", "Callao"]
+CALLES = ["Av. Argentina", "Av. Colonial", "Jr. Huallaga", "Av. Javier Prado", "Av. Universitaria",
+          "Av. Túpac Amaru", "Jr. Lampa", "Av. Venezuela", "Av. Aviación", "Calle Los Pinos"]
+DISTRITOS = ["Cercado de Lima", "La Victoria", "San Luis", "Ate", "Los Olivos", "Surquillo",
+             "Callao", "Chorrillos", "San Juan de Lurigancho", "Independencia"]
+CONTACTOS = ["Carlos Pérez", "María Quispe", "José Ramírez", "Ana Torres", "Luis Huamán",
+             "Rosa Flores", "Jorge Mendoza", "Lucía Vargas", "Miguel Castillo", "Carmen Rojas"]
+CARGOS = ["Dueño", "Gerente General", "Jefe de Operaciones", "Administrador", "Encargado de Compras"]
+ACCIONES = ["Enviar cotización", "Visita técnica", "Llamar la próxima semana", "Enviar muestras",
+            "Reunión con gerencia", "Esperar aprobación de presupuesto"]
+MOTIVOS = ["Precio alto", "Eligió competencia", "Proyecto postergado", "Sin presupuesto", "No responde"]
+NOTAS = [None, "Interesado en pisos para taller", "Pidió catálogo", "Volver en 2 semanas",
+         "Local en remodelación", "Atendió el encargado"]
+TIPOS_GASTO_DIRECTO = ["Material", "Mano de Obra", "Transporte", "Alquiler de Equipo"]
+TIPOS_GASTO_INDIRECTO = ["Marketing", "Combustible", "Movilidad", "Oficina", "Planilla Administrativa"]
+GASTOS_COLUMNS = ["Fecha", "Semana", "Tipo_Gasto", "Categoría", "Tipo_Negocio",
+                  "Descripción", "Monto_Soles", "Venta_ID"]
+
+
+def counts(scale: str) -> Dict[str, int]:
+    """Rows per table for a named scale"""
+    visits = SCALES[scale]
+    return {
+        "businesses": max(1, visits // 4),
+        "visitas": visits,
+        "oportunidades": visits * 2 // 5,
+        "ventas": visits // 10,
+        "gastos": min(visits // 4, EXCEL_MAX_ROWS),
+    }
+
+
+def week_of(day: date) -> str:
+    return f"W{day.isocalendar()[1]:02d}"
+
+
+def _day(rng: random.Random, start: date) -> date:
+    return start + timedelta(days=rng.randrange(SPAN_DAYS + 1))
+
+
+def _phone(rng: random.Random) -> str:
+    return f"+519{rng.randrange(10**8):08d}"
+
+
+def _batches(rows: Iterator[Tuple], size: int = BATCH) -> Iterator[list]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _businesses(rng: random.Random, n: int) -> Iterator[Tuple]:
+    for i in range(1, n + 1):
+        nombre = f"{rng.choice(NOMBRES)} {rng.choice(APELLIDOS)}"
+        # The street number keeps nombre + direccion unique like the real constraint
+        direccion = f"{rng.choice(CALLES)} {i}, {rng.choice(DISTRITOS)}"
+        yield i, nombre, rng.choice(TIPOS_NEGOCIO), direccion
+
+
+def _visitas(rng: random.Random, n: int, n_businesses: int, start: date) -> Iterator[Tuple]:
+    for i in range(1, n + 1):
+        fecha = _day(rng, start)
+        yield i, rng.randint(1, n_businesses), fecha.isoformat(), week_of(fecha), rng.choice(NOTAS)
+
+
+def _oportunidades(rng: random.Random, n: int, n_visitas: int, n_businesses: int, converted: set,
+                   start: date) -> Iterator[Tuple]:
+    for i in range(1, n + 1):
+        fecha = _day(rng, start)
+        if i in converted:
+            estado, motivo = "Convertida", None
+        elif rng.random() < 0.7:
+            estado, motivo = "Activa", None
+        else:
+            estado, motivo = "Perdida", rng.choice(MOTIVOS)
+        contacto = rng.choice(CONTACTOS)
+        # Most active opportunities have a next-action date, some already overdue
+        # (derived from the id, so the random stream and other columns stay the same)
+        siguiente = fecha + timedelta(days=3 + i % 28) if estado == "Activa" and i % 4 else None
+        yield (
+            i, rng.randint(1, n_businesses),
+            rng.randint(1, n_visitas) if rng.random() < 0.6 else None,
+            fecha.isoformat(), week_of(fecha),
+            rng.choice([50, 80, 120, 200, 350, 500, 800, 1200]),
+            rng.choice(PRODUCTOS), rng.choice(ACCIONES), estado, motivo,
+            rng.choice(SOURCES), contacto, rng.choice(CARGOS), _phone(rng),
+            contacto.lower().replace(" ", ".").replace("é", "e").replace("á", "a") + "@example.pe",
+            rng.choices(SALES_REPS, weights=SALES_WEIGHTS, k=1)[0],
+            siguiente.isoformat() if siguiente else None,
+        )
+
+
+def _ventas(rng: random.Random, n: int, n_businesses: int, start: date) -> Iterator[Tuple]:
+    # Closing dates in order so venta_id sequences grow with time, like the app assigns them
+    dates = sorted(_day(rng, start) for _ in range(n))
+    per_year: Dict[int, int] = {}
+    for i, fecha in enumerate(dates, start=1):
+        per_year[fecha.year] = per_year.get(fecha.year, 0) + 1
+        m2 = rng.choice([40, 75, 120, 180, 250, 400, 650, 1000])
+        precio_m2 = rng.uniform(35, 95)
+        instalacion = fecha + timedelta(days=rng.randint(3, 30)) if rng.random() < 0.8 else None
+        yield (
+            i, f"LUX-{fecha.year}-{per_year[fecha.year]:03d}", rng.randint(1, n_businesses),
+            # 4 of 5 sales come from an opportunity (opportunity i converts into sale i)
+            i if i % 5 else None,
+            fecha.isoformat(), week_of(fecha), m2, rng.choice(PRODUCTOS), round(m2 * precio_m2, 2),
+            instalacion.isoformat() if instalacion else None,
+        )
+
+
+def generate_sqlite(db_path: Path, scale: str = "1k", seed: int = 42, today: Optional[date] = None) -> Dict[str, int]:
+    """
+    Create a SQLite database with the app schema (database.init_database) and
+    fill it with synthetic rows
+
+    Returns:
+        Rows written per table
+    """
+    import contextlib
+    import io
+
+    import database
+
+    db_path = Path(db_path)
+    if db_path.exists():
+        db_path.unlink()
+    with contextlib.redirect_stdout(io.StringIO()):
+        database.init_database(db_path)
+
+    n = counts(scale)
+    rng = random.Random(seed)
+    start = (today or date.today()) - timedelta(days=SPAN_DAYS)
+    converted = {i for i in range(1, n["ventas"] + 1) if i % 5}
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    tables = [
+        ("INSERT INTO businesses (id, nombre, tipo_negocio, direccion) VALUES (?, ?, ?, ?)",
+         _businesses(rng, n["businesses"])),
+        ("INSERT INTO visitas (id, business_id, fecha, semana, notas) VALUES (?, ?, ?, ?, ?)",
+         _visitas(rng, n["visitas"], n["businesses"], start)),
+        ("""INSERT INTO oportunidades (id, business_id, visita_id, fecha_contacto, semana, m2_estimado,
+                producto_interes, siguiente_accion, estado, motivo_perdida, source, nombre_contacto,
+                cargo_contacto, celular_contacto, email_contacto, asignado_a, fecha_siguiente_accion)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+         _oportunidades(rng, n["oportunidades"], n["visitas"], n["businesses"], converted, start)),
+        ("""INSERT INTO ventas (id, venta_id, business_id, oportunidad_id, fecha_cierre, semana, m2_real,
+                producto, monto_soles, fecha_instalacion)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+         _ventas(rng, n["ventas"], n["businesses"], start)),
+    ]
+    for sql, rows in tables:
+        for batch in _batches(rows):
+            conn.executemany(sql, batch)
+        conn.commit()
+    # The bulk load is not a change the live feed should replay
+    conn.execute("DELETE FROM change_log")
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+    return {k: v for k, v in n.items() if k != "gastos"}
+
+
+def generate_gastos_xlsx(xlsx_path: Path, db_path: Path, scale: str = "1k", seed: int = 42) -> int:
+    """
+    Write a Gastos workbook (sheet "Gastos", the accountant's template columns)
+    whose direct costs point at sales in the generated database
+
+    Returns:
+        Expense rows written
+    """
+    from openpyxl import Workbook
+
+    n = counts(scale)["gastos"]
+    rng = random.Random(seed + 1)
+    conn = sqlite3.connect(db_path)
+    ventas = conn.execute("SELECT venta_id, fecha_cierre FROM ventas").fetchall()
+    tipos = dict(conn.execute("SELECT v.venta_id, b.tipo_negocio FROM ventas v JOIN businesses b ON v.business_id = b.id"))
+    conn.close()
+    start = date.today() - timedelta(days=SPAN_DAYS)
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Gastos")
+    ws.append(GASTOS_COLUMNS)
+    for _ in range(n):
+        if ventas and rng.random() < 0.6:
+            venta_id, fecha_cierre = rng.choice(ventas)
+            fecha = date.fromisoformat(fecha_cierre) + timedelta(days=rng.randint(0, 20))
+            tipo, categoria = rng.choice(TIPOS_GASTO_DIRECTO), "Costo Directo"
+            tipo_negocio = tipos.get(venta_id)
+            # A few direct costs reference sales that don't exist (typos in the sheet)
+            if rng.random() < 0.02:
+                venta_id = f"LUX-{fecha.year}-9{rng.randrange(1000):03d}"
+        else:
+            fecha, venta_id = _day(rng, start), None
+            tipo, categoria = rng.choice(TIPOS_GASTO_INDIRECTO), "Costo Indirecto"
+            tipo_negocio = rng.choice(TIPOS_NEGOCIO)
+        ws.append([fecha, week_of(fecha), tipo, categoria, tipo_negocio, f"{tipo} - {fecha:%b %Y}",
+                   round(rng.uniform(20, 3000), 2), venta_id])
+    wb.save(xlsx_path)
+    return n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=SCALES, default="1k")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--db", type=Path, required=True, help="SQLite file to create (overwritten)")
+    parser.add_argument("--xlsx", type=Path, help="Also write a Gastos workbook here")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    rows = generate_sqlite(args.db, args.scale, args.seed)
+    print(f"✅ {args.db}: " + ", ".join(f"{t}={c:,}" for t, c in rows.items())
+          + f" ({time.perf_counter() - t0:.1f}s)")
+    if args.xlsx:
+        t0 = time.perf_counter()
+        gastos = generate_gastos_xlsx(args.xlsx, args.db, args.scale, args.seed)
+        print(f"✅ {args.xlsx}: gastos={gastos:,} ({time.perf_counter() - t0:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""
+Multi-user load test for the Streamlit app
+
+Simulates N concurrent sessions with Streamlit's AppTest. Each session opens
+the dashboard and then repeats a scripted visit:
+
+    Inicio → Registrar Visita (submit the form) → Registrar Oportunidad
+    (submit) → Registrar Venta (submit) → Ver Registros → KPIs
+
+Every rerun (page load, navigation click, form submit) is timed. For each
+session count the report shows p50/p95/p99 rerun latency and throughput
+(reruns per second across all sessions), so you can see where latency starts
+to climb as sessions are added.
+
+AppTest keeps its mock runtime in a process-wide global, so two AppTest
+instances cannot run at the same time in one process. Each session therefore
+runs in its own process; all of them start together (barrier) and share the
+same SQLite file, so write contention and lock waits are real. What this does
+not reproduce is the GIL and cache sharing of a single Streamlit server.
+
+Backends:
+    sqlite    a copy of a seeded datagen.py database
+    supabase  fake_supabase.FakeSupabase loaded with the same seeded rows
+              (exercises the real database_supabase code, no network)
+
+Usage:
+    python benchmarks/load_test.py [--sessions 1,2,4,8] [--iterations 3]
+                                   [--backend sqlite|supabase] [--scale 1k] [--output FILE]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List
+
+BENCH_DIR = Path(__file__).resolve().parent
+APP_DIR = BENCH_DIR.parent / "app"
+DASHBOARD = APP_DIR / "dashboard.py"
+sys.path.insert(0, str(APP_DIR))
+sys.path.insert(0, str(BENCH_DIR))
+
+import datagen  # noqa: E402
+from bench_suite import dataset  # noqa: E402
+
+PAGE_INICIO = "🏠 Inicio"
+PAGE_VISITA = "📝 Registrar Visita"
+PAGE_OPORTUNIDAD = "🎯 Registrar Oportunidad"
+PAGE_VENTA = "💰 Registrar Venta"
+PAGE_REGISTROS = "📋 Ver Registros"
+PAGE_KPIS = "📊 KPIs y Reportes"
+
+# (action, page): navigate to the page, or navigate and submit its form
+SCENARIO = [
+    ("navigate", PAGE_INICIO),
+    ("submit", PAGE_VISITA),
+    ("submit", PAGE_OPORTUNIDAD),
+    ("submit", PAGE_VENTA),
+    ("navigate", PAGE_REGISTROS),
+    ("navigate", PAGE_KPIS),
+]
+
+# Submit button of each form
+SUBMIT_LABELS = {
+    PAGE_VISITA: "💾 Guardar Visita",
+    PAGE_OPORTUNIDAD: "💾 Guardar Oportunidad",
+    PAGE_VENTA: "💰 Registrar Venta",
+}
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def _widget(elements, label: str):
+    for element in elements:
+        if element.label == label:
+            return element
+    raise LookupError(f"No widget labeled {label!r}")
+
+
+class Session:
+    """One simulated user driving its own AppTest instance"""
+
+    def __init__(self, number: int, timeout: float):
+        from streamlit.testing.v1 import AppTest
+
+        self.number = number
+        self.at = AppTest.from_file(str(DASHBOARD), default_timeout=timeout)
+        self.latencies: List[float] = []
+        self.errors: List[str] = []
+
+    def _run(self, action) -> None:
+        start = time.perf_counter()
+        try:
+            action()
+        except Exception as e:
+            self.errors.append(f"{type(e).__name__}: {e}")
+        self.latencies.append((time.perf_counter() - start) * 1000)
+        if self.at.exception:
+            self.errors.extend(str(ex.message) for ex in self.at.exception)
+
+    def open(self) -> None:
+        self._run(self.at.run)
+
+    def navigate(self, page: str) -> None:
+        self._run(lambda: self.at.sidebar.radio[0].set_value(page).run())
+
+    def submit(self, page: str, iteration: int) -> None:
+        self.navigate(page)
+        at, tag = self.at, f"Carga {self.number}-{iteration}"
+        try:
+            _widget(at.text_input, "Nombre del Negocio *").set_value(tag)
+            _widget(at.text_area, "Dirección *").set_value(f"Av. Prueba {self.number}, Lima")
+            if page == PAGE_VENTA:
+                _widget(at.number_input, "Monto S/. *").set_value(5000.0)
+            elif page == PAGE_OPORTUNIDAD:
+                _widget(at.number_input, "m² Estimado").set_value(120)
+        except LookupError as e:
+            self.errors.append(str(e))
+            return
+        self._run(lambda: _widget(at.button, SUBMIT_LABELS[page]).click().run())
+
+    def scenario(self, iterations: int) -> None:
+        self.open()
+        for iteration in range(iterations):
+            for action, page in SCENARIO:
+                if action == "submit":
+                    self.submit(page, iteration)
+                else:
+                    self.navigate(page)
+
+
+def prepare_backend(backend: str, db_path: Path) -> None:
+    """Point the app's storage engine at the seeded data (run in every session process)"""
+    os.environ["LUX_DB_ENGINE"] = backend
+
+    if backend == "sqlite":
+        import database
+
+        database.DB_PATH = db_path
+        return
+
+    from clients import set_supabase_client
+    from fake_supabase import FakeSupabase
+
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    tables = {t: [dict(r) for r in conn.execute(f"SELECT * FROM {t}")]
+              for t in ["businesses", "visitas", "oportunidades", "ventas"]}
+    conn.close()
+    set_supabase_client(FakeSupabase(tables))
+
+
+def _session_process(number, iterations, timeout, backend, db_path, barrier, results) -> None:
+    # AppTest runs without a server; silence its bare-mode warnings and the app's prints
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        prepare_backend(backend, db_path)
+        user = Session(number, timeout)
+        barrier.wait()
+        start = time.time()
+        user.scenario(iterations)
+        results.put((number, start, time.time(), user.latencies, user.errors))
+
+
+def run_level(sessions: int, iterations: int, timeout: float, backend: str, db_path: Path) -> Dict[str, Any]:
+    """Run N sessions concurrently and summarize their rerun latencies"""
+    ctx = multiprocessing.get_context("spawn")
+    barrier, results = ctx.Barrier(sessions), ctx.Queue()
+    procs = [
+        ctx.Process(target=_session_process, name=f"lux-load-{i}",
+                    args=(i, iterations, timeout, backend, db_path, barrier, results))
+        for i in range(sessions)
+    ]
+    for p in procs:
+        p.start()
+    # Drain before join: a child blocks on exit until its queued result is read
+    finished = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+
+    wall = max(f[2] for f in finished) - min(f[1] for f in finished)
+    latencies = sorted(ms for f in finished for ms in f[3])
+    errors = [e for f in sorted(finished) for e in f[4]]
+    return {
+        "sessions": sessions,
+        "reruns": len(latencies),
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(len(latencies) / wall, 2) if wall else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50), 1),
+        "p95_ms": round(percentile(latencies, 0.95), 1),
+        "p99_ms": round(percentile(latencies, 0.99), 1),
+        "mean_ms": round(statistics.fmean(latencies), 1),
+        "errors": len(errors),
+        "first_errors": errors[:5],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", default="1,2,4,8", help="Comma-separated concurrent session counts")
+    parser.add_argument("--iterations", type=int, default=3, help="Scenario repetitions per session")
+    parser.add_argument("--backend", choices=["sqlite", "supabase"], default="sqlite")
+    parser.add_argument("--scale", choices=datagen.SCALES, default="1k")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--timeout", type=float, default=60, help="Seconds allowed per rerun")
+    parser.add_argument("--output", type=Path, help="Write results as JSON")
+    args = parser.parse_args()
+
+    levels = [int(n) for n in args.sessions.split(",") if n.strip()]
+
+    results = []
+    files = dataset(args.scale, args.seed, with_excel=False)
+    with tempfile.TemporaryDirectory() as tmp:
+        # Keep the local secrets.toml (real credentials, realtime, queues) out of the test
+        os.environ["LUX_SECRETS_FILE"] = str(Path(tmp) / "secrets.toml")
+        print(f"🧪 Carga: backend {args.backend}, escala {args.scale}, {args.iterations} iteraciones por sesión")
+        print(f"  {'sesiones':>8} {'reruns':>7} {'rps':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errores':>8}")
+        for sessions in levels:
+            # Fresh copy per level so earlier submits don't grow the tables
+            db_path = Path(tmp) / f"load-{sessions}.db"
+            shutil.copy(files["db"], db_path)
+            level = run_level(sessions, args.iterations, args.timeout, args.backend, db_path)
+            results.append(level)
+            print(f"  {level['sessions']:>8} {level['reruns']:>7} {level['throughput_rps']:>7} "
+                  f"{level['p50_ms']:>8} {level['p95_ms']:>8} {level['p99_ms']:>8} {level['errors']:>8}")
+            for error in level["first_errors"]:
+                print(f"           ⚠️ {error}")
+
+    if args.output:
+        report = {
+            "meta": {
+                "backend": args.backend,
+                "scale": args.scale,
+                "seed": args.seed,
+                "iterations": args.iterations,
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+            },
+            "levels": results,
+        }
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+        print(f"\n💾 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -13,6 +13,13 @@ else
     echo "✅ Git already initialized"
 fi
 
+# Check that the SQLite queries still use their indexes
+echo "🔎 Checking query plans..."
+if ! python benchmarks/check_query_plans.py; then
+    echo "❌ Query plan check failed, fix the SQL or indexes before deploying"
+    exit 1
+fi
+
 # Add all files
 echo "📝 Adding files to Git..."
 git add .
@@ -0,0 +1,11 @@
+-- Version tracking for the Supabase schema (see app/migrations.py).
+-- Baseline: supabase_schema.sql, already applied to the project by hand.
+CREATE TABLE IF NOT EXISTS public.schema_version (
+    version INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    applied_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- The app only reads the version with the API key; migrations are applied over a direct connection
+ALTER TABLE public.schema_version ENABLE ROW LEVEL SECURITY;
+CREATE POLICY "Enable read access for anon/authenticated" ON public.schema_version FOR SELECT USING (true);
@@ -0,0 +1,7 @@
+-- migrate: no-transaction
+-- Indexes for the getters' filters (same as the SQLite schema), built without
+-- blocking writes. CONCURRENTLY can't run inside a transaction block.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_visitas_fecha ON public.visitas(fecha);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_ventas_fecha ON public.ventas(fecha_cierre);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_oportunidades_estado_fecha ON public.oportunidades(estado, fecha_contacto);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_oportunidades_visita ON public.oportunidades(visita_id);
@@ -0,0 +1,114 @@
+-- Full-text search for the dashboard search box (same documents as the SQLite
+-- search_index): one row per business, visit and opportunity in
+-- search_documents, kept current by triggers, ranked by search_records().
+CREATE EXTENSION IF NOT EXISTS unaccent WITH SCHEMA extensions;
+
+-- unaccent() is only STABLE; the tsvector builders below must be IMMUTABLE
+CREATE OR REPLACE FUNCTION public.lux_unaccent(value text) RETURNS text
+LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+    SELECT extensions.unaccent('extensions.unaccent', coalesce(value, ''))
+$$;
+
+-- kind: 1 business, 2 visit, 3 opportunity
+CREATE TABLE IF NOT EXISTS public.search_documents (
+    kind SMALLINT NOT NULL,
+    row_id INTEGER NOT NULL,
+    business_id INTEGER NOT NULL,
+    contenido TEXT NOT NULL,
+    documento TSVECTOR NOT NULL,
+    PRIMARY KEY (kind, row_id)
+);
+
+ALTER TABLE public.search_documents ENABLE ROW LEVEL SECURITY;
+CREATE POLICY "Enable read access for anon/authenticated" ON public.search_documents FOR SELECT USING (true);
+
+-- Weights: A business name, B address, C contact, D notes / next action
+CREATE OR REPLACE FUNCTION public.lux_search_vector(a text, b text, c text, d text) RETURNS tsvector
+LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+    SELECT setweight(to_tsvector('simple', public.lux_unaccent(a)), 'A')
+        || setweight(to_tsvector('simple', public.lux_unaccent(b)), 'B')
+        || setweight(to_tsvector('simple', public.lux_unaccent(c)), 'C')
+        || setweight(to_tsvector('simple', public.lux_unaccent(d)), 'D')
+$$;
+
+CREATE OR REPLACE FUNCTION public.lux_contacto(o public.oportunidades) RETURNS text
+LANGUAGE sql IMMUTABLE AS $$
+    SELECT concat_ws(' ', o.nombre_contacto, o.cargo_contacto, o.celular_contacto, o.email_contacto)
+$$;
+
+-- Each branch only touches its own table's columns (plpgsql plans a statement when it first runs)
+CREATE OR REPLACE FUNCTION public.lux_index_search_document() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    doc_kind SMALLINT := TG_ARGV[0]::SMALLINT;
+    doc_business INTEGER;
+    doc_text TEXT;
+    doc_vector TSVECTOR;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        DELETE FROM public.search_documents WHERE kind = doc_kind AND row_id = OLD.id;
+        RETURN OLD;
+    END IF;
+
+    IF TG_TABLE_NAME = 'businesses' THEN
+        doc_business := NEW.id;
+        doc_text := concat_ws(' ', NEW.nombre, NEW.direccion);
+        doc_vector := public.lux_search_vector(NEW.nombre, NEW.direccion, NULL, NULL);
+    ELSIF TG_TABLE_NAME = 'visitas' THEN
+        doc_business := NEW.business_id;
+        doc_text := coalesce(NEW.notas, '');
+        doc_vector := public.lux_search_vector(NULL, NULL, NULL, NEW.notas);
+    ELSE
+        doc_business := NEW.business_id;
+        doc_text := concat_ws(' ', NEW.siguiente_accion, public.lux_contacto(NEW));
+        doc_vector := public.lux_search_vector(NULL, NULL, public.lux_contacto(NEW), NEW.siguiente_accion);
+    END IF;
+
+    INSERT INTO public.search_documents (kind, row_id, business_id, contenido, documento)
+    VALUES (doc_kind, NEW.id, doc_business, doc_text, doc_vector)
+    ON CONFLICT (kind, row_id) DO UPDATE
+        SET business_id = EXCLUDED.business_id, contenido = EXCLUDED.contenido, documento = EXCLUDED.documento;
+    RETURN NEW;
+END;
+$$;
+
+CREATE TRIGGER trg_businesses_search AFTER INSERT OR DELETE OR UPDATE OF nombre, direccion
+    ON public.businesses FOR EACH ROW EXECUTE FUNCTION public.lux_index_search_document(1);
+CREATE TRIGGER trg_visitas_search AFTER INSERT OR DELETE OR UPDATE OF business_id, notas
+    ON public.visitas FOR EACH ROW EXECUTE FUNCTION public.lux_index_search_document(2);
+CREATE TRIGGER trg_oportunidades_search AFTER INSERT OR DELETE OR UPDATE OF business_id, siguiente_accion,
+    nombre_contacto, cargo_contacto, celular_contacto, email_contacto
+    ON public.oportunidades FOR EACH ROW EXECUTE FUNCTION public.lux_index_search_document(3);
+
+-- Every word must match, the last one as a prefix (search-as-you-type)
+CREATE OR REPLACE FUNCTION public.search_records(q text, max_results integer DEFAULT 20)
+RETURNS TABLE (tipo text, id integer, business_id integer, nombre text, direccion text,
+               fecha date, coincidencia text, score real)
+LANGUAGE sql STABLE AS $$
+    WITH words AS (
+        SELECT word, row_number() OVER () AS n, count(*) OVER () AS total
+        FROM regexp_split_to_table(public.lux_unaccent(lower(q)), '[^[:alnum:]]+') AS word
+        WHERE word <> ''
+    ),
+    query AS (
+        SELECT to_tsquery('simple', string_agg(
+            quote_literal(word) || CASE WHEN n = total THEN ':*' ELSE '' END, ' & ' ORDER BY n)) AS tsq
+        FROM words
+    ),
+    hits AS (
+        SELECT d.kind, d.row_id, d.business_id, d.contenido, ts_rank(d.documento, query.tsq) AS score, query.tsq
+        FROM public.search_documents d, query
+        WHERE d.documento @@ query.tsq
+        ORDER BY score DESC
+        LIMIT max_results
+    )
+    SELECT CASE h.kind WHEN 1 THEN 'negocio' WHEN 2 THEN 'visita' ELSE 'oportunidad' END,
+           h.row_id, h.business_id, b.nombre, b.direccion, coalesce(v.fecha, o.fecha_contacto),
+           ts_headline('simple', h.contenido, h.tsq, 'StartSel=**, StopSel=**, MaxWords=12, MinWords=4'),
+           h.score
+    FROM hits h
+    JOIN public.businesses b ON b.id = h.business_id
+    LEFT JOIN public.visitas v ON h.kind = 2 AND v.id = h.row_id
+    LEFT JOIN public.oportunidades o ON h.kind = 3 AND o.id = h.row_id
+    ORDER BY h.score DESC
+$$;
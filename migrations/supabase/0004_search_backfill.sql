@@ -0,0 +1,23 @@
+-- migrate: batched
+-- Index the rows that existed before 0003's triggers, 5000 per transaction.
+-- Each statement repeats until it inserts nothing.
+INSERT INTO public.search_documents (kind, row_id, business_id, contenido, documento)
+SELECT 1, b.id, b.id, concat_ws(' ', b.nombre, b.direccion),
+       public.lux_search_vector(b.nombre, b.direccion, NULL, NULL)
+FROM public.businesses b
+WHERE NOT EXISTS (SELECT 1 FROM public.search_documents d WHERE d.kind = 1 AND d.row_id = b.id)
+ORDER BY b.id LIMIT 5000;
+
+INSERT INTO public.search_documents (kind, row_id, business_id, contenido, documento)
+SELECT 2, v.id, v.business_id, coalesce(v.notas, ''),
+       public.lux_search_vector(NULL, NULL, NULL, v.notas)
+FROM public.visitas v
+WHERE NOT EXISTS (SELECT 1 FROM public.search_documents d WHERE d.kind = 2 AND d.row_id = v.id)
+ORDER BY v.id LIMIT 5000;
+
+INSERT INTO public.search_documents (kind, row_id, business_id, contenido, documento)
+SELECT 3, o.id, o.business_id, concat_ws(' ', o.siguiente_accion, public.lux_contacto(o)),
+       public.lux_search_vector(NULL, NULL, public.lux_contacto(o), o.siguiente_accion)
+FROM public.oportunidades o
+WHERE NOT EXISTS (SELECT 1 FROM public.search_documents d WHERE d.kind = 3 AND d.row_id = o.id)
+ORDER BY o.id LIMIT 5000;
@@ -0,0 +1,3 @@
+-- migrate: no-transaction
+-- GIN index for search_records(), built without blocking writes
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_search_documents_documento ON public.search_documents USING GIN (documento);
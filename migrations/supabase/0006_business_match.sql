@@ -0,0 +1,44 @@
+-- Near-duplicate businesses (app/business_match.py): pg_trgm candidates for
+-- find_similar_businesses() and an atomic merge for the dedupe job. Python
+-- rescores the candidates, so this key only needs to be close to match_key().
+CREATE EXTENSION IF NOT EXISTS pg_trgm WITH SCHEMA extensions;
+
+CREATE OR REPLACE FUNCTION public.lux_business_key(nombre text, direccion text) RETURNS text
+LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+    SELECT lower(public.lux_unaccent(concat_ws(' ', nombre, direccion)))
+$$;
+
+-- Nearest businesses by trigram distance (GiST KNN on idx_businesses_key, 0007)
+CREATE OR REPLACE FUNCTION public.similar_businesses(q text, max_results integer DEFAULT 100)
+RETURNS TABLE (id integer, nombre text, tipo_negocio text, direccion text)
+LANGUAGE sql STABLE AS $$
+    SELECT b.id, b.nombre, b.tipo_negocio, b.direccion
+    FROM public.businesses b
+    ORDER BY public.lux_business_key(b.nombre, b.direccion) OPERATOR(extensions.<->) q
+    LIMIT max_results
+$$;
+
+-- Re-point the records of duplicate_ids to keep_id and delete the duplicates;
+-- returns the number of records moved
+CREATE OR REPLACE FUNCTION public.merge_businesses(keep_id integer, duplicate_ids integer[]) RETURNS integer
+LANGUAGE plpgsql AS $$
+DECLARE
+    moved integer := 0;
+    n integer;
+BEGIN
+    duplicate_ids := array_remove(duplicate_ids, keep_id);
+
+    UPDATE public.visitas SET business_id = keep_id, updated_at = now() WHERE business_id = ANY(duplicate_ids);
+    GET DIAGNOSTICS n = ROW_COUNT;
+    moved := moved + n;
+    UPDATE public.oportunidades SET business_id = keep_id, updated_at = now() WHERE business_id = ANY(duplicate_ids);
+    GET DIAGNOSTICS n = ROW_COUNT;
+    moved := moved + n;
+    UPDATE public.ventas SET business_id = keep_id, updated_at = now() WHERE business_id = ANY(duplicate_ids);
+    GET DIAGNOSTICS n = ROW_COUNT;
+    moved := moved + n;
+
+    DELETE FROM public.businesses WHERE id = ANY(duplicate_ids);
+    RETURN moved;
+END;
+$$;
@@ -0,0 +1,8 @@
+-- migrate: no-transaction
+-- Trigram index for similar_businesses() and business_id indexes for
+-- merge_businesses() (Postgres doesn't index foreign key columns by itself)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_businesses_key
+    ON public.businesses USING GIST (public.lux_business_key(nombre, direccion) extensions.gist_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_visitas_business ON public.visitas(business_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_oportunidades_business ON public.oportunidades(business_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_ventas_business ON public.ventas(business_id);
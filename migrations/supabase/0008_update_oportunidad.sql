@@ -0,0 +1,29 @@
+-- Opportunity edits in one round trip (database_supabase.update_oportunidad):
+-- write only the columns in changes and return the previous asignado_a, so
+-- the app can notify a reassignment without reading the row first.
+CREATE OR REPLACE FUNCTION public.update_oportunidad_changes(opp_id integer, changes jsonb) RETURNS text
+LANGUAGE plpgsql AS $$
+DECLARE
+    previous text;
+    assignments text;
+BEGIN
+    SELECT asignado_a INTO previous FROM public.oportunidades WHERE id = opp_id FOR UPDATE;
+    IF NOT FOUND THEN
+        RETURN NULL;
+    END IF;
+
+    -- Columns the edit form may change; other keys are ignored
+    SELECT string_agg(format('%I = r.%I', key, key), ', ') INTO assignments
+    FROM jsonb_object_keys(changes) AS key
+    WHERE key = ANY (ARRAY['business_id', 'fecha_contacto', 'semana', 'm2_estimado', 'producto_interes',
+                           'siguiente_accion', 'source', 'nombre_contacto', 'cargo_contacto',
+                           'celular_contacto', 'email_contacto', 'asignado_a']);
+
+    IF assignments IS NOT NULL THEN
+        EXECUTE format('UPDATE public.oportunidades o SET %s, updated_at = now() '
+                       'FROM jsonb_populate_record(NULL::public.oportunidades, $1) r WHERE o.id = $2', assignments)
+        USING changes, opp_id;
+    END IF;
+    RETURN previous;
+END;
+$$;
@@ -0,0 +1,19 @@
+-- migrate: no-transaction
+-- Deleting a visit unlinks its opportunities and deleting an opportunity its
+-- sales in the same statement (ON DELETE SET NULL), instead of the app
+-- clearing the references first. Each constraint is swapped in one ALTER and
+-- added NOT VALID, then validated separately so the existing rows are checked
+-- without blocking writes. The sales index lets the delete find dependents.
+ALTER TABLE public.oportunidades
+    DROP CONSTRAINT IF EXISTS oportunidades_visita_id_fkey,
+    ADD CONSTRAINT oportunidades_visita_id_fkey
+        FOREIGN KEY (visita_id) REFERENCES public.visitas(id) ON DELETE SET NULL NOT VALID;
+ALTER TABLE public.oportunidades VALIDATE CONSTRAINT oportunidades_visita_id_fkey;
+
+ALTER TABLE public.ventas
+    DROP CONSTRAINT IF EXISTS ventas_oportunidad_id_fkey,
+    ADD CONSTRAINT ventas_oportunidad_id_fkey
+        FOREIGN KEY (oportunidad_id) REFERENCES public.oportunidades(id) ON DELETE SET NULL NOT VALID;
+ALTER TABLE public.ventas VALIDATE CONSTRAINT ventas_oportunidad_id_fkey;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_ventas_oportunidad ON public.ventas(oportunidad_id);
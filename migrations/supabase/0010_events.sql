@@ -0,0 +1,92 @@
+-- Append-only audit log (app/events.py), same rows as the SQLite events table:
+-- entity 1 businesses, 2 visitas, 3 oportunidades, 4 ventas; kind 1 created,
+-- 2 updated, 3 reassigned, 4 converted, 5 lost, 6 deleted. data is the row
+-- without nulls for created/deleted and only the changed fields for updates.
+CREATE TABLE IF NOT EXISTS public.events (
+    id BIGSERIAL PRIMARY KEY,
+    entity SMALLINT NOT NULL,
+    row_id INTEGER NOT NULL,
+    kind SMALLINT NOT NULL,
+    at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+    data JSONB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_events_row ON public.events(entity, row_id);
+
+-- Readable by the app, written only by the triggers below (SECURITY DEFINER)
+ALTER TABLE public.events ENABLE ROW LEVEL SECURITY;
+CREATE POLICY "Enable read access for anon/authenticated" ON public.events FOR SELECT USING (true);
+
+CREATE OR REPLACE FUNCTION public.lux_reject_event_change() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    RAISE EXCEPTION 'events is append-only';
+END;
+$$;
+CREATE TRIGGER trg_events_append_only BEFORE UPDATE OR DELETE ON public.events
+    FOR EACH ROW EXECUTE FUNCTION public.lux_reject_event_change();
+
+CREATE OR REPLACE FUNCTION public.lux_log_event() RETURNS trigger
+LANGUAGE plpgsql SECURITY DEFINER SET search_path = public AS $$
+DECLARE
+    event_entity SMALLINT := TG_ARGV[0]::SMALLINT;
+    new_row JSONB;
+    old_row JSONB;
+    changes JSONB;
+    event_kind SMALLINT := 2;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        new_row := to_jsonb(NEW) - 'id' - 'created_at' - 'updated_at';
+        INSERT INTO public.events (entity, row_id, kind, data)
+        VALUES (event_entity, NEW.id, 1, jsonb_strip_nulls(new_row));
+        RETURN NEW;
+    END IF;
+
+    old_row := to_jsonb(OLD) - 'id' - 'created_at' - 'updated_at';
+    IF TG_OP = 'DELETE' THEN
+        INSERT INTO public.events (entity, row_id, kind, data)
+        VALUES (event_entity, OLD.id, 6, jsonb_strip_nulls(old_row));
+        RETURN OLD;
+    END IF;
+
+    new_row := to_jsonb(NEW) - 'id' - 'created_at' - 'updated_at';
+    SELECT coalesce(jsonb_object_agg(n.key, n.value), '{}'::jsonb) INTO changes
+    FROM jsonb_each(new_row) n
+    WHERE n.value IS DISTINCT FROM old_row -> n.key;
+    IF changes = '{}'::jsonb THEN
+        RETURN NEW;
+    END IF;
+
+    IF TG_TABLE_NAME = 'oportunidades' THEN
+        event_kind := CASE
+            WHEN changes ->> 'estado' = 'Convertida' THEN 4
+            WHEN changes ->> 'estado' = 'Perdida' THEN 5
+            WHEN changes ? 'asignado_a' THEN 3
+            ELSE 2 END;
+    END IF;
+    INSERT INTO public.events (entity, row_id, kind, data) VALUES (event_entity, NEW.id, event_kind, changes);
+    RETURN NEW;
+END;
+$$;
+
+-- Rows that existed before the log: one created event each, dated with created_at
+INSERT INTO public.events (entity, row_id, kind, at, data)
+SELECT 1, t.id, 1, coalesce(t.created_at, now()), jsonb_strip_nulls(to_jsonb(t) - 'id' - 'created_at' - 'updated_at')
+FROM public.businesses t ORDER BY t.id;
+INSERT INTO public.events (entity, row_id, kind, at, data)
+SELECT 2, t.id, 1, coalesce(t.created_at, now()), jsonb_strip_nulls(to_jsonb(t) - 'id' - 'created_at' - 'updated_at')
+FROM public.visitas t ORDER BY t.id;
+INSERT INTO public.events (entity, row_id, kind, at, data)
+SELECT 3, t.id, 1, coalesce(t.created_at, now()), jsonb_strip_nulls(to_jsonb(t) - 'id' - 'created_at' - 'updated_at')
+FROM public.oportunidades t ORDER BY t.id;
+INSERT INTO public.events (entity, row_id, kind, at, data)
+SELECT 4, t.id, 1, coalesce(t.created_at, now()), jsonb_strip_nulls(to_jsonb(t) - 'id' - 'created_at' - 'updated_at')
+FROM public.ventas t ORDER BY t.id;
+
+CREATE TRIGGER trg_businesses_event AFTER INSERT OR UPDATE OR DELETE
+    ON public.businesses FOR EACH ROW EXECUTE FUNCTION public.lux_log_event(1);
+CREATE TRIGGER trg_visitas_event AFTER INSERT OR UPDATE OR DELETE
+    ON public.visitas FOR EACH ROW EXECUTE FUNCTION public.lux_log_event(2);
+CREATE TRIGGER trg_oportunidades_event AFTER INSERT OR UPDATE OR DELETE
+    ON public.oportunidades FOR EACH ROW EXECUTE FUNCTION public.lux_log_event(3);
+CREATE TRIGGER trg_ventas_event AFTER INSERT OR UPDATE OR DELETE
+    ON public.ventas FOR EACH ROW EXECUTE FUNCTION public.lux_log_event(4);
@@ -0,0 +1,33 @@
+-- Structured due date of an opportunity's next action (app/followups.py
+-- schedules WhatsApp reminders from it, kpis.aging_report counts overdue ones).
+-- A nullable column without default is a catalog-only change. The event
+-- trigger (0010) logs it through to_jsonb, so it needs no change.
+ALTER TABLE public.oportunidades ADD COLUMN IF NOT EXISTS fecha_siguiente_accion DATE;
+
+-- update_oportunidad_changes (0008) with the new column in its whitelist
+CREATE OR REPLACE FUNCTION public.update_oportunidad_changes(opp_id integer, changes jsonb) RETURNS text
+LANGUAGE plpgsql AS $$
+DECLARE
+    previous text;
+    assignments text;
+BEGIN
+    SELECT asignado_a INTO previous FROM public.oportunidades WHERE id = opp_id FOR UPDATE;
+    IF NOT FOUND THEN
+        RETURN NULL;
+    END IF;
+
+    -- Columns the edit form may change; other keys are ignored
+    SELECT string_agg(format('%I = r.%I', key, key), ', ') INTO assignments
+    FROM jsonb_object_keys(changes) AS key
+    WHERE key = ANY (ARRAY['business_id', 'fecha_contacto', 'semana', 'm2_estimado', 'producto_interes',
+                           'siguiente_accion', 'fecha_siguiente_accion', 'source', 'nombre_contacto',
+                           'cargo_contacto', 'celular_contacto', 'email_contacto', 'asignado_a']);
+
+    IF assignments IS NOT NULL THEN
+        EXECUTE format('UPDATE public.oportunidades o SET %s, updated_at = now() '
+                       'FROM jsonb_populate_record(NULL::public.oportunidades, $1) r WHERE o.id = $2', assignments)
+        USING changes, opp_id;
+    END IF;
+    RETURN previous;
+END;
+$$;
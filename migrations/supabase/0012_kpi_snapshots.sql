@@ -0,0 +1,11 @@
+-- Precomputed KPIs page figures (app/snapshots.py): the worker inserts one
+-- row per refresh and deletes all but the latest few, the page reads the
+-- newest. data is the snapshot dict as JSON.
+CREATE TABLE IF NOT EXISTS public.kpi_snapshots (
+    id BIGSERIAL PRIMARY KEY,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+    data JSONB NOT NULL
+);
+
+ALTER TABLE public.kpi_snapshots ENABLE ROW LEVEL SECURITY;
+CREATE POLICY "Enable all access for anon/authenticated" ON public.kpi_snapshots FOR ALL USING (true) WITH CHECK (true);
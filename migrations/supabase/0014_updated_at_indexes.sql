@@ -0,0 +1,7 @@
+-- migrate: no-transaction
+-- Indexes for the replica's incremental sync (updated_at >= mark ORDER BY
+-- updated_at), built without blocking writes.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_businesses_updated_at ON public.businesses(updated_at);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_visitas_updated_at ON public.visitas(updated_at);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_oportunidades_updated_at ON public.oportunidades(updated_at);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_ventas_updated_at ON public.ventas(updated_at);
@@ -0,0 +1,15 @@
+-- Realtime change feed (app/change_feed.py): publish row changes of the
+-- sales tables. Tables already in the publication are skipped, since ADD
+-- TABLE fails on them.
+DO $$
+DECLARE
+    t text;
+BEGIN
+    FOREACH t IN ARRAY ARRAY['businesses', 'visitas', 'oportunidades', 'ventas'] LOOP
+        IF NOT EXISTS (SELECT 1 FROM pg_publication_tables
+                       WHERE pubname = 'supabase_realtime' AND schemaname = 'public' AND tablename = t) THEN
+            EXECUTE format('ALTER PUBLICATION supabase_realtime ADD TABLE public.%I', t);
+        END IF;
+    END LOOP;
+END;
+$$;
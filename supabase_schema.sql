@@ -1,3 +1,4 @@
+-- Baseline schema. Later changes are versioned in migrations/supabase/ (python app/migrations.py --supabase).
 -- Enable UUID usage (optional, but good practice, though we use SERIAL/INTEGER here to match existing)
 -- For this migration, we will stick to SERIAL/INTEGER IDs to minimize code changes in the app logic that expects integers.
 
@@ -0,0 +1,47 @@
+"""
+SQLite change log tailed by change_feed.SQLiteChangeFeed
+
+    python -m pytest tests
+"""
+
+import sqlite3
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+import database  # noqa: E402
+from change_feed import LiveStore, SQLiteChangeFeed  # noqa: E402
+
+
+def _add_business(db_path: Path, nombre: str) -> None:
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO businesses (nombre, tipo_negocio, direccion) VALUES (?, 'Taller Automotriz', ?)",
+                 (nombre, f"Av. {nombre}"))
+    conn.commit()
+    conn.close()
+
+
+def test_prune_keeps_unread_and_recent_entries(tmp_path):
+    db_path = tmp_path / "lux.db"
+    database.init_database(db_path)
+    _add_business(db_path, "Uno")
+    _add_business(db_path, "Dos")
+    feed = SQLiteChangeFeed(db_path, LiveStore())
+    feed.load_snapshot()
+    _add_business(db_path, "Tres")
+    _add_business(db_path, "Cuatro")
+    assert feed.poll() == 2
+
+    # Every entry is old, but the last one has not been read yet
+    _add_business(db_path, "Cinco")
+    conn = sqlite3.connect(db_path)
+    conn.execute("UPDATE change_log SET changed_at = datetime('now', '-2 hours') WHERE id != 3")
+    conn.commit()
+    conn.close()
+
+    assert feed.prune() == 3
+    conn = sqlite3.connect(db_path)
+    assert [r[0] for r in conn.execute("SELECT id FROM change_log ORDER BY id")] == [3, 5]
+    conn.close()
+    assert feed.poll() == 1
@@ -0,0 +1,40 @@
+"""
+Event projections folded from the memory engine's log
+
+    python -m pytest tests
+"""
+
+import sys
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+import database_memory as db  # noqa: E402
+from events import KpiRollup, Projector  # noqa: E402
+
+
+@pytest.fixture
+def rollup():
+    db.reset()
+    rollup = KpiRollup()
+    yield rollup
+    db.reset()
+
+
+def test_weekly_rollup_keeps_years_apart(rollup):
+    # Both fall in week 2 of their ISO year, with the bare label "W02"
+    db.create_visita("Taller A", "Taller Automotriz", "Av. Uno 1", date(2025, 1, 8), "W02")
+    db.create_visita("Taller B", "Taller Automotriz", "Av. Dos 2", date(2026, 1, 7), "W02")
+    # ISO week 1 of 2026 starts on 2025-12-29
+    db.create_venta("LUX-2025-001", "Taller C", "Taller Automotriz", "Av. Tres 3", date(2025, 12, 30), "W01",
+                    100, "Piso", 9000.0)
+    Projector([rollup]).catch_up(db)
+
+    assert rollup.weeks() == [
+        {"semana": "2025-W02", "visitas": 1},
+        {"semana": "2026-W01", "ventas": 1, "monto_soles": 9000.0, "m2": 100.0},
+        {"semana": "2026-W02", "visitas": 1},
+    ]
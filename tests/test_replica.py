@@ -0,0 +1,56 @@
+"""
+Local read replica synced from fake_supabase.FakeSupabase
+
+    python -m pytest tests
+"""
+
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+import replica  # noqa: E402
+from fake_supabase import FakeSupabase  # noqa: E402
+
+
+def _wait_for(condition, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+@pytest.fixture
+def client():
+    return FakeSupabase({
+        "businesses": [{"id": 1, "nombre": "Taller El Rayo", "tipo_negocio": "Taller Automotriz",
+                        "direccion": "Av. Arriola 234", "updated_at": "2026-03-02T10:00:00+00:00"}],
+        "visitas": [{"id": 1, "business_id": 1, "fecha": "2026-03-02", "semana": "2026-W10",
+                     "updated_at": "2026-03-02T10:00:00+00:00"}],
+    })
+
+
+def test_reads_never_sync_inline(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(replica, "_replica", None)
+    mirror = replica.start_replica(client, tmp_path / "replica.db", max_staleness=60)
+    # Getters move to the replica once its first sync is in
+    assert _wait_for(lambda: replica.active_replica() is mirror)
+    assert len(mirror.get_visitas_by_period(date(2026, 3, 1), date(2026, 3, 31))) == 1
+
+    client.table("visitas").insert({"business_id": 1, "fecha": "2026-03-03", "semana": "2026-W10"}).execute()
+    requests = client.requests
+    mirror._lock.acquire()  # Hold the sync so the read can only be served as it is
+    try:
+        mirror.mark_stale()
+        assert len(mirror.get_visitas_by_period(date(2026, 3, 1), date(2026, 3, 31))) == 1
+        assert client.requests == requests
+    finally:
+        mirror._lock.release()
+
+    assert _wait_for(lambda: len(mirror.get_visitas_by_period(date(2026, 3, 1), date(2026, 3, 31))) == 2)
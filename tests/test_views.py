@@ -0,0 +1,63 @@
+"""
+Page flows run with Streamlit's AppTest on the in-memory engine
+
+    python -m pytest tests
+"""
+
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from streamlit.testing.v1 import AppTest
+
+APP_DIR = Path(__file__).resolve().parent.parent / "app"
+sys.path.insert(0, str(APP_DIR))
+
+import database_memory as db  # noqa: E402
+
+
+@pytest.fixture
+def app(monkeypatch, tmp_path):
+    monkeypatch.setenv("LUX_DB_ENGINE", "memory")
+    monkeypatch.setenv("LUX_SECRETS_FILE", str(tmp_path / "secrets.toml"))
+    db.reset()
+    yield AppTest.from_file(str(APP_DIR / "dashboard.py"), default_timeout=60)
+    db.reset()
+
+
+def test_edit_opportunity_selected_in_grid(app):
+    # A missing m2_estimado makes pandas store the column as float64
+    db.create_oportunidad("Taller A", "Taller Automotriz", "Av. Uno 1", date.today(), "W01", 150, "Piso", "Llamar")
+    db.create_oportunidad("Taller B", "Taller Automotriz", "Av. Dos 2", date.today(), "W01", None, "Piso", "Llamar")
+    app.session_state["page"] = "📋 Ver Registros"
+    app.run()
+
+    grid = app.dataframe(key="grid_registros_oportunidades_0")
+    row = grid.value.index[grid.value["nombre"] == "Taller A"][0]
+    app.session_state["grid_registros_oportunidades_0"] = {"selection": {"rows": [int(row)], "columns": []}}
+    app.run()
+    next(b for b in app.button if b.label == "✏️ Editar Oportunidad").click().run()
+
+    assert not app.exception
+    assert app.session_state["page"] == "🎯 Registrar Oportunidad"
+    assert app.number_input[0].value == 150
+
+
+def test_kpis_page_renders_a_stale_snapshot_and_refreshes_it_in_background(app):
+    import snapshots
+
+    stale = {**snapshots.compute_snapshot(db, gastos=pd.DataFrame()),
+             "generado": time.time() - 3 * snapshots.REFRESH_INTERVAL}
+    db.save_kpi_snapshot(stale)
+    app.session_state["page"] = "📊 KPIs y Reportes"
+    app.run()
+
+    assert not app.exception
+    assert any("desactualizadas" in w.value for w in app.warning)
+    deadline = time.monotonic() + 30
+    while db.get_kpi_snapshot()["data"]["generado"] == stale["generado"] and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert not snapshots.is_stale(db.get_kpi_snapshot()["data"])
@@ -0,0 +1,83 @@
+"""
+Offline write queue replay against fake_supabase.FakeSupabase
+
+    python -m pytest tests
+"""
+
+import sys
+from datetime import date, datetime
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+import database_supabase as db  # noqa: E402
+import write_queue  # noqa: E402
+from clients import set_supabase_client  # noqa: E402
+from fake_supabase import FakeSupabase  # noqa: E402
+
+PREFIX = f"LUX-{datetime.now().year}-"
+
+
+@pytest.fixture
+def client():
+    client = FakeSupabase({
+        "businesses": [{"id": 1, "nombre": "Taller El Rayo", "tipo_negocio": "Taller Automotriz",
+                        "direccion": "Av. Arriola 234"}],
+        "oportunidades": [{"id": 1, "business_id": 1, "estado": "Activa"}],
+        "ventas": [{"id": 1, "venta_id": f"{PREFIX}005", "business_id": 1, "fecha_cierre": "2026-01-05",
+                    "m2_real": 100, "monto_soles": 9000.0, "oportunidad_id": None}],
+    })
+    set_supabase_client(client)
+    yield client
+    set_supabase_client(None)
+
+
+@pytest.fixture
+def queue(client, tmp_path):
+    write_queue._queue = write_queue.WriteQueue(lambda: client, tmp_path / "queue.db")
+    yield write_queue._queue
+    write_queue._queue = None
+
+
+def _queue_sale(nombre: str, oportunidad_id=None) -> int:
+    return db.create_venta(db.generate_venta_id(), nombre, "Taller Automotriz", f"Av. {nombre}",
+                           date(2026, 3, 2), "2026-W10", 120, "Piso", 10000.0, date(2026, 3, 9), oportunidad_id)
+
+
+def test_queued_sales_get_their_venta_id_at_replay(client, queue):
+    first, second = _queue_sale("Uno", oportunidad_id=1), _queue_sale("Dos")
+    assert first < 0 and second < 0
+
+    # Two sales and the conversion of the first one's opportunity
+    assert queue.flush() == 3
+    assert queue.pending_count() == 0
+    ventas = client.table("ventas").select("venta_id").order("id").execute().data
+    assert [v["venta_id"] for v in ventas] == [f"{PREFIX}005", f"{PREFIX}006", f"{PREFIX}007"]
+    assert client.table("oportunidades").select("estado").eq("id", 1).execute().data[0]["estado"] == "Convertida"
+
+
+def test_failed_conversion_stays_queued(client, queue, monkeypatch):
+    _queue_sale("Uno", oportunidad_id=1)
+
+    def offline(oportunidad_ids):
+        raise ConnectionError("offline")
+
+    monkeypatch.setattr(db, "mark_opportunities_converted", offline)
+    assert queue.flush() == 1
+    assert queue.pending_count() == 1
+    assert queue.last_error == "offline"
+
+    monkeypatch.undo()
+    assert queue.flush() == 1
+    assert queue.pending_count() == 0
+    assert client.table("oportunidades").select("estado").eq("id", 1).execute().data[0]["estado"] == "Convertida"
+
+
+def test_venta_ids_continue_past_999(client):
+    # As text LUX-YYYY-999 sorts after LUX-YYYY-1000
+    for venta_id in (f"{PREFIX}999", f"{PREFIX}1000", f"LUX-{datetime.now().year - 1}-2000"):
+        client.table("ventas").insert({"venta_id": venta_id, "business_id": 1}).execute()
+
+    assert db.next_venta_ids(2) == [f"{PREFIX}1001", f"{PREFIX}1002"]